@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+
+"""
+Compares the engines that run programs for the web interface.
+Usage: python benchmark_execution.py [source_file ...] [--runs=N]
+
+Every source file is prepared once per engine (e.g. compiled to bytecode)
+and then run N times; the script prints the preparation time, the best run
+time, the speedup over simulate_execution and whether the output matches
+it. simulate_execution only runs the first function of a program, so the
+default program stays within what it supports.
+"""
+
+import contextlib
+import io
+import sys
+import time
+from compiler.lexer import Lexer
+from compiler.parser import Parser
+from compiler.code_generator import IntermediateCodeGenerator
+from compiler.execution import (BytecodeCompiler, ClosureCompiler, VirtualMachine,
+                                compile_program)
+from compiler_web.app import simulate_execution
+
+# Loop-heavy default program
+DEFAULT_PROGRAM = """int main() {
+    int total = 0;
+    int i = 0;
+    while (i < 1000) {
+        if (i / 2 * 2 == i) {
+            total = total + i * 3;
+        } else {
+            total = total - i;
+        }
+        i = i + 1;
+    }
+    print(total);
+    return 0;
+}"""
+
+
+def prepare_simulator(ast):
+    main_func = ast[0] if isinstance(ast, list) and ast else ast
+    return lambda: simulate_execution(main_func)
+
+
+def prepare_vm(ast):
+    program = BytecodeCompiler().compile(IntermediateCodeGenerator(ast).generate())
+    return lambda: VirtualMachine(program).run()
+
+
+def prepare_closures(ast):
+    return ClosureCompiler().compile(ast).run
+
+
+def prepare_python(ast):
+    return compile_program(ast).run
+
+
+ENGINES = [
+    ('simulate_execution', prepare_simulator),
+    ('bytecode-vm', prepare_vm),
+    ('closures', prepare_closures),
+    ('python-source', prepare_python)
+]
+
+
+def benchmark(name, source_code, runs):
+    """Prepares and runs a program with every engine and prints the comparison."""
+    print(f"\n{name}")
+    print(f"{'Engine':<20}  {'prepare ms':>10}  {'run ms':>10}  {'speedup':>8}  output")
+    with contextlib.redirect_stdout(io.StringIO()):
+        # The lexer and parser print debugging output
+        ast = Parser(Lexer(source_code).tokenize()).parse()
+    baseline = None
+    for engine, prepare in ENGINES:
+        start = time.perf_counter()
+        run = prepare(ast)
+        prepare_time = time.perf_counter() - start
+        best = None
+        for _ in range(runs):
+            start = time.perf_counter()
+            output = run()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        if baseline is None:
+            baseline = (best, output)
+        matches = "matches" if output == baseline[1] else "differs"
+        print(f"{engine:<20}  {prepare_time * 1000:10.3f}  {best * 1000:10.3f}"
+              f"  {baseline[0] / best:7.1f}x  {matches}")
+
+
+def main():
+    runs = 3
+    sources = []
+    for arg in sys.argv[1:]:
+        if arg.startswith("--runs="):
+            runs = int(arg[len("--runs="):])
+        else:
+            sources.append(arg)
+
+    if not sources:
+        benchmark("default loop program", DEFAULT_PROGRAM, runs)
+    for source_file in sources:
+        with open(source_file, 'r') as f:
+            benchmark(source_file, f.read(), runs)
+
+if __name__ == "__main__":
+    main()
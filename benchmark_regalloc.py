@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+
+"""
+Compares the register allocators on the static code they produce.
+Usage: python benchmark_regalloc.py [source_file ...] [-O0|-O1|-O2]
+
+Every source file is compiled to assembly once with each allocator, and
+the script prints the number of instructions and the number of
+instructions with a memory operand (spill slots and globals) per function.
+Without arguments it compiles test.c and the programs in examples/.
+"""
+
+import glob
+import os
+import sys
+from compiler.lexer import Lexer
+from compiler.parser import Parser
+from compiler.semantic_analyzer import SemanticAnalyzer
+from compiler.code_generator import IntermediateCodeGenerator, TargetCodeGenerator
+from compiler.passes import build_pipeline
+from compiler.regalloc import GraphColoringAllocator, LinearScanAllocator
+
+ALLOCATORS = [
+    ('linear-scan', LinearScanAllocator),
+    ('graph-coloring', GraphColoringAllocator)
+]
+
+
+def count_code(target_code):
+    """
+    Counts instructions per function in generated assembly.
+
+    Returns:
+        dict: Maps function names to (instructions, memory operands)
+    """
+    counts = {}
+    function = None
+    in_text = False
+    for line in target_code:
+        text = line.strip()
+        if text.startswith('section'):
+            in_text = text == 'section .text'
+            continue
+        if not in_text or not text or text.startswith(('global', 'extern')):
+            continue
+        if text.endswith(':'):
+            if not line.startswith(' '):
+                function = text[:-1]
+                counts[function] = [0, 0]
+            continue
+        counts[function][0] += 1
+        if '[' in text and not text.startswith('lea'):
+            counts[function][1] += 1
+    return {name: tuple(value) for name, value in counts.items()}
+
+
+def benchmark(source_file, optimization_level):
+    """Compiles a file with every allocator and prints the comparison."""
+    with open(source_file, 'r') as f:
+        source_code = f.read()
+    ast = Parser(Lexer(source_code).tokenize()).parse()
+    SemanticAnalyzer(ast).analyze()
+    intermediate_code = IntermediateCodeGenerator(ast).generate()
+    intermediate_code = build_pipeline(optimization_level).run_on_code(intermediate_code)
+
+    results = {}
+    for name, allocator_class in ALLOCATORS:
+        target_code = TargetCodeGenerator(intermediate_code, allocator_class()).generate()
+        results[name] = count_code(target_code)
+
+    print(f"\n{source_file} (-O{optimization_level})")
+    header = f"{'Function':<20}"
+    for name, _ in ALLOCATORS:
+        header += f"  {name + ' instrs':>22}  {'memory':>6}"
+    print(header)
+    totals = {name: [0, 0] for name, _ in ALLOCATORS}
+    for function in results[ALLOCATORS[0][0]]:
+        row = f"{function:<20}"
+        for name, _ in ALLOCATORS:
+            instructions, memory = results[name][function]
+            totals[name][0] += instructions
+            totals[name][1] += memory
+            row += f"  {instructions:>22}  {memory:>6}"
+        print(row)
+    row = f"{'Total':<20}"
+    for name, _ in ALLOCATORS:
+        row += f"  {totals[name][0]:>22}  {totals[name][1]:>6}"
+    print(row)
+    return totals
+
+
+def main():
+    optimization_level = 2
+    sources = []
+    for arg in sys.argv[1:]:
+        if arg in ("-O0", "-O1", "-O2"):
+            optimization_level = int(arg[2])
+        else:
+            sources.append(arg)
+    if not sources:
+        sources = [path for path in ['test.c'] if os.path.exists(path)]
+        sources += sorted(glob.glob(os.path.join('examples', '*.c')))
+
+    for source_file in sources:
+        benchmark(source_file, optimization_level)
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,12 @@
 
 """
 Simple script to run the compiler on a source file.
-Usage: python compile.py <source_file>
+Usage: python compile.py <source_file> [-O0|-O1|-O2] [-m32] [--emit=asm|c] [--buffered-print] [--time-passes] [--debug]
+
+-O0 (the default) runs no optimization pass; it only renumbers temps so
+that temps with disjoint live ranges share a name. -O1 and -O2 optimize
+(see compiler/passes/manager.py). Both backends allocate registers by
+linear scan, or by graph coloring at -O2 (see compiler/regalloc.py).
 """
 
 import sys
@@ -11,14 +16,31 @@ from compiler.lexer import Lexer
 from compiler.parser import Parser
 from compiler.semantic_analyzer import SemanticAnalyzer
 from compiler.code_generator import IntermediateCodeGenerator, TargetCodeGenerator
+from compiler.x86_64 import X86_64CodeGenerator
+from compiler.c_backend import CCodeGenerator
+from compiler.assembler import Assembler
+from compiler.elf import write_object_file
+from compiler.passes import build_pipeline
+from compiler.regalloc import allocator_for_level
+from compiler.peephole import PeepholeOptimizer
 
-def compile_file(source_file: str, debug: bool = False) -> bool:
+def compile_file(source_file: str, debug: bool = False, optimization_level: int = 0,
+                 time_passes: bool = False, target: str = 'x86-64',
+                 buffered_print: bool = False, emit: str = 'asm') -> bool:
     """
     Compile a source file through all compilation phases.
     
     Args:
         source_file: Path to the source file
         debug: Enable debug mode
+        optimization_level: IR optimization level (0, 1 or 2)
+        time_passes: Print per-pass timing and instruction counts, and
+            the peephole rule hits
+        target: 'x86-64' (System V) or 'x86' (32-bit)
+        buffered_print: Print through a buffered runtime emitted into the
+            program instead of calling printf (x86-64 only)
+        emit: 'asm' for assembly (and an object file on x86-64) or 'c'
+            for C source to build with the system C compiler
         
     Returns:
         bool: True if compilation succeeded, False otherwise
@@ -59,11 +81,54 @@ def compile_file(source_file: str, debug: bool = False) -> bool:
                     f.write(instr + '\n')
             print(f"Intermediate code written to: {intermediate_file}")
             
+            # Optimization
+            print(f"\nOptimizing intermediate code (-O{optimization_level})...")
+            pipeline = build_pipeline(optimization_level)
+            intermediate_code = pipeline.run_on_code(intermediate_code)
+            
+            optimized_file = env.get_output_path('optimized.txt')
+            with open(optimized_file, 'w') as f:
+                for instr in intermediate_code:
+                    f.write(instr + '\n')
+            print(f"Optimized code written to: {optimized_file}")
+            
+            if time_passes:
+                print()
+                for line in pipeline.report():
+                    print(line)
+            
+            if emit == 'c':
+                # 5. C code generation; `cc -O2 output.c` builds the program
+                print("\n5. Generating C code...")
+                c_code = CCodeGenerator(intermediate_code).generate()
+                c_file = env.get_output_path('output.c')
+                with open(c_file, 'w') as f:
+                    for line in c_code:
+                        f.write(line + '\n')
+                print(f"C code written to: {c_file}")
+                print("\nCompilation completed successfully!")
+                return True
+            
             # 5. Target Code Generation
             print("\n5. Generating target code...")
-            target_generator = TargetCodeGenerator(intermediate_code)
+            if target == 'x86':
+                target_generator = TargetCodeGenerator(intermediate_code,
+                                                       allocator_for_level(optimization_level))
+            else:
+                target_generator = X86_64CodeGenerator(intermediate_code,
+                                                       allocator_for_level(optimization_level, target),
+                                                       buffered_output=buffered_print)
             target_code = target_generator.generate()
             
+            # 6. Peephole optimization of the assembly
+            print("\n6. Running peephole optimizer...")
+            peephole = PeepholeOptimizer()
+            target_code = peephole.optimize(target_code)
+            if time_passes:
+                print()
+                for line in peephole.report():
+                    print(line)
+            
             # Save target code
             target_file = env.get_output_path('output.asm')
             with open(target_file, 'w') as f:
@@ -71,6 +136,13 @@ def compile_file(source_file: str, debug: bool = False) -> bool:
                     f.write(instr + '\n')
             print(f"Assembly code written to: {target_file}")
             
+            # 7. Machine code: an ELF object file, linkable with `cc output.o`
+            if target == 'x86-64':
+                print("\n7. Assembling object file...")
+                object_file = env.get_output_path('output.o')
+                write_object_file(Assembler().assemble(target_code), object_file)
+                print(f"Object file written to: {object_file}")
+            
             print("\nCompilation completed successfully!")
             return True
             
@@ -83,13 +155,22 @@ def compile_file(source_file: str, debug: bool = False) -> bool:
 
 def main():
     if len(sys.argv) < 2:
-        print("Usage: python compile.py <source_file> [--debug]")
+        print("Usage: python compile.py <source_file> [-O0|-O1|-O2] [-m32] [--emit=asm|c] [--buffered-print] [--time-passes] [--debug]")
         sys.exit(1)
     
     source_file = sys.argv[1]
     debug_mode = "--debug" in sys.argv
+    time_passes = "--time-passes" in sys.argv
+    target = 'x86' if "-m32" in sys.argv else 'x86-64'
+    buffered_print = "--buffered-print" in sys.argv
+    emit = 'c' if "--emit=c" in sys.argv else 'asm'
+    optimization_level = 0
+    for arg in sys.argv[2:]:
+        if arg in ("-O0", "-O1", "-O2"):
+            optimization_level = int(arg[2])
     
-    success = compile_file(source_file, debug_mode)
+    success = compile_file(source_file, debug_mode, optimization_level, time_passes, target,
+                           buffered_print, emit)
     sys.exit(0 if success else 1)
 
 if __name__ == "__main__":
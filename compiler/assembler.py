@@ -0,0 +1,450 @@
+"""
+This module assembles the output of X86_64CodeGenerator into machine code,
+so that compile.py can write an object file without running an external
+assembler (see compiler.elf for the file format).
+
+The assembler understands exactly the NASM subset the x86-64 backend and
+the peephole optimizer emit:
+- Data: `name dd value` (into .data), `name db 'text', 10, 0` (printf
+  formats and string literals, the latter as byte values only; into
+  .rodata) and `name resb count` (into .bss)
+- Operands: 8/32/64-bit general-purpose registers, immediates, labels,
+  `dword [reg+disp]` and RIP-relative `[rel symbol]` memory
+- Instructions: mov, movzx, lea, add, sub, and, or, xor, cmp, test, imul
+  (two and three operands), div, idiv, neg, not, shl, sar, cdq, setcc,
+  push, pop, jmp, jcc, call, ret, syscall
+
+Jumps and calls always use the rel32 form, so an instruction's size never
+depends on where its target is and one pass with fixups suffices. Jumps
+and calls to labels of the same file are resolved here; calls to extern
+functions and RIP-relative data references become relocations.
+"""
+
+import re
+import struct
+
+from .peephole import parse_assembly
+
+REGISTERS_64 = ['rax', 'rcx', 'rdx', 'rbx', 'rsp', 'rbp', 'rsi', 'rdi',
+                'r8', 'r9', 'r10', 'r11', 'r12', 'r13', 'r14', 'r15']
+REGISTERS_32 = ['eax', 'ecx', 'edx', 'ebx', 'esp', 'ebp', 'esi', 'edi',
+                'r8d', 'r9d', 'r10d', 'r11d', 'r12d', 'r13d', 'r14d', 'r15d']
+REGISTERS_8 = ['al', 'cl', 'dl', 'bl']
+
+REGISTERS = {}
+for _size, _names in ((64, REGISTERS_64), (32, REGISTERS_32), (8, REGISTERS_8)):
+    for _number, _name in enumerate(_names):
+        REGISTERS[_name] = (_size, _number)
+
+# Condition codes of jcc and setcc
+CONDITIONS = {
+    'o': 0, 'no': 1, 'b': 2, 'ae': 3, 'e': 4, 'z': 4, 'ne': 5, 'nz': 5,
+    'be': 6, 'a': 7, 's': 8, 'ns': 9, 'l': 12, 'ge': 13, 'le': 14, 'g': 15
+}
+
+# Group 1 arithmetic: the /digit of the 0x81/0x83 forms and opcode base
+ALU_OPS = {'add': 0, 'or': 1, 'and': 4, 'sub': 5, 'xor': 6, 'cmp': 7}
+
+# Shifts by an immediate (0xC1) or by cl (0xD3)
+SHIFT_OPS = {'shl': 4, 'sal': 4, 'shr': 5, 'sar': 7}
+
+# Unary group 3 (0xF7)
+UNARY_OPS = {'not': 2, 'neg': 3, 'mul': 4, 'imul': 5, 'div': 6, 'idiv': 7}
+
+MEMORY = re.compile(r'(?:(byte|dword|qword)\s+)?\[(.*)\]$')
+DATA = re.compile(r'(\w+)\s+(db|dd|resb)\s+(.*)$')
+
+# Section of each data directive
+DATA_SECTIONS = {'dd': '.data', 'db': '.rodata', 'resb': '.bss'}
+DATA_ITEM = re.compile(r"'[^']*'|\"[^\"]*\"|-?\d+")
+
+# Relocation types of the x86-64 psABI
+R_X86_64_PC32 = 2
+R_X86_64_PLT32 = 4
+
+
+class Operand:
+    """
+    A parsed instruction operand.
+
+    Attributes:
+        kind: 'reg', 'mem', 'imm' or 'label'
+        size: Operand size in bits, or None if the instruction decides
+        number: Register number (registers and memory bases)
+        value: Immediate value or memory displacement
+        symbol: Label or symbol name (labels and RIP-relative memory)
+        plt: True for `symbol wrt ..plt`
+    """
+
+    def __init__(self, kind, size=None, number=None, value=0, symbol=None, plt=False):
+        self.kind = kind
+        self.size = size
+        self.number = number
+        self.value = value
+        self.symbol = symbol
+        self.plt = plt
+
+
+class Symbol:
+    """
+    A symbol of the object file.
+
+    Attributes:
+        name: Symbol name
+        section: Name of the defining section, or None if undefined (extern)
+        offset: Offset in the section
+        size: Size in bytes
+        kind: 'func', 'object' or 'notype'
+        is_global: True for symbols visible to the linker
+    """
+
+    def __init__(self, name, section=None, offset=0, size=0, kind='notype', is_global=False):
+        self.name = name
+        self.section = section
+        self.offset = offset
+        self.size = size
+        self.kind = kind
+        self.is_global = is_global
+
+
+class Relocation:
+    """
+    A fixup the linker applies to .text.
+
+    Attributes:
+        offset: Offset of the field in .text
+        symbol: Name of the referenced symbol
+        type: R_X86_64_PC32 or R_X86_64_PLT32
+        addend: Constant added to the symbol's address
+    """
+
+    def __init__(self, offset, symbol, type, addend):
+        self.offset = offset
+        self.symbol = symbol
+        self.type = type
+        self.addend = addend
+
+
+class ObjectCode:
+    """
+    Assembled sections, symbols and relocations of one file.
+
+    Attributes:
+        sections: Maps '.text', '.data', '.rodata' and '.bss' to their bytes
+        symbols: Symbols in definition order
+        relocations: Relocations against .text
+    """
+
+    def __init__(self):
+        self.sections = {'.text': bytearray(), '.data': bytearray(), '.rodata': bytearray(),
+                         '.bss': bytearray()}
+        self.symbols = []
+        self.relocations = []
+
+
+def parse_operand(text):
+    """
+    Parses one NASM operand.
+
+    Raises:
+        ValueError: If the operand is not in the supported subset
+    """
+    text = text.strip()
+    if text in REGISTERS:
+        size, number = REGISTERS[text]
+        return Operand('reg', size, number)
+    if re.fullmatch(r'-?\d+', text):
+        return Operand('imm', value=int(text))
+    match = MEMORY.match(text)
+    if match:
+        size = {'byte': 8, 'dword': 32, 'qword': 64, None: None}[match.group(1)]
+        address = match.group(2).replace(' ', '')
+        if address.startswith('rel'):
+            return Operand('mem', size, symbol=address[3:])
+        base = re.match(r'([a-z0-9]+)([+-]\d+)?$', address)
+        if base and REGISTERS.get(base.group(1), (0,))[0] == 64:
+            return Operand('mem', size, REGISTERS[base.group(1)][1], int(base.group(2) or 0))
+        raise ValueError(f"Unsupported address: {text}")
+    match = re.fullmatch(r'([A-Za-z_.][\w.]*)(\s+wrt\s+\.\.plt)?', text)
+    if match:
+        return Operand('label', symbol=match.group(1), plt=bool(match.group(2)))
+    raise ValueError(f"Unsupported operand: {text}")
+
+
+class Assembler:
+    """
+    Encodes the assembly of X86_64CodeGenerator into an ObjectCode.
+
+    Attributes:
+        code: ObjectCode being built
+        labels: Maps labels defined in .text to their offsets
+        fixups: (offset, label) of rel32 fields to patch once all labels are known
+        externs: Symbols declared with `extern`
+        globals: Symbols declared with `global`
+    """
+
+    def __init__(self):
+        self.code = ObjectCode()
+        self.labels = {}
+        self.fixups = []
+        self.externs = set()
+        self.globals = set()
+
+    def assemble(self, target_code):
+        """
+        Assembles a program.
+
+        Args:
+            target_code: Assembly lines from X86_64CodeGenerator
+
+        Returns:
+            ObjectCode: Sections, symbols and relocations
+
+        Raises:
+            ValueError: If an instruction or operand is not supported
+        """
+        text = self.code.sections['.text']
+        functions = []
+        for line in parse_assembly(target_code):
+            if line.mnemonic is None and line.label is None:
+                self._data(line.text)
+            elif line.label is not None:
+                self.labels[line.label] = len(text)
+                if not line.local:
+                    functions.append(line.label)
+            elif line.mnemonic == 'global':
+                self.globals.update(line.operands)
+            elif line.mnemonic == 'extern':
+                self.externs.update(line.operands)
+            else:
+                self._instruction(line.mnemonic, [parse_operand(o) for o in line.operands])
+
+        for offset, label in self.fixups:
+            if label in self.labels:
+                struct.pack_into('<i', text, offset, self.labels[label] - (offset + 4))
+            elif label in self.externs:
+                self.code.relocations.append(Relocation(offset, label, R_X86_64_PLT32, -4))
+            else:
+                raise ValueError(f"Undefined label: {label}")
+
+        # Function symbols extend to the next function
+        starts = sorted(self.labels[name] for name in functions) + [len(text)]
+        for name in functions:
+            offset = self.labels[name]
+            end = next(start for start in starts if start > offset) if offset < len(text) else offset
+            self.code.symbols.append(Symbol(name, '.text', offset, end - offset, 'func',
+                                            name in self.globals))
+        for name in sorted(self.externs):
+            self.code.symbols.append(Symbol(name, is_global=True))
+        return self.code
+
+    def _data(self, line):
+        match = DATA.match(line.strip())
+        if not match:
+            return
+        name, kind, items = match.groups()
+        section = self.code.sections[DATA_SECTIONS[kind]]
+        offset = len(section)
+        for item in DATA_ITEM.findall(items):
+            if kind == 'resb':
+                section += bytes(int(item))
+            elif kind == 'dd':
+                section += self._imm(int(item), 32)
+            elif item[0] in '\'"':
+                section += item[1:-1].encode('utf-8')
+            else:
+                section.append(int(item) & 0xFF)
+        self.code.symbols.append(Symbol(name, DATA_SECTIONS[kind], offset,
+                                        len(section) - offset, 'object',
+                                        name in self.globals))
+
+    def _emit(self, opcode, reg=0, rm=None, imm=b'', size=32, prefix=b''):
+        """
+        Emits one instruction: [REX] opcode [ModRM [SIB] [disp]] [imm].
+
+        Args:
+            opcode: Opcode bytes
+            reg: Register number or /digit for the ModRM reg field
+            rm: Register or memory Operand for the ModRM r/m field, or None
+            imm: Encoded immediate
+            size: Operand size; 64 sets REX.W
+            prefix: Bytes before the REX prefix
+        """
+        text = self.code.sections['.text']
+        rex = 0x48 if size == 64 else 0x40
+        body = bytearray()
+        symbol = None
+        if rm is not None:
+            if reg & 8:
+                rex |= 4
+            if rm.kind == 'reg':
+                if rm.number & 8:
+                    rex |= 1
+                body.append(0xC0 | (reg & 7) << 3 | (rm.number & 7))
+            elif rm.symbol is not None:
+                # RIP-relative: mod 00, r/m 101, disp32 patched by the linker
+                body.append((reg & 7) << 3 | 5)
+                symbol = len(body)
+                body += b'\0\0\0\0'
+            else:
+                base, disp = rm.number, rm.value
+                if base & 8:
+                    rex |= 1
+                if disp == 0 and base & 7 != 5:
+                    mod, encoded = 0, b''
+                elif -128 <= disp <= 127:
+                    mod, encoded = 1, struct.pack('<b', disp)
+                elif -(1 << 31) <= disp < 1 << 31:
+                    mod, encoded = 2, struct.pack('<i', disp)
+                else:
+                    raise ValueError(f"Displacement {disp} does not fit in 32 bits")
+                body.append(mod << 6 | (reg & 7) << 3 | (base & 7))
+                if base & 7 == 4:
+                    # rsp and r12 need a SIB byte without index
+                    body.append(0x24)
+                body += encoded
+        start = len(text) + len(prefix) + (rex != 0x40) + len(opcode)
+        text += prefix
+        if rex != 0x40:
+            text.append(rex)
+        text += opcode + body + imm
+        if symbol is not None:
+            field = start + symbol
+            # The CPU adds the displacement to the address of the next instruction
+            self.code.relocations.append(
+                Relocation(field, rm.symbol, R_X86_64_PC32, field - len(text)))
+
+    def _imm(self, value, size):
+        """
+        Encodes an immediate for an operand size in bits. Like NASM, 8- and
+        32-bit immediates may be signed or unsigned (4294967295 is -1);
+        64-bit operands take a sign-extended 32-bit immediate.
+
+        Raises:
+            ValueError: If the value does not fit
+        """
+        low = -(1 << 7) if size == 8 else -(1 << 31)
+        high = (1 << 8) - 1 if size == 8 else (1 << 31) - 1 if size == 64 else (1 << 32) - 1
+        if not low <= value <= high:
+            raise ValueError(f"Immediate {value} does not fit in {size} bits")
+        if size == 8:
+            return struct.pack('<B', value & 0xFF)
+        return struct.pack('<I', value & 0xFFFFFFFF)
+
+    def _rel32(self, opcode, label):
+        text = self.code.sections['.text']
+        text += opcode
+        self.fixups.append((len(text), label))
+        text += b'\0\0\0\0'
+
+    def _instruction(self, mnemonic, operands):
+        count = len(operands)
+        dest = operands[0] if operands else None
+        source = operands[1] if count > 1 else None
+        size = next((o.size for o in operands if o.kind in ('reg', 'mem') and o.size), 32)
+        if size != 64:
+            for operand in operands:
+                if operand.kind == 'imm' and 1 << (size - 1) <= operand.value < 1 << size:
+                    # An unsigned immediate, e.g. 2147483648 from the literal of
+                    # INT_MIN; take its signed value so short forms apply
+                    operand.value -= 1 << size
+
+        if mnemonic == 'mov' and count == 2:
+            if source.kind == 'imm':
+                if size == 8:
+                    self._emit(b'\xC6', 0, dest, self._imm(source.value, 8), size)
+                elif dest.kind == 'reg' and size == 32:
+                    text = self.code.sections['.text']
+                    if dest.number & 8:
+                        text.append(0x41)
+                    text.append(0xB8 + (dest.number & 7))
+                    text += self._imm(source.value, 32)
+                else:
+                    self._emit(b'\xC7', 0, dest, self._imm(source.value, size), size)
+            elif source.kind == 'reg':
+                self._emit(b'\x88' if size == 8 else b'\x89', source.number, dest, size=size)
+            else:
+                self._emit(b'\x8A' if size == 8 else b'\x8B', dest.number, source, size=size)
+        elif mnemonic == 'movzx' and count == 2:
+            self._emit(b'\x0F\xB6', dest.number, source, size=dest.size)
+        elif mnemonic == 'lea' and count == 2:
+            self._emit(b'\x8D', dest.number, source, size=dest.size)
+        elif mnemonic in ALU_OPS and count == 2:
+            digit = ALU_OPS[mnemonic]
+            if source.kind == 'imm':
+                if size == 8:
+                    self._emit(b'\x80', digit, dest, self._imm(source.value, 8), size)
+                elif -128 <= source.value <= 127:
+                    self._emit(b'\x83', digit, dest, self._imm(source.value, 8), size)
+                else:
+                    self._emit(b'\x81', digit, dest, self._imm(source.value, size), size)
+            elif source.kind == 'reg':
+                self._emit(bytes([digit * 8 + (0 if size == 8 else 1)]), source.number, dest, size=size)
+            else:
+                self._emit(bytes([digit * 8 + (2 if size == 8 else 3)]), dest.number, source, size=size)
+        elif mnemonic == 'test' and count == 2:
+            if source.kind == 'imm':
+                self._emit(b'\xF7', 0, dest, self._imm(source.value, size), size)
+            else:
+                self._emit(b'\x84' if size == 8 else b'\x85', source.number, dest, size=size)
+        elif mnemonic == 'imul' and count == 3:
+            value = operands[2].value
+            if -128 <= value <= 127:
+                self._emit(b'\x6B', dest.number, source, self._imm(value, 8), size)
+            else:
+                self._emit(b'\x69', dest.number, source, self._imm(value, size), size)
+        elif mnemonic == 'imul' and count == 2:
+            if source.kind == 'imm':
+                if -128 <= source.value <= 127:
+                    self._emit(b'\x6B', dest.number, dest, self._imm(source.value, 8), size)
+                else:
+                    self._emit(b'\x69', dest.number, dest, self._imm(source.value, size), size)
+            else:
+                self._emit(b'\x0F\xAF', dest.number, source, size=size)
+        elif mnemonic in UNARY_OPS and count == 1:
+            self._emit(b'\xF7', UNARY_OPS[mnemonic], dest, size=size)
+        elif mnemonic in SHIFT_OPS and count == 2:
+            if source.kind == 'imm' and source.value == 1:
+                self._emit(b'\xD1', SHIFT_OPS[mnemonic], dest, size=size)
+            elif source.kind == 'imm':
+                self._emit(b'\xC1', SHIFT_OPS[mnemonic], dest, self._imm(source.value, 8), size)
+            elif source.kind == 'reg' and source.size == 8 and source.number == 1:
+                self._emit(b'\xD3', SHIFT_OPS[mnemonic], dest, size=size)
+            else:
+                raise ValueError(f"Unsupported shift count for {mnemonic}")
+        elif mnemonic.startswith('set') and mnemonic[3:] in CONDITIONS and count == 1:
+            self._emit(bytes([0x0F, 0x90 + CONDITIONS[mnemonic[3:]]]), 0, dest, size=8)
+        elif mnemonic == 'push' and count == 1:
+            text = self.code.sections['.text']
+            if dest.kind == 'reg':
+                if dest.number & 8:
+                    text.append(0x41)
+                text.append(0x50 + (dest.number & 7))
+            elif dest.kind == 'imm' and -128 <= dest.value <= 127:
+                text += b'\x6A' + self._imm(dest.value, 8)
+            elif dest.kind == 'imm':
+                # Pushed immediates are sign-extended to 64 bits
+                text += b'\x68' + self._imm(dest.value, 64)
+            else:
+                self._emit(b'\xFF', 6, dest, size=32)
+        elif mnemonic == 'pop' and count == 1 and dest.kind == 'reg':
+            text = self.code.sections['.text']
+            if dest.number & 8:
+                text.append(0x41)
+            text.append(0x58 + (dest.number & 7))
+        elif mnemonic == 'jmp' and count == 1:
+            self._rel32(b'\xE9', dest.symbol)
+        elif mnemonic.startswith('j') and mnemonic[1:] in CONDITIONS and count == 1:
+            self._rel32(bytes([0x0F, 0x80 + CONDITIONS[mnemonic[1:]]]), dest.symbol)
+        elif mnemonic == 'call' and count == 1 and dest.kind == 'label':
+            self._rel32(b'\xE8', dest.symbol)
+        elif mnemonic == 'cdq' and count == 0:
+            self.code.sections['.text'].append(0x99)
+        elif mnemonic == 'syscall' and count == 0:
+            self.code.sections['.text'] += b'\x0F\x05'
+        elif mnemonic == 'ret' and count == 0:
+            self.code.sections['.text'].append(0xC3)
+        elif mnemonic == 'leave' and count == 0:
+            self.code.sections['.text'].append(0xC9)
+        else:
+            raise ValueError(f"Cannot encode: {mnemonic} {', '.join(o.kind for o in operands)}")
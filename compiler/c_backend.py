@@ -0,0 +1,231 @@
+"""
+This module contains the C backend: CCodeGenerator translates TAC into
+portable C, so that the system C compiler can build native executables
+(e.g. `cc -O2 output.c -o program`).
+
+Every TAC function becomes a C function with gotos between its blocks;
+temps become local variables. The C keeps the semantics of the x86
+backends where C itself would not:
+- Addition, subtraction, multiplication, negation and left shifts are
+  computed in unsigned arithmetic, so they wrap around instead of being
+  undefined on overflow.
+- Shift counts are masked to 0-31, as the x86 shift instructions do.
+- Division and remainder by -1 are computed as negation and 0, so
+  INT_MIN / -1 wraps around to INT_MIN instead of being undefined (it
+  traps on x86).
+- Program names get prefixes (fn_ for functions, v_ for variables), so a
+  function called `puts` cannot collide with the C library.
+"""
+
+from .cfg import build_program
+from .ir import BINARY_OPS, is_int_constant
+
+# C operators of the TAC operations that need no special care
+C_OPERATORS = {
+    'DIV': '/', 'MOD': '%',
+    'EQ': '==', 'NE': '!=', 'LT': '<', 'LE': '<=', 'GT': '>', 'GE': '>=',
+    'AND': '&&', 'OR': '||', 'BITAND': '&'
+}
+
+# Operations computed in unsigned arithmetic to wrap around on overflow
+WRAPPING_OPERATORS = {'ADD': '+', 'SUB': '-', 'MUL': '*'}
+
+
+def c_string_literal(text):
+    """
+    Returns a C string literal holding the UTF-8 bytes of text. Quotes and
+    backslashes are escaped; bytes outside printable ASCII become
+    three-digit octal escapes, which cannot run into a following digit.
+    """
+    chars = []
+    for byte in text.encode('utf-8'):
+        char = chr(byte)
+        if char in '"\\':
+            chars.append('\\' + char)
+        elif 32 <= byte < 127:
+            chars.append(char)
+        else:
+            chars.append(f'\\{byte:03o}')
+    return '"' + ''.join(chars) + '"'
+
+
+class CCodeGenerator:
+    """
+    Converts three-address code (TAC) to a C translation unit.
+
+    Attributes:
+        intermediate_code: List of TAC instructions
+        c_code: List of generated C lines
+        global_names: Names of the global variables
+        string_values: Temps of the current function holding string literals
+        pending_args: Values of the ARG instructions before the next CALL
+    """
+
+    def __init__(self, intermediate_code):
+        self.intermediate_code = intermediate_code
+        self.c_code = []
+        self.global_names = set()
+        self.string_values = set()
+        self.pending_args = []
+
+    def generate(self):
+        """
+        Generates C code from TAC.
+
+        Returns:
+            list: Generated lines of C
+        """
+        program = build_program(self.intermediate_code)
+        self.global_names = program.global_names
+
+        self.c_code.append("#include <stdio.h>")
+        self.c_code.append("")
+        for name in sorted(self.global_names):
+            self.c_code.append(f"static int v_{name};")
+        for function in program.functions:
+            self.c_code.append(f"static int {self._signature(function)};")
+
+        # Global initializers run before main
+        self.c_code.append("")
+        self.c_code.append("static void init_globals(void)")
+        self.c_code.append("{")
+        self._generate_body(program.prologue, [])
+        self.c_code.append("}")
+
+        for function in program.functions:
+            self.c_code.append("")
+            self.c_code.append(f"static int {self._signature(function)}")
+            self.c_code.append("{")
+            self._generate_body(function.linearize()[len(function.header):], function.params)
+            self.c_code.append("    return 0;")
+            self.c_code.append("}")
+
+        self.c_code.append("")
+        self.c_code.append("int main(void)")
+        self.c_code.append("{")
+        self.c_code.append("    init_globals();")
+        self.c_code.append("    return fn_main();")
+        self.c_code.append("}")
+        return self.c_code
+
+    def _signature(self, function):
+        params = ", ".join(f"int v_{param}" for param in function.params) or "void"
+        return f"fn_{function.name}({params})"
+
+    def _generate_body(self, instructions, params):
+        """
+        Emits the declarations and statements of one function body.
+
+        Args:
+            instructions: Instructions of the body, without the header
+            params: Parameter names, which need no declaration
+        """
+        self.string_values = self._find_string_values(instructions)
+        self.pending_args = []
+
+        # As in the x86 backends, a variable is local unless it is global
+        temps = []
+        local_names = []
+        for instr in instructions:
+            var = instr.loaded_var() or instr.stored_var()
+            if instr.dest is not None and instr.dest not in temps:
+                temps.append(instr.dest)
+            if (var is not None and var not in self.global_names and var not in params and
+                    var not in local_names):
+                local_names.append(var)
+        for name in local_names:
+            self.c_code.append(f"    int v_{name} = 0;")
+        for name in temps:
+            kind = "const char *" if name in self.string_values else "int "
+            self.c_code.append(f"    {kind}{name} = 0;")
+
+        for instr in instructions:
+            statement = self._convert_instruction(instr)
+            if statement:
+                self.c_code.append(statement if instr.op == 'LABEL' else "    " + statement)
+
+    def _find_string_values(self, instructions):
+        """Returns the temps that hold string literals, directly or through copies."""
+        strings = set()
+        changed = True
+        while changed:
+            changed = False
+            for instr in instructions:
+                if instr.dest is None or instr.dest in strings:
+                    continue
+                if ((instr.op == 'CONST' and instr.args[0].startswith('"')) or
+                        (instr.op == 'COPY' and instr.args[0] in strings)):
+                    strings.add(instr.dest)
+                    changed = True
+        return strings
+
+    def _value(self, operand):
+        """Returns the C expression of a TAC operand: a literal or a temp."""
+        if operand.startswith('"'):
+            return c_string_literal(operand.strip('"'))
+        return operand
+
+    def _convert_instruction(self, instr):
+        """
+        Converts one TAC instruction to a C statement.
+
+        Returns:
+            str: The statement, or None if the instruction emits nothing
+        """
+        op = instr.op
+        args = [self._value(arg) for arg in instr.args]
+        if op == 'DECLARE':
+            return None
+        if op == 'LABEL':
+            return f"{args[0]}:;"
+        if op == 'GOTO':
+            return f"goto {args[0]};"
+        if op == 'IF_FALSE':
+            return f"if (!{args[0]}) goto {args[1]};"
+        if op == 'IF_TRUE':
+            return f"if ({args[0]}) goto {args[1]};"
+        if op == 'STORE':
+            return f"v_{args[1]} = {args[0]};"
+        if op == 'LOAD':
+            return f"{instr.dest} = v_{args[0]};"
+        if op in ('CONST', 'COPY'):
+            return f"{instr.dest} = {args[0]};"
+        if op == 'PRINT':
+            if instr.args[0].startswith('"') or instr.args[0] in self.string_values:
+                return f'printf("%s\\n", {args[0]});'
+            return f'printf("%d\\n", {args[0]});'
+        if op == 'ARG':
+            self.pending_args.append(args[0])
+            return None
+        if op == 'CALL':
+            count = int(args[1])
+            call_args = self.pending_args[len(self.pending_args) - count:]
+            del self.pending_args[len(self.pending_args) - count:]
+            call = f"fn_{args[0]}({', '.join(call_args)})"
+            return f"{instr.dest} = {call};" if instr.dest else f"{call};"
+        if op == 'RETURN':
+            return f"return {args[0] if args else 0};"
+        if op == 'NEG':
+            return f"{instr.dest} = (int)(0u - (unsigned)({args[0]}));"
+        if op == 'NOT':
+            return f"{instr.dest} = !{args[0]};"
+        if op in BINARY_OPS:
+            return f"{instr.dest} = {self._binary(op, args[0], args[1])};"
+        raise ValueError(f"Cannot translate {instr} to C")
+
+    def _binary(self, op, left, right):
+        """Returns the C expression of a binary TAC operation."""
+        if op in WRAPPING_OPERATORS:
+            return f"(int)((unsigned)({left}) {WRAPPING_OPERATORS[op]} (unsigned)({right}))"
+        if op == 'SHL':
+            return f"(int)((unsigned)({left}) << ({right} & 31))"
+        if op == 'SAR':
+            return f"{left} >> ({right} & 31)"
+        if op in ('DIV', 'MOD') and not (is_int_constant(right) and int(right) != -1):
+            negated = f"(int)(0u - (unsigned)({left}))" if op == 'DIV' else "0"
+            if is_int_constant(right):
+                return negated
+            return f"({right} == -1 ? {negated} : {left} {C_OPERATORS[op]} {right})"
+        if is_int_constant(right) and int(right) < 0:
+            right = f"({right})"
+        return f"{left} {C_OPERATORS[op]} {right}"
@@ -0,0 +1,89 @@
+"""
+This module builds the call graph of a TAC program: which functions each
+function calls and from where. Interprocedural passes such as inlining
+use it to find leaf functions, recursion and a bottom-up order in which
+callees are processed before their callers.
+"""
+
+
+class CallGraph:
+    """
+    Call graph over the functions of a Program.
+
+    Attributes:
+        functions: Maps function names to their Function CFGs
+        callees: Maps each function name to the set of functions it calls
+        callers: Maps each function name to the set of functions calling it
+        call_sites: Maps each function name to a list of (block, instruction)
+            pairs, one per CALL it contains
+    """
+
+    def __init__(self, program):
+        self.functions = {func.name: func for func in program.functions}
+        self.callees = {name: set() for name in self.functions}
+        self.callers = {name: set() for name in self.functions}
+        self.call_sites = {name: [] for name in self.functions}
+        for func in program.functions:
+            for block in func.blocks:
+                for instr in block.instructions:
+                    if instr.op != 'CALL':
+                        continue
+                    callee = instr.args[0]
+                    self.call_sites[func.name].append((block, instr))
+                    self.callees[func.name].add(callee)
+                    if callee in self.callers:
+                        self.callers[callee].add(func.name)
+
+    def is_leaf(self, name):
+        """Returns True if the function makes no calls."""
+        return not self.callees[name]
+
+    def is_recursive(self, name):
+        """Returns True if the function can reach itself through calls."""
+        seen = set()
+        stack = list(self.callees[name])
+        while stack:
+            current = stack.pop()
+            if current == name:
+                return True
+            if current in seen or current not in self.callees:
+                continue
+            seen.add(current)
+            stack.extend(self.callees[current])
+        return False
+
+    def reachable(self, root='main'):
+        """Returns the names of functions reachable from root, including root."""
+        seen = set()
+        stack = [root] if root in self.functions else []
+        while stack:
+            current = stack.pop()
+            if current in seen:
+                continue
+            seen.add(current)
+            stack.extend(c for c in self.callees[current] if c in self.functions)
+        return seen
+
+    def bottom_up(self):
+        """
+        Returns function names in postorder: callees before their callers,
+        except along recursive cycles.
+        """
+        order = []
+        visited = set()
+        for root in self.functions:
+            if root in visited:
+                continue
+            visited.add(root)
+            stack = [(root, iter(sorted(self.callees[root])))]
+            while stack:
+                name, callees = stack[-1]
+                for callee in callees:
+                    if callee in self.functions and callee not in visited:
+                        visited.add(callee)
+                        stack.append((callee, iter(sorted(self.callees[callee]))))
+                        break
+                else:
+                    stack.pop()
+                    order.append(name)
+        return order
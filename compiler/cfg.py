@@ -0,0 +1,498 @@
+"""
+This module builds control flow graphs (CFGs) over the TAC produced by
+IntermediateCodeGenerator and provides the graph analyses that the
+optimization passes share:
+- Splitting a program into functions and basic blocks
+- Reverse postorder traversal
+- Dominator trees (Cooper, Harvey & Kennedy) and dominance frontiers
+- Turning a CFG back into a flat list of TAC instructions
+"""
+
+import re
+
+from .ir import CONDITIONAL_BRANCHES, JUMPS, Instruction, parse_program, format_program
+
+
+class BasicBlock:
+    """
+    A maximal straight-line sequence of instructions with a single entry.
+
+    Attributes:
+        label: Name of the block; the LABEL that starts it in the TAC
+        instructions: Instructions of the block, excluding its LABEL
+        fallthrough: Label of the block reached by falling off the end,
+            or None if the block ends in GOTO/RETURN
+        succs: Labels of successor blocks
+        preds: Labels of predecessor blocks
+    """
+
+    def __init__(self, label, instructions=None):
+        self.label = label
+        self.instructions = instructions if instructions is not None else []
+        self.fallthrough = None
+        self.succs = []
+        self.preds = []
+
+    def __repr__(self):
+        return f"BasicBlock({self.label}, {len(self.instructions)} instrs)"
+
+    @property
+    def terminator(self):
+        """The GOTO/IF_FALSE/IF_TRUE/RETURN ending the block, or None."""
+        if self.instructions and self.instructions[-1].is_terminator():
+            return self.instructions[-1]
+        return None
+
+    def phis(self):
+        """Returns the PHI instructions at the top of the block."""
+        result = []
+        for instr in self.instructions:
+            if instr.op != 'PHI':
+                break
+            result.append(instr)
+        return result
+
+
+class Function:
+    """
+    The CFG of a single function.
+
+    Attributes:
+        name: Function name
+        header: FUNCTION and PARAM instructions that precede the body
+        blocks: Basic blocks in layout order; blocks[0] is the entry
+        block_map: Maps labels to blocks
+    """
+
+    def __init__(self, name, header, counters):
+        self.name = name
+        self.header = header
+        self.blocks = []
+        self.block_map = {}
+        self._counters = counters
+
+    @property
+    def entry(self):
+        return self.blocks[0]
+
+    @property
+    def params(self):
+        return [instr.args[0] for instr in self.header if instr.op == 'PARAM']
+
+    def new_label(self):
+        """Generates a label that does not clash with any existing one."""
+        label = f"L{self._counters['label']}"
+        self._counters['label'] += 1
+        return label
+
+    def new_temp(self):
+        """Generates a temporary that does not clash with any existing one."""
+        temp = f"t{self._counters['temp']}"
+        self._counters['temp'] += 1
+        return temp
+
+    def add_block(self, block, index=None):
+        if index is None:
+            self.blocks.append(block)
+        else:
+            self.blocks.insert(index, block)
+        self.block_map[block.label] = block
+
+    def remove_block(self, block):
+        self.blocks.remove(block)
+        del self.block_map[block.label]
+
+    def compute_edges(self):
+        """Recomputes succs/preds of every block from terminators and fallthroughs."""
+        for block in self.blocks:
+            block.succs = []
+            block.preds = []
+        for block in self.blocks:
+            term = block.terminator
+            if term is not None and term.op in JUMPS:
+                block.succs.append(term.target)
+            if block.fallthrough is not None and block.fallthrough not in block.succs:
+                block.succs.append(block.fallthrough)
+            for succ in block.succs:
+                self.block_map[succ].preds.append(block.label)
+
+    def instructions(self):
+        """Iterates over all body instructions in layout order."""
+        for block in self.blocks:
+            yield from block.instructions
+
+    def reverse_postorder(self):
+        """
+        Returns the labels of blocks reachable from the entry in reverse postorder.
+
+        Uses an explicit stack so that very large functions do not hit the
+        Python recursion limit.
+        """
+        visited = {self.entry.label}
+        order = []
+        stack = [(self.entry.label, iter(self.entry.succs))]
+        while stack:
+            label, succs = stack[-1]
+            for succ in succs:
+                if succ not in visited:
+                    visited.add(succ)
+                    stack.append((succ, iter(self.block_map[succ].succs)))
+                    break
+            else:
+                stack.pop()
+                order.append(label)
+        order.reverse()
+        return order
+
+    def linearize(self):
+        """
+        Flattens the CFG back into a list of Instructions.
+
+        A LABEL is emitted only for blocks that are referenced by a jump, a
+        PHI or a displaced fallthrough, and a GOTO is added wherever a fallthrough successor is not
+        the next block in the layout.
+        """
+        referenced = set()
+        for i, block in enumerate(self.blocks):
+            next_label = self.blocks[i + 1].label if i + 1 < len(self.blocks) else None
+            if block.fallthrough is not None and block.fallthrough != next_label:
+                referenced.add(block.fallthrough)
+            for instr in block.instructions:
+                if instr.op in JUMPS:
+                    referenced.add(instr.target)
+                elif instr.op == 'PHI':
+                    referenced.update(instr.labels)
+
+        result = list(self.header)
+        for i, block in enumerate(self.blocks):
+            if block.label in referenced:
+                result.append(Instruction('LABEL', args=[block.label]))
+            result.extend(block.instructions)
+            next_label = self.blocks[i + 1].label if i + 1 < len(self.blocks) else None
+            if block.fallthrough is not None and block.fallthrough != next_label:
+                result.append(Instruction('GOTO', args=[block.fallthrough]))
+        return result
+
+
+class Program:
+    """
+    A whole TAC program split into functions.
+
+    Attributes:
+        prologue: Instructions before the first FUNCTION (global initializers)
+        functions: List of Function CFGs in source order
+        global_names: Variables declared or stored in the prologue
+    """
+
+    def __init__(self, prologue, functions):
+        self.prologue = prologue
+        self.functions = functions
+        self.global_names = {instr.stored_var() for instr in prologue
+                             if instr.stored_var() is not None}
+        self._variable_names = None
+
+    def new_variable(self, base):
+        """
+        Generates a variable name that is not used anywhere in the program.
+
+        Args:
+            base: Prefix for the new name
+
+        Returns:
+            str: Unused variable name of the form <base>_<n>
+        """
+        if self._variable_names is None:
+            names = set(self.global_names)
+            for func in self.functions:
+                names.update(func.params)
+                for instr in func.instructions():
+                    var = instr.loaded_var() or instr.stored_var()
+                    if var is not None:
+                        names.add(var)
+            self._variable_names = names
+        suffix = 0
+        while f"{base}_{suffix}" in self._variable_names:
+            suffix += 1
+        name = f"{base}_{suffix}"
+        self._variable_names.add(name)
+        return name
+
+    def to_instructions(self):
+        result = list(self.prologue)
+        for func in self.functions:
+            result.extend(func.linearize())
+        return result
+
+    def to_tac(self):
+        """Returns the program as a list of TAC strings."""
+        return format_program(self.to_instructions())
+
+
+def build_program(code):
+    """
+    Builds the CFGs of every function in a TAC program.
+
+    Args:
+        code: List of TAC strings or of Instructions
+
+    Returns:
+        Program: The program with one Function per FUNCTION directive
+    """
+    instructions = parse_program(code) if code and isinstance(code[0], str) else list(code)
+
+    # Labels and temps created by passes continue the generator's numbering
+    counters = {'label': 0, 'temp': 0}
+    for instr in instructions:
+        if instr.op == 'LABEL':
+            match = re.match(r'L(\d+)$', instr.args[0])
+            if match:
+                counters['label'] = max(counters['label'], int(match.group(1)) + 1)
+        elif instr.dest is not None:
+            match = re.match(r't(\d+)$', instr.dest)
+            if match:
+                counters['temp'] = max(counters['temp'], int(match.group(1)) + 1)
+
+    prologue = []
+    chunks = []
+    for instr in instructions:
+        if instr.op == 'FUNCTION':
+            chunks.append([instr])
+        elif chunks:
+            chunks[-1].append(instr)
+        else:
+            prologue.append(instr)
+
+    functions = [_build_function(chunk, counters) for chunk in chunks]
+    return Program(prologue, functions)
+
+
+def _build_function(chunk, counters):
+    header = [chunk[0]]
+    pos = 1
+    while pos < len(chunk) and chunk[pos].op == 'PARAM':
+        header.append(chunk[pos])
+        pos += 1
+
+    func = Function(chunk[0].args[0], header, counters)
+    current = None
+    for instr in chunk[pos:]:
+        if instr.op == 'LABEL':
+            block = BasicBlock(instr.args[0])
+            if current is not None and current.terminator is None:
+                current.fallthrough = block.label
+            elif current is not None and current.terminator.op in CONDITIONAL_BRANCHES:
+                current.fallthrough = block.label
+            func.add_block(block)
+            current = block
+            continue
+        if current is None or current.terminator is not None:
+            block = BasicBlock(func.new_label())
+            if current is not None and current.terminator.op in CONDITIONAL_BRANCHES:
+                current.fallthrough = block.label
+            func.add_block(block)
+            current = block
+        current.instructions.append(instr)
+
+    if current is None:
+        current = BasicBlock(func.new_label())
+        func.add_block(current)
+    if current.terminator is None or current.terminator.op in CONDITIONAL_BRANCHES:
+        # Falling off the end of a function returns
+        if current.terminator is not None:
+            exit_block = BasicBlock(func.new_label())
+            current.fallthrough = exit_block.label
+            func.add_block(exit_block)
+            current = exit_block
+        current.instructions.append(Instruction('RETURN'))
+
+    func.compute_edges()
+    return func
+
+
+def remove_unreachable_blocks(func):
+    """
+    Deletes blocks that cannot be reached from the function entry.
+
+    Args:
+        func: Function whose edges are up to date
+
+    Returns:
+        bool: True if any block was removed
+    """
+    reachable = set(func.reverse_postorder())
+    dead = [block for block in func.blocks if block.label not in reachable]
+    for block in dead:
+        func.remove_block(block)
+    if dead:
+        for block in func.blocks:
+            for phi in block.phis():
+                keep = [i for i, label in enumerate(phi.labels) if label in reachable]
+                phi.args = [phi.args[i] for i in keep]
+                phi.labels = [phi.labels[i] for i in keep]
+        func.compute_edges()
+    return bool(dead)
+
+
+def compute_dominators(func):
+    """
+    Computes immediate dominators with the Cooper-Harvey-Kennedy algorithm.
+
+    Args:
+        func: Function whose edges are up to date
+
+    Returns:
+        dict: Maps each reachable block label to its immediate dominator's
+        label; the entry maps to itself
+    """
+    order = func.reverse_postorder()
+    index = {label: i for i, label in enumerate(order)}
+    entry = order[0]
+    idom = {entry: entry}
+
+    def intersect(a, b):
+        while a != b:
+            while index[a] > index[b]:
+                a = idom[a]
+            while index[b] > index[a]:
+                b = idom[b]
+        return a
+
+    changed = True
+    while changed:
+        changed = False
+        for label in order[1:]:
+            new_idom = None
+            for pred in func.block_map[label].preds:
+                if pred in idom:
+                    new_idom = pred if new_idom is None else intersect(pred, new_idom)
+            if idom.get(label) != new_idom:
+                idom[label] = new_idom
+                changed = True
+    return idom
+
+
+def dominator_tree(idom):
+    """Returns a dict mapping each label to the labels it immediately dominates."""
+    children = {label: [] for label in idom}
+    for label, parent in idom.items():
+        if label != parent:
+            children[parent].append(label)
+    return children
+
+
+def dominates(idom, a, b):
+    """Returns True if block a dominates block b."""
+    while True:
+        if a == b:
+            return True
+        parent = idom[b]
+        if parent == b:
+            return False
+        b = parent
+
+
+def dominance_frontiers(func, idom):
+    """
+    Computes the dominance frontier of every reachable block.
+
+    Args:
+        func: Function whose edges are up to date
+        idom: Immediate dominators from compute_dominators
+
+    Returns:
+        dict: Maps each label to the set of labels in its dominance frontier
+    """
+    frontiers = {label: set() for label in idom}
+    for label in idom:
+        preds = [p for p in func.block_map[label].preds if p in idom]
+        if len(preds) < 2:
+            continue
+        for pred in preds:
+            runner = pred
+            while runner != idom[label]:
+                frontiers[runner].add(label)
+                runner = idom[runner]
+    return frontiers
+
+
+class Loop:
+    """
+    A natural loop: a header plus every block that can reach one of the
+    header's back edges without passing through the header.
+
+    Attributes:
+        header: Label of the loop header
+        latches: Labels of blocks with a back edge to the header
+        blocks: Set of labels in the loop body, including the header
+    """
+
+    def __init__(self, header):
+        self.header = header
+        self.latches = []
+        self.blocks = {header}
+
+    def __repr__(self):
+        return f"Loop({self.header}, {len(self.blocks)} blocks)"
+
+    def exits(self, func):
+        """Returns (inside, outside) label pairs for edges leaving the loop."""
+        return [(label, succ) for label in self.blocks
+                for succ in func.block_map[label].succs if succ not in self.blocks]
+
+
+def find_natural_loops(func, idom=None):
+    """
+    Finds the natural loops of a function, merging back edges that share a header.
+
+    Args:
+        func: Function whose edges are up to date
+        idom: Optional precomputed immediate dominators
+
+    Returns:
+        list: Loop objects ordered from innermost to outermost
+    """
+    if idom is None:
+        idom = compute_dominators(func)
+    loops = {}
+    for label in idom:
+        for succ in func.block_map[label].succs:
+            if succ in idom and dominates(idom, succ, label):
+                loop = loops.setdefault(succ, Loop(succ))
+                loop.latches.append(label)
+                worklist = [label]
+                while worklist:
+                    current = worklist.pop()
+                    if current in loop.blocks:
+                        continue
+                    loop.blocks.add(current)
+                    worklist.extend(p for p in func.block_map[current].preds if p in idom)
+    return sorted(loops.values(), key=lambda loop: len(loop.blocks))
+
+
+def insert_preheader(func, loop):
+    """
+    Gives a loop a dedicated preheader: a new block placed just before the
+    header that every entry edge from outside the loop now goes through.
+
+    Args:
+        func: Function containing the loop
+        loop: Loop to give a preheader
+
+    Returns:
+        BasicBlock: The new preheader block
+    """
+    header = func.block_map[loop.header]
+    preheader = BasicBlock(func.new_label())
+    preheader.fallthrough = header.label
+    for pred_label in header.preds:
+        if pred_label in loop.blocks:
+            continue
+        pred = func.block_map[pred_label]
+        term = pred.terminator
+        if term is not None and term.op in JUMPS and term.target == header.label:
+            term.target = preheader.label
+        if pred.fallthrough == header.label:
+            pred.fallthrough = preheader.label
+    func.add_block(preheader, func.blocks.index(header))
+    func.compute_edges()
+    return preheader
@@ -4,6 +4,10 @@ This module contains two main classes for code generation:
 2. TargetCodeGenerator: Converts TAC to x86 assembly code
 """
 
+from .cfg import build_program
+from .ir import BINARY_OPS, evaluate_binary, is_int_constant, parse_instruction, wrap_int32
+from .regalloc import LinearScanAllocator
+
 class IntermediateCodeGenerator:
     """
     Generates three-address code (TAC) from an Abstract Syntax Tree (AST).
@@ -101,6 +105,7 @@ class IntermediateCodeGenerator:
             node: Function declaration AST node
         """
         self.instructions.append(f"FUNCTION {node.get('name', 'main')}:")
+        start = len(self.instructions)
         
         if 'parameters' in node:
             for param in node['parameters']:
@@ -110,7 +115,7 @@ class IntermediateCodeGenerator:
             for stmt in node['body']:
                 self.visit(stmt)
         
-        if node.get('name', 'main') == 'main' and not any(instr.startswith('RETURN') for instr in self.instructions):
+        if node.get('name', 'main') == 'main' and not any(instr.startswith('RETURN') for instr in self.instructions[start:]):
             self.instructions.append("RETURN 0")
     
     def visit_variable_declaration(self, node):
@@ -125,8 +130,7 @@ class IntermediateCodeGenerator:
         end_label = self.new_label()
         
         self.instructions.append(f"LABEL {start_label}")
-        condition_temp = self.visit(node['condition'])
-        self.instructions.append(f"IF_FALSE {condition_temp} GOTO {end_label}")
+        self.jump_if(node['condition'], False, end_label)
         
         if isinstance(node['body'], list):
             for stmt in node['body']:
@@ -138,11 +142,10 @@ class IntermediateCodeGenerator:
         self.instructions.append(f"LABEL {end_label}")
     
     def visit_if_statement(self, node):
-        condition_temp = self.visit(node['condition'])
         false_label = self.new_label()
         end_label = self.new_label()
         
-        self.instructions.append(f"IF_FALSE {condition_temp} GOTO {false_label}")
+        self.jump_if(node['condition'], False, false_label)
         
         if isinstance(node['consequent'], list):
             for stmt in node['consequent']:
@@ -164,24 +167,77 @@ class IntermediateCodeGenerator:
         else:
             self.instructions.append(f"LABEL {false_label}")
     
+    def jump_if(self, node, truth, label):
+        """
+        Generates TAC that jumps to label when the condition's truth value
+        equals truth and falls through otherwise. && and || become chains
+        of conditional jumps, so their right operand is only evaluated
+        when it can change the outcome, and no boolean is materialized.
+        
+        Args:
+            node: Condition expression AST node
+            truth: True to jump when the condition holds, False when it fails
+            label: Jump target
+        """
+        operator = node.get('operator') if isinstance(node, dict) else None
+        node_type = node.get('type') if isinstance(node, dict) else None
+        
+        if node_type == 'binary_expression' and operator in ('&&', '||'):
+            # a && b fails as soon as a fails; a || b holds as soon as a holds
+            decisive = operator == '||'
+            if truth == decisive:
+                self.jump_if(node['left'], truth, label)
+                self.jump_if(node['right'], truth, label)
+            else:
+                skip_label = self.new_label()
+                self.jump_if(node['left'], decisive, skip_label)
+                self.jump_if(node['right'], truth, label)
+                self.instructions.append(f"LABEL {skip_label}")
+        elif node_type == 'unary_expression' and operator == '!':
+            self.jump_if(node['operand'], not truth, label)
+        else:
+            condition_temp = self.visit(node)
+            branch = "IF_TRUE" if truth else "IF_FALSE"
+            self.instructions.append(f"{branch} {condition_temp} GOTO {label}")
+    
     def visit_print_statement(self, node):
         expr_temp = self.visit(node['expression'])
         self.instructions.append(f"PRINT {expr_temp}")
     
     def visit_binary_expression(self, node):
+        if node['operator'] in ('&&', '||'):
+            return self.visit_logical_expression(node)
+        
         left_temp = self.visit(node['left'])
         right_temp = self.visit(node['right'])
         result_temp = self.new_temp()
         
         op_map = {
             '+': 'ADD', '-': 'SUB', '*': 'MUL', '/': 'DIV', '%': 'MOD',
-            '==': 'EQ', '!=': 'NE', '<': 'LT', '<=': 'LE', '>': 'GT', '>=': 'GE',
-            '&&': 'AND', '||': 'OR'
+            '==': 'EQ', '!=': 'NE', '<': 'LT', '<=': 'LE', '>': 'GT', '>=': 'GE'
         }
         
         self.instructions.append(f"{result_temp} = {left_temp} {op_map[node['operator']]} {right_temp}")
         return result_temp
     
+    def visit_logical_expression(self, node):
+        """
+        Generates TAC for && and || used as values. The operands are
+        evaluated through jump_if, so short-circuiting is preserved, and
+        the result temp is set to 1 or 0 on the two outcomes.
+        """
+        false_label = self.new_label()
+        end_label = self.new_label()
+        result_temp = self.new_temp()
+        
+        self.jump_if(node, False, false_label)
+        self.instructions.append(f"{result_temp} = 1")
+        self.instructions.append(f"GOTO {end_label}")
+        self.instructions.append(f"LABEL {false_label}")
+        self.instructions.append(f"{result_temp} = 0")
+        self.instructions.append(f"LABEL {end_label}")
+        return result_temp
+    
     def visit_unary_expression(self, node):
         operand_temp = self.visit(node['operand'])
         result_temp = self.new_temp()
@@ -225,6 +281,25 @@ class IntermediateCodeGenerator:
     
     def visit_expression_statement(self, node):
         return self.visit(node['expression'])
+    
+    def visit_call_expression(self, node):
+        """
+        Generates TAC for function calls. All arguments are evaluated first
+        and then passed with consecutive ARG instructions right before the
+        CALL, so calls nested inside arguments never interleave with them.
+        
+        Args:
+            node: Call expression AST node
+            
+        Returns:
+            str: Temporary holding the call's return value
+        """
+        arg_temps = [self.visit(arg) for arg in node['arguments']]
+        for temp in arg_temps:
+            self.instructions.append(f"ARG {temp}")
+        result_temp = self.new_temp()
+        self.instructions.append(f"{result_temp} = CALL {node['callee']}, {len(arg_temps)}")
+        return result_temp
 
 
 
@@ -233,24 +308,101 @@ class IntermediateCodeGenerator:
 class TargetCodeGenerator:
     """
     Converts three-address code (TAC) to x86 assembly code.
-    Handles register allocation, memory management, and system calls.
+    Handles stack frames, calling conventions, memory management, and system calls.
+    
+    Temporaries and local variables are kept in registers chosen by a
+    register allocator (see compiler.regalloc; linear scan unless another
+    is passed in); the ones it spills get
+    a slot in the function's ebp-based stack frame, and globals live in the
+    data section. eax and edx are scratch registers. Calls between compiled
+    functions pass their first arguments in registers (see
+    ARGUMENT_REGISTERS) and the rest on the stack, pushed right to left and
+    removed by the caller, and return their result in eax. printf is
+    called with the C convention.
+    
+    Instructions are selected from SELECTION_RULES by opcode and the kinds
+    of the resolved operands (register, memory or immediate), so folding
+    an immediate, a memory operand or an lea is a matter of a pattern.
     
     Attributes:
         intermediate_code: List of TAC instructions to convert
+        allocator: RegisterAllocator used for every function
         target_code: Generated assembly instructions
         string_counter: Counter for unique string labels
         label_counter: Counter for unique assembly labels
-        variables: Set of program variables that need memory allocation
+        variables: Global variables mapped to their initial values
         strings: Dictionary mapping string literals to their labels
+        allocation: RegisterAllocation of the current function
+        frame: Maps the current function's spilled values to their stack operands
+        fused: Maps id() of branches to the comparison fused into them
+        pending_args: Operands of ARG instructions waiting for their CALL
     """
     
-    def __init__(self, intermediate_code):
+    # Registers carrying the first arguments of calls between compiled functions
+    ARGUMENT_REGISTERS = ['ecx', 'edx']
+    CONDITION_CODES = {'EQ': 'e', 'NE': 'ne', 'LT': 'l', 'LE': 'le', 'GT': 'g', 'GE': 'ge'}
+    INVERSE_CONDITIONS = {'e': 'ne', 'ne': 'e', 'l': 'ge', 'ge': 'l', 'g': 'le', 'le': 'g'}
+    REGISTERS = {'eax', 'ebx', 'ecx', 'edx', 'esi', 'edi'}
+    OPERAND_KINDS = ['reg', 'mem', 'imm', None]
+    
+    # Positions of the value operands of each opcode; the others are labels,
+    # names or counts
+    VALUE_ARGS = {op: (0, 1) for op in BINARY_OPS}
+    VALUE_ARGS.update({op: (0,) for op in ('CONST', 'COPY', 'LOAD', 'NEG', 'NOT', 'PRINT', 'ARG',
+                                           'RETURN', 'IF_FALSE', 'IF_TRUE')})
+    VALUE_ARGS['STORE'] = (0, 1)
+    COMMUTATIVE = {'ADD', 'MUL', 'BITAND', 'EQ', 'NE'}
+    BINARY_MNEMONICS = {'ADD': ('add', True), 'SUB': ('sub', False), 'MUL': ('imul', True),
+                        'SHL': ('shl', False), 'SAR': ('sar', False), 'BITAND': ('and', True)}
+    
+    # Instruction selection patterns: (opcode, dest kind, operand kinds,
+    # emitter). Kinds are 'reg', 'mem' and 'imm' ('*' matches any); the
+    # first pattern that matches an instruction wins.
+    SELECTION_RULES = [
+        ('CONST', '*', ('*',), '_select_const'),
+        ('COPY', '*', ('*',), '_select_move'),
+        ('LOAD', '*', ('*',), '_select_move'),
+        ('STORE', None, ('*', '*'), '_select_store'),
+        ('ADD', 'reg', ('reg', 'imm'), '_select_add_lea'),
+        ('ADD', 'reg', ('reg', 'reg'), '_select_add_lea'),
+        ('SUB', 'reg', ('reg', 'imm'), '_select_sub_lea'),
+        ('SHL', 'reg', ('reg', 'imm'), '_select_shl_lea'),
+        ('MUL', '*', ('*', 'imm'), '_select_mul_imm'),
+        ('ADD', '*', ('*', '*'), '_select_binary'),
+        ('SUB', '*', ('*', '*'), '_select_binary'),
+        ('MUL', '*', ('*', '*'), '_select_binary'),
+        ('SHL', '*', ('*', '*'), '_select_binary'),
+        ('SAR', '*', ('*', '*'), '_select_binary'),
+        ('BITAND', '*', ('*', '*'), '_select_binary'),
+        ('DIV', '*', ('*', '*'), '_select_divide'),
+        ('MOD', '*', ('*', '*'), '_select_divide'),
+        ('AND', '*', ('*', '*'), '_select_logical'),
+        ('OR', '*', ('*', '*'), '_select_logical'),
+        ('NEG', '*', ('*',), '_select_neg'),
+        ('NOT', '*', ('*',), '_select_not'),
+        ('PRINT', None, ('*',), '_select_print'),
+        ('ARG', None, ('*',), '_select_arg'),
+        ('CALL', '*', (), '_select_call'),
+        ('RETURN', None, ('*',), '_select_return'),
+        ('RETURN', None, (), '_select_return'),
+        ('LABEL', None, (), '_select_label'),
+        ('GOTO', None, (), '_select_goto'),
+        ('IF_FALSE', None, ('*',), '_select_branch'),
+        ('IF_TRUE', None, ('*',), '_select_branch')
+    ] + [(op, '*', ('*', '*'), '_select_compare') for op in CONDITION_CODES]
+    
+    def __init__(self, intermediate_code, allocator=None):
         self.intermediate_code = intermediate_code
+        self.allocator = allocator or LinearScanAllocator()
         self.target_code = []
         self.string_counter = 0
         self.label_counter = 0
-        self.variables = set()
+        self.variables = {}
         self.strings = {}
+        self.allocation = None
+        self.frame = {}
+        self.fused = {}
+        self.pending_args = []
     
     def generate(self):
         """
@@ -269,126 +421,472 @@ class TargetCodeGenerator:
         self._collect_symbols()
         
         # Declare space for variables
-        for var in self.variables:
-            self.target_code.append(f"    {var} dd 0")  # 32-bit integer variables
+        for var, value in self.variables.items():
+            self.target_code.append(f"    {var} dd {value}")  # 32-bit integer variables
         
-        # Declare string literals
+        # Declare string literals as byte values, so quotes and control
+        # characters need no escaping in the assembler
         for str_val, label in self.strings.items():
-            self.target_code.append(f"    {label} db {str_val}, 0")
+            data = str_val.strip('"').encode('utf-8') + b'\0'
+            self.target_code.append(f"    {label} db {', '.join(str(byte) for byte in data)}")
         
         # Text section for code
         self.target_code.append("\nsection .text")
         self.target_code.append("    global main")
         self.target_code.append("    extern printf")  # External C function for printing
         
-        # Convert each TAC instruction to assembly
-        current_function = None
-        for instr in self.intermediate_code:
-            if instr.startswith("FUNCTION"):
-                current_function = instr.split()[1].rstrip(":")
-                self.target_code.append(f"\n{current_function}:")
-                
-                if current_function == "main":
-                    # Set up stack frame for main function
-                    self.target_code.append("    push ebp")
-                    self.target_code.append("    mov ebp, esp")
-            else:
-                asm_code = self._convert_instruction(instr)
-                if isinstance(asm_code, list):
-                    self.target_code.extend(["    " + line for line in asm_code])
-                elif asm_code:
-                    self.target_code.append("    " + asm_code)
+        # Convert each function to assembly; the global initializers that
+        # precede the first FUNCTION are already in the data section
+        program = build_program(self.intermediate_code)
+        for function in program.functions:
+            self._generate_function(function)
         
         return self.target_code
     
     def _collect_symbols(self):
-        for instr in self.intermediate_code:
-            parts = instr.split()
-            if "STORE" in instr:
-                var_name = parts[-1].rstrip(",")
-                self.variables.add(var_name)
-            elif "LOAD" in instr and not instr.startswith("t"):
-                var_name = parts[1].rstrip(",")
-                if not var_name.startswith("#"):
-                    self.variables.add(var_name)
-            elif '"' in instr:
-                str_val = instr[instr.find('"'):instr.rfind('"')+1]
-                if str_val not in self.strings:
-                    label = f"str_{self.string_counter}"
-                    self.strings[str_val] = label
+        """
+        Collects string literals and global variables. The global
+        initializers are evaluated here and their results become the
+        initial values in the data section.
+        """
+        prologue = []
+        in_prologue = True
+        for line in self.intermediate_code:
+            instr = parse_instruction(line)
+            if instr.op == 'FUNCTION':
+                in_prologue = False
+            elif instr.op == 'CONST' and instr.args[0].startswith('"'):
+                if instr.args[0] not in self.strings:
+                    self.strings[instr.args[0]] = f"str_{self.string_counter}"
                     self.string_counter += 1
+            elif in_prologue:
+                prologue.append(instr)
+        self.variables = self._evaluate_initializers(prologue)
     
-    def _convert_instruction(self, instr):
-        parts = instr.split()
-        
-        if "=" in instr:
-            dest = parts[0]
-            if "LOAD" in instr:
-                var = parts[-1]
-                return f"mov eax, [{var}]"
-            elif parts[2] in ["ADD", "SUB", "MUL", "DIV"]:
-                op1, op, op2 = parts[2:5]
-                if op == "ADD":
-                    return [
-                        f"mov eax, {op1}",
-                        f"add eax, {op2}"
-                    ]
-                elif op == "SUB":
-                    return [
-                        f"mov eax, {op1}",
-                        f"sub eax, {op2}"
-                    ]
-                elif op == "MUL":
-                    return [
-                        f"mov eax, {op1}",
-                        f"imul eax, {op2}"
-                    ]
-                elif op == "DIV":
-                    return [
-                        f"mov eax, {op1}",
-                        f"cdq",
-                        f"idiv {op2}"
-                    ]
-        elif instr.startswith("PRINT"):
-            expr = parts[1]
-            if expr.startswith('"'):
-                str_label = self.strings[expr]
-                return [
-                    f"push {str_label}",
-                    f"push fmt_str",
-                    f"call printf",
-                    f"add esp, 8"
-                ]
+    def _evaluate_initializers(self, prologue):
+        """
+        Runs the global initializers at compile time. They may read globals
+        assigned before them and branch (short-circuit && and ||), but
+        cannot call functions.
+        
+        Args:
+            prologue: Instructions before the first FUNCTION
+            
+        Returns:
+            dict: Global variable name -> initial value, in declaration order
+            
+        Raises:
+            ValueError: If an initializer cannot be evaluated at compile time
+        """
+        labels = {instr.args[0]: i for i, instr in enumerate(prologue) if instr.op == 'LABEL'}
+        globals_, temps = {}, {}
+        
+        def value(operand):
+            return int(operand) if is_int_constant(operand) else temps[operand]
+        
+        pc = 0
+        while pc < len(prologue):
+            instr = prologue[pc]
+            op, args = instr.op, instr.args
+            pc += 1
+            if op == 'CONST':
+                if not is_int_constant(args[0]):
+                    raise ValueError(f"Global initializer {instr} is not an integer")
+                temps[instr.dest] = int(args[0])
+            elif op == 'COPY':
+                temps[instr.dest] = value(args[0])
+            elif op == 'LOAD':
+                temps[instr.dest] = globals_.get(args[0], 0)
+            elif op == 'STORE':
+                globals_[args[1]] = value(args[0])
+            elif op == 'DECLARE':
+                globals_.setdefault(args[0], 0)
+            elif op in BINARY_OPS:
+                result = evaluate_binary(op, value(args[0]), value(args[1]))
+                if result is None:
+                    raise ValueError(f"Division by zero in global initializer {instr}")
+                temps[instr.dest] = result
+            elif op == 'NEG':
+                temps[instr.dest] = wrap_int32(-value(args[0]))
+            elif op == 'NOT':
+                temps[instr.dest] = int(not value(args[0]))
+            elif op == 'GOTO':
+                pc = labels[args[0]]
+            elif op in ('IF_TRUE', 'IF_FALSE'):
+                if bool(value(args[0])) == (op == 'IF_TRUE'):
+                    pc = labels[args[1]]
+            elif op != 'LABEL':
+                raise ValueError(f"Global initializer {instr} cannot be evaluated at compile time")
+        return globals_
+    
+    def _generate_function(self, function):
+        """
+        Emits one function: prologue, register allocation and body.
+        
+        Args:
+            function: Function CFG (compiler.cfg.Function); its instructions
+                are renamed by the register allocator
+        """
+        params = function.params
+        self.allocation = self.allocator.allocate(function, self.variables)
+        
+        # Stack layout: [ebp+8+4i] holds stack arguments, [ebp-4k] spill slots
+        self.frame = {}
+        registers = len(self.ARGUMENT_REGISTERS)
+        incoming = {}
+        for i, param in enumerate(params[registers:]):
+            incoming[param] = f"dword [ebp+{8 + 4 * i}]"
+            web = self.allocation.params.get(param)
+            if web is not None and self.allocation.register(web) is None:
+                # A spilled stack parameter stays where the caller put it
+                self.frame[self.allocation.home(web)] = incoming[param]
+        slots = 0
+        for name in self.allocation.spilled():
+            if name not in self.frame:
+                slots += 1
+                self.frame[name] = f"dword [ebp-{4 * slots}]"
+        frame_size = (4 * slots + 15) // 16 * 16
+        
+        self.target_code.append(f"\n{function.name}:")
+        self.target_code.append("    push ebp")
+        self.target_code.append("    mov ebp, esp")
+        if frame_size:
+            self.target_code.append(f"    sub esp, {frame_size}")
+        for register in self.allocation.callee_saved:
+            self.target_code.append(f"    push {register}")
+        # The first parameter is moved first: no allocated home is edx
+        for i, param in enumerate(params):
+            web = self.allocation.params.get(param)
+            if web is None:
+                continue
+            source = self.ARGUMENT_REGISTERS[i] if i < registers else incoming[param]
+            for line in self._move(self._operand(web), source):
+                self.target_code.append("    " + line)
+        
+        body = function.linearize()[len(function.header):]
+        self.fused = self._find_fused_branches(body)
+        compares = {id(compare) for compare in self.fused.values()}
+        for instr in body:
+            if id(instr) in compares:
+                continue
+            asm_code = self._convert_instruction(instr)
+            if isinstance(asm_code, list):
+                self.target_code.extend(["    " + line for line in asm_code])
+            elif asm_code:
+                self.target_code.append("    " + asm_code)
+    
+    def _find_fused_branches(self, body):
+        """
+        Finds comparisons whose result is only used by the branch right
+        after them. Such a pair becomes a cmp and a conditional jump, and
+        the boolean is never materialized.
+        
+        Returns:
+            dict: Maps id() of branches to the fused comparison
+        """
+        uses = {}
+        for instr in body:
+            for name in instr.uses():
+                uses[name] = uses.get(name, 0) + 1
+        fused = {}
+        for instr, branch in zip(body, body[1:]):
+            if ((instr.op in self.CONDITION_CODES or instr.op == 'NOT') and
+                    branch.op in ('IF_FALSE', 'IF_TRUE') and branch.args[0] == instr.dest and
+                    uses[instr.dest] == 1):
+                fused[id(branch)] = instr
+        return fused
+    
+    def _operand(self, name):
+        """
+        Returns the assembly operand for a TAC value or variable name:
+        an immediate, a string label, a register, a stack slot or a global.
+        """
+        if is_int_constant(name):
+            return name
+        constant = self.allocation.constants.get(name)
+        if constant is not None:
+            return self.strings[constant] if constant.startswith('"') else constant
+        register = self.allocation.register(name)
+        if register is not None:
+            return register
+        home = self.allocation.home(name)
+        if home in self.frame:
+            return self.frame[home]
+        return f"dword [{name}]"
+    
+    def _is_memory(self, operand):
+        return operand.startswith("dword [")
+    
+    def _is_string(self, name):
+        return self.allocation.constants.get(name, '').startswith('"')
+    
+    def _move(self, dest, source):
+        """Moves between any two operands, through eax if both are in memory."""
+        if dest == source:
+            return []
+        if self._is_memory(dest) and self._is_memory(source):
+            return [f"mov eax, {source}", f"mov {dest}, eax"]
+        return [f"mov {dest}, {source}"]
+    
+    def _binary(self, mnemonic, dest, left, right, commutative):
+        """Emits dest = left <op> right for two-operand instructions like add."""
+        if dest in self.REGISTERS:
+            if dest == right and dest != left:
+                if commutative:
+                    return [f"{mnemonic} {dest}, {left}"]
             else:
-                return [
-                    f"push {expr}",
-                    f"push fmt_int",
-                    f"call printf",
-                    f"add esp, 8"
-                ]
-        elif instr.startswith("STORE"):
-            value, var = parts[1].rstrip(","), parts[2]
-            return f"mov [{var}], {value}"
-        elif instr.startswith("RETURN"):
-            if len(parts) > 1:
-                return [
-                    f"mov eax, {parts[1]}",
-                    "mov esp, ebp",
-                    "pop ebp",
-                    "ret"
-                ]
+                return self._move(dest, left) + [f"{mnemonic} {dest}, {right}"]
+        return [f"mov eax, {left}", f"{mnemonic} eax, {right}"] + self._move(dest, "eax")
+    
+    def _compare(self, left, right):
+        """Emits a cmp of two operands of any kind."""
+        if left in self.REGISTERS or (self._is_memory(left) and not self._is_memory(right)):
+            return [f"cmp {left}, {right}"]
+        return [f"mov eax, {left}", f"cmp eax, {right}"]
+    
+    def _set_flag(self, condition, dest):
+        """Materializes a condition code as 0 or 1 in dest."""
+        if dest in self.REGISTERS:
+            return [f"set{condition} al", f"movzx {dest}, al"]
+        return [f"set{condition} al", "movzx eax, al", f"mov {dest}, eax"]
+    
+    def _with_saves(self, instr, code):
+        """Preserves caller-saved registers that hold values live across a call."""
+        saves = self.allocation.call_saves.get(id(instr), [])
+        return ([f"push {register}" for register in saves] + code +
+                [f"pop {register}" for register in reversed(saves)])
+    
+    def _kind(self, operand):
+        """Classifies an assembly operand as 'reg', 'mem' or 'imm'."""
+        if operand is None:
+            return None
+        if operand in self.REGISTERS:
+            return 'reg'
+        if self._is_memory(operand):
+            return 'mem'
+        return 'imm'
+    
+    @classmethod
+    def _selection_table(cls):
+        """
+        Expands SELECTION_RULES into a dict keyed by (opcode, dest kind,
+        operand kinds), so selecting a pattern is a single lookup.
+        """
+        if '_table' not in cls.__dict__:
+            table = {}
+            for op, dest, operands, emitter in cls.SELECTION_RULES:
+                dests = cls.OPERAND_KINDS if dest == '*' else [dest]
+                combinations = [()]
+                for kind in operands:
+                    kinds = cls.OPERAND_KINDS[:3] if kind == '*' else [kind]
+                    combinations = [c + (k,) for c in combinations for k in kinds]
+                for dest_kind in dests:
+                    for kinds in combinations:
+                        table.setdefault((op, dest_kind, kinds), emitter)
+            cls._table = table
+        return cls._table
+    
+    def _convert_instruction(self, instr):
+        """
+        Selects the assembly for one TAC instruction.
+        
+        The instruction's destination and value operands are resolved to
+        assembly operands first, commutative operations get an immediate
+        on the right, and the opcode together with the operand kinds picks
+        the emitter from the selection table.
+        """
+        op, args = instr.op, instr.args
+        dest = self._operand(instr.dest) if instr.dest else None
+        operands = [self._resolve(args[i]) for i in self.VALUE_ARGS.get(op, ()) if i < len(args)]
+        if op in self.COMMUTATIVE and operands[0] != dest and (
+                self._kind(operands[0]) == 'imm' or operands[1] == dest):
+            operands.reverse()
+        key = (op, self._kind(dest), tuple(self._kind(operand) for operand in operands))
+        emitter = self._selection_table().get(key)
+        if emitter is None:
+            return None
+        return getattr(self, emitter)(instr, dest, *operands)
+    
+    def _resolve(self, value):
+        """Resolves a TAC operand, including literals, to an assembly operand."""
+        if value.startswith('"'):
+            return self.strings[value]
+        return self._operand(value)
+    
+    # Emitters: each gets the instruction and its resolved operands
+    
+    def _select_const(self, instr, dest, value):
+        if instr.dest in self.allocation.constants:
+            # Uses of a single-definition constant are immediates
+            return None
+        return f"mov {dest}, {value}"
+    
+    def _select_move(self, instr, dest, source):
+        return self._move(dest, source)
+    
+    def _select_store(self, instr, dest, value, var):
+        return self._move(var, value)
+    
+    def _select_add_lea(self, instr, dest, left, right):
+        # dest = left + right without touching the sources
+        if dest == left:
+            return [f"add {dest}, {right}"]
+        if dest == right:
+            return [f"add {dest}, {left}"]
+        if self._kind(right) == 'imm':
+            return [f"lea {dest}, [{left}{int(right):+d}]"]
+        return [f"lea {dest}, [{left}+{right}]"]
+    
+    def _select_sub_lea(self, instr, dest, left, right):
+        if dest == left:
+            return [f"sub {dest}, {right}"]
+        return [f"lea {dest}, [{left}{-int(right):+d}]"]
+    
+    def _select_shl_lea(self, instr, dest, left, right):
+        shift = int(right)
+        if dest == left or shift not in (1, 2, 3) or not (
+                dest in self.REGISTERS and left in self.REGISTERS):
+            return self._binary("shl", dest, left, right, False)
+        if shift == 1:
+            return [f"lea {dest}, [{left}+{left}]"]
+        return [f"lea {dest}, [{left}*{1 << shift}]"]
+    
+    def _select_binary(self, instr, dest, left, right):
+        mnemonic, commutative = self.BINARY_MNEMONICS[instr.op]
+        return self._binary(mnemonic, dest, left, right, commutative)
+    
+    def _select_mul_imm(self, instr, dest, left, right):
+        if right in ["3", "5", "9"]:
+            # x * 3, x * 5 and x * 9 fit a single scaled-index lea
+            base = left if left in self.REGISTERS else "eax"
+            target = dest if dest in self.REGISTERS else "eax"
+            code = [] if base == left else [f"mov eax, {left}"]
+            code.append(f"lea {target}, [{base}+{base}*{int(right) - 1}]")
+            return code + self._move(dest, target)
+        if right in ["2", "4", "8"]:
+            return self._select_shl_lea(instr, dest, left, str(int(right).bit_length() - 1))
+        # Three-operand imul takes the source from a register or memory
+        target = dest if dest in self.REGISTERS else "eax"
+        if self._kind(left) == 'imm':
+            return self._binary("imul", dest, left, right, True)
+        return [f"imul {target}, {left}, {right}"] + self._move(dest, target)
+    
+    def _select_divide(self, instr, dest, left, divisor):
+        # idiv faults when INT_MIN / -1 overflows; like the TAC, the
+        # quotient wraps around to -left and the remainder is 0
+        result = "eax" if instr.op == 'DIV' else "edx"
+        if self._kind(divisor) == 'imm':
+            if int(divisor) == -1:
+                if instr.op == 'DIV':
+                    return self._select_neg(instr, dest, left)
+                return self._move(dest, "0")
+            return ([f"mov eax, {left}", "cdq"] + self._divide_by_immediate(divisor) +
+                    self._move(dest, result))
+        label = f"div_{self.label_counter}"
+        self.label_counter += 1
+        return [
+            f"mov eax, {left}",
+            f"cmp {divisor}, -1",
+            f"jne {label}",
+            "neg eax",
+            "xor edx, edx",
+            f"jmp {label}_done",
+            f"{label}:",
+            "cdq",
+            f"idiv {divisor}",
+            f"{label}_done:"
+        ] + self._move(dest, result)
+    
+    def _divide_by_immediate(self, divisor):
+        """Divides edx:eax by an immediate, which idiv has no form for."""
+        # eax and edx are both in use
+        return [f"push {divisor}", "idiv dword [esp]", "add esp, 4"]
+    
+    def _select_compare(self, instr, dest, left, right):
+        return self._compare(left, right) + self._set_flag(self.CONDITION_CODES[instr.op], dest)
+    
+    def _select_logical(self, instr, dest, left, right):
+        return [
+            f"mov eax, {left}",
+            "test eax, eax",
+            "setne al",
+            f"mov edx, {right}",
+            "test edx, edx",
+            "setne dl",
+            f"{instr.op.lower()} al, dl",
+            "movzx eax, al"
+        ] + self._move(dest, "eax")
+    
+    def _select_neg(self, instr, dest, value):
+        if dest in self.REGISTERS:
+            return self._move(dest, value) + [f"neg {dest}"]
+        return [f"mov eax, {value}", "neg eax"] + self._move(dest, "eax")
+    
+    def _select_not(self, instr, dest, value):
+        return self._compare(value, "0") + self._set_flag("e", dest)
+    
+    def _select_print(self, instr, dest, value):
+        fmt = "fmt_str" if self._is_string(instr.args[0]) else "fmt_int"
+        return self._with_saves(instr, [
+            f"push {value}",
+            f"push {fmt}",
+            f"call printf",
+            f"add esp, 8"
+        ])
+    
+    def _select_arg(self, instr, dest, value):
+        self.pending_args.append(value)
+        return None
+    
+    def _select_call(self, instr, dest):
+        args = instr.args
+        count = int(args[1])
+        call_args = self.pending_args[len(self.pending_args) - count:]
+        del self.pending_args[len(self.pending_args) - count:]
+        registers = len(self.ARGUMENT_REGISTERS)
+        code = [f"push {arg}" for arg in reversed(call_args[registers:])]
+        # Load the registers in reverse: an argument may be in ecx, never in edx
+        code += [f"mov {register}, {arg}"
+                 for register, arg in reversed(list(zip(self.ARGUMENT_REGISTERS, call_args)))
+                 if register != arg]
+        code.append(f"call {args[0]}")
+        if len(call_args) > registers:
+            code.append(f"add esp, {4 * (len(call_args) - registers)}")
+        return self._with_saves(instr, code + self._move(dest, "eax"))
+    
+    def _select_return(self, instr, dest, value="0"):
+        code = self._move("eax", value)
+        code += [f"pop {register}" for register in reversed(self.allocation.callee_saved)]
+        return code + [
+            "mov esp, ebp",
+            "pop ebp",
+            "ret"
+        ]
+    
+    def _select_label(self, instr, dest):
+        return f"{instr.args[0]}:"
+    
+    def _select_goto(self, instr, dest):
+        return f"jmp {instr.args[0]}"
+    
+    def _select_branch(self, instr, dest, cond):
+        op, target = instr.op, instr.args[1]
+        compare = self.fused.get(id(instr))
+        if compare is not None:
+            if compare.op == 'NOT':
+                # NOT x is x == 0
+                code = self._compare(self._operand(compare.args[0]), "0")
+                condition = 'e'
             else:
-                return [
-                    "mov eax, 0",
-                    "mov esp, ebp",
-                    "pop ebp",
-                    "ret"
-                ]
-        elif instr.startswith("LABEL"):
-            return f"{parts[1].rstrip(':')}:"
-        elif instr.startswith("GOTO"):
-            return f"jmp {parts[1]}"
-        elif instr.startswith("IF_FALSE"):
-            return f"jz {parts[-1]}"
-        
-        return None
\ No newline at end of file
+                code = self._compare(self._operand(compare.args[0]), self._operand(compare.args[1]))
+                condition = self.CONDITION_CODES[compare.op]
+            if op == 'IF_FALSE':
+                condition = self.INVERSE_CONDITIONS[condition]
+            return code + [f"j{condition} {target}"]
+        # Short-circuit conditions arrive as chains of these branches
+        jump = "jz" if op == 'IF_FALSE' else "jnz"
+        if cond in self.REGISTERS:
+            test = [f"test {cond}, {cond}"]
+        else:
+            test = self._compare(cond, "0")
+        return test + [f"{jump} {target}"]
@@ -0,0 +1,444 @@
+"""
+This module implements a generic worklist solver for dataflow problems
+over a function's CFG.
+
+Sets of facts are Python ints used as bitsets: every fact (a temp, a
+variable, a definition site) gets a dense ID from an IndexMap, and a set
+is the int with those bits set. Union, intersection and difference are
+then single big-integer operations, which keeps the solver fast on
+functions with 100k+ temps where sets of strings would be copied and
+hashed on every iteration.
+
+A problem describes itself through gen/kill bitsets per block, its
+direction and its meet operator. solve() visits blocks in reverse
+postorder for forward problems and in postorder for backward ones, and
+only revisits a block when the value flowing into it changed.
+
+Built-in problems:
+- LiveValues: which temps are live (backward, union)
+- LiveVariables: which memory variables may still be loaded (backward, union)
+- ReachingDefinitions: which definition sites reach a point (forward, union)
+"""
+
+import re
+
+from .ir import is_constant
+
+FORWARD = 'forward'
+BACKWARD = 'backward'
+
+# Above this many IDs a mask is assembled in a bytearray instead of by shifts
+_BYTEARRAY_THRESHOLD = 64
+_ONE = re.compile('1')
+
+
+def iter_bits(bits):
+    """
+    Yields the indices of the set bits of a bitset in increasing order.
+
+    Args:
+        bits: Non-negative int
+
+    Returns:
+        iterator: Bit indices
+    """
+    for match in _ONE.finditer(bin(bits)[:1:-1]):
+        yield match.start()
+
+
+def mask_of(ids, size):
+    """
+    Builds the bitset containing the given IDs.
+
+    Args:
+        ids: Collection of IDs, each below size
+        size: Number of IDs in the universe
+
+    Returns:
+        int: Bitset
+    """
+    if len(ids) < _BYTEARRAY_THRESHOLD:
+        mask = 0
+        for i in ids:
+            mask |= 1 << i
+        return mask
+    buffer = bytearray((size + 7) // 8)
+    for i in ids:
+        buffer[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(buffer, 'little')
+
+
+class IndexMap:
+    """
+    Assigns dense integer IDs to hashable facts.
+
+    Attributes:
+        ids: Maps facts to their IDs
+        items: Facts in ID order
+    """
+
+    def __init__(self, items=()):
+        self.ids = {}
+        self.items = []
+        for item in items:
+            self.add(item)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, item):
+        return item in self.ids
+
+    def add(self, item):
+        """Returns the ID of a fact, assigning the next free one if it is new."""
+        index = self.ids.get(item)
+        if index is None:
+            index = len(self.items)
+            self.ids[item] = index
+            self.items.append(item)
+        return index
+
+    def mask(self, items):
+        """Returns the bitset of known facts; unknown facts are ignored."""
+        ids = self.ids
+        return mask_of([ids[item] for item in items if item in ids], len(self.items))
+
+    def to_set(self, bits):
+        """Converts a bitset back into a set of facts."""
+        items = self.items
+        return {items[i] for i in iter_bits(bits)}
+
+
+class DataflowProblem:
+    """
+    Base class for gen/kill dataflow problems.
+
+    Subclasses fill `index` with the facts of the function and implement
+    gen_kill(). The transfer function of a block is
+    out = gen | (in & ~kill) in the direction of the problem.
+
+    Attributes:
+        func: Function being analyzed
+        index: IndexMap of the facts
+        direction: FORWARD or BACKWARD
+        meet: 'union' (may problems) or 'intersection' (must problems)
+    """
+
+    direction = FORWARD
+    meet = 'union'
+
+    def __init__(self, func):
+        self.func = func
+        self.index = IndexMap()
+
+    def gen_kill(self, block):
+        """
+        Summarizes a block.
+
+        Args:
+            block: BasicBlock to summarize
+
+        Returns:
+            tuple: (gen, kill) bitsets
+        """
+        raise NotImplementedError
+
+    def boundary(self):
+        """Returns the value at the entry (forward) or at exit blocks (backward)."""
+        return 0
+
+    def edge(self, pred, succ):
+        """Returns extra facts that flow only along the edge pred -> succ."""
+        return 0
+
+    def top(self):
+        """Returns the initial value of every block: the identity of the meet."""
+        if self.meet == 'intersection':
+            return (1 << len(self.index)) - 1
+        return 0
+
+
+class DataflowResult:
+    """
+    Solution of a dataflow problem.
+
+    Attributes:
+        index: IndexMap the bitsets refer to
+        block_in: Maps block labels to the bitset at block entry
+        block_out: Maps block labels to the bitset at block exit
+        iterations: Number of block transfer evaluations the solver needed
+    """
+
+    def __init__(self, index, block_in, block_out, iterations):
+        self.index = index
+        self.block_in = block_in
+        self.block_out = block_out
+        self.iterations = iterations
+
+    def in_set(self, label):
+        """Returns the facts at the entry of a block as a set."""
+        return self.index.to_set(self.block_in[label])
+
+    def out_set(self, label):
+        """Returns the facts at the exit of a block as a set."""
+        return self.index.to_set(self.block_out[label])
+
+    def sets(self):
+        """
+        Converts the whole solution into sets.
+
+        Returns:
+            tuple: (block_in, block_out) dicts mapping labels to sets of facts
+        """
+        to_set = self.index.to_set
+        return ({label: to_set(bits) for label, bits in self.block_in.items()},
+                {label: to_set(bits) for label, bits in self.block_out.items()})
+
+
+def solve(problem):
+    """
+    Solves a dataflow problem with a worklist swept in block order.
+
+    Blocks are visited in reverse postorder (postorder for backward
+    problems), so a block is processed after the blocks feeding it
+    wherever the CFG allows, and each sweep only evaluates blocks whose
+    inputs changed since their last visit. Blocks unreachable from the
+    entry are appended to the order so that every block gets a solution.
+
+    Args:
+        problem: DataflowProblem to solve
+
+    Returns:
+        DataflowResult: Fixed point of the problem
+    """
+    func = problem.func
+    block_map = func.block_map
+    order = func.reverse_postorder()
+    reachable = set(order)
+    order.extend(b.label for b in func.blocks if b.label not in reachable)
+    forward = problem.direction == FORWARD
+    if not forward:
+        order.reverse()
+
+    summaries = {label: problem.gen_kill(block_map[label]) for label in order}
+    top = problem.top()
+    boundary = problem.boundary()
+    intersect = problem.meet == 'intersection'
+    result_in = dict.fromkeys(order, top)
+    result_out = dict.fromkeys(order, top)
+    # sources feed a block, targets are revisited when the block changes
+    if forward:
+        sources = {label: block_map[label].preds for label in order}
+        targets = {label: block_map[label].succs for label in order}
+        before, after = result_in, result_out
+    else:
+        sources = {label: block_map[label].succs for label in order}
+        targets = {label: block_map[label].preds for label in order}
+        before, after = result_out, result_in
+    edge = problem.edge
+    has_edges = type(problem).edge is not DataflowProblem.edge
+
+    entry = func.entry.label if forward else None
+    pending = set(order)
+    iterations = 0
+    while pending:
+        for label in order:
+            if label not in pending:
+                continue
+            pending.discard(label)
+            iterations += 1
+
+            feeding = sources[label]
+            if not feeding:
+                value = boundary
+            else:
+                # The entry also receives the boundary when a loop jumps back to it
+                value = boundary if label == entry else None
+                for other in feeding:
+                    bits = after[other]
+                    if has_edges:
+                        bits |= edge(other, label) if forward else edge(label, other)
+                    if value is None:
+                        value = bits
+                    elif intersect:
+                        value &= bits
+                    else:
+                        value |= bits
+            before[label] = value
+
+            gen, kill = summaries[label]
+            new = gen | (value & ~kill)
+            if new != after[label]:
+                after[label] = new
+                pending.update(targets[label])
+    return DataflowResult(problem.index, result_in, result_out, iterations)
+
+
+class LiveValues(DataflowProblem):
+    """
+    Backward liveness of temps and other value names.
+
+    PHI operands are treated as uses at the end of the corresponding
+    predecessor rather than at the top of the PHI's own block.
+    """
+
+    direction = BACKWARD
+
+    def __init__(self, func):
+        super().__init__(func)
+        add = self.index.add
+        for instr in func.instructions():
+            if instr.dest is not None:
+                add(instr.dest)
+            for name in instr.uses():
+                add(name)
+        self._phi_edges = {}
+        for block in func.blocks:
+            for phi in block.phis():
+                for value, label in zip(phi.args, phi.labels):
+                    if not is_constant(value):
+                        key = (label, block.label)
+                        self._phi_edges.setdefault(key, set()).add(value)
+        self._phi_edges = {key: self.index.mask(names) for key, names in self._phi_edges.items()}
+
+    def gen_kill(self, block):
+        ids = self.index.ids
+        uses = set()
+        defs = set()
+        for instr in block.instructions:
+            if instr.op != 'PHI':
+                for name in instr.uses():
+                    i = ids[name]
+                    if i not in defs:
+                        uses.add(i)
+            if instr.dest is not None:
+                defs.add(ids[instr.dest])
+        size = len(self.index)
+        return mask_of(uses, size), mask_of(defs, size)
+
+    def edge(self, pred, succ):
+        return self._phi_edges.get((pred, succ), 0)
+
+
+class LiveVariables(DataflowProblem):
+    """
+    Backward liveness of memory variables: a variable is live when a LOAD
+    of it may execute before the next STORE or DECLARE.
+
+    Args:
+        func: Function whose edges are up to date
+        live_at_exit: Variables still observable after the function returns
+        call_uses: Variables a CALL may read (the globals)
+    """
+
+    direction = BACKWARD
+
+    def __init__(self, func, live_at_exit=(), call_uses=()):
+        super().__init__(func)
+        add = self.index.add
+        for name in live_at_exit:
+            add(name)
+        for name in call_uses:
+            add(name)
+        for instr in func.instructions():
+            var = instr.loaded_var() or instr.stored_var()
+            if var is not None:
+                add(var)
+        self._exit = self.index.mask(live_at_exit)
+        self._call_uses = self.index.mask(call_uses)
+
+    def gen_kill(self, block):
+        ids = self.index.ids
+        uses = 0
+        defs = 0
+        for instr in block.instructions:
+            var = instr.loaded_var()
+            if var is not None:
+                uses |= (1 << ids[var]) & ~defs
+            if instr.op == 'CALL':
+                uses |= self._call_uses & ~defs
+            var = instr.stored_var()
+            if var is not None:
+                defs |= 1 << ids[var]
+        return uses, defs
+
+    def boundary(self):
+        return self._exit
+
+
+class ReachingDefinitions(DataflowProblem):
+    """
+    Forward reaching definitions.
+
+    Facts are definition sites (block label, instruction index, name): an
+    instruction with a destination defines that value and a STORE or
+    DECLARE defines its variable. A CALL defines each name in call_defs.
+    Names in entry_defs are also defined on entry to the function, by the
+    site (None, -1, name); parameters are the typical case.
+
+    Args:
+        func: Function whose edges are up to date
+        call_defs: Variables a CALL may write (the globals)
+        entry_defs: Names that have a definition on entry
+
+    Attributes:
+        definitions: Maps each name to the bitset of its definition sites
+    """
+
+    def __init__(self, func, call_defs=(), entry_defs=()):
+        super().__init__(func)
+        self._sites = {}
+        by_name = self._by_name = {}
+        add = self.index.add
+        entry = []
+        for name in entry_defs:
+            site = add((None, -1, name))
+            entry.append(site)
+            by_name.setdefault(name, []).append(site)
+        for block in func.blocks:
+            sites = []
+            for i, instr in enumerate(block.instructions):
+                names = []
+                if instr.dest is not None:
+                    names.append(instr.dest)
+                var = instr.stored_var()
+                if var is not None:
+                    names.append(var)
+                if instr.op == 'CALL':
+                    names.extend(call_defs)
+                for name in names:
+                    site = add((block.label, i, name))
+                    sites.append((name, site))
+                    by_name.setdefault(name, []).append(site)
+            self._sites[block.label] = sites
+        size = len(self.index)
+        self.definitions = {name: mask_of(ids, size) for name, ids in by_name.items()}
+        self._entry = mask_of(entry, size)
+
+    def gen_kill(self, block):
+        last = {}
+        for name, site in self._sites[block.label]:
+            last[name] = site
+        size = len(self.index)
+        kill = []
+        for name in last:
+            kill.extend(self._by_name[name])
+        return mask_of(list(last.values()), size), mask_of(kill, size)
+
+    def boundary(self):
+        return self._entry
+
+    def reaching(self, result, label, name):
+        """
+        Returns the definition sites of a name that reach the entry of a block.
+
+        Args:
+            result: DataflowResult of solving this problem
+            label: Block label
+            name: Value or variable name
+
+        Returns:
+            list: (label, index, name) tuples
+        """
+        bits = result.block_in[label] & self.definitions.get(name, 0)
+        return [self.index.items[i] for i in iter_bits(bits)]
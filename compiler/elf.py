@@ -0,0 +1,165 @@
+"""
+This module writes an assembled program (compiler.assembler.ObjectCode) as
+an ELF64 relocatable object file for x86-64 Linux, which the system linker
+turns into an executable (e.g. `cc output.o -o program`).
+
+File layout: ELF header, then the contents of .text, .data, .rodata,
+.symtab, .strtab, .rela.text and .shstrtab, then the section header
+table. .bss takes no space in the file; the loader zero-fills it. An
+empty .note.GNU-stack section marks the stack non-executable.
+
+Symbols: every function and data label becomes a symbol (FUNC or OBJECT);
+labels declared `global` and the `extern` functions are global, all other
+symbols are local, and ELF requires the local ones to come first.
+"""
+
+import struct
+
+# Section types
+SHT_PROGBITS = 1
+SHT_SYMTAB = 2
+SHT_STRTAB = 3
+SHT_RELA = 4
+SHT_NOBITS = 8
+
+# Section flags
+SHF_WRITE = 0x1
+SHF_ALLOC = 0x2
+SHF_EXECINSTR = 0x4
+SHF_INFO_LINK = 0x40
+
+# Symbol bindings and types
+STB_LOCAL = 0
+STB_GLOBAL = 1
+SYMBOL_TYPES = {'notype': 0, 'object': 1, 'func': 2}
+
+ET_REL = 1
+EM_X86_64 = 62
+
+ELF_HEADER_SIZE = 64
+SECTION_HEADER_SIZE = 64
+SYMBOL_SIZE = 24
+RELA_SIZE = 24
+
+
+class StringTable:
+    """
+    An ELF string table: NUL-terminated names addressed by offset.
+
+    Attributes:
+        data: Table contents, starting with the empty name
+        offsets: Maps names to their offsets
+    """
+
+    def __init__(self):
+        self.data = bytearray(b'\0')
+        self.offsets = {'': 0}
+
+    def add(self, name):
+        """Returns the offset of a name, appending it if it is new."""
+        if name not in self.offsets:
+            self.offsets[name] = len(self.data)
+            self.data += name.encode('utf-8') + b'\0'
+        return self.offsets[name]
+
+
+def build_object_file(code):
+    """
+    Serializes assembled code as an ELF64 relocatable object.
+
+    Args:
+        code: ObjectCode from compiler.assembler.Assembler
+
+    Returns:
+        bytes: Contents of the .o file
+    """
+    # (name, type, flags, data, alignment); link/info/entsize patched below
+    sections = [
+        ('.text', SHT_PROGBITS, SHF_ALLOC | SHF_EXECINSTR, bytes(code.sections['.text']), 16),
+        ('.data', SHT_PROGBITS, SHF_ALLOC | SHF_WRITE, bytes(code.sections['.data']), 4),
+        ('.rodata', SHT_PROGBITS, SHF_ALLOC, bytes(code.sections['.rodata']), 1),
+        ('.bss', SHT_NOBITS, SHF_ALLOC | SHF_WRITE, bytes(code.sections['.bss']), 16),
+        ('.note.GNU-stack', SHT_PROGBITS, 0, b'', 1)
+    ]
+    index = {name: i + 1 for i, (name, *_) in enumerate(sections)}
+    symtab_index = len(sections) + 1
+    strtab_index = symtab_index + 1
+    rela_index = strtab_index + 1
+    shstrtab_index = rela_index + 1
+
+    # Symbol table: the null symbol, then locals, then globals
+    strtab = StringTable()
+    ordered = ([symbol for symbol in code.symbols if not symbol.is_global] +
+               [symbol for symbol in code.symbols if symbol.is_global])
+    symbol_ids = {}
+    symtab = bytearray(SYMBOL_SIZE)
+    for i, symbol in enumerate(ordered, start=1):
+        symbol_ids[symbol.name] = i
+        binding = STB_GLOBAL if symbol.is_global else STB_LOCAL
+        shndx = index[symbol.section] if symbol.section else 0
+        symtab += struct.pack('<IBBHQQ', strtab.add(symbol.name),
+                              binding << 4 | SYMBOL_TYPES[symbol.kind], 0, shndx,
+                              symbol.offset, symbol.size)
+    first_global = 1 + sum(1 for symbol in ordered if not symbol.is_global)
+
+    rela = bytearray()
+    for relocation in code.relocations:
+        rela += struct.pack('<QQq', relocation.offset,
+                            symbol_ids[relocation.symbol] << 32 | relocation.type,
+                            relocation.addend)
+
+    sections += [
+        ('.symtab', SHT_SYMTAB, 0, bytes(symtab), 8),
+        ('.strtab', SHT_STRTAB, 0, bytes(strtab.data), 1),
+        ('.rela.text', SHT_RELA, SHF_INFO_LINK, bytes(rela), 8)
+    ]
+    shstrtab = StringTable()
+    for name, *_ in sections:
+        shstrtab.add(name)
+    shstrtab.add('.shstrtab')
+    sections.append(('.shstrtab', SHT_STRTAB, 0, bytes(shstrtab.data), 1))
+
+    # Section contents follow the ELF header, each at its alignment
+    contents = bytearray()
+    offsets = []
+    for _, type_, _, data, alignment in sections:
+        position = ELF_HEADER_SIZE + len(contents)
+        padding = -position % alignment
+        contents += b'\0' * padding
+        offsets.append(ELF_HEADER_SIZE + len(contents))
+        if type_ != SHT_NOBITS:
+            contents += data
+    contents += b'\0' * (-(ELF_HEADER_SIZE + len(contents)) % 8)
+    section_header_offset = ELF_HEADER_SIZE + len(contents)
+
+    headers = bytearray(SECTION_HEADER_SIZE)
+    for i, (name, type_, flags, data, alignment) in enumerate(sections, start=1):
+        link = info = entsize = 0
+        if i == symtab_index:
+            link, info, entsize = strtab_index, first_global, SYMBOL_SIZE
+        elif i == rela_index:
+            link, info, entsize = symtab_index, index['.text'], RELA_SIZE
+        headers += struct.pack('<IIQQQQIIQQ', shstrtab.add(name), type_, flags, 0,
+                               offsets[i - 1], len(data), link, info, alignment, entsize)
+
+    header = struct.pack(
+        '<4sBBBBB7sHHIQQQIHHHHHH',
+        b'\x7fELF', 2, 1, 1, 0, 0, b'\0' * 7,   # 64-bit, little endian, version 1, System V ABI
+        ET_REL, EM_X86_64, 1,
+        0, 0, section_header_offset,            # entry, program headers, section headers
+        0, ELF_HEADER_SIZE, 0, 0,               # flags, header size, no program headers
+        SECTION_HEADER_SIZE, len(sections) + 1, shstrtab_index
+    )
+    return header + bytes(contents) + bytes(headers)
+
+
+def write_object_file(code, path):
+    """
+    Writes assembled code to an ELF64 relocatable object file.
+
+    Args:
+        code: ObjectCode from compiler.assembler.Assembler
+        path: Output path, conventionally ending in .o
+    """
+    with open(path, 'wb') as f:
+        f.write(build_object_file(code))
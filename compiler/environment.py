@@ -0,0 +1,77 @@
+"""
+This module sets up the directories and logging used while compiling:
+- build/output/ receives the generated files
+- build/temp/ holds scratch files and is removed afterwards unless
+  debugging
+- compiler.log records the compilation process
+"""
+
+import logging
+import os
+import shutil
+
+
+class CompilerEnvironment:
+    """
+    Context manager that prepares the build directories and the compiler log.
+
+    Attributes:
+        debug_mode: Keep temporary files and log at DEBUG level
+        base_dir: Root of the build directory tree
+        output_dir: Directory for generated files
+        temp_dir: Directory for temporary files
+        logger: Logger writing to compiler.log
+    """
+
+    def __init__(self, debug_mode=False, base_dir='build', log_file='compiler.log'):
+        self.debug_mode = debug_mode
+        self.base_dir = base_dir
+        self.output_dir = os.path.join(base_dir, 'output')
+        self.temp_dir = os.path.join(base_dir, 'temp')
+        self.log_file = log_file
+        self.logger = logging.getLogger('compiler')
+        self._handler = None
+
+    def __enter__(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        os.makedirs(self.temp_dir, exist_ok=True)
+
+        self._handler = logging.FileHandler(self.log_file)
+        self._handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+        self.logger.addHandler(self._handler)
+        self.logger.setLevel(logging.DEBUG if self.debug_mode else logging.INFO)
+        self.logger.info("Compilation environment ready")
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self.logger.error(f"Compilation failed: {exc_value}")
+        if not self.debug_mode:
+            shutil.rmtree(self.temp_dir, ignore_errors=True)
+        self.logger.removeHandler(self._handler)
+        self._handler.close()
+        return False
+
+    def get_output_path(self, filename):
+        """
+        Returns the path of a generated file in the output directory.
+
+        Args:
+            filename: Name of the file
+
+        Returns:
+            str: Path inside build/output
+        """
+        return os.path.join(self.output_dir, filename)
+
+    def get_temp_path(self, filename):
+        """
+        Returns the path of a temporary file.
+
+        Args:
+            filename: Name of the file
+
+        Returns:
+            str: Path inside build/temp
+        """
+        return os.path.join(self.temp_dir, filename)
@@ -0,0 +1,22 @@
+"""
+Engines that execute programs inside the compiler, without building a
+native executable. The web interface runs the programs it compiles with
+them.
+"""
+
+from .closures import ClosureCompiler, ClosureProgram, CompiledFunction
+from .python_backend import PythonProgram, PythonTranspiler, compile_program
+from .vm import BytecodeCompiler, BytecodeFunction, BytecodeProgram, VirtualMachine
+
+__all__ = [
+    'ClosureCompiler',
+    'ClosureProgram',
+    'CompiledFunction',
+    'PythonProgram',
+    'PythonTranspiler',
+    'compile_program',
+    'BytecodeCompiler',
+    'BytecodeFunction',
+    'BytecodeProgram',
+    'VirtualMachine'
+]
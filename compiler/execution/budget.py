@@ -0,0 +1,94 @@
+"""
+This module contains ExecutionBudget, the limits of one program run:
+executed steps (instructions, nodes, or loop iterations and calls,
+depending on the executor),
+wall-clock time and printed output.
+
+Executors count steps in a local variable and compare it with a single
+limit, the value returned by check(). That limit is the next point at which
+the clock is read, never past max_steps, so the time limit costs nothing
+between checkpoints and the common path stays one integer comparison.
+"""
+
+import time
+
+# Steps between two reads of the clock
+CHECK_INTERVAL = 10000
+
+
+class ExecutionBudget:
+    """
+    Limits of a program run and what the run consumed.
+
+    Attributes:
+        max_steps: Limit on executed steps
+        max_time: Limit on wall-clock seconds, or None
+        max_output: Limit on printed characters, counting one newline per
+            line, or None
+        steps: Steps consumed
+        output_size: Characters printed
+        elapsed: Seconds the run took, once it has stopped
+    """
+
+    def __init__(self, max_steps, max_time=None, max_output=None):
+        self.max_steps = max_steps
+        self.max_time = max_time
+        self.max_output = max_output
+        self.steps = 0
+        self.output_size = 0
+        self.elapsed = 0.0
+        self.started = None
+
+    def start(self):
+        """Starts the clock; returns the first step limit."""
+        self.started = time.perf_counter()
+        return self.check(self.steps)
+
+    def stop(self):
+        if self.started is not None:
+            self.elapsed = time.perf_counter() - self.started
+
+    def check(self, steps):
+        """
+        Checks the limits at a step count, typically once the count has
+        passed the limit returned by the previous check.
+
+        Returns:
+            int: Step count at which to check again
+
+        Raises:
+            RuntimeError: If a limit is exceeded
+        """
+        self.steps = steps
+        if steps > self.max_steps:
+            raise RuntimeError(f"Execution limit of {self.max_steps} steps exceeded")
+        if self.max_time is not None and self.started is not None:
+            if time.perf_counter() - self.started > self.max_time:
+                raise RuntimeError(f"Time limit of {self.max_time:g} seconds exceeded")
+        return min(self.max_steps, steps + CHECK_INTERVAL)
+
+    def output_limit(self):
+        """Returns the limit on printed characters; infinite if there is none."""
+        return float('inf') if self.max_output is None else self.max_output
+
+    def add_output(self, text):
+        """
+        Counts a printed line.
+
+        Raises:
+            RuntimeError: If the output limit is exceeded
+        """
+        self.output_size += len(text) + 1
+        if self.output_size > self.output_limit():
+            raise RuntimeError(f"Output limit of {self.max_output} characters exceeded")
+
+    def usage(self):
+        """Returns the limits and the consumed budget as a dict."""
+        return {
+            'steps': self.steps,
+            'max_steps': self.max_steps,
+            'time': round(self.elapsed, 6),
+            'max_time': self.max_time,
+            'output_size': self.output_size,
+            'max_output': self.max_output
+        }
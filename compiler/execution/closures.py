@@ -0,0 +1,352 @@
+"""
+This module contains an execution engine that compiles the AST into
+nested Python closures: ClosureCompiler turns every node into a closure
+once, and running the program only calls closures.
+
+Constants, operator functions, variable slots and callees are bound when
+a closure is created, so nothing is looked up by node type or by name at
+run time. Variables live in a list per call, indexed by slot; globals in a
+list shared by all functions. Expression closures take the frame and
+return a value; statement closures take the frame and return None to fall
+through, or the function's return value.
+
+The semantics are those of the compiled program (see
+compiler.execution.vm): 32-bit wrap-around, division truncating toward
+zero, and a variable declared in a function refers to the global of the
+same name if there is one, as in the TAC. Calls recurse in Python, so
+deep recursion stops at Python's recursion limit.
+
+Every loop iteration and every call is a step. A run is limited by an
+ExecutionBudget (see compiler.execution.budget): loops and calls compare
+the step count with the budget's next checkpoint, and print counts the
+output.
+"""
+
+from .budget import ExecutionBudget
+from .vm import BINARY_OPERATIONS, MAX_STEPS, _wrap
+
+# TAC operations of the binary operators of the source language
+OPERATORS = {
+    '+': 'ADD', '-': 'SUB', '*': 'MUL', '/': 'DIV', '%': 'MOD',
+    '==': 'EQ', '!=': 'NE', '<': 'LT', '<=': 'LE', '>': 'GT', '>=': 'GE'
+}
+OPERATOR_FUNCTIONS = dict(BINARY_OPERATIONS)
+
+
+class CompiledFunction:
+    """
+    A function compiled to closures.
+
+    Attributes:
+        name: Function name
+        param_count: Number of parameters, which occupy the first slots
+        frame_size: Number of slots
+        body: Statement closure of the body, set once it is compiled
+    """
+
+    def __init__(self, name, param_count):
+        self.name = name
+        self.param_count = param_count
+        self.frame_size = param_count
+        self.body = None
+
+
+class ClosureProgram:
+    """
+    A program compiled to closures.
+
+    Attributes:
+        functions: Maps function names to CompiledFunctions
+        init: Closures of the global initializers, run in order
+        globals: Values of the global variables
+        output: Lines printed by the program
+        steps: Loop iterations and calls executed so far
+        max_steps: Limit on steps of runs without an explicit budget
+        budget: ExecutionBudget of the current run
+        limit: Step count at which the budget is checked next
+    """
+
+    def __init__(self, max_steps=MAX_STEPS):
+        self.functions = {}
+        self.init = []
+        self.globals = []
+        self.output = []
+        self.steps = 0
+        self.max_steps = max_steps
+        self.budget = None
+        self.limit = 0
+
+    def run(self, entry='main', budget=None):
+        """
+        Runs the global initializers, then the entry function. The program
+        can be run again; every run starts from fresh globals.
+
+        Args:
+            entry: Name of the function to run
+            budget: ExecutionBudget limiting steps, time and output; by
+                default only max_steps is limited
+
+        Returns:
+            list: Lines printed by the program
+
+        Raises:
+            RuntimeError: On division by zero, or when a limit is exceeded
+        """
+        if entry not in self.functions:
+            raise RuntimeError(f"Program has no function {entry}")
+        # Closures are bound to these lists, so they are reset in place
+        self.globals[:] = [0] * len(self.globals)
+        self.output.clear()
+        self.steps = 0
+        self.budget = budget if budget is not None else ExecutionBudget(self.max_steps)
+        self.limit = self.budget.start()
+        frame = []
+        try:
+            for initializer in self.init:
+                initializer(frame)
+            function = self.functions[entry]
+            function.body([0] * function.frame_size)
+        except ZeroDivisionError:
+            raise RuntimeError("Division by zero") from None
+        except RecursionError:
+            raise RuntimeError("Call depth limit exceeded") from None
+        finally:
+            self.budget.steps = self.steps
+            self.budget.stop()
+        return list(self.output)
+
+
+class ClosureCompiler:
+    """
+    Compiles an AST into a ClosureProgram.
+
+    Attributes:
+        program: ClosureProgram being built
+        global_index: Maps global variable names to their index
+        slots: Maps the variables of the function being compiled to slots
+        function: CompiledFunction being compiled
+    """
+
+    def __init__(self, max_steps=MAX_STEPS):
+        self.program = ClosureProgram(max_steps)
+        self.global_index = {}
+        self.slots = {}
+        self.function = None
+
+    def compile(self, ast):
+        """
+        Compiles a program.
+
+        Args:
+            ast: List of top-level declarations from the parser
+
+        Returns:
+            ClosureProgram: The compiled program
+
+        Raises:
+            ValueError: If the program uses a construct the engine does not
+                know, or calls a function it does not define
+        """
+        nodes = ast if isinstance(ast, list) else [ast]
+        program = self.program
+        for node in nodes:
+            if node['type'] == 'variable_declaration' and node['name'] not in self.global_index:
+                self.global_index[node['name']] = len(self.global_index)
+            elif node['type'] == 'function_declaration':
+                name = node.get('name', 'main')
+                program.functions[name] = CompiledFunction(name, len(node.get('parameters', [])))
+        program.globals = [0] * len(self.global_index)
+
+        for node in nodes:
+            if node['type'] == 'variable_declaration':
+                # Global initializers use no local slots
+                self.slots = {}
+                program.init.append(self._statement(node))
+            elif node['type'] == 'function_declaration':
+                self._function(node)
+        return program
+
+    def _function(self, node):
+        function = self.program.functions[node.get('name', 'main')]
+        self.function = function
+        self.slots = {param['name']: i for i, param in enumerate(node.get('parameters', []))}
+        body = self._block(node.get('body', []))
+        function.frame_size = len(self.slots)
+        function.body = body
+
+    def _slot(self, name):
+        """Returns the local slot of a variable, or None if it is global."""
+        if name in self.slots:
+            return self.slots[name]
+        if name in self.global_index:
+            return None
+        self.slots[name] = len(self.slots)
+        return self.slots[name]
+
+    def _block(self, statements):
+        if not isinstance(statements, list):
+            return self._statement(statements)
+        compiled = [self._statement(statement) for statement in statements]
+        if len(compiled) == 1:
+            return compiled[0]
+
+        def block(frame):
+            for statement in compiled:
+                result = statement(frame)
+                if result is not None:
+                    return result
+        return block
+
+    def _statement(self, node):
+        """Compiles a statement into a closure returning None or a return value."""
+        kind = node['type']
+        if kind == 'variable_declaration':
+            if node.get('initializer') is None:
+                # As in the TAC, a declaration without initializer only
+                # reserves the slot
+                self._slot(node['name'])
+                return lambda frame: None
+            assign = self._assignment(node['name'], node['initializer'])
+
+            def initialize(frame):
+                assign(frame)
+            return initialize
+        if kind == 'expression_statement':
+            expression = self._expression(node['expression'])
+
+            def evaluate(frame):
+                expression(frame)
+            return evaluate
+        if kind == 'print_statement':
+            value = self._expression(node['expression'])
+            append = self.program.output.append
+            program = self.program
+
+            def print_(frame):
+                text = str(value(frame))
+                program.budget.add_output(text)
+                append(text)
+            return print_
+        if kind == 'return_statement':
+            if node.get('expression') is None:
+                return lambda frame: 0
+            return self._expression(node['expression'])
+        if kind == 'if_statement':
+            return self._if(node)
+        if kind == 'while_statement':
+            return self._while(node)
+        if kind == 'block_statement':
+            return self._block(node.get('body', []))
+        raise ValueError(f"Cannot execute {kind}")
+
+    def _if(self, node):
+        condition = self._expression(node['condition'])
+        consequent = self._block(node['consequent'])
+        if not node.get('alternate'):
+            def if_then(frame):
+                if condition(frame):
+                    return consequent(frame)
+            return if_then
+        alternate = self._block(node['alternate'])
+
+        def if_else(frame):
+            if condition(frame):
+                return consequent(frame)
+            return alternate(frame)
+        return if_else
+
+    def _while(self, node):
+        condition = self._expression(node['condition'])
+        body = self._block(node['body'])
+        program = self.program
+
+        def loop(frame):
+            while condition(frame):
+                program.steps += 1
+                if program.steps > program.limit:
+                    program.limit = program.budget.check(program.steps)
+                result = body(frame)
+                if result is not None:
+                    return result
+        return loop
+
+    def _assignment(self, name, value_node):
+        value = self._expression(value_node)
+        slot = self._slot(name)
+        if slot is None:
+            globals_ = self.program.globals
+            index = self.global_index[name]
+
+            def assign_global(frame):
+                result = globals_[index] = value(frame)
+                return result
+            return assign_global
+
+        def assign(frame):
+            result = frame[slot] = value(frame)
+            return result
+        return assign
+
+    def _expression(self, node):
+        """Compiles an expression into a closure returning its value."""
+        kind = node['type']
+        if kind == 'number_literal':
+            constant = _wrap(int(node['value']))
+            return lambda frame: constant
+        if kind == 'string_literal':
+            constant = node['value'].strip('"')
+            return lambda frame: constant
+        if kind == 'identifier':
+            slot = self._slot(node['name'])
+            if slot is None:
+                globals_ = self.program.globals
+                index = self.global_index[node['name']]
+                return lambda frame: globals_[index]
+            return lambda frame: frame[slot]
+        if kind == 'assignment_expression':
+            return self._assignment(node['left']['name'], node['right'])
+        if kind == 'binary_expression':
+            return self._binary(node)
+        if kind == 'unary_expression':
+            operand = self._expression(node['operand'])
+            if node['operator'] == '-':
+                return lambda frame: _wrap(-operand(frame))
+            if node['operator'] == '!':
+                return lambda frame: 0 if operand(frame) else 1
+            return operand
+        if kind == 'call_expression':
+            return self._call(node)
+        raise ValueError(f"Cannot evaluate {kind}")
+
+    def _binary(self, node):
+        operator = node['operator']
+        left = self._expression(node['left'])
+        right = self._expression(node['right'])
+        if operator == '&&':
+            return lambda frame: 1 if left(frame) and right(frame) else 0
+        if operator == '||':
+            return lambda frame: 1 if left(frame) or right(frame) else 0
+        function = OPERATOR_FUNCTIONS[OPERATORS[operator]]
+        if node['right']['type'] == 'number_literal':
+            # The most common shape, i < 10 or i + 1, skips a call
+            constant = _wrap(int(node['right']['value']))
+            return lambda frame: function(left(frame), constant)
+        return lambda frame: function(left(frame), right(frame))
+
+    def _call(self, node):
+        name = node['callee']
+        if name not in self.program.functions:
+            raise ValueError(f"Call to undefined function {name}")
+        callee = self.program.functions[name]
+        arguments = [self._expression(argument) for argument in node['arguments']]
+        program = self.program
+
+        def call(frame):
+            values = [argument(frame) for argument in arguments]
+            program.steps += 1
+            if program.steps > program.limit:
+                program.limit = program.budget.check(program.steps)
+            callee_frame = values + [0] * (callee.frame_size - len(values))
+            result = callee.body(callee_frame)
+            return 0 if result is None else result
+        return call
@@ -0,0 +1,318 @@
+"""
+This module runs programs by translating the AST into Python source:
+PythonTranspiler writes the source, compile_program() compiles it with
+compile() and PythonProgram runs it with exec() in a restricted namespace.
+
+Functions become `def`s, while loops `while` loops and print appends to a
+buffered output list. Names get prefixes (f_ for functions, v_ for locals,
+g_ for globals), so programs cannot reach Python names. Arithmetic keeps
+the semantics of the compiled program (see compiler.execution.vm):
+results wrap around to 32 bits and `/` and `%` truncate toward zero.
+
+Every loop iteration and every call increments a step counter. A run is
+limited by an ExecutionBudget (see compiler.execution.budget): the step
+counter is compared with the budget's next checkpoint and printed lines
+are counted, so runaway programs are bounded in steps, time and output.
+Compiled programs are cached by a hash of their AST, so running the same
+program again skips translation and compilation.
+"""
+
+import hashlib
+import json
+from collections import OrderedDict
+
+from .budget import ExecutionBudget
+from .vm import MAX_STEPS, _divide, _wrap
+
+# Number of compiled programs kept by compile_program()
+CACHE_SIZE = 64
+
+# Python operators of the comparisons of the source language
+COMPARISONS = {'==', '!=', '<', '<=', '>', '>='}
+
+_cache = OrderedDict()
+
+
+def _div(left, right):
+    return _wrap(_divide(left, right))
+
+
+def _mod(left, right):
+    return _wrap(left - _divide(left, right) * right)
+
+
+class PythonTranspiler:
+    """
+    Translates an AST into Python source.
+
+    Attributes:
+        lines: Lines of the generated source
+        global_names: Names of the global variables
+        function_names: Names of the functions
+        params: Parameter names of the function being translated
+    """
+
+    def __init__(self):
+        self.lines = []
+        self.global_names = set()
+        self.function_names = set()
+        self.params = set()
+
+    def transpile(self, ast):
+        """
+        Translates a program.
+
+        Args:
+            ast: List of top-level declarations from the parser
+
+        Returns:
+            str: Python source defining g_ globals and f_ functions
+
+        Raises:
+            ValueError: If the program uses a construct that cannot be
+                translated, or calls a function it does not define
+        """
+        nodes = ast if isinstance(ast, list) else [ast]
+        self.global_names = {node['name'] for node in nodes
+                             if node['type'] == 'variable_declaration'}
+        self.function_names = {node.get('name', 'main') for node in nodes
+                               if node['type'] == 'function_declaration'}
+        for name in sorted(self.global_names):
+            self.lines.append(f"g_{name} = 0")
+        for node in nodes:
+            if node['type'] == 'variable_declaration':
+                self.params = set()
+                self._statement(node, 0)
+            elif node['type'] == 'function_declaration':
+                self._function(node)
+        return "\n".join(self.lines) + "\n"
+
+    def _name(self, name):
+        """Returns the Python name of a variable."""
+        if name in self.global_names and name not in self.params:
+            return f"g_{name}"
+        return f"v_{name}"
+
+    def _function(self, node):
+        params = [param['name'] for param in node.get('parameters', [])]
+        self.params = set(params)
+        body = node.get('body', [])
+        locals_ = sorted({self._name(name) for name in _assigned_names(body)} -
+                         {self._name(name) for name in params} -
+                         {f"g_{name}" for name in self.global_names})
+        self.lines.append("")
+        self.lines.append(f"def f_{node.get('name', 'main')}({', '.join('v_' + p for p in params)}):")
+        self.lines.append(f"    global {', '.join(['_steps'] + [f'g_{n}' for n in sorted(self.global_names)])}")
+        self.lines.append("    _steps += 1")
+        self.lines.append("    if _steps > _limit: _check()")
+        if locals_:
+            # Locals read before they are assigned hold 0
+            self.lines.append(f"    {' = '.join(locals_)} = 0")
+        self._block(body, 1)
+        self.lines.append("    return 0")
+
+    def _block(self, statements, depth):
+        if not isinstance(statements, list):
+            statements = [statements]
+        start = len(self.lines)
+        for statement in statements:
+            self._statement(statement, depth)
+        if len(self.lines) == start:
+            self.lines.append("    " * depth + "pass")
+
+    def _statement(self, node, depth):
+        indent = "    " * depth
+        kind = node['type']
+        if kind == 'variable_declaration':
+            # Without initializer a declaration only names the variable
+            if node.get('initializer') is not None:
+                value = self._expression(node['initializer'])
+                self.lines.append(f"{indent}{self._name(node['name'])} = {value}")
+        elif kind == 'expression_statement':
+            expression = node['expression']
+            if expression['type'] == 'assignment_expression':
+                value = self._expression(expression['right'])
+                self.lines.append(f"{indent}{self._name(expression['left']['name'])} = {value}")
+            else:
+                self.lines.append(f"{indent}{self._expression(expression)}")
+        elif kind == 'print_statement':
+            self.lines.append(f"{indent}_print(str({self._expression(node['expression'])}))")
+        elif kind == 'return_statement':
+            value = node.get('expression')
+            self.lines.append(f"{indent}return {self._expression(value) if value else '0'}")
+        elif kind == 'if_statement':
+            self.lines.append(f"{indent}if {self._condition(node['condition'])}:")
+            self._block(node['consequent'], depth + 1)
+            if node.get('alternate'):
+                self.lines.append(f"{indent}else:")
+                self._block(node['alternate'], depth + 1)
+        elif kind == 'while_statement':
+            self.lines.append(f"{indent}while {self._condition(node['condition'])}:")
+            self.lines.append(f"{indent}    _steps += 1")
+            self.lines.append(f"{indent}    if _steps > _limit: _check()")
+            self._block(node['body'], depth + 1)
+        elif kind == 'block_statement':
+            self._block(node.get('body', []), depth)
+        else:
+            raise ValueError(f"Cannot translate {kind}")
+
+    def _condition(self, node):
+        """Returns a Python expression with the truth value of a condition."""
+        kind = node['type']
+        operator = node.get('operator')
+        if kind == 'binary_expression' and operator in COMPARISONS:
+            return f"({self._expression(node['left'])} {operator} {self._expression(node['right'])})"
+        if kind == 'binary_expression' and operator in ('&&', '||'):
+            python_operator = 'and' if operator == '&&' else 'or'
+            return f"({self._condition(node['left'])} {python_operator} {self._condition(node['right'])})"
+        if kind == 'unary_expression' and operator == '!':
+            return f"(not {self._condition(node['operand'])})"
+        return self._expression(node)
+
+    def _expression(self, node):
+        """Returns a Python expression with the value of an expression."""
+        kind = node['type']
+        if kind == 'number_literal':
+            return str(_wrap(int(node['value'])))
+        if kind == 'string_literal':
+            return repr(node['value'].strip('"'))
+        if kind == 'identifier':
+            return self._name(node['name'])
+        if kind == 'assignment_expression':
+            return f"({self._name(node['left']['name'])} := {self._expression(node['right'])})"
+        if kind == 'call_expression':
+            if node['callee'] not in self.function_names:
+                raise ValueError(f"Call to undefined function {node['callee']}")
+            arguments = ', '.join(self._expression(argument) for argument in node['arguments'])
+            return f"f_{node['callee']}({arguments})"
+        if kind == 'unary_expression':
+            operand = self._expression(node['operand'])
+            if node['operator'] == '-':
+                return f"((2147483648 - {operand} & 4294967295) - 2147483648)"
+            if node['operator'] == '!':
+                return f"(0 if {operand} else 1)"
+            return operand
+        if kind == 'binary_expression':
+            operator = node['operator']
+            if operator in COMPARISONS or operator in ('&&', '||'):
+                return f"(1 if {self._condition(node)} else 0)"
+            left = self._expression(node['left'])
+            right = self._expression(node['right'])
+            if operator == '/':
+                return f"_div({left}, {right})"
+            if operator == '%':
+                return f"_mod({left}, {right})"
+            # Wrap-around to 32 bits, inlined
+            return f"(({left} {operator} {right} + 2147483648 & 4294967295) - 2147483648)"
+        raise ValueError(f"Cannot translate {kind}")
+
+
+def _assigned_names(statements):
+    """Returns the names of the variables a function body declares or assigns."""
+    names = set()
+    stack = list(statements) if isinstance(statements, list) else [statements]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(node)
+        elif isinstance(node, dict):
+            if node.get('type') == 'variable_declaration':
+                names.add(node['name'])
+            elif node.get('type') == 'assignment_expression':
+                names.add(node['left']['name'])
+            stack.extend(value for value in node.values() if isinstance(value, (dict, list)))
+    return names
+
+
+class PythonProgram:
+    """
+    A program compiled to a Python code object.
+
+    Attributes:
+        source: Generated Python source
+        code: Code object compiled from the source
+        output: Lines printed by the last run
+        steps: Loop iterations and calls of the last run
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self.code = compile(source, '<program>', 'exec')
+        self.output = []
+        self.steps = 0
+
+    def run(self, entry='main', max_steps=MAX_STEPS, budget=None):
+        """
+        Runs the program in a fresh namespace that only holds the runtime
+        helpers; Python's builtins are not reachable.
+
+        Args:
+            entry: Name of the function to run
+            max_steps: Limit on steps if no budget is given
+            budget: ExecutionBudget limiting steps, time and output
+
+        Returns:
+            list: Lines printed by the program
+
+        Raises:
+            RuntimeError: On division by zero, or when a limit is exceeded
+        """
+        output = []
+        if budget is None:
+            budget = ExecutionBudget(max_steps)
+
+        def check():
+            namespace['_limit'] = budget.check(namespace['_steps'])
+
+        def print_(text):
+            budget.add_output(text)
+            output.append(text)
+
+        namespace = {
+            '__builtins__': {},
+            'str': str,
+            '_print': print_,
+            '_div': _div,
+            '_mod': _mod,
+            '_steps': 0,
+            '_limit': budget.start(),
+            '_check': check
+        }
+        self.output = output
+        try:
+            exec(self.code, namespace)
+            function = namespace.get(f"f_{entry}")
+            if function is None:
+                raise RuntimeError(f"Program has no function {entry}")
+            function()
+        except ZeroDivisionError:
+            raise RuntimeError("Division by zero") from None
+        except RecursionError:
+            raise RuntimeError("Call depth limit exceeded") from None
+        finally:
+            self.steps = budget.steps = namespace['_steps']
+            budget.stop()
+        return output
+
+
+def compile_program(ast):
+    """
+    Translates and compiles a program, or returns it from the cache if
+    the same AST was compiled before.
+
+    Args:
+        ast: List of top-level declarations from the parser
+
+    Returns:
+        PythonProgram: The compiled program
+    """
+    key = hashlib.sha256(json.dumps(ast, sort_keys=True).encode('utf-8')).hexdigest()
+    program = _cache.get(key)
+    if program is None:
+        program = PythonProgram(PythonTranspiler().transpile(ast))
+        _cache[key] = program
+        if len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    else:
+        _cache.move_to_end(key)
+    return program
@@ -0,0 +1,84 @@
+"""
+This module contains execution tracing: a Tracer collects trace messages
+of a running program in a bounded in-memory ring buffer and writes them to
+disk once, when execution has finished.
+
+Executors check the tracer's level before they format a message, so
+tracing that is off costs a comparison and never touches the disk. When
+more messages arrive than the buffer holds, the oldest are dropped; the
+end of a run, where errors happen, is what a trace is read for.
+"""
+
+from collections import deque
+
+# Trace levels: nothing; calls, returns, statements and output; every
+# evaluation step
+TRACE_OFF = 0
+TRACE_BASIC = 1
+TRACE_VERBOSE = 2
+TRACE_LEVELS = {'off': TRACE_OFF, 'basic': TRACE_BASIC, 'verbose': TRACE_VERBOSE}
+
+# Default number of messages kept
+TRACE_CAPACITY = 10000
+
+
+class Tracer:
+    """
+    Collects trace messages in a ring buffer.
+
+    Attributes:
+        level: TRACE_OFF, TRACE_BASIC or TRACE_VERBOSE
+        records: The most recent messages
+        count: Number of messages traced, including dropped ones
+    """
+
+    def __init__(self, level=TRACE_OFF, capacity=TRACE_CAPACITY):
+        self.level = level
+        self.records = deque(maxlen=capacity)
+        self.count = 0
+
+    @classmethod
+    def from_name(cls, name, capacity=TRACE_CAPACITY):
+        """
+        Creates a tracer from a level name ('off', 'basic' or 'verbose').
+
+        Raises:
+            ValueError: If the name is not a trace level
+        """
+        if name not in TRACE_LEVELS:
+            raise ValueError(f"Unknown trace level {name!r}, expected one of {', '.join(TRACE_LEVELS)}")
+        return cls(TRACE_LEVELS[name], capacity)
+
+    def enabled(self, level=TRACE_BASIC):
+        return self.level >= level
+
+    def trace(self, message):
+        """Records a message; callers check enabled() first."""
+        self.records.append(message)
+        self.count += 1
+
+    @property
+    def dropped(self):
+        """Number of messages that no longer fit in the buffer."""
+        return self.count - len(self.records)
+
+    def lines(self):
+        """Returns the buffered messages, oldest first."""
+        if self.dropped:
+            return [f"... {self.dropped} earlier trace messages dropped"] + list(self.records)
+        return list(self.records)
+
+    def flush(self, path, header=None, footer=None):
+        """
+        Writes the trace to a file in one go; does nothing if tracing is off.
+
+        Args:
+            path: File to write
+            header: Lines written before the trace
+            footer: Lines written after the trace
+        """
+        if self.level == TRACE_OFF:
+            return
+        with open(path, 'w') as f:
+            for line in (header or []) + self.lines() + (footer or []):
+                f.write(str(line) + '\n')
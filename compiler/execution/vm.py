@@ -0,0 +1,384 @@
+"""
+This module contains a register-based bytecode virtual machine for TAC
+programs: BytecodeCompiler translates TAC into compact bytecode and
+VirtualMachine executes it.
+
+Every function gets a frame of indexed slots holding its parameters,
+variables, temps and constants; constants are written into the frame
+template once, so instructions only ever name slots. An instruction is a
+tuple (opcode, a, b, c) with a small dense integer opcode:
+    0-15  dest, left, right    binary operations, in BINARY_OPERATIONS order
+    MOVE  dest, source         copies, constants, local LOAD and STORE
+    NEG / NOT  dest, source
+    GET_GLOBAL  dest, global   SET_GLOBAL  global, source
+    JUMP  target               JUMP_IF_FALSE / JUMP_IF_TRUE  cond, target
+    PRINT  value               RETURN  value
+    CALL  dest, function, argument slots
+
+The machine runs one loop over the instructions; calls push the caller's
+state on an explicit stack instead of recursing in Python, so deep
+recursion in the program does not hit Python's recursion limit.
+Arithmetic follows the target machine: 32-bit wrap-around and division
+truncating toward zero (see compiler.ir.evaluate_binary).
+A Tracer (see compiler.execution.tracing) can follow calls, returns,
+output and jumps; it is only consulted in those branches of the loop.
+"""
+
+from ..cfg import build_program
+from ..ir import BINARY_OPS, is_constant
+from .budget import ExecutionBudget
+from .tracing import TRACE_BASIC, TRACE_VERBOSE
+
+# Default limits of VirtualMachine
+MAX_STEPS = 10000000
+MAX_CALL_DEPTH = 10000
+
+
+def _wrap(value):
+    return (value + 0x80000000 & 0xFFFFFFFF) - 0x80000000
+
+
+def _divide(left, right):
+    quotient = abs(left) // abs(right)
+    return -quotient if (left < 0) != (right < 0) else quotient
+
+
+BINARY_OPERATIONS = [
+    # _wrap inlined: these are the most frequent operations
+    ('ADD', lambda left, right: (left + right + 0x80000000 & 0xFFFFFFFF) - 0x80000000),
+    ('SUB', lambda left, right: (left - right + 0x80000000 & 0xFFFFFFFF) - 0x80000000),
+    ('MUL', lambda left, right: (left * right + 0x80000000 & 0xFFFFFFFF) - 0x80000000),
+    ('DIV', lambda left, right: _wrap(_divide(left, right))),
+    ('MOD', lambda left, right: _wrap(left - _divide(left, right) * right)),
+    ('EQ', lambda left, right: 1 if left == right else 0),
+    ('NE', lambda left, right: 1 if left != right else 0),
+    ('LT', lambda left, right: 1 if left < right else 0),
+    ('LE', lambda left, right: 1 if left <= right else 0),
+    ('GT', lambda left, right: 1 if left > right else 0),
+    ('GE', lambda left, right: 1 if left >= right else 0),
+    ('AND', lambda left, right: 1 if left and right else 0),
+    ('OR', lambda left, right: 1 if left or right else 0),
+    ('SHL', lambda left, right: _wrap(left << (right & 31))),
+    ('SAR', lambda left, right: left >> (right & 31)),
+    ('BITAND', lambda left, right: left & right)
+]
+BINARY_OPCODES = {name: opcode for opcode, (name, _) in enumerate(BINARY_OPERATIONS)}
+BINARY_FUNCTIONS = [function for _, function in BINARY_OPERATIONS]
+
+# The other opcodes follow the binary operations
+MOVE = len(BINARY_OPERATIONS)
+NEG = MOVE + 1
+NOT = MOVE + 2
+GET_GLOBAL = MOVE + 3
+SET_GLOBAL = MOVE + 4
+JUMP = MOVE + 5
+JUMP_IF_FALSE = MOVE + 6
+JUMP_IF_TRUE = MOVE + 7
+PRINT = MOVE + 8
+CALL = MOVE + 9
+RETURN = MOVE + 10
+
+
+class BytecodeFunction:
+    """
+    A compiled function.
+
+    Attributes:
+        name: Function name
+        code: List of (opcode, a, b, c) instructions
+        frame: Initial slot values: 0 for parameters, variables and temps,
+            the values of constants
+        param_count: Number of parameters, which occupy the first slots
+        slot_names: Names of the slots, for debugging
+    """
+
+    def __init__(self, name, code, frame, param_count, slot_names):
+        self.name = name
+        self.code = code
+        self.frame = frame
+        self.param_count = param_count
+        self.slot_names = slot_names
+
+
+class BytecodeProgram:
+    """
+    A compiled program.
+
+    Attributes:
+        functions: BytecodeFunctions; CALL instructions index this list
+        function_index: Maps function names to their index in functions
+        init: BytecodeFunction running the global initializers
+        global_names: Names of the global variables, in slot order
+    """
+
+    def __init__(self, functions, init, global_names):
+        self.functions = functions
+        self.function_index = {function.name: i for i, function in enumerate(functions)}
+        self.init = init
+        self.global_names = global_names
+
+
+class BytecodeCompiler:
+    """
+    Translates a TAC program into bytecode.
+
+    Attributes:
+        global_index: Maps global variable names to their slot
+        function_index: Maps function names to their index
+    """
+
+    def __init__(self):
+        self.global_index = {}
+        self.function_index = {}
+
+    def compile(self, intermediate_code):
+        """
+        Compiles a TAC program.
+
+        Args:
+            intermediate_code: List of TAC instructions (optimized or not)
+
+        Returns:
+            BytecodeProgram: The compiled program
+
+        Raises:
+            ValueError: If the program calls a function it does not define
+        """
+        program = build_program(intermediate_code)
+        self.global_index = {name: i for i, name in enumerate(sorted(program.global_names))}
+        self.function_index = {function.name: i for i, function in enumerate(program.functions)}
+        functions = [self._compile_function(function.name, function.params,
+                                            function.linearize()[len(function.header):])
+                     for function in program.functions]
+        init = self._compile_function('<globals>', [], list(program.prologue) + [None])
+        return BytecodeProgram(functions, init, sorted(program.global_names))
+
+    def _compile_function(self, name, params, instructions):
+        """
+        Compiles one function body.
+
+        Args:
+            name: Function name
+            params: Parameter names
+            instructions: Body instructions; None stands for a final RETURN
+        """
+        slots = {}
+        frame = []
+        slot_names = []
+
+        def slot(key, value=0):
+            if key not in slots:
+                slots[key] = len(frame)
+                frame.append(value)
+                slot_names.append(key[1])
+            return slots[key]
+
+        def operand(text):
+            # Constants, temps and variables live in separate namespaces
+            if not is_constant(text):
+                return slot(('value', text))
+            if text.startswith('"'):
+                return slot(('constant', text), text.strip('"'))
+            return slot(('constant', text), _wrap(int(text)))
+
+        for param in params:
+            slot(('variable', param))
+
+        code = []
+        labels = {}
+        pending_args = []
+        for instr in instructions:
+            if instr is None:
+                code.append((RETURN, operand('0'), 0, 0))
+                continue
+            op = instr.op
+            args = instr.args
+            if op == 'LABEL':
+                labels[args[0]] = len(code)
+            elif op in BINARY_OPS:
+                code.append((BINARY_OPCODES[op], operand(instr.dest),
+                             operand(args[0]), operand(args[1])))
+            elif op in ('CONST', 'COPY'):
+                code.append((MOVE, operand(instr.dest), operand(args[0]), 0))
+            elif op in ('NEG', 'NOT'):
+                code.append((NEG if op == 'NEG' else NOT, operand(instr.dest), operand(args[0]), 0))
+            elif op == 'LOAD':
+                var = args[0]
+                if var in self.global_index and var not in params:
+                    code.append((GET_GLOBAL, operand(instr.dest), self.global_index[var], 0))
+                else:
+                    code.append((MOVE, operand(instr.dest), slot(('variable', var)), 0))
+            elif op == 'STORE':
+                var = args[1]
+                if var in self.global_index and var not in params:
+                    code.append((SET_GLOBAL, self.global_index[var], operand(args[0]), 0))
+                else:
+                    code.append((MOVE, slot(('variable', var)), operand(args[0]), 0))
+            elif op == 'DECLARE':
+                if args[0] not in self.global_index:
+                    slot(('variable', args[0]))
+            elif op == 'GOTO':
+                code.append((JUMP, args[0], 0, 0))
+            elif op in ('IF_FALSE', 'IF_TRUE'):
+                opcode = JUMP_IF_FALSE if op == 'IF_FALSE' else JUMP_IF_TRUE
+                code.append((opcode, operand(args[0]), args[1], 0))
+            elif op == 'PRINT':
+                code.append((PRINT, operand(args[0]), 0, 0))
+            elif op == 'ARG':
+                pending_args.append(operand(args[0]))
+            elif op == 'CALL':
+                if args[0] not in self.function_index:
+                    raise ValueError(f"Call to undefined function {args[0]}")
+                count = int(args[1])
+                call_args = tuple(pending_args[len(pending_args) - count:])
+                del pending_args[len(pending_args) - count:]
+                dest = operand(instr.dest or '<result>')
+                code.append((CALL, dest, self.function_index[args[0]], call_args))
+            elif op == 'RETURN':
+                code.append((RETURN, operand(args[0] if args else '0'), 0, 0))
+
+        # Jump targets become instruction indices
+        for i, (opcode, a, b, c) in enumerate(code):
+            if opcode == JUMP:
+                code[i] = (opcode, labels[a], b, c)
+            elif opcode in (JUMP_IF_FALSE, JUMP_IF_TRUE):
+                code[i] = (opcode, a, labels[b], c)
+        return BytecodeFunction(name, code, frame, len(params), slot_names)
+
+
+class VirtualMachine:
+    """
+    Executes a BytecodeProgram.
+
+    Attributes:
+        program: The BytecodeProgram
+        globals: Values of the global variables
+        output: Lines printed by the program
+        steps: Number of instructions executed so far
+        budget: ExecutionBudget limiting steps, time and output; steps are
+            checked at every jump and call, so straight-line code may
+            overshoot the limit by a few instructions
+        max_call_depth: Limit on nested calls
+        exit_code: Return value of main once it has returned
+        tracer: Tracer receiving calls, returns and output at TRACE_BASIC,
+            and taken jumps at TRACE_VERBOSE, or None
+    """
+
+    def __init__(self, program, max_steps=MAX_STEPS, max_call_depth=MAX_CALL_DEPTH, tracer=None,
+                 budget=None):
+        self.program = program
+        self.tracer = tracer
+        self.globals = [0] * len(program.global_names)
+        self.output = []
+        self.steps = 0
+        self.budget = budget if budget is not None else ExecutionBudget(max_steps)
+        self.max_call_depth = max_call_depth
+        self.exit_code = None
+
+    def run(self, entry='main'):
+        """
+        Runs the global initializers, then the entry function.
+
+        Returns:
+            list: Lines printed by the program
+
+        Raises:
+            RuntimeError: On division by zero, or when a limit is exceeded
+        """
+        if entry not in self.program.function_index:
+            raise RuntimeError(f"Program has no function {entry}")
+        self.budget.start()
+        try:
+            self._execute(self.program.init)
+            self.exit_code = self._execute(self.program.functions[self.program.function_index[entry]])
+        finally:
+            self.budget.stop()
+        return self.output
+
+    def _execute(self, function):
+        """Runs a function without arguments to completion; returns its value."""
+        code = function.code
+        regs = list(function.frame)
+        stack = []
+        pc = mark = 0
+        budget = self.budget
+        steps = self.steps
+        # One comparison per jump or call; the budget reads the clock and
+        # checks max_steps whenever steps pass limit
+        limit = budget.check(steps)
+        output_size = budget.output_size
+        max_output = budget.output_limit()
+        globals_ = self.globals
+        output = self.output
+        functions = self.program.functions
+        binary = BINARY_FUNCTIONS
+        name = function.name
+        # Tracing is only checked on calls, returns, prints and jumps
+        tracer = self.tracer
+        trace = tracer.trace if tracer else None
+        basic = tracer is not None and tracer.enabled(TRACE_BASIC)
+        verbose = tracer is not None and tracer.enabled(TRACE_VERBOSE)
+        try:
+            while True:
+                op, a, b, c = code[pc]
+                pc += 1
+                if op < MOVE:
+                    regs[a] = binary[op](regs[b], regs[c])
+                elif op == MOVE:
+                    regs[a] = regs[b]
+                elif op == JUMP_IF_FALSE or op == JUMP_IF_TRUE:
+                    if (not regs[a]) == (op == JUMP_IF_FALSE):
+                        # Straight-line instructions are counted when control leaves them
+                        steps += pc - mark
+                        pc = mark = b
+                        if verbose: trace(f"{name}: jump to {pc}")
+                        if steps > limit:
+                            limit = budget.check(steps)
+                elif op == JUMP:
+                    steps += pc - mark
+                    pc = mark = a
+                    if verbose: trace(f"{name}: jump to {pc}")
+                    if steps > limit:
+                        limit = budget.check(steps)
+                elif op == GET_GLOBAL:
+                    regs[a] = globals_[b]
+                elif op == SET_GLOBAL:
+                    globals_[a] = regs[b]
+                elif op == CALL:
+                    if len(stack) >= self.max_call_depth:
+                        raise RuntimeError(f"Call depth limit of {self.max_call_depth} exceeded")
+                    callee = functions[b]
+                    frame = list(callee.frame)
+                    for i, arg in enumerate(c):
+                        frame[i] = regs[arg]
+                    if basic: trace(f"{name}: call {callee.name}({', '.join(str(regs[arg]) for arg in c)})")
+                    stack.append((code, pc, regs, a, name))
+                    steps += pc - mark
+                    code, regs, pc, mark, name = callee.code, frame, 0, 0, callee.name
+                    if steps > limit:
+                        limit = budget.check(steps)
+                elif op == RETURN:
+                    value = regs[a]
+                    steps += pc - mark
+                    if basic: trace(f"{name}: return {value}")
+                    if not stack:
+                        return value
+                    code, pc, regs, dest, name = stack.pop()
+                    regs[dest] = value
+                    mark = pc
+                elif op == PRINT:
+                    text = str(regs[a])
+                    output_size += len(text) + 1
+                    if output_size > max_output:
+                        raise RuntimeError(f"Output limit of {budget.max_output} characters exceeded")
+                    output.append(text)
+                    if basic: trace(f"{name}: print {regs[a]}")
+                elif op == NEG:
+                    regs[a] = _wrap(-regs[b])
+                elif op == NOT:
+                    regs[a] = 0 if regs[b] else 1
+        except ZeroDivisionError:
+            raise RuntimeError("Division by zero") from None
+        finally:
+            self.steps = budget.steps = steps
+            budget.output_size = output_size
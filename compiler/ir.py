@@ -0,0 +1,315 @@
+"""
+This module gives the three-address code (TAC) produced by
+IntermediateCodeGenerator a structured form that optimization passes can
+work on. Every TAC line is parsed into an Instruction and can be formatted
+back into exactly the same text, so passes can be chained with the rest of
+the pipeline, which still exchanges TAC as a list of strings.
+
+Instruction forms:
+    FUNCTION name:          PARAM name          DECLARE name
+    STORE value, var        dest = LOAD var     LABEL L0
+    GOTO L0                 IF_FALSE cond GOTO L0
+    IF_TRUE cond GOTO L0    PRINT value         RETURN [value]
+    dest = constant         dest = source       (CONST / COPY)
+    dest = a OP b           dest = NEG a        dest = NOT a
+    ARG value               dest = CALL name, n
+    dest = PHI [v0, L0], [v1, L1]               (SSA form only)
+
+Operands of arithmetic instructions may be integer immediates
+(t2 = t1 SHL 3) once optimization passes have folded constants into them.
+
+A call passes its n arguments with the n ARG instructions immediately
+before it, in parameter order.
+"""
+
+import re
+
+BINARY_OPS = {
+    'ADD', 'SUB', 'MUL', 'DIV', 'MOD',
+    'EQ', 'NE', 'LT', 'LE', 'GT', 'GE',
+    'AND', 'OR',
+    'SHL', 'SAR', 'BITAND'
+}
+UNARY_OPS = {'NEG', 'NOT'}
+COMPARISON_OPS = {'EQ', 'NE', 'LT', 'LE', 'GT', 'GE'}
+
+# Instructions that end a basic block
+CONDITIONAL_BRANCHES = {'IF_FALSE', 'IF_TRUE'}
+JUMPS = {'GOTO'} | CONDITIONAL_BRANCHES
+TERMINATORS = JUMPS | {'RETURN'}
+
+# Instructions whose only effect is defining their destination
+PURE_OPS = BINARY_OPS | UNARY_OPS | {'CONST', 'COPY', 'PHI'}
+
+TEMP_PATTERN = re.compile(r't\d+$')
+INT_PATTERN = re.compile(r'-?\d+$')
+
+
+def is_temp(operand):
+    """Returns True if the operand names a compiler temporary (t0, t1, ...)."""
+    return bool(TEMP_PATTERN.match(operand))
+
+
+def is_constant(operand):
+    """Returns True if the operand is a numeric or string literal."""
+    return operand[:1].isdigit() or operand[:1] == '"' or (
+        operand[:1] == '-' and operand[1:2].isdigit())
+
+
+def is_int_constant(operand):
+    """Returns True if the operand is an integer literal."""
+    return bool(INT_PATTERN.match(operand))
+
+
+def wrap_int32(value):
+    """Wraps an integer to the signed 32-bit range of the target machine."""
+    return (value + 0x80000000) % 0x100000000 - 0x80000000
+
+
+def evaluate_binary(op, left, right):
+    """
+    Evaluates a binary TAC operation on integer operands with C semantics:
+    32-bit wrap-around, division truncating toward zero, comparisons and
+    logical operators yielding 0 or 1.
+
+    Returns:
+        int: The result, or None if the operation would trap (division by zero)
+    """
+    if op in ('DIV', 'MOD'):
+        if right == 0:
+            return None
+        quotient = abs(left) // abs(right)
+        if (left < 0) != (right < 0):
+            quotient = -quotient
+        return wrap_int32(quotient if op == 'DIV' else left - quotient * right)
+    if op == 'ADD':
+        return wrap_int32(left + right)
+    if op == 'SUB':
+        return wrap_int32(left - right)
+    if op == 'MUL':
+        return wrap_int32(left * right)
+    if op == 'SHL':
+        return wrap_int32(left << (right & 31))
+    if op == 'SAR':
+        return left >> (right & 31)
+    if op == 'BITAND':
+        return left & right
+    if op == 'EQ':
+        return int(left == right)
+    if op == 'NE':
+        return int(left != right)
+    if op == 'LT':
+        return int(left < right)
+    if op == 'LE':
+        return int(left <= right)
+    if op == 'GT':
+        return int(left > right)
+    if op == 'GE':
+        return int(left >= right)
+    if op == 'AND':
+        return int(bool(left) and bool(right))
+    if op == 'OR':
+        return int(bool(left) or bool(right))
+    raise ValueError(f"Unknown binary operation {op}")
+
+
+def is_value(operand):
+    """Returns True if the operand is a named value (temp or SSA name)."""
+    return not is_constant(operand)
+
+
+class Instruction:
+    """
+    A single parsed TAC instruction.
+
+    Attributes:
+        op: Opcode ('ADD', 'LOAD', 'STORE', 'CONST', 'COPY', 'PHI', ...)
+        dest: Name defined by the instruction, or None
+        args: Operand list; its meaning depends on the opcode (for CALL
+            the function name and the argument count)
+        labels: Predecessor labels of a PHI, parallel to args
+    """
+
+    __slots__ = ('op', 'dest', 'args', 'labels')
+
+    def __init__(self, op, dest=None, args=None, labels=None):
+        self.op = op
+        self.dest = dest
+        self.args = list(args) if args else []
+        self.labels = list(labels) if labels else []
+
+    def __str__(self):
+        return format_instruction(self)
+
+    def __repr__(self):
+        return f"Instruction({str(self)!r})"
+
+    def copy(self):
+        return Instruction(self.op, self.dest, self.args, self.labels)
+
+    @property
+    def target(self):
+        """Jump target of a GOTO or conditional branch, or the name of a LABEL."""
+        if self.op in ('GOTO', 'LABEL'):
+            return self.args[0]
+        if self.op in CONDITIONAL_BRANCHES:
+            return self.args[1]
+        return None
+
+    @target.setter
+    def target(self, label):
+        if self.op in ('GOTO', 'LABEL'):
+            self.args[0] = label
+        elif self.op in CONDITIONAL_BRANCHES:
+            self.args[1] = label
+
+    def is_terminator(self):
+        return self.op in TERMINATORS
+
+    def is_pure(self):
+        """True if removing the instruction is safe once dest is unused."""
+        if self.op in ('DIV', 'MOD'):
+            # Division by a possibly-zero value may trap
+            divisor = self.args[1]
+            return is_int_constant(divisor) and int(divisor) != 0
+        return self.op in PURE_OPS
+
+    def uses(self):
+        """
+        Returns the value operands (temps and SSA names) read by this instruction.
+        Memory variables named by LOAD/STORE are not included; see
+        loaded_var() and stored_var().
+        """
+        op = self.op
+        if op in ('LOAD', 'CONST', 'LABEL', 'GOTO', 'FUNCTION', 'PARAM', 'DECLARE', 'CALL'):
+            return []
+        if op == 'STORE':
+            args = self.args[:1]
+        elif op in CONDITIONAL_BRANCHES:
+            args = self.args[:1]
+        else:
+            args = self.args
+        return [a for a in args if not is_constant(a)]
+
+    def replace_uses(self, mapping):
+        """Renames value operands according to mapping (old name -> new operand)."""
+        op = self.op
+        if op in ('LOAD', 'CONST', 'LABEL', 'GOTO', 'FUNCTION', 'PARAM', 'DECLARE', 'CALL'):
+            return
+        count = 1 if op == 'STORE' or op in CONDITIONAL_BRANCHES else len(self.args)
+        for i in range(count):
+            arg = self.args[i]
+            if arg in mapping:
+                self.args[i] = mapping[arg]
+
+    def loaded_var(self):
+        return self.args[0] if self.op == 'LOAD' else None
+
+    def stored_var(self):
+        if self.op == 'STORE':
+            return self.args[1]
+        if self.op in ('DECLARE', 'PARAM'):
+            return self.args[0]
+        return None
+
+
+def parse_instruction(line):
+    """
+    Parses one line of TAC text into an Instruction.
+
+    Args:
+        line: TAC instruction text as produced by IntermediateCodeGenerator
+
+    Returns:
+        Instruction: The parsed instruction
+
+    Raises:
+        ValueError: If the line is not valid TAC
+    """
+    line = line.strip()
+    if ' = ' in line and not line.startswith(('STORE', 'PRINT', 'RETURN')):
+        dest, rhs = line.split(' = ', 1)
+        if rhs.startswith('"'):
+            return Instruction('CONST', dest, [rhs])
+        parts = rhs.split()
+        if len(parts) == 1:
+            op = 'CONST' if is_constant(parts[0]) else 'COPY'
+            return Instruction(op, dest, parts)
+        if parts[0] == 'LOAD':
+            return Instruction('LOAD', dest, parts[1:2])
+        if parts[0] == 'CALL' and len(parts) == 3:
+            return Instruction('CALL', dest, [parts[1].rstrip(','), parts[2]])
+        if parts[0] == 'PHI':
+            values, labels = [], []
+            for value, label in re.findall(r'\[([^,\]]+), ([^\]]+)\]', rhs):
+                values.append(value)
+                labels.append(label)
+            return Instruction('PHI', dest, values, labels)
+        if parts[0] in UNARY_OPS and len(parts) == 2:
+            return Instruction(parts[0], dest, parts[1:2])
+        if len(parts) == 3 and parts[1] in BINARY_OPS:
+            return Instruction(parts[1], dest, [parts[0], parts[2]])
+        raise ValueError(f"Unrecognized TAC instruction: {line}")
+
+    parts = line.split()
+    op = parts[0]
+    if op == 'FUNCTION':
+        return Instruction('FUNCTION', args=[parts[1].rstrip(':')])
+    if op in ('PARAM', 'DECLARE', 'LABEL', 'GOTO', 'ARG'):
+        return Instruction(op, args=[parts[1].rstrip(':')])
+    if op == 'STORE':
+        value, var = line[len('STORE '):].rsplit(', ', 1)
+        return Instruction('STORE', args=[value, var])
+    if op in CONDITIONAL_BRANCHES:
+        return Instruction(op, args=[parts[1].rstrip(','), parts[-1]])
+    if op == 'PRINT':
+        return Instruction('PRINT', args=[line[len('PRINT '):]])
+    if op == 'RETURN':
+        return Instruction('RETURN', args=[line[len('RETURN '):]] if len(parts) > 1 else [])
+    raise ValueError(f"Unrecognized TAC instruction: {line}")
+
+
+def format_instruction(instr):
+    """
+    Formats an Instruction back into TAC text.
+
+    Args:
+        instr: Instruction to format
+
+    Returns:
+        str: TAC text in the format written by IntermediateCodeGenerator
+    """
+    op = instr.op
+    args = instr.args
+    if op in ('CONST', 'COPY'):
+        return f"{instr.dest} = {args[0]}"
+    if op == 'LOAD':
+        return f"{instr.dest} = LOAD {args[0]}"
+    if op == 'CALL':
+        return f"{instr.dest} = CALL {args[0]}, {args[1]}"
+    if op in BINARY_OPS:
+        return f"{instr.dest} = {args[0]} {op} {args[1]}"
+    if op in UNARY_OPS:
+        return f"{instr.dest} = {op} {args[0]}"
+    if op == 'PHI':
+        pairs = ', '.join(f"[{v}, {l}]" for v, l in zip(args, instr.labels))
+        return f"{instr.dest} = PHI {pairs}"
+    if op == 'FUNCTION':
+        return f"FUNCTION {args[0]}:"
+    if op == 'STORE':
+        return f"STORE {args[0]}, {args[1]}"
+    if op in CONDITIONAL_BRANCHES:
+        return f"{op} {args[0]} GOTO {args[1]}"
+    if op == 'RETURN':
+        return f"RETURN {args[0]}" if args else "RETURN"
+    return f"{op} {args[0]}"
+
+
+def parse_program(lines):
+    """Parses a list of TAC strings into a list of Instructions."""
+    return [parse_instruction(line) for line in lines if line.strip()]
+
+
+def format_program(instructions):
+    """Formats a list of Instructions into a list of TAC strings."""
+    return [format_instruction(instr) for instr in instructions]
@@ -50,7 +50,7 @@ class Lexer:
         ('STRING', r'"[^"\\]*(?:\\.[^"\\]*)*"'),  # String literals with escape sequence support
         ('IDENTIFIER', r'[a-zA-Z_][a-zA-Z0-9_]*'),  # Variable and function names
         ('NUMBER', r'\d+(\.\d+)?'),  # Integer and floating-point numbers
-        ('OPERATOR', r'==|!=|<=|>=|[+\-*/%=<>!]'),  # Arithmetic and comparison operators
+        ('OPERATOR', r'==|!=|<=|>=|&&|\|\||[+\-*/%=<>!]'),  # Arithmetic, comparison and logical operators
         ('SEPARATOR', r'[(),;{}]'),  # Punctuation and grouping symbols
         ('UNKNOWN', r'.')  # Catch-all for invalid characters
     ]
@@ -0,0 +1,85 @@
+"""
+This module implements live variable analysis over a function's CFG.
+A value is live at a point if some path from that point reads it before
+redefining it. Liveness drives out-of-SSA copy coalescing and dead code
+elimination.
+
+PHI operands are treated as uses at the end of the corresponding
+predecessor rather than at the top of the PHI's own block.
+
+Both analyses are solved as bitset problems by compiler.dataflow, and the
+functions here return the bitset solutions. Passes walk a block backwards
+from its live-out bitset with LiveScan; sets of names (DataflowResult.sets)
+are only needed to print a solution.
+"""
+
+from .dataflow import LiveValues, LiveVariables, solve
+
+
+class LiveScan:
+    """
+    Liveness inside one block, walked backwards from the block's exit.
+
+    The names the walk defines or uses are tracked in a dict; every other
+    name is looked up in the live-out bitset, which is never converted into
+    a set.
+
+    Attributes:
+        bits: Live-out bitset of the block
+        ids: Maps names to their bit
+        local: Maps names defined or used so far in the walk to whether
+            they are live
+    """
+
+    def __init__(self, result, label):
+        self.bits = result.block_out[label]
+        self.ids = result.index.ids
+        self.local = {}
+
+    def __contains__(self, name):
+        live = self.local.get(name)
+        if live is not None:
+            return live
+        bit = self.ids.get(name)
+        return bit is not None and (self.bits >> bit) & 1 == 1
+
+    def add(self, name):
+        self.local[name] = True
+
+    def update(self, names):
+        for name in names:
+            self.local[name] = True
+
+    def discard(self, name):
+        self.local[name] = False
+
+
+def compute_liveness(func):
+    """
+    Solves backward liveness for every block of a function.
+
+    Args:
+        func: Function whose edges are up to date
+
+    Returns:
+        DataflowResult: Bitsets of live value names at the entry and exit
+        of every block
+    """
+    return solve(LiveValues(func))
+
+
+def compute_variable_liveness(func, live_at_exit=(), call_uses=()):
+    """
+    Solves backward liveness for memory variables: a variable is live when
+    a LOAD of it may execute before the next STORE or DECLARE.
+
+    Args:
+        func: Function whose edges are up to date
+        live_at_exit: Variables still observable after the function returns
+        call_uses: Variables a CALL may read (the globals)
+
+    Returns:
+        DataflowResult: Bitsets of live variable names at the entry and
+        exit of every block
+    """
+    return solve(LiveVariables(func, live_at_exit, call_uses))
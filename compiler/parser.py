@@ -16,7 +16,7 @@ class Parser:
     Implements operator precedence and handles nested structures.
     
     The parser follows this precedence hierarchy (highest to lowest):
-    1. Primary expressions (literals, identifiers, parenthesized)
+    1. Primary expressions (literals, identifiers, calls, parenthesized)
     2. Unary operators (!, -)
     3. Multiplicative operators (*, /, %)
     4. Additive operators (+, -)
@@ -506,6 +506,8 @@ class Parser:
             }
         elif token.type == 'IDENTIFIER':
             self.advance()
+            if self.current_token and self.current_token.value == '(':
+                return self.call_expression(token)
             return {
                 'type': 'identifier',
                 'name': token.value
@@ -516,4 +518,34 @@ class Parser:
             self.eat('SEPARATOR', ')')
             return expr
         else:
-            raise SyntaxError(f"Unexpected token in primary expression: {token}")
\ No newline at end of file
+            raise SyntaxError(f"Unexpected token in primary expression: {token}")
+    
+    def call_expression(self, name_token):
+        """
+        Parse the argument list of a function call.
+        Format: identifier ( [expression {, expression}] )
+        
+        Args:
+            name_token: Token containing the called function's name
+            
+        Returns:
+            dict: AST node for the call expression
+            
+        Raises:
+            SyntaxError: If an argument is missing or arguments are not
+                separated by commas
+        """
+        self.eat('SEPARATOR', '(')
+        arguments = []
+        if self.current_token and self.current_token.value != ')':
+            arguments.append(self.expression())
+            # Every further argument follows a comma; anything else must be ')'
+            while self.current_token and self.current_token.value == ',':
+                self.eat('SEPARATOR', ',')
+                arguments.append(self.expression())
+        self.eat('SEPARATOR', ')')
+        return {
+            'type': 'call_expression',
+            'callee': name_token.value,
+            'arguments': arguments
+        }
@@ -0,0 +1,32 @@
+"""
+Optimization passes over the three-address code (TAC) intermediate
+representation. Each pass works on the CFGs built by compiler.cfg.
+"""
+
+from .analysis import AnalysisManager
+from .base import FunctionPass
+from .branch_simplification import BlockLayout, BranchSimplification
+from .dead_code import DeadCodeElimination
+from .inline import FunctionInlining
+from .licm import LoopInvariantCodeMotion
+from .loop_unroll import LoopUnrolling
+from .manager import OPTIMIZATION_LEVELS, PassManager, build_pipeline
+from .strength_reduction import AlgebraicSimplification, InductionVariableStrengthReduction
+from .temp_renumbering import TempRenumbering
+
+__all__ = [
+    'AnalysisManager',
+    'FunctionPass',
+    'PassManager',
+    'OPTIMIZATION_LEVELS',
+    'build_pipeline',
+    'BlockLayout',
+    'BranchSimplification',
+    'DeadCodeElimination',
+    'FunctionInlining',
+    'LoopInvariantCodeMotion',
+    'LoopUnrolling',
+    'AlgebraicSimplification',
+    'InductionVariableStrengthReduction',
+    'TempRenumbering'
+]
@@ -0,0 +1,94 @@
+"""
+This module caches the analyses that optimization passes share.
+
+Dominators, natural loops and liveness are recomputed from scratch by
+every pass that needs them unless something keeps them around. The
+AnalysisManager stores each result per function until a pass reports
+that it changed that function; passes that leave the CFG alone declare
+which analyses they preserve so those survive.
+
+Liveness is cached as the bitset solution of compiler.dataflow (see
+compiler.liveness), not as sets of names.
+"""
+
+from ..cfg import compute_dominators, find_natural_loops
+from ..liveness import compute_liveness
+
+
+def _dominators(manager, func):
+    return compute_dominators(func)
+
+
+def _loops(manager, func):
+    return find_natural_loops(func, manager.get('dominators', func))
+
+
+def _liveness(manager, func):
+    return compute_liveness(func)
+
+
+# Analysis name -> function(manager, func) computing it
+ANALYSES = {
+    'dominators': _dominators,
+    'loops': _loops,
+    'liveness': _liveness
+}
+
+# Analyses that only depend on the shape of the CFG, not on instructions
+CFG_ANALYSES = ('dominators', 'loops')
+
+
+class AnalysisManager:
+    """
+    Per-function cache of analysis results.
+
+    Attributes:
+        hits: Maps analysis names to the number of requests served from the cache
+        misses: Maps analysis names to the number of times they were computed
+    """
+
+    def __init__(self):
+        self._cache = {}
+        self.hits = {name: 0 for name in ANALYSES}
+        self.misses = {name: 0 for name in ANALYSES}
+
+    def get(self, name, func):
+        """
+        Returns the result of an analysis, computing it on a cache miss.
+
+        Args:
+            name: Analysis name (a key of ANALYSES)
+            func: Function to analyze
+
+        Returns:
+            The analysis result; callers must not modify it
+
+        Raises:
+            KeyError: If the analysis is unknown
+        """
+        results = self._cache.setdefault(func, {})
+        if name in results:
+            self.hits[name] += 1
+            return results[name]
+        self.misses[name] += 1
+        result = ANALYSES[name](self, func)
+        results[name] = result
+        return result
+
+    def invalidate(self, func, preserved=()):
+        """
+        Drops the cached results for a function, except preserved ones.
+
+        Args:
+            func: Function that changed
+            preserved: Names of analyses that are still valid
+        """
+        results = self._cache.get(func)
+        if results:
+            for name in list(results):
+                if name not in preserved:
+                    del results[name]
+
+    def clear(self):
+        """Drops every cached result."""
+        self._cache.clear()
@@ -0,0 +1,92 @@
+"""
+This module defines the interface shared by the IR optimization passes.
+"""
+
+from ..cfg import build_program
+from .analysis import AnalysisManager
+
+
+class FunctionPass:
+    """
+    Base class for optimization passes that transform one function at a time.
+
+    Subclasses set `name` and implement run_on_function(). Analyses should
+    be requested through analysis(), which serves them from the pass
+    manager's cache, and a pass that changes a function in the middle of
+    run_on_function must call invalidate() before requesting them again.
+
+    Attributes:
+        name: Short identifier of the pass
+        preserves: Analyses still valid after the pass changed a function
+        analyses: AnalysisManager shared with the other passes, set by the
+            PassManager; None when the pass runs on its own
+    """
+
+    name = None
+    preserves = ()
+    analyses = None
+
+    def analysis(self, name, func):
+        """
+        Returns the result of an analysis of func (see analysis.ANALYSES).
+
+        Args:
+            name: Analysis name, e.g. 'dominators', 'loops' or 'liveness'
+            func: Function to analyze
+
+        Returns:
+            The cached or freshly computed result
+        """
+        if self.analyses is None:
+            return AnalysisManager().get(name, func)
+        return self.analyses.get(name, func)
+
+    def invalidate(self, func):
+        """Drops all cached analyses of a function the pass has just changed."""
+        if self.analyses is not None:
+            self.analyses.invalidate(func)
+
+    def run(self, program):
+        """
+        Runs the pass over every function of a program.
+
+        Args:
+            program: Program to transform in place
+
+        Returns:
+            bool: True if any function changed
+        """
+        changed = False
+        for func in program.functions:
+            if self.run_on_function(func, program):
+                changed = True
+                if self.analyses is not None:
+                    self.analyses.invalidate(func, self.preserves)
+        return changed
+
+    def run_on_function(self, func, program):
+        """
+        Transforms a single function in place.
+
+        Args:
+            func: Function CFG to transform
+            program: Enclosing program (for global names)
+
+        Returns:
+            bool: True if the function changed
+        """
+        raise NotImplementedError
+
+    def apply(self, code):
+        """
+        Convenience wrapper that runs the pass on TAC strings.
+
+        Args:
+            code: List of TAC strings
+
+        Returns:
+            list: Transformed TAC strings
+        """
+        program = build_program(code)
+        self.run(program)
+        return program.to_tac()
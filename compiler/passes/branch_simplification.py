@@ -0,0 +1,240 @@
+"""
+This module cleans up the control flow produced by the if/while lowering
+in IntermediateCodeGenerator and chooses a block order for it.
+
+BranchSimplification:
+- Folds IF_FALSE/IF_TRUE on compile-time constants into jumps
+- Removes conditional branches whose target is also the fallthrough
+- Threads jumps through blocks that contain nothing but a jump
+- Drops GOTOs to the next block and blocks that become unreachable
+- Merges a block into its predecessor when it is the only successor
+  and has no other predecessors
+
+BlockLayout orders blocks so that the likely successor (staying inside
+the current loop) is the fallthrough, and rotates while loops so that
+their test sits after the body: each iteration then ends in a single
+conditional jump back to the body instead of a GOTO to the test plus a
+not-taken IF_FALSE.
+"""
+
+from ..cfg import insert_preheader, remove_unreachable_blocks
+from ..ir import CONDITIONAL_BRANCHES, is_int_constant
+from .base import FunctionPass
+from .strength_reduction import constant_temps, definition_counts
+
+
+class BranchSimplification(FunctionPass):
+    """
+    Simplifies branches and merges straight-line blocks until nothing changes.
+
+    Unconditional GOTOs are turned into block fallthroughs, so a GOTO is
+    only emitted again when its target does not end up next in the layout.
+    """
+
+    name = 'simplify-cfg'
+
+    def run_on_function(self, func, program):
+        if any(block.phis() for block in func.blocks):
+            return False
+        changed = False
+        while self._simplify(func):
+            changed = True
+        return changed
+
+    def _simplify(self, func):
+        changed = self._fold_branches(func)
+        func.compute_edges()
+        if self._thread_jumps(func):
+            changed = True
+            func.compute_edges()
+        if remove_unreachable_blocks(func):
+            changed = True
+        if self._merge_blocks(func):
+            changed = True
+        return changed
+
+    def _fold_branches(self, func):
+        constants = constant_temps(func, definition_counts(func))
+        changed = False
+        for block in func.blocks:
+            term = block.terminator
+            if term is None or term.op == 'RETURN':
+                continue
+            if term.op == 'GOTO':
+                block.instructions.pop()
+                block.fallthrough = term.target
+                changed = True
+                continue
+            if term.target == block.fallthrough:
+                block.instructions.pop()
+                changed = True
+                continue
+            cond = term.args[0]
+            value = int(cond) if is_int_constant(cond) else constants.get(cond)
+            if value is None:
+                continue
+            block.instructions.pop()
+            if bool(value) == (term.op == 'IF_TRUE'):
+                block.fallthrough = term.target
+            changed = True
+        return changed
+
+    def _thread_jumps(self, func):
+        def final_target(label):
+            seen = set()
+            while label not in seen:
+                seen.add(label)
+                block = func.block_map[label]
+                if block.instructions or block.fallthrough is None:
+                    break
+                label = block.fallthrough
+            return label
+
+        changed = False
+        for block in func.blocks:
+            term = block.terminator
+            if term is not None and term.op in CONDITIONAL_BRANCHES:
+                target = final_target(term.target)
+                if target != term.target:
+                    term.target = target
+                    changed = True
+            if block.fallthrough is not None:
+                target = final_target(block.fallthrough)
+                if target != block.fallthrough and target != block.label:
+                    block.fallthrough = target
+                    changed = True
+        return changed
+
+    def _merge_blocks(self, func):
+        changed = False
+        for block in list(func.blocks):
+            if block.label not in func.block_map:
+                continue
+            while block.terminator is None and block.fallthrough is not None:
+                succ = func.block_map[block.fallthrough]
+                if succ is block or succ is func.entry or len(succ.preds) != 1:
+                    break
+                block.instructions.extend(succ.instructions)
+                block.fallthrough = succ.fallthrough
+                block.succs = succ.succs
+                for label in succ.succs:
+                    preds = func.block_map[label].preds
+                    preds[preds.index(succ.label)] = block.label
+                func.remove_block(succ)
+                changed = True
+        return changed
+
+
+class BlockLayout(FunctionPass):
+    """
+    Reorders blocks so likely successors are fallthroughs and rotates loops.
+
+    Blocks are placed greedily: after each block comes its unplaced
+    successor that stays inside the block's innermost loop, if any, so
+    loop bodies are laid out contiguously and exits come after them. A
+    loop whose header tests the condition and whose single latch jumps
+    straight back is then rotated by moving the header after the latch.
+    Finally conditional branches are inverted wherever their target
+    landed next in the layout.
+    """
+
+    name = 'block-layout'
+
+    def run_on_function(self, func, program):
+        if any(block.phis() for block in func.blocks):
+            return False
+        if remove_unreachable_blocks(func):
+            self.invalidate(func)
+        original = [block.label for block in func.blocks]
+
+        if self._rotate_entry_loop(func):
+            self.invalidate(func)
+        loops = self.analysis('loops', func)
+        innermost = {}
+        for loop in loops:
+            for label in loop.blocks:
+                innermost.setdefault(label, loop)
+
+        order = self._chain(func, innermost)
+        for loop in loops:
+            latch = self._rotatable_latch(func, loop)
+            if latch is not None:
+                order.remove(loop.header)
+                order.insert(order.index(latch) + 1, loop.header)
+
+        func.blocks = [func.block_map[label] for label in order]
+        self._fix_polarity(func)
+        func.compute_edges()
+        return [block.label for block in func.blocks] != original
+
+    def _rotate_entry_loop(self, func):
+        """Gives a loop headed by the entry block a preheader to jump from."""
+        for loop in self.analysis('loops', func):
+            if loop.header == func.entry.label and self._rotatable_latch(func, loop):
+                insert_preheader(func, loop)
+                return True
+        return False
+
+    def _chain(self, func, innermost):
+        remaining = [block.label for block in func.blocks]
+        scan = 0
+        placed = set()
+        order = []
+        current = func.entry.label
+        while current is not None:
+            order.append(current)
+            placed.add(current)
+            current = self._choose_successor(func, current, placed, innermost)
+            if current is None:
+                # No successor left to chain: continue in original order
+                while scan < len(remaining) and remaining[scan] in placed:
+                    scan += 1
+                current = remaining[scan] if scan < len(remaining) else None
+        return order
+
+    def _choose_successor(self, func, label, placed, innermost):
+        block = func.block_map[label]
+        loop = innermost.get(label)
+        candidates = [succ for succ in block.succs if succ not in placed]
+        if not candidates:
+            return None
+        if loop is not None:
+            inside = [succ for succ in candidates if succ in loop.blocks]
+            if inside:
+                return inside[0] if block.fallthrough not in inside else block.fallthrough
+        return block.fallthrough if block.fallthrough in candidates else candidates[0]
+
+    def _rotatable_latch(self, func, loop):
+        header = func.block_map[loop.header]
+        term = header.terminator
+        if term is None or term.op not in CONDITIONAL_BRANCHES or len(loop.latches) != 1:
+            return None
+        latch = func.block_map[loop.latches[0]]
+        if latch is header:
+            return None
+        latch_term = latch.terminator
+        if latch_term is None:
+            if latch.fallthrough != header.label:
+                return None
+        elif latch_term.op != 'GOTO':
+            return None
+        inside = [succ for succ in header.succs if succ in loop.blocks]
+        if len(inside) != 1 or len(header.succs) != 2:
+            return None
+        return latch.label
+
+    def _fix_polarity(self, func):
+        inverse = {'IF_FALSE': 'IF_TRUE', 'IF_TRUE': 'IF_FALSE'}
+        for i, block in enumerate(func.blocks):
+            term = block.terminator
+            next_label = func.blocks[i + 1].label if i + 1 < len(func.blocks) else None
+            if term is not None and term.op == 'GOTO' and term.target == next_label:
+                # A rotated latch that jumped back to its header now falls into it
+                block.instructions.pop()
+                block.fallthrough = next_label
+                continue
+            if term is None or term.op not in CONDITIONAL_BRANCHES:
+                continue
+            if term.target == next_label and block.fallthrough != next_label:
+                term.op = inverse[term.op]
+                term.target, block.fallthrough = block.fallthrough, term.target
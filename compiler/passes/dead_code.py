@@ -0,0 +1,77 @@
+"""
+This module implements dead code elimination.
+
+IntermediateCodeGenerator materializes every expression, including the
+results of expression statements, and code after a RETURN is still
+emitted. DeadCodeElimination removes:
+- Blocks that cannot be reached from the function entry
+- Pure instructions and LOADs whose result is never used
+- STOREs and DECLAREs of variables that are never read afterwards
+"""
+
+from ..cfg import remove_unreachable_blocks
+from ..liveness import LiveScan, compute_variable_liveness
+from .base import FunctionPass
+
+
+class DeadCodeElimination(FunctionPass):
+    """
+    Liveness-based dead temp, dead store and unreachable block elimination.
+
+    Locals are dead after the function returns. Globals stay live at the
+    exit of every function except main: once main returns the program is
+    over, so its final stores to globals can go as well. A call may read
+    any global, so globals are live before every CALL.
+
+    Removing one dead instruction can make the instructions feeding it
+    dead, so the pass repeats until nothing changes.
+    """
+
+    name = 'dce'
+
+    def run_on_function(self, func, program):
+        live_at_exit = () if func.name == 'main' else program.global_names
+        changed = False
+        while True:
+            removed = remove_unreachable_blocks(func)
+            if self._sweep(func, live_at_exit, program.global_names):
+                removed = True
+            if not removed:
+                return changed
+            self.invalidate(func)
+            changed = True
+
+    def _sweep(self, func, live_at_exit, global_names):
+        liveness = self.analysis('liveness', func)
+        variables = compute_variable_liveness(func, live_at_exit, global_names)
+        removed = False
+        for block in func.blocks:
+            live = LiveScan(liveness, block.label)
+            live_vars = LiveScan(variables, block.label)
+            kept = []
+            for instr in reversed(block.instructions):
+                if self._is_dead(instr, live, live_vars):
+                    removed = True
+                    continue
+                if instr.dest is not None:
+                    live.discard(instr.dest)
+                live.update(instr.uses())
+                var = instr.stored_var()
+                if var is not None:
+                    live_vars.discard(var)
+                var = instr.loaded_var()
+                if var is not None:
+                    live_vars.add(var)
+                if instr.op == 'CALL':
+                    live_vars.update(global_names)
+                kept.append(instr)
+            kept.reverse()
+            block.instructions = kept
+        return removed
+
+    def _is_dead(self, instr, live, live_vars):
+        if instr.op in ('STORE', 'DECLARE'):
+            return instr.args[-1] not in live_vars
+        if instr.dest is None or instr.dest in live:
+            return False
+        return instr.op == 'LOAD' or instr.is_pure()
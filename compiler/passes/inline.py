@@ -0,0 +1,176 @@
+"""
+This module implements inlining of small leaf functions.
+
+Every call pays for its ARG instructions, the CALL itself and the callee's
+frame setup and teardown. For a helper like `int square(int x) { return
+x * x; }` that overhead is larger than the body, and keeping the body
+behind a call also hides it from the other passes. FunctionInlining
+replaces such calls with a copy of the callee's CFG:
+- Parameters and locals of the copy get fresh variable names and are
+  initialized from the arguments with STOREs
+- Temps and labels get fresh names from the caller's counters
+- Each RETURN becomes an assignment of the call's result and a jump to
+  the code after the call
+
+Whether a call site is inlined is decided by a cost model: the size of
+the callee minus the call overhead it saves, with a bonus for constant
+arguments (which later folding can exploit) and a more generous limit
+for calls inside loops, where the overhead is paid on every iteration.
+"""
+
+from ..callgraph import CallGraph
+from ..cfg import BasicBlock
+from ..ir import JUMPS, Instruction, is_constant
+from .base import FunctionPass
+
+# Instructions saved besides the ARGs: CALL, frame setup and teardown, RETURN
+CALL_OVERHEAD = 4
+CONSTANT_ARG_BONUS = 2
+
+
+class FunctionInlining(FunctionPass):
+    """
+    Inlines calls to small, non-recursive leaf functions.
+
+    Callers are processed bottom-up over the call graph. Functions that are
+    no longer reachable from main afterwards are removed.
+
+    Attributes:
+        threshold: Maximum net growth, in instructions, of inlining one call
+        loop_bonus: Extra growth allowed per loop the call site is nested in
+        max_function_size: Size a caller may not grow beyond through inlining
+    """
+
+    name = 'inline'
+
+    def __init__(self, threshold=8, loop_bonus=8, max_function_size=2000):
+        self.threshold = threshold
+        self.loop_bonus = loop_bonus
+        self.max_function_size = max_function_size
+
+    def run(self, program):
+        graph = CallGraph(program)
+        changed = False
+        for name in graph.bottom_up():
+            if self.run_on_function(graph.functions[name], program):
+                changed = True
+        if changed and 'main' in graph.functions:
+            live = CallGraph(program).reachable('main')
+            program.functions = [func for func in program.functions if func.name in live]
+        return changed
+
+    def run_on_function(self, func, program):
+        graph = CallGraph(program)
+        if any(block.phis() for block in func.blocks):
+            return False
+        changed = False
+        rejected = set()
+        while True:
+            site = self._next_site(func, graph, rejected)
+            if site is None:
+                return changed
+            block, index = site
+            self._inline(func, program, block, index, graph.functions[block.instructions[index].args[0]])
+            self.invalidate(func)
+            changed = True
+
+    def _next_site(self, func, graph, rejected):
+        """Finds the next call site the cost model accepts, or None."""
+        depth = {}
+        for loop in self.analysis('loops', func):
+            for label in loop.blocks:
+                depth[label] = depth.get(label, 0) + 1
+        size = sum(len(block.instructions) for block in func.blocks)
+        for block in func.blocks:
+            for index, instr in enumerate(block.instructions):
+                if instr.op != 'CALL' or id(instr) in rejected:
+                    continue
+                if self._should_inline(graph, block, index, depth.get(block.label, 0), size):
+                    return block, index
+                rejected.add(id(instr))
+        return None
+
+    def _should_inline(self, graph, block, index, loop_depth, caller_size):
+        call = block.instructions[index]
+        callee = graph.functions.get(call.args[0])
+        if callee is None or not graph.is_leaf(callee.name):
+            return False
+        if any(b.phis() for b in callee.blocks):
+            return False
+        count = int(call.args[1])
+        if count != len(callee.params) or index < count:
+            return False
+        args = block.instructions[index - count:index]
+        if any(instr.op != 'ARG' for instr in args):
+            return False
+
+        callee_size = sum(len(b.instructions) for b in callee.blocks)
+        if caller_size + callee_size > self.max_function_size:
+            return False
+        saved = CALL_OVERHEAD + count
+        bonus = CONSTANT_ARG_BONUS * sum(1 for instr in args if is_constant(instr.args[0]))
+        growth = callee_size - saved - bonus
+        return growth <= self.threshold + self.loop_bonus * loop_depth
+
+    def _inline(self, func, program, block, index, callee):
+        call = block.instructions[index]
+        count = int(call.args[1])
+        args = [instr.args[0] for instr in block.instructions[index - count:index]]
+
+        # Fresh names for everything the callee defines
+        variables = {}
+        for name in callee.params:
+            variables[name] = program.new_variable(f"{callee.name}_{name}")
+        for instr in callee.instructions():
+            var = instr.loaded_var() or instr.stored_var()
+            if var is not None and var not in variables and var not in program.global_names:
+                variables[var] = program.new_variable(f"{callee.name}_{var}")
+        temps = {}
+        for instr in callee.instructions():
+            if instr.dest is not None and instr.dest not in temps:
+                temps[instr.dest] = func.new_temp()
+        labels = {b.label: func.new_label() for b in callee.blocks}
+
+        after = BasicBlock(func.new_label())
+        after.instructions = block.instructions[index + 1:]
+        after.fallthrough = block.fallthrough
+        block.instructions = block.instructions[:index - count]
+        for name, value in zip(callee.params, args):
+            block.instructions.append(Instruction('STORE', args=[value, variables[name]]))
+        block.fallthrough = labels[callee.entry.label]
+
+        returns = sum(1 for instr in callee.instructions() if instr.op == 'RETURN')
+        result = program.new_variable(f"{callee.name}_result") if returns > 1 else None
+        if result is not None:
+            after.instructions.insert(0, Instruction('LOAD', call.dest, [result]))
+
+        copies = []
+        for original in callee.blocks:
+            clone = BasicBlock(labels[original.label])
+            clone.fallthrough = labels.get(original.fallthrough)
+            for instr in original.instructions:
+                instr = instr.copy()
+                instr.replace_uses(temps)
+                if instr.dest is not None:
+                    instr.dest = temps[instr.dest]
+                if instr.op in JUMPS:
+                    instr.target = labels[instr.target]
+                elif instr.op in ('LOAD', 'DECLARE') and instr.args[0] in variables:
+                    instr.args[0] = variables[instr.args[0]]
+                elif instr.op == 'STORE' and instr.args[1] in variables:
+                    instr.args[1] = variables[instr.args[1]]
+                elif instr.op == 'RETURN':
+                    value = instr.args[0] if instr.args else '0'
+                    if result is not None:
+                        instr = Instruction('STORE', args=[value, result])
+                    else:
+                        op = 'CONST' if is_constant(value) else 'COPY'
+                        instr = Instruction(op, call.dest, [value])
+                    clone.fallthrough = after.label
+                clone.instructions.append(instr)
+            copies.append(clone)
+
+        position = func.blocks.index(block) + 1
+        for offset, clone in enumerate(copies + [after]):
+            func.add_block(clone, position + offset)
+        func.compute_edges()
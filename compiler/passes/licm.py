@@ -0,0 +1,135 @@
+"""
+This module implements loop-invariant code motion (LICM).
+
+A while loop compiles to LABEL start / condition / IF_FALSE / body /
+GOTO start, so everything in the loop is re-evaluated each iteration,
+including LOADs of variables the loop never stores to and arithmetic on
+them. LICM finds each natural loop, gives it a preheader just before the
+loop label and moves the invariant pure computations there.
+"""
+
+from ..cfg import insert_preheader
+from ..ir import is_constant
+from .base import FunctionPass
+
+
+class LoopInvariantCodeMotion(FunctionPass):
+    """
+    Hoists loop-invariant computations into loop preheaders.
+
+    An instruction is invariant when it is pure (see Instruction.is_pure)
+    or a LOAD of a variable the loop never writes, its destination is
+    assigned nowhere else in the function, and each operand is a constant,
+    defined outside the loop, or itself invariant. Pure instructions cannot
+    trap, so executing them speculatively in the preheader is safe even
+    when the loop body would not have run.
+
+    Constants are only hoisted when every use of them is hoisted too, so
+    that constant operands stay next to their users for the backend.
+    """
+
+    name = 'licm'
+
+    def run_on_function(self, func, program):
+        changed = False
+        done = set()
+        while True:
+            loops = [loop for loop in self.analysis('loops', func) if loop.header not in done]
+            if not loops:
+                return changed
+            loop = loops[0]
+            done.add(loop.header)
+            if self._hoist(func, program, loop):
+                self.invalidate(func)
+                changed = True
+
+    def _hoist(self, func, program, loop):
+        if func.block_map[loop.header].phis():
+            return False
+
+        def_counts = {}
+        for instr in func.instructions():
+            if instr.dest is not None:
+                def_counts[instr.dest] = def_counts.get(instr.dest, 0) + 1
+
+        written = set()
+        defined_in_loop = set()
+        body = [label for label in func.reverse_postorder() if label in loop.blocks]
+        for label in body:
+            for instr in func.block_map[label].instructions:
+                if instr.stored_var() is not None:
+                    written.add(instr.stored_var())
+                elif instr.op == 'CALL':
+                    # The callee may assign any global
+                    written.update(program.global_names)
+                if instr.dest is not None:
+                    defined_in_loop.add(instr.dest)
+
+        # Grow the invariant set to a fixed point, in dominance-friendly order
+        invariant = {}
+        changed = True
+        while changed:
+            changed = False
+            for label in body:
+                for instr in func.block_map[label].instructions:
+                    if id(instr) in invariant or instr.dest is None:
+                        continue
+                    if def_counts[instr.dest] != 1:
+                        continue
+                    if instr.op == 'LOAD':
+                        if instr.args[0] in written:
+                            continue
+                    elif not instr.is_pure() or instr.op == 'PHI':
+                        continue
+                    if all(is_constant(arg) or arg not in defined_in_loop or arg in invariant
+                           for arg in instr.uses()):
+                        invariant[id(instr)] = instr
+                        invariant[instr.dest] = instr
+                        changed = True
+
+        # Keep constants in the loop unless all their users move out
+        users = {}
+        for label in body:
+            for instr in func.block_map[label].instructions:
+                for use in instr.uses():
+                    users.setdefault(use, []).append(instr)
+        hoisted = set()
+        for label in body:
+            for instr in func.block_map[label].instructions:
+                if id(instr) in invariant and instr.op != 'CONST':
+                    hoisted.add(id(instr))
+        for label in body:
+            for instr in func.block_map[label].instructions:
+                if id(instr) in invariant and instr.op == 'CONST':
+                    if all(id(user) in hoisted for user in users.get(instr.dest, [])):
+                        hoisted.add(id(instr))
+
+        # A non-constant whose constant operand stays behind cannot move
+        settled = False
+        while not settled:
+            settled = True
+            for label in body:
+                for instr in func.block_map[label].instructions:
+                    if id(instr) not in hoisted or instr.op == 'CONST':
+                        continue
+                    for use in instr.uses():
+                        source = invariant.get(use)
+                        if source is not None and id(source) not in hoisted:
+                            hoisted.discard(id(instr))
+                            settled = False
+                            break
+
+        if not hoisted:
+            return False
+
+        preheader = insert_preheader(func, loop)
+        for label in body:
+            block = func.block_map[label]
+            kept = []
+            for instr in block.instructions:
+                if id(instr) in hoisted:
+                    preheader.instructions.append(instr)
+                else:
+                    kept.append(instr)
+            block.instructions = kept
+        return True
@@ -0,0 +1,357 @@
+"""
+This module implements loop unrolling for counted while loops.
+
+A loop of the form
+
+    i = a;  while (i < n) { ...; i = i + s; }
+
+where a, n and s are known at compile time runs a fixed number of times.
+LoopUnrolling computes that trip count and then either:
+- replaces the loop with one copy of the body per iteration (full
+  unrolling) when the copies fit in the code-size budget, or
+- builds a new loop whose body holds `factor` copies and tests the
+  induction variable only once per `factor` iterations, followed by the
+  original loop as a remainder loop for the leftover iterations.
+
+Constant start values are found by a forward constant propagation over
+local variables, so the initialization does not have to sit right
+before the loop.
+"""
+
+from ..cfg import BasicBlock, dominates
+from ..ir import COMPARISON_OPS, JUMPS, Instruction, is_int_constant, wrap_int32
+from .base import FunctionPass
+from .strength_reduction import constant_temps, definition_counts
+
+# Comparison that holds when the operands are swapped / when it fails
+MIRRORED = {'LT': 'GT', 'LE': 'GE', 'GT': 'LT', 'GE': 'LE', 'EQ': 'EQ', 'NE': 'NE'}
+NEGATED = {'LT': 'GE', 'LE': 'GT', 'GT': 'LE', 'GE': 'LT', 'EQ': 'NE', 'NE': 'EQ'}
+
+
+def trip_count(op, start, step, bound):
+    """
+    Counts the iterations of a loop that runs while `i op bound` holds,
+    with i starting at start and advancing by step after each iteration.
+
+    Returns:
+        int: Number of iterations, or None if the loop does not terminate
+        or the induction variable would overflow on the way
+    """
+    if op == 'EQ':
+        count = 1 if start == bound else 0
+    elif op == 'NE':
+        distance = bound - start
+        if distance % step or distance // step < 0:
+            return None
+        count = distance // step
+    elif op in ('LT', 'LE') and step > 0:
+        limit = bound + 1 if op == 'LE' else bound
+        count = max(0, -(-(limit - start) // step))
+    elif op in ('GT', 'GE') and step < 0:
+        limit = bound - 1 if op == 'GE' else bound
+        count = max(0, -(-(start - limit) // -step))
+    else:
+        return None
+    final = start + count * step
+    if wrap_int32(final) != final:
+        return None
+    return count
+
+
+def variable_constants(func, constants):
+    """
+    Propagates constant values of local variables forward through the CFG.
+
+    Args:
+        func: Function whose edges are up to date
+        constants: Maps constant temps to their values
+
+    Returns:
+        dict: Maps each reachable block label to the {variable: value}
+        map that holds at the end of the block
+    """
+    def transfer(state, block):
+        state = dict(state)
+        for instr in block.instructions:
+            var = instr.stored_var()
+            if var is None:
+                continue
+            value = instr.args[0] if instr.op == 'STORE' else None
+            if value is not None and is_int_constant(value):
+                state[var] = int(value)
+            elif value in constants:
+                state[var] = constants[value]
+            else:
+                state.pop(var, None)
+        return state
+
+    order = func.reverse_postorder()
+    out = {}
+    changed = True
+    while changed:
+        changed = False
+        for label in order:
+            block = func.block_map[label]
+            incoming = [out[pred] for pred in block.preds if pred in out]
+            if label == func.entry.label or not incoming:
+                state = {}
+            else:
+                state = dict(incoming[0])
+                for other in incoming[1:]:
+                    state = {var: value for var, value in state.items()
+                             if other.get(var) == value}
+            state = transfer(state, block)
+            if out.get(label) != state:
+                out[label] = state
+                changed = True
+    return out
+
+
+class LoopUnrolling(FunctionPass):
+    """
+    Fully or partially unrolls innermost loops with a compile-time trip count.
+
+    A loop qualifies when its header only loads and compares (`i op n`
+    against a constant) before branching out of the loop, the header is
+    the only exit, there is a single latch, and the local variable i is
+    stored exactly once in the loop as `i = i + s` in a block that runs on
+    every iteration.
+
+    Attributes:
+        factor: Number of body copies per iteration of a partially unrolled loop
+        size_budget: Maximum number of instructions the copies may add
+    """
+
+    name = 'loop-unroll'
+
+    def __init__(self, factor=4, size_budget=64):
+        self.factor = factor
+        self.size_budget = size_budget
+
+    def run_on_function(self, func, program):
+        if any(block.phis() for block in func.blocks):
+            return False
+        changed = False
+        done = set()
+        while True:
+            loops = self.analysis('loops', func)
+            headers = {loop.header for loop in loops}
+            candidates = [loop for loop in loops if loop.header not in done and
+                          not any(label in headers for label in loop.blocks - {loop.header})]
+            if not candidates:
+                return changed
+            loop = candidates[0]
+            done.add(loop.header)
+            if self._unroll(func, program, loop, done):
+                self.invalidate(func)
+                changed = True
+
+    def _unroll(self, func, program, loop, done):
+        """Unrolls one loop, adding any new loop header to done."""
+        counted = self._analyze(func, program, loop)
+        if counted is None:
+            return False
+        var, start, step, count, body_entry, exit_label = counted
+
+        header = func.block_map[loop.header]
+        body = [block for block in func.blocks
+                if block.label in loop.blocks and block is not header]
+        body_size = sum(len(block.instructions) for block in body) + 1
+        index = func.blocks.index(header)
+
+        if count * body_size <= self.size_budget:
+            copies = self._copy_body(func, body, loop.header, body_entry, count, exit_label)
+            self._redirect_entries(func, loop, copies[0].label if copies else exit_label)
+            for block in [header] + body:
+                func.remove_block(block)
+            for offset, block in enumerate(copies):
+                func.add_block(block, index + offset)
+            func.compute_edges()
+            return True
+
+        factor = min(self.factor, count)
+        while factor > 1 and factor * body_size > self.size_budget:
+            factor -= 1
+        if factor < 2:
+            return False
+
+        # New loop running `factor` iterations per test; the original loop
+        # stays behind it to run the remaining count % factor iterations
+        remainder = count % factor
+        end = start + (count - remainder) * step
+        unrolled = BasicBlock(func.new_label())
+        value, bound, cond = func.new_temp(), func.new_temp(), func.new_temp()
+        after = loop.header if remainder else exit_label
+        unrolled.instructions = [
+            Instruction('LOAD', value, [var]),
+            Instruction('CONST', bound, [str(end)]),
+            Instruction('NE', cond, [value, bound]),
+            Instruction('IF_FALSE', args=[cond, after])
+        ]
+        copies = self._copy_body(func, body, loop.header, body_entry, factor, unrolled.label)
+        unrolled.fallthrough = copies[0].label
+        self._redirect_entries(func, loop, unrolled.label)
+        if not remainder:
+            for block in [header] + body:
+                func.remove_block(block)
+        for offset, block in enumerate([unrolled] + copies):
+            func.add_block(block, index + offset)
+        func.compute_edges()
+        done.add(unrolled.label)
+        return True
+
+    def _analyze(self, func, program, loop):
+        """
+        Checks that a loop is counted and computes its trip count.
+
+        Returns:
+            tuple: (variable, start, step, trip count, body entry label,
+            exit label), or None if the loop does not qualify
+        """
+        header = func.block_map[loop.header]
+        term = header.terminator
+        if term is None or term.op not in ('IF_FALSE', 'IF_TRUE') or len(loop.latches) != 1:
+            return None
+        inside = [succ for succ in header.succs if succ in loop.blocks]
+        outside = [succ for succ in header.succs if succ not in loop.blocks]
+        if len(inside) != 1 or len(outside) != 1 or inside[0] == loop.header:
+            return None
+        if any(label != loop.header for label, _ in loop.exits(func)):
+            return None
+        if any(instr.op != 'LOAD' and not instr.is_pure() for instr in header.instructions[:-1]):
+            return None
+
+        def_counts = definition_counts(func)
+        constants = constant_temps(func, def_counts)
+        definitions = {}
+        for label in loop.blocks:
+            for instr in func.block_map[label].instructions:
+                if instr.dest is not None:
+                    definitions[instr.dest] = instr
+
+        # Temps computed in the loop must not be read after it, and those
+        # of the header (which unrolled copies do not repeat) not in the body
+        for block in func.blocks:
+            reads = {use for instr in block.instructions for use in instr.uses()}
+            if block.label not in loop.blocks:
+                if any(use in definitions for use in reads):
+                    return None
+            elif block is not header:
+                if any(instr.dest in reads for instr in header.instructions):
+                    return None
+        if any(def_counts[instr.dest] != 1 for instr in definitions.values()
+               if instr.op != 'CONST'):
+            return None
+
+        # Condition: LOAD i compared against a constant
+        compare = definitions.get(term.args[0])
+        if compare is None or compare.op not in COMPARISON_OPS or compare not in header.instructions:
+            return None
+        op = compare.op
+        left, right = compare.args
+        if self._constant(right, constants) is None:
+            left, right, op = right, left, MIRRORED[op]
+        bound = self._constant(right, constants)
+        load = definitions.get(left)
+        if bound is None or load is None or load.op != 'LOAD' or load not in header.instructions:
+            return None
+        var = load.args[0]
+        if var in program.global_names:
+            return None
+        taken = term.op == 'IF_TRUE'
+        if (term.target in loop.blocks) != taken:
+            op = NEGATED[op]
+
+        # Induction variable: a single `STORE i +/- step, i` on every iteration
+        stores = [(label, instr) for label in loop.blocks
+                  for instr in func.block_map[label].instructions if instr.stored_var() == var]
+        if len(stores) != 1 or stores[0][1].op != 'STORE':
+            return None
+        store_label, store = stores[0]
+        update = definitions.get(store.args[0])
+        if update is None or update.op not in ('ADD', 'SUB'):
+            return None
+        base, amount = update.args
+        if update.op == 'ADD' and self._constant(base, constants) is not None:
+            base, amount = amount, base
+        step = self._constant(amount, constants)
+        source = definitions.get(base)
+        if step is None or source is None or source.op != 'LOAD' or source.args[0] != var:
+            return None
+        block_instructions = func.block_map[store_label].instructions
+        if source not in block_instructions or \
+                block_instructions.index(source) > block_instructions.index(store):
+            return None
+        if update.op == 'SUB':
+            step = -step
+        if step == 0:
+            return None
+        idom = self.analysis('dominators', func)
+        if not dominates(idom, store_label, loop.latches[0]):
+            return None
+
+        # Start value: the same constant on every edge into the loop
+        out = variable_constants(func, constants)
+        starts = {out.get(pred, {}).get(var) for pred in header.preds if pred not in loop.blocks}
+        if len(starts) != 1 or None in starts:
+            return None
+        start = starts.pop()
+
+        count = trip_count(op, start, step, bound)
+        if count is None:
+            return None
+        return var, start, step, count, inside[0], outside[0]
+
+    def _constant(self, operand, constants):
+        if is_int_constant(operand):
+            return int(operand)
+        return constants.get(operand)
+
+    def _copy_body(self, func, body, header_label, body_entry, times, exit_label):
+        """
+        Makes `times` chained copies of the loop body. The back edge of
+        each copy leads to the next copy and that of the last to exit_label.
+
+        Returns:
+            list: The new blocks in layout order
+        """
+        label_maps = [{block.label: func.new_label() for block in body} for _ in range(times)]
+        copies = []
+        for i, labels in enumerate(label_maps):
+            following = label_maps[i + 1][body_entry] if i + 1 < times else exit_label
+            labels = dict(labels)
+            labels[header_label] = following
+            temps = {}
+            for block in body:
+                for instr in block.instructions:
+                    if instr.dest is not None and instr.dest not in temps:
+                        temps[instr.dest] = func.new_temp()
+            for block in body:
+                clone = BasicBlock(labels[block.label])
+                for instr in block.instructions:
+                    instr = instr.copy()
+                    instr.replace_uses(temps)
+                    if instr.dest is not None:
+                        instr.dest = temps[instr.dest]
+                    if instr.op in JUMPS and instr.target in labels:
+                        instr.target = labels[instr.target]
+                    clone.instructions.append(instr)
+                clone.fallthrough = labels.get(block.fallthrough, block.fallthrough)
+                copies.append(clone)
+            # Keep each copy's entry block first so the chain falls through
+            entry = next(c for c in copies[-len(body):] if c.label == labels[body_entry])
+            copies.remove(entry)
+            copies.insert(len(copies) - len(body) + 1, entry)
+        return copies
+
+    def _redirect_entries(self, func, loop, label):
+        """Makes every edge entering the loop from outside go to label instead."""
+        for pred_label in func.block_map[loop.header].preds:
+            if pred_label in loop.blocks:
+                continue
+            pred = func.block_map[pred_label]
+            term = pred.terminator
+            if term is not None and term.op in JUMPS and term.target == loop.header:
+                term.target = label
+            if pred.fallthrough == loop.header:
+                pred.fallthrough = label
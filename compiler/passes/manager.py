@@ -0,0 +1,175 @@
+"""
+This module runs the IR optimization passes as a pipeline.
+
+The PassManager builds the CFGs of a program once, runs each pass over
+them in order and shares one AnalysisManager between the passes, so an
+analysis is only recomputed for functions that a pass actually changed.
+For every pass it records the wall time and how the number of TAC
+instructions changed; compile.py prints these with --time-passes.
+
+Optimization levels:
+    -O0  Only TempRenumbering runs: it renames temps so that temps with
+         disjoint live ranges share a name, which shrinks every per-temp
+         table, and leaves the instructions otherwise unchanged
+    -O1  Transformations that never grow the code: folding and algebraic
+         simplification, dead code elimination, branch simplification
+         and block layout
+    -O2  -O1 plus inlining, loop-invariant code motion, loop unrolling
+         and induction variable strength reduction
+"""
+
+import time
+
+from ..cfg import build_program
+from .analysis import AnalysisManager
+from .branch_simplification import BlockLayout, BranchSimplification
+from .dead_code import DeadCodeElimination
+from .inline import FunctionInlining
+from .licm import LoopInvariantCodeMotion
+from .loop_unroll import LoopUnrolling
+from .strength_reduction import AlgebraicSimplification, InductionVariableStrengthReduction
+from .temp_renumbering import TempRenumbering
+
+OPTIMIZATION_LEVELS = {
+    0: [TempRenumbering],
+    1: [
+        AlgebraicSimplification,
+        DeadCodeElimination,
+        BranchSimplification,
+        DeadCodeElimination,
+        BlockLayout,
+        TempRenumbering
+    ],
+    2: [
+        FunctionInlining,
+        AlgebraicSimplification,
+        LoopInvariantCodeMotion,
+        LoopUnrolling,
+        InductionVariableStrengthReduction,
+        AlgebraicSimplification,
+        DeadCodeElimination,
+        BranchSimplification,
+        DeadCodeElimination,
+        BlockLayout,
+        TempRenumbering
+    ]
+}
+
+
+def count_instructions(program):
+    """Counts the TAC instructions a program would be written out as."""
+    return len(program.to_instructions())
+
+
+class PassManager:
+    """
+    Runs a sequence of passes over a program and records statistics.
+
+    Attributes:
+        passes: Passes in execution order
+        analyses: AnalysisManager shared by the passes
+        statistics: One dict per executed pass with its name, wall time
+            in milliseconds, instruction counts before and after, and
+            whether it changed anything
+    """
+
+    def __init__(self, passes=None):
+        self.passes = []
+        self.analyses = AnalysisManager()
+        self.statistics = []
+        for pass_ in passes or []:
+            self.add_pass(pass_)
+
+    def add_pass(self, pass_):
+        """Appends a pass to the pipeline and connects it to the analysis cache."""
+        pass_.analyses = self.analyses
+        self.passes.append(pass_)
+
+    def run(self, program):
+        """
+        Runs every pass over a program in place.
+
+        Args:
+            program: Program built by compiler.cfg.build_program
+
+        Returns:
+            bool: True if any pass changed the program
+        """
+        changed = False
+        count = count_instructions(program)
+        for pass_ in self.passes:
+            start = time.perf_counter()
+            pass_changed = pass_.run(program)
+            elapsed = time.perf_counter() - start
+            new_count = count_instructions(program) if pass_changed else count
+            self.statistics.append({
+                'pass': pass_.name,
+                'time_ms': elapsed * 1000,
+                'instructions_before': count,
+                'instructions_after': new_count,
+                'changed': pass_changed
+            })
+            count = new_count
+            changed = changed or pass_changed
+        return changed
+
+    def run_on_code(self, code):
+        """
+        Optimizes TAC strings.
+
+        Args:
+            code: List of TAC strings
+
+        Returns:
+            list: Optimized TAC strings (the input itself with no passes)
+        """
+        if not self.passes:
+            return list(code)
+        program = build_program(code)
+        self.run(program)
+        return program.to_tac()
+
+    def report(self):
+        """
+        Formats the recorded statistics as a table.
+
+        Returns:
+            list: Lines of the report
+        """
+        lines = [
+            "===== Pass execution timing report =====",
+            f"{'Time (ms)':>10}  {'Before':>7}  {'After':>7}  {'Delta':>6}  Pass"
+        ]
+        for stat in self.statistics:
+            delta = stat['instructions_after'] - stat['instructions_before']
+            lines.append(f"{stat['time_ms']:10.3f}  {stat['instructions_before']:7d}  "
+                         f"{stat['instructions_after']:7d}  {delta:+6d}  {stat['pass']}")
+        if self.statistics:
+            total = sum(stat['time_ms'] for stat in self.statistics)
+            before = self.statistics[0]['instructions_before']
+            after = self.statistics[-1]['instructions_after']
+            lines.append(f"{total:10.3f}  {before:7d}  {after:7d}  {after - before:+6d}  Total")
+        for name in self.analyses.misses:
+            if not self.analyses.misses[name]:
+                continue
+            lines.append(f"Analysis {name}: computed {self.analyses.misses[name]}, "
+                         f"reused {self.analyses.hits[name]}")
+        return lines
+
+
+def build_pipeline(level):
+    """
+    Creates a PassManager with the passes of an optimization level.
+
+    Args:
+        level: Optimization level (0, 1 or 2)
+
+    Returns:
+        PassManager: Pipeline with fresh pass instances
+
+    Raises:
+        ValueError: If the level is not supported
+    """
+    if level not in OPTIMIZATION_LEVELS:
+        raise ValueError(f"Unsupported optimization level -O{level}")
+    return PassManager([pass_class() for pass_class in OPTIMIZATION_LEVELS[level]])
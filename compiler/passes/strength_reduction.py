@@ -0,0 +1,457 @@
+"""
+This module implements algebraic simplification and strength reduction.
+
+AlgebraicSimplification rewrites individual instructions:
+- Constant operands are folded (t = 2 MUL 3 -> t = 6)
+- Identities disappear (x MUL 1, x ADD 0, x SUB 0, x DIV 1)
+- x SUB x, x MUL 0 and x MOD 1 become constants
+- Multiplication by 2^k becomes SHL k
+- Division and modulus by 2^k become SAR k and BITAND 2^k-1 when the
+  dividend is provably non-negative, since C rounds toward zero; with
+  32-bit wrap-around that requires proving it cannot overflow
+
+InductionVariableStrengthReduction replaces multiplications of a loop's
+basic induction variable by a running sum that is advanced with an
+addition each time the induction variable is.
+"""
+
+from ..cfg import insert_preheader
+from ..ir import Instruction, evaluate_binary, is_int_constant, is_temp, wrap_int32
+from .analysis import CFG_ANALYSES
+from .base import FunctionPass
+
+INT32_MAX = 0x7FFFFFFF
+
+SYMMETRIC_EQUAL = {'EQ': 1, 'LE': 1, 'GE': 1, 'NE': 0, 'LT': 0, 'GT': 0, 'SUB': 0}
+
+
+def _power_of_two(value):
+    """Returns k if value == 2**k for k >= 1, else None."""
+    if value is not None and value > 1 and value & (value - 1) == 0:
+        return value.bit_length() - 1
+    return None
+
+
+def definition_counts(func):
+    """Counts how many instructions define each name in a function."""
+    counts = {}
+    for instr in func.instructions():
+        if instr.dest is not None:
+            counts[instr.dest] = counts.get(instr.dest, 0) + 1
+    return counts
+
+
+def constant_temps(func, def_counts):
+    """Maps each single-definition temp holding an integer constant to its value."""
+    constants = {}
+    for instr in func.instructions():
+        if instr.op == 'CONST' and def_counts[instr.dest] == 1 and is_int_constant(instr.args[0]):
+            constants[instr.dest] = int(instr.args[0])
+    return constants
+
+
+class NonNegativeValues:
+    """
+    Proves values non-negative. Arithmetic wraps around at 32 bits, so a
+    sum, product or shift is only non-negative when bounds on its operands
+    show that it cannot wrap; each provable value therefore gets an upper
+    bound, and it lies in [0, bound].
+
+    Local variables are bounded when every STORE to them stores a bounded
+    value. This is solved pessimistically: a variable is bounded once all
+    its stores are bounded by constants and already bounded variables, so
+    `i = i + 1` never qualifies; after 2**31 iterations i is negative.
+    """
+
+    def __init__(self, func, program, def_counts):
+        self.definitions = {}
+        for instr in func.instructions():
+            if instr.dest is not None and def_counts[instr.dest] == 1:
+                self.definitions[instr.dest] = instr
+
+        stores = {}
+        for instr in func.instructions():
+            if instr.op == 'STORE':
+                stores.setdefault(instr.args[1], []).append(instr.args[0])
+        excluded = set(program.global_names) | set(func.params)
+        candidates = [var for var in stores if var not in excluded]
+
+        # Maps bounded variables to their bound; a bound never changes once
+        # set, since it only depends on variables bounded before
+        self.variables = {}
+        changed = True
+        while changed:
+            changed = False
+            for var in candidates:
+                if var in self.variables:
+                    continue
+                bounds = [self.bound(value) for value in stores[var]]
+                if all(bound is not None for bound in bounds):
+                    self.variables[var] = max(bounds)
+                    changed = True
+
+    def operand(self, operand):
+        """Returns True if the operand is known to be >= 0."""
+        return self.bound(operand) is not None
+
+    def bound(self, operand, depth=0):
+        """Returns b such that the operand is known to lie in [0, b], or None."""
+        if is_int_constant(operand):
+            return int(operand) if int(operand) >= 0 else None
+        instr = self.definitions.get(operand)
+        if instr is None or depth > 50:
+            return None
+        op = instr.op
+        if op == 'CONST':
+            if is_int_constant(instr.args[0]) and int(instr.args[0]) >= 0:
+                return int(instr.args[0])
+            return None
+        if op == 'LOAD':
+            return self.variables.get(instr.args[0])
+        if op == 'COPY':
+            return self.bound(instr.args[0], depth + 1)
+        if op in ('EQ', 'NE', 'LT', 'LE', 'GT', 'GE', 'AND', 'OR', 'NOT'):
+            return 1
+        if op not in ('BITAND', 'DIV', 'MOD', 'SAR', 'ADD', 'MUL', 'SHL'):
+            return None
+        bounds = [self.bound(arg, depth + 1) for arg in instr.args]
+        if op == 'BITAND':
+            # Masking with a non-negative value cannot exceed it
+            known = [bound for bound in bounds if bound is not None]
+            return min(known) if known else None
+        if bounds[0] is None:
+            return None
+        if op in ('DIV', 'MOD', 'SAR'):
+            # Neither can grow a non-negative dividend; DIV needs a
+            # non-negative divisor as well
+            if op == 'DIV' and bounds[1] is None:
+                return None
+            return bounds[0]
+        if bounds[1] is None:
+            return None
+        if op == 'ADD':
+            result = bounds[0] + bounds[1]
+        elif op == 'MUL':
+            result = bounds[0] * bounds[1]
+        elif op == 'SHL' and bounds[1] < 32:
+            result = bounds[0] << bounds[1]
+        else:
+            return None
+        # Larger results may wrap around to negative values
+        return result if result <= INT32_MAX else None
+
+
+class AlgebraicSimplification(FunctionPass):
+    """
+    Folds constants, removes algebraic identities and replaces
+    multiplication, division and modulus by powers of two with shifts and masks.
+
+    Loads of the same variable within a block with no store in between are
+    recognized as equal, so source-level `x - x` folds to 0. Copies left
+    behind by removed identities are propagated into their users.
+    """
+
+    name = 'simplify'
+    preserves = CFG_ANALYSES
+
+    def run_on_function(self, func, program):
+        def_counts = definition_counts(func)
+        constants = constant_temps(func, def_counts)
+        nonneg = NonNegativeValues(func, program, def_counts)
+        equal = self._equal_loads(func)
+
+        def value(operand):
+            if is_int_constant(operand):
+                return int(operand)
+            return constants.get(operand)
+
+        def same(a, b):
+            return equal.get(a, a) == equal.get(b, b)
+
+        changed = False
+        for block in func.blocks:
+            for i, instr in enumerate(block.instructions):
+                new = self._simplify(instr, value, same, nonneg)
+                if new is not None:
+                    block.instructions[i] = new
+                    if new.op == 'CONST' and def_counts[new.dest] == 1:
+                        constants[new.dest] = int(new.args[0])
+                    changed = True
+
+        if self._propagate_copies(func, def_counts):
+            changed = True
+        return changed
+
+    def _equal_loads(self, func):
+        """Maps each LOAD temp to the first temp loaded from the same value."""
+        equal = {}
+        for block in func.blocks:
+            available = {}
+            for instr in block.instructions:
+                if instr.op == 'LOAD':
+                    var = instr.args[0]
+                    if var in available:
+                        equal[instr.dest] = available[var]
+                    else:
+                        available[var] = instr.dest
+                elif instr.stored_var() is not None:
+                    available.pop(instr.stored_var(), None)
+                elif instr.op == 'CALL':
+                    # The callee may assign globals
+                    available.clear()
+        return equal
+
+    def _simplify(self, instr, value, same, nonneg):
+        op = instr.op
+        if op in ('NEG', 'NOT'):
+            operand = value(instr.args[0])
+            if operand is None:
+                return None
+            result = evaluate_binary('SUB', 0, operand) if op == 'NEG' else int(not operand)
+            return Instruction('CONST', instr.dest, [str(result)])
+        if op not in ('ADD', 'SUB', 'MUL', 'DIV', 'MOD', 'SHL', 'SAR', 'BITAND',
+                      'EQ', 'NE', 'LT', 'LE', 'GT', 'GE', 'AND', 'OR'):
+            return None
+
+        dest = instr.dest
+        a, b = instr.args
+        va, vb = value(a), value(b)
+
+        def const(result):
+            return Instruction('CONST', dest, [str(result)])
+
+        def copy(source):
+            return Instruction('COPY', dest, [source]) if not is_int_constant(source) \
+                else Instruction('CONST', dest, [source])
+
+        if va is not None and vb is not None:
+            result = evaluate_binary(op, va, vb)
+            return const(result) if result is not None else None
+        if op in SYMMETRIC_EQUAL and same(a, b):
+            return const(SYMMETRIC_EQUAL[op])
+
+        if op == 'ADD':
+            if vb == 0:
+                return copy(a)
+            if va == 0:
+                return copy(b)
+        elif op == 'SUB':
+            if vb == 0:
+                return copy(a)
+        elif op == 'MUL':
+            if va == 0 or vb == 0:
+                return const(0)
+            if vb == 1:
+                return copy(a)
+            if va == 1:
+                return copy(b)
+            if vb == -1:
+                return Instruction('NEG', dest, [a])
+            if _power_of_two(vb) is not None:
+                return Instruction('SHL', dest, [a, str(_power_of_two(vb))])
+            if _power_of_two(va) is not None:
+                return Instruction('SHL', dest, [b, str(_power_of_two(va))])
+        elif op == 'DIV':
+            if vb == 1:
+                return copy(a)
+            if _power_of_two(vb) is not None and nonneg.operand(a):
+                return Instruction('SAR', dest, [a, str(_power_of_two(vb))])
+        elif op == 'MOD':
+            if vb == 1:
+                return const(0)
+            if _power_of_two(vb) is not None and nonneg.operand(a):
+                return Instruction('BITAND', dest, [a, str(vb - 1)])
+        elif op in ('SHL', 'SAR'):
+            if vb == 0:
+                return copy(a)
+        elif op == 'BITAND':
+            if va == 0 or vb == 0:
+                return const(0)
+        return None
+
+    def _propagate_copies(self, func, def_counts):
+        """Replaces uses of single-definition temp copies by their source."""
+        mapping = {}
+        for instr in func.instructions():
+            if (instr.op == 'COPY' and is_temp(instr.dest) and is_temp(instr.args[0])
+                    and def_counts[instr.dest] == 1 and def_counts.get(instr.args[0], 0) == 1):
+                mapping[instr.dest] = instr.args[0]
+        if not mapping:
+            return False
+
+        def resolve(name):
+            while name in mapping:
+                name = mapping[name]
+            return name
+
+        for block in func.blocks:
+            kept = []
+            for instr in block.instructions:
+                if instr.op == 'COPY' and instr.dest in mapping:
+                    continue
+                instr.replace_uses({use: resolve(use) for use in instr.uses() if use in mapping})
+                kept.append(instr)
+            block.instructions = kept
+        return True
+
+
+class InductionVariableStrengthReduction(FunctionPass):
+    """
+    Replaces `i * k` inside a while loop by a running sum kept in a new
+    variable, where i is a basic induction variable of the loop and k is
+    a constant or a value computed before the loop.
+
+    A basic induction variable is a local stored exactly once in the loop,
+    by `i = i + c` or `i = i - c` with constant c. The running sum s is set
+    to i * k in the loop preheader and advanced by c * k right after the
+    store to i, so s == i * k holds everywhere in the loop and each
+    multiplication becomes a LOAD of s.
+
+    Multiplications by powers of two are left to AlgebraicSimplification,
+    which turns them into shifts that are cheaper than the extra store.
+    """
+
+    name = 'iv-strength-reduction'
+
+    def run_on_function(self, func, program):
+        changed = False
+        done = set()
+        while True:
+            loops = [loop for loop in self.analysis('loops', func) if loop.header not in done]
+            if not loops:
+                return changed
+            loop = loops[0]
+            done.add(loop.header)
+            if self._reduce(func, program, loop):
+                self.invalidate(func)
+                changed = True
+
+    def _induction_variables(self, func, program, loop, definitions, def_counts):
+        """Returns {var: (step, store block label, STORE instruction)} for the loop."""
+        stores = {}
+        for label in loop.blocks:
+            for instr in func.block_map[label].instructions:
+                var = instr.stored_var()
+                if var is not None:
+                    stores.setdefault(var, []).append((label, instr))
+
+        result = {}
+        for var, sites in stores.items():
+            if len(sites) != 1 or var in program.global_names:
+                continue
+            label, store = sites[0]
+            if store.op != 'STORE':
+                continue
+            update = definitions.get(store.args[0])
+            if update is None or update.op not in ('ADD', 'SUB'):
+                continue
+            loaded, step = update.args
+            loaded_def = definitions.get(loaded)
+            step_value = int(step) if is_int_constant(step) else None
+            step_def = definitions.get(step)
+            if step_value is None and step_def is not None and step_def.op == 'CONST' \
+                    and is_int_constant(step_def.args[0]):
+                step_value = int(step_def.args[0])
+            if loaded_def is None or loaded_def.op != 'LOAD' or loaded_def.args[0] != var:
+                continue
+            if step_value is None:
+                continue
+            if update.op == 'SUB':
+                step_value = -step_value
+            result[var] = (step_value, label, store)
+        return result
+
+    def _reduce(self, func, program, loop):
+        def_counts = definition_counts(func)
+        definitions = {}
+        defined_in_loop = set()
+        for block in func.blocks:
+            for instr in block.instructions:
+                if instr.dest is not None and def_counts[instr.dest] == 1:
+                    definitions[instr.dest] = instr
+                if block.label in loop.blocks and instr.dest is not None:
+                    defined_in_loop.add(instr.dest)
+
+        ivs = self._induction_variables(func, program, loop, definitions, def_counts)
+        if not ivs:
+            return False
+
+        # Find multiplications i * k where the LOAD of i is in the same block
+        # with no store to i in between
+        candidates = []
+        for label in loop.blocks:
+            block = func.block_map[label]
+            loaded = {}
+            for instr in block.instructions:
+                if instr.op == 'LOAD' and instr.args[0] in ivs:
+                    loaded[instr.dest] = instr.args[0]
+                elif instr.stored_var() is not None:
+                    loaded = {t: v for t, v in loaded.items() if v != instr.stored_var()}
+                elif instr.op == 'MUL':
+                    for iv_operand, factor in (instr.args, instr.args[::-1]):
+                        if iv_operand not in loaded:
+                            continue
+                        k = self._factor(factor, definitions, defined_in_loop, def_counts)
+                        if k is None:
+                            continue
+                        candidates.append((label, instr, loaded[iv_operand], k))
+                        break
+        if not candidates:
+            return False
+
+        preheader = insert_preheader(func, loop)
+        sums = {}
+        for label, instr, var, k in candidates:
+            key = (var, k)
+            if key not in sums:
+                sums[key] = self._create_sum(func, program, preheader, var, k, ivs[var])
+            instr.op = 'LOAD'
+            instr.args = [sums[key]]
+        return True
+
+    def _factor(self, operand, definitions, defined_in_loop, def_counts):
+        """Returns the multiplier as an int or an invariant temp, or None."""
+        if is_int_constant(operand):
+            value = int(operand)
+        else:
+            instr = definitions.get(operand)
+            if instr is not None and instr.op == 'CONST' and is_int_constant(instr.args[0]):
+                value = int(instr.args[0])
+            elif operand not in defined_in_loop and def_counts.get(operand) == 1:
+                return operand
+            else:
+                return None
+        if value in (0, 1, -1) or _power_of_two(value) is not None:
+            return None
+        return value
+
+    def _create_sum(self, func, program, preheader, var, factor, iv):
+        step, store_label, store = iv
+        name = program.new_variable(f"{var}_sr")
+        factor_operand = str(factor) if isinstance(factor, int) else factor
+
+        # s = i * k before the loop
+        current = func.new_temp()
+        product = func.new_temp()
+        preheader.instructions.extend([
+            Instruction('LOAD', current, [var]),
+            Instruction('MUL', product, [current, factor_operand]),
+            Instruction('STORE', args=[product, name]),
+        ])
+        if isinstance(factor, int):
+            increment = str(wrap_int32(step * factor))
+        else:
+            increment = func.new_temp()
+            preheader.instructions.append(Instruction('MUL', increment, [factor, str(step)]))
+
+        # s = s + c * k right after i = i + c
+        block = func.block_map[store_label]
+        position = block.instructions.index(store) + 1
+        loaded = func.new_temp()
+        advanced = func.new_temp()
+        block.instructions[position:position] = [
+            Instruction('LOAD', loaded, [name]),
+            Instruction('ADD', advanced, [loaded, increment]),
+            Instruction('STORE', args=[advanced, name]),
+        ]
+        return name
@@ -0,0 +1,155 @@
+"""
+This module renumbers temporaries so that temps whose live ranges do not
+overlap share a name.
+
+IntermediateCodeGenerator gives every subexpression a fresh temp, so the
+temp namespace grows with the size of the program although only a handful
+of temps are live at any point. Everything downstream that keeps a table
+per temp (liveness bitsets, stack slots in TargetCodeGenerator) pays for
+that. TempRenumbering shrinks the namespace to roughly the maximum number
+of simultaneously live temps:
+- Temps that are live across blocks are colored greedily over an
+  interference graph built from liveness
+- Temps that live inside one block, which is almost all of them, get
+  numbers from a free list that a temp returns its number to at its last
+  use (a linear scan over the block)
+- Temps holding string literals keep a number of their own, since the
+  target code generator substitutes them with their data labels
+
+Renumbered temps have several definitions, which makes them opaque to
+passes that look for single-definition constants, so this pass runs last.
+"""
+
+import heapq
+
+from ..dataflow import LiveValues, solve
+from ..ir import is_temp
+from .base import FunctionPass
+
+
+class TempRenumbering(FunctionPass):
+    """
+    Renames temps to t0, t1, ... reusing names whose live ranges are disjoint.
+    """
+
+    name = 'renumber-temps'
+
+    def run_on_function(self, func, program):
+        if any(block.phis() for block in func.blocks):
+            return False
+
+        strings = []
+        for instr in func.instructions():
+            if instr.op == 'CONST' and instr.args[0].startswith('"') and instr.dest not in strings:
+                strings.append(instr.dest)
+
+        liveness = solve(LiveValues(func))
+        across = 0
+        for bits in liveness.block_in.values():
+            across |= bits
+        pinned = set(strings)
+        cross = {name for name in liveness.index.to_set(across) if is_temp(name)} - pinned
+
+        numbers = self._color_cross_block(func, liveness, cross)
+        base = max(numbers.values(), default=-1) + 1
+        for offset, name in enumerate(strings):
+            numbers[name] = base + offset
+        base += len(strings)
+
+        renames = [self._scan_block(block, numbers, cross | pinned, base) for block in func.blocks]
+        changed = False
+        for block, mapping in zip(func.blocks, renames):
+            for instr, uses, dest in mapping:
+                if uses:
+                    instr.replace_uses(uses)
+                    changed = True
+                if dest is not None and dest != instr.dest:
+                    instr.dest = dest
+                    changed = True
+        return changed
+
+    def _color_cross_block(self, func, liveness, cross):
+        """Colors temps live across blocks; returns a map from temp to number."""
+        index = liveness.index
+        cross_mask = index.mask(cross)
+        neighbors = {name: set() for name in cross}
+        order = []
+        for block in func.blocks:
+            live = index.to_set(liveness.block_out[block.label] & cross_mask)
+            for instr in reversed(block.instructions):
+                dest = instr.dest
+                if dest in neighbors:
+                    for other in live:
+                        if other != dest:
+                            neighbors[dest].add(other)
+                            neighbors[other].add(dest)
+                    live.discard(dest)
+                for name in instr.uses():
+                    if name in neighbors:
+                        live.add(name)
+            for instr in block.instructions:
+                if instr.dest in neighbors:
+                    order.append(instr.dest)
+        # Temps that are read but never defined (none in practice) come last
+        seen = set()
+        order = [name for name in order if not (name in seen or seen.add(name))]
+        order.extend(sorted(cross - seen))
+
+        numbers = {}
+        for name in order:
+            taken = {numbers[other] for other in neighbors[name] if other in numbers}
+            number = 0
+            while number in taken:
+                number += 1
+            numbers[name] = number
+        return numbers
+
+    def _scan_block(self, block, numbers, fixed, base):
+        """
+        Assigns numbers to the block-local temps of one block.
+
+        Returns:
+            list: (instruction, uses mapping, new dest) for every instruction
+        """
+        last_use = {}
+        for i in range(len(block.instructions) - 1, -1, -1):
+            for name in block.instructions[i].uses():
+                if name not in fixed and name not in last_use:
+                    last_use[name] = i
+
+        free = []
+        top = base
+        current = {}
+        result = []
+        for i, instr in enumerate(block.instructions):
+            uses = {}
+            for name in instr.uses():
+                if name in fixed:
+                    uses[name] = f"t{numbers[name]}"
+                elif name in current:
+                    uses[name] = f"t{current[name]}"
+            for name in list(uses):
+                if name in current and last_use.get(name) == i:
+                    heapq.heappush(free, current.pop(name))
+
+            dest = instr.dest
+            if dest is not None and is_temp(dest):
+                if dest in fixed:
+                    dest = f"t{numbers[dest]}"
+                else:
+                    number = current.get(dest)
+                    if number is None:
+                        if free:
+                            number = heapq.heappop(free)
+                        else:
+                            number = top
+                            top += 1
+                    if last_use.get(dest, -1) > i:
+                        current[dest] = number
+                    else:
+                        # Never read again: the number is free right away
+                        current.pop(dest, None)
+                        heapq.heappush(free, number)
+                    dest = f"t{number}"
+            result.append((instr, {name: new for name, new in uses.items() if new != name}, dest))
+        return result
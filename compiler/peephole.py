@@ -0,0 +1,335 @@
+"""
+This module implements a peephole optimizer for the assembly produced by
+TargetCodeGenerator.
+
+The generator translates one TAC instruction at a time, so the seams
+between translations are full of redundancy that no single translation
+can see: a value stored to a slot and loaded straight back, a register
+loaded and then overwritten, a jump to the label that follows it. The
+optimizer parses the assembly into AsmLines, slides a window over the
+text section and applies a table of rewrite rules until none matches any
+more. Each rule counts its hits, so compile.py can report which rules fire.
+
+Rules only look at adjacent lines. A label ends most patterns (control
+may arrive there from elsewhere), so a rule of its own removes local
+labels that nothing jumps to. TargetCodeGenerator indents local labels
+and starts functions at column 0; function labels are always kept.
+"""
+
+import re
+
+# Names by which each general-purpose register can be accessed
+REGISTER_NAMES = {
+    'eax': {'rax', 'eax', 'ax', 'al', 'ah'},
+    'ebx': {'rbx', 'ebx', 'bx', 'bl', 'bh'},
+    'ecx': {'rcx', 'ecx', 'cx', 'cl', 'ch'},
+    'edx': {'rdx', 'edx', 'dx', 'dl', 'dh'},
+    'esi': {'rsi', 'esi', 'si', 'sil'},
+    'edi': {'rdi', 'edi', 'di', 'dil'},
+    'ebp': {'rbp', 'ebp', 'bp'},
+    'esp': {'rsp', 'esp', 'sp'},
+    'r8d': {'r8', 'r8d', 'r8w', 'r8b'},
+    'r9d': {'r9', 'r9d', 'r9w', 'r9b'},
+    'r10d': {'r10', 'r10d', 'r10w', 'r10b'},
+    'r11d': {'r11', 'r11d', 'r11w', 'r11b'},
+    'r12d': {'r12', 'r12d', 'r12w', 'r12b'},
+    'r13d': {'r13', 'r13d', 'r13w', 'r13b'},
+    'r14d': {'r14', 'r14d', 'r14w', 'r14b'},
+    'r15d': {'r15', 'r15d', 'r15w', 'r15b'}
+}
+
+# Conditional jumps and the jump taken on the opposite condition
+INVERSE_JUMPS = {
+    'je': 'jne', 'jne': 'je', 'jz': 'jnz', 'jnz': 'jz',
+    'jl': 'jge', 'jge': 'jl', 'jg': 'jle', 'jle': 'jg'
+}
+
+IDENTIFIER = re.compile(r'[A-Za-z_][A-Za-z0-9_.]*')
+
+
+class AsmLine:
+    """
+    One line of assembly.
+
+    Attributes:
+        label: Label the line defines, or None
+        local: True for labels inside a function
+        mnemonic: Instruction mnemonic or directive, or None
+        operands: Operand strings of the instruction
+        text: Verbatim text of labels and of lines outside the text section
+    """
+
+    def __init__(self, label=None, mnemonic=None, operands=None, text=None, local=False):
+        self.label = label
+        self.local = local
+        self.mnemonic = mnemonic
+        self.operands = operands or []
+        self.text = text
+
+    def __repr__(self):
+        return f"AsmLine({format_line(self)!r})"
+
+    def is_instruction(self):
+        return self.mnemonic is not None
+
+    def is_jump(self):
+        return self.mnemonic is not None and self.mnemonic.startswith('j')
+
+
+def parse_line(line, in_text=True):
+    """
+    Parses one line of assembly.
+
+    Args:
+        line: Line as emitted by TargetCodeGenerator
+        in_text: False for lines of the data section, which are kept verbatim
+
+    Returns:
+        AsmLine: Structured form of the line
+    """
+    stripped = line.strip()
+    if not in_text or not stripped or stripped.startswith('section'):
+        return AsmLine(text=line)
+    if stripped.endswith(':'):
+        return AsmLine(label=stripped[:-1], text=line, local=line.startswith(' '))
+    mnemonic, _, rest = stripped.partition(' ')
+    operands = [operand.strip() for operand in rest.split(',')] if rest else []
+    return AsmLine(mnemonic=mnemonic, operands=operands)
+
+
+def format_line(line):
+    """Formats an AsmLine back into assembly text."""
+    if line.mnemonic is None:
+        return line.text
+    if line.operands:
+        return f"    {line.mnemonic} {', '.join(line.operands)}"
+    return f"    {line.mnemonic}"
+
+
+def parse_assembly(lines):
+    """Parses assembly lines; only the text section is structured."""
+    result = []
+    in_text = False
+    for line in lines:
+        stripped = line.strip()
+        if stripped.startswith('section'):
+            in_text = stripped == 'section .text'
+        result.append(parse_line(line, in_text))
+    return result
+
+
+def is_register(operand):
+    return operand in REGISTER_NAMES
+
+
+def is_memory(operand):
+    return '[' in operand
+
+
+def mentions(operand, register):
+    """Returns True if an operand reads any part of a register."""
+    names = REGISTER_NAMES[register]
+    return any(word in names for word in IDENTIFIER.findall(operand))
+
+
+def _is_mov(line, dest=None):
+    return line.mnemonic == 'mov' and len(line.operands) == 2 and (
+        dest is None or line.operands[0] == dest)
+
+
+class PeepholeRule:
+    """
+    A rewrite rule over a window of adjacent lines.
+
+    Attributes:
+        name: Name shown in the hit report
+        size: Number of lines the rule looks at
+        rewrite: Function taking the window (a list of AsmLines) and the
+            optimizer, returning the replacement lines or None if the rule
+            does not apply
+    """
+
+    def __init__(self, name, size, rewrite):
+        self.name = name
+        self.size = size
+        self.rewrite = rewrite
+
+
+def _self_move(window, optimizer):
+    # mov eax, eax
+    line = window[0]
+    if _is_mov(line) and line.operands[0] == line.operands[1]:
+        return []
+    return None
+
+
+def _overwritten_move(window, optimizer):
+    # mov eax, X / mov eax, Y  ->  mov eax, Y   (Y does not read eax)
+    first, second = window
+    if not _is_mov(first) or not is_register(first.operands[0]):
+        return None
+    register = first.operands[0]
+    if second.mnemonic in ('mov', 'movzx', 'lea') and len(second.operands) == 2:
+        if second.operands[0] == register and not mentions(second.operands[1], register):
+            return [second]
+    return None
+
+
+def _store_load(window, optimizer):
+    # mov [m], eax / mov ebx, [m]  ->  mov [m], eax / mov ebx, eax
+    first, second = window
+    if not (_is_mov(first) and _is_mov(second)):
+        return None
+    memory, register = first.operands
+    if not is_memory(memory) or not is_register(register) or second.operands[1] != memory:
+        return None
+    if second.operands[0] == register:
+        return [first]
+    return [first, AsmLine(mnemonic='mov', operands=[second.operands[0], register])]
+
+
+def _load_store(window, optimizer):
+    # mov eax, [m] / mov [m], eax  ->  mov eax, [m]
+    first, second = window
+    if not (_is_mov(first) and _is_mov(second)):
+        return None
+    register, memory = first.operands
+    if is_register(register) and is_memory(memory) and second.operands == [memory, register]:
+        return [first]
+    return None
+
+
+def _jump_to_next(window, optimizer):
+    # jmp L0 / L0:  ->  L0:
+    jump, label = window
+    if jump.is_jump() and label.label is not None and jump.operands == [label.label]:
+        return [label]
+    return None
+
+
+def _branch_over_jump(window, optimizer):
+    # jz L0 / jmp L1 / L0:  ->  jnz L1 / L0:
+    branch, jump, label = window
+    if (branch.mnemonic in INVERSE_JUMPS and jump.mnemonic == 'jmp' and
+            label.label is not None and branch.operands == [label.label]):
+        return [AsmLine(mnemonic=INVERSE_JUMPS[branch.mnemonic], operands=jump.operands), label]
+    return None
+
+
+def _unreachable(window, optimizer):
+    # jmp L0 / <anything but a label>  ->  jmp L0
+    first, second = window
+    if first.mnemonic in ('jmp', 'ret') and second.is_instruction():
+        return [first]
+    return None
+
+
+def _unused_label(window, optimizer):
+    line = window[0]
+    if line.local and line.label not in optimizer.references:
+        return []
+    return None
+
+
+def _push_pop_stack(window, optimizer):
+    # push X / add esp, 4  ->  (nothing)
+    first, second = window
+    if first.mnemonic == 'push' and second.mnemonic == 'add' and second.operands == ['esp', '4']:
+        return []
+    return None
+
+
+def _merge_stack_adjustments(window, optimizer):
+    # add esp, 8 / add esp, 4  ->  add esp, 12
+    first, second = window
+    if (first.mnemonic == 'add' and second.mnemonic == 'add' and
+            first.operands[0] == 'esp' and second.operands[0] == 'esp' and
+            first.operands[1].isdigit() and second.operands[1].isdigit()):
+        total = int(first.operands[1]) + int(second.operands[1])
+        return [AsmLine(mnemonic='add', operands=['esp', str(total)])]
+    return None
+
+
+RULES = [
+    PeepholeRule('self-move', 1, _self_move),
+    PeepholeRule('unused-label', 1, _unused_label),
+    PeepholeRule('overwritten-move', 2, _overwritten_move),
+    PeepholeRule('store-load', 2, _store_load),
+    PeepholeRule('load-store', 2, _load_store),
+    PeepholeRule('jump-to-next', 2, _jump_to_next),
+    PeepholeRule('unreachable', 2, _unreachable),
+    PeepholeRule('push-add-esp', 2, _push_pop_stack),
+    PeepholeRule('merge-add-esp', 2, _merge_stack_adjustments),
+    PeepholeRule('branch-over-jump', 3, _branch_over_jump)
+]
+
+
+class PeepholeOptimizer:
+    """
+    Applies the peephole rules to assembly until it stops changing.
+
+    Attributes:
+        rules: PeepholeRules tried in order at every position
+        hits: Maps rule names to the number of times they rewrote code
+        references: Names used as operands anywhere in the code; labels
+            outside this set are unused
+    """
+
+    def __init__(self, rules=None):
+        self.rules = list(RULES if rules is None else rules)
+        self.hits = {rule.name: 0 for rule in self.rules}
+        self.references = set()
+
+    def optimize(self, target_code):
+        """
+        Optimizes assembly lines.
+
+        Args:
+            target_code: Assembly lines from TargetCodeGenerator
+
+        Returns:
+            list: Optimized assembly lines
+        """
+        lines = parse_assembly(target_code)
+        changed = True
+        while changed:
+            self.references = {name for line in lines for operand in line.operands
+                               for name in IDENTIFIER.findall(operand)}
+            changed = self._sweep(lines)
+        return [format_line(line) for line in lines]
+
+    def _sweep(self, lines):
+        """Slides the window over the lines once; returns True on any rewrite."""
+        changed = False
+        longest = max((rule.size for rule in self.rules), default=1)
+        i = 0
+        while i < len(lines):
+            for rule in self.rules:
+                window = lines[i:i + rule.size]
+                if len(window) < rule.size or any(
+                        line.mnemonic is None and line.label is None for line in window):
+                    continue
+                replacement = rule.rewrite(window, self)
+                if replacement is not None:
+                    lines[i:i + rule.size] = replacement
+                    self.hits[rule.name] += 1
+                    changed = True
+                    # An earlier window may match now
+                    i = max(i - longest + 1, 0)
+                    break
+            else:
+                i += 1
+        return changed
+
+    def report(self):
+        """
+        Formats the rule hit counters.
+
+        Returns:
+            list: Lines of the report
+        """
+        lines = ["===== Peephole rule hits ====="]
+        for rule in self.rules:
+            lines.append(f"{self.hits[rule.name]:8d}  {rule.name}")
+        lines.append(f"{sum(self.hits.values()):8d}  Total")
+        return lines
@@ -0,0 +1,641 @@
+"""
+This module implements register allocation for TargetCodeGenerator.
+
+The candidates are a function's temps and local variables. Before
+allocation, every candidate is split into webs: maximal groups of
+definitions and uses connected through reaching definitions. A temp name
+that TempRenumbering reused for unrelated values, or a local that is
+reassigned, then becomes one allocation unit per independent value. A web
+whose only definition is a constant needs no storage at all: its uses
+become immediates.
+
+Two allocators share that preparation:
+
+LinearScanAllocator (Poletto and Sarkar) numbers the instructions in
+layout order with two positions each: 2i is where instruction i reads its
+operands and 2i+1 where it writes its result, so a value read by an
+instruction can share a register with the value the instruction defines.
+An interval is the hull of a web's definitions, uses and the blocks it is
+live into or out of; lifetime holes are not modeled. Intervals are
+visited by start position, and when no register is free the one with
+the lowest spill cost goes to a stack slot.
+
+GraphColoringAllocator (Chaitin-Briggs) builds an interference graph from
+liveness, which does model holes. It first coalesces the webs connected
+by COPY, LOAD and STORE, which the IR generator emits as chains like
+`t1 = LOAD x; ...; STORE t2, x`, whenever the Briggs test shows the
+merged node stays colorable and both halves agree on whether they live
+across a call. Then it simplifies the graph, optimistically
+pushing spill candidates, and colors it, preferring the register of a
+move partner.
+
+StackAllocator assigns no registers at all and keeps every web in a stack
+slot.
+
+Spill costs are the uses and definitions of a web, weighted by 10 per
+enclosing loop, relative to the interval length (linear scan) or the
+node degree (graph coloring).
+
+Register conventions (32-bit):
+- eax and edx are scratch registers of the code generator (idiv needs both)
+- ebx, esi and edi are callee-saved; a function that uses them saves them
+  in its prologue
+- ecx is caller-saved: printf and calls clobber it, so a value kept in ecx
+  across a call is pushed and popped around the call. Values that live
+  across calls therefore prefer the callee-saved registers
+
+Register conventions (x86-64, System V):
+- eax, ecx and edx are scratch registers of the code generator, and edi,
+  esi, edx, ecx, r8d and r9d carry call arguments, so none of them holds
+  a value across instructions
+- ebx and r12d-r15d are callee-saved
+- r10d and r11d are caller-saved: printf, the buffered PRINT runtime and
+  calls clobber them
+"""
+
+import heapq
+from bisect import bisect_left
+
+from .cfg import find_natural_loops
+from .dataflow import LiveValues, LiveVariables, ReachingDefinitions, iter_bits, solve
+
+CALLEE_SAVED = ['ebx', 'esi', 'edi']
+CALLER_SAVED = ['ecx']
+
+X86_64_CALLEE_SAVED = ['ebx', 'r12d', 'r13d', 'r14d', 'r15d']
+X86_64_CALLER_SAVED = ['r10d', 'r11d']
+
+# (caller-saved, callee-saved) registers of each target
+CONVENTIONS = {
+    'x86': (CALLER_SAVED, CALLEE_SAVED),
+    'x86-64': (X86_64_CALLER_SAVED, X86_64_CALLEE_SAVED)
+}
+
+# Instructions after which the caller-saved registers no longer hold their values
+CALL_OPS = {'CALL', 'PRINT'}
+
+# Instructions that copy one web into another
+MOVE_OPS = {'COPY', 'LOAD', 'STORE'}
+
+
+def move_operands(instr):
+    """Returns (dest, source) names of a COPY, LOAD or STORE."""
+    if instr.op == 'STORE':
+        return instr.args[1], instr.args[0]
+    return instr.dest, instr.args[0]
+
+
+class LiveInterval:
+    """
+    The live range of one web.
+
+    Attributes:
+        name: Name of the web
+        start: First position at which the web is live
+        end: Last position at which the web is live
+        weight: Uses and definitions weighted by loop depth
+        crosses_call: True if the web is live across a CALL or PRINT
+        register: Assigned register, or None if the web is spilled
+    """
+
+    def __init__(self, name, start, end):
+        self.name = name
+        self.start = start
+        self.end = end
+        self.weight = 0
+        self.crosses_call = False
+        self.register = None
+
+    def __repr__(self):
+        return f"LiveInterval({self.name}, {self.start}-{self.end}, {self.register})"
+
+    def spill_cost(self):
+        return self.weight / (self.end - self.start + 1)
+
+
+class RegisterAllocation:
+    """
+    Result of allocating registers for one function.
+
+    Attributes:
+        assignment: Maps webs to their register, or to None if they live in
+            a stack slot; coalesced webs appear under their representative
+        aliases: Maps coalesced webs to their representative
+        constants: Maps webs defined by a single CONST to the literal
+        params: Maps parameter names to the web holding their incoming value
+        call_saves: Maps id() of CALL/PRINT instructions to the caller-saved
+            registers that must be preserved around them
+        callee_saved: Callee-saved registers the function uses
+    """
+
+    def __init__(self):
+        self.assignment = {}
+        self.aliases = {}
+        self.constants = {}
+        self.params = {}
+        self.call_saves = {}
+        self.callee_saved = []
+
+    def home(self, name):
+        """Returns the web that stands for name after coalescing."""
+        return self.aliases.get(name, name)
+
+    def register(self, name):
+        """Returns the register of a web, or None if it lives in memory."""
+        return self.assignment.get(self.home(name))
+
+    def spilled(self):
+        """Returns the webs that need a stack slot."""
+        return [name for name, register in self.assignment.items() if register is None]
+
+
+class RegisterAllocator:
+    """
+    Base class of the allocators: splits candidates into webs and works out
+    which caller-saved registers must survive each call.
+
+    Subclasses implement _assign(), which fills allocation.assignment.
+
+    Attributes:
+        caller_saved: Allocatable registers that calls clobber
+        callee_saved: Allocatable registers that calls preserve
+        registers: Allocatable registers in order of preference
+        live: (live_in, live_out) of the function being allocated: block
+            labels to the sets of nodes live there
+    """
+
+    def __init__(self, registers=None, target='x86'):
+        self.caller_saved, self.callee_saved = CONVENTIONS[target]
+        self.registers = registers or self.caller_saved + self.callee_saved
+        self.live = None
+
+    def allocate(self, func, global_names=()):
+        """
+        Splits the candidates of a function into webs and allocates them.
+
+        The instructions of func are renamed in place so that every web has
+        a name of its own.
+
+        Args:
+            func: Function CFG, not in SSA form
+            global_names: Variables that live in the data section
+
+        Returns:
+            RegisterAllocation: Locations of the webs
+        """
+        allocation = RegisterAllocation()
+        globals_ = set(global_names)
+        params = func.params
+        candidates = set(params)
+        for instr in func.instructions():
+            if instr.dest is not None:
+                candidates.add(instr.dest)
+            var = instr.loaded_var() or instr.stored_var()
+            if var is not None and var not in globals_:
+                candidates.add(var)
+
+        webs = self._build_webs(func, candidates, params, allocation)
+        nodes = webs - set(allocation.constants)
+        self.live = self._liveness(func, nodes)
+        self._assign(func, nodes, allocation)
+        self._find_call_saves(func, nodes, allocation)
+        used = set(allocation.assignment.values())
+        allocation.callee_saved = [register for register in self.callee_saved if register in used]
+        return allocation
+
+    def _assign(self, func, nodes, allocation):
+        raise NotImplementedError
+
+    def _build_webs(self, func, candidates, params, allocation):
+        """
+        Renames every candidate occurrence after its web.
+
+        Returns:
+            set: Names of all webs
+        """
+        problem = ReachingDefinitions(func, entry_defs=sorted(candidates))
+        result = solve(problem)
+        ids = problem.index.ids
+        parent = list(range(len(problem.index)))
+
+        def find(site):
+            while parent[site] != site:
+                parent[site] = parent[parent[site]]
+                site = parent[site]
+            return site
+
+        # Each use joins the webs of all definitions reaching it
+        occurrences = []
+        for block in func.blocks:
+            reaching = result.block_in[block.label]
+            current = {}
+            for i, instr in enumerate(block.instructions):
+                used = [name for name in instr.uses() if name in candidates]
+                var = instr.loaded_var()
+                if var in candidates:
+                    used.append(var)
+                for name in used:
+                    bits = current.get(name)
+                    if bits is None:
+                        bits = reaching & problem.definitions.get(name, 0)
+                    sites = list(iter_bits(bits)) or [ids[(None, -1, name)]]
+                    for site in sites[1:]:
+                        parent[find(site)] = find(sites[0])
+                    occurrences.append((instr, 'use', name, sites[0]))
+                defined = [instr.dest] if instr.dest in candidates else []
+                var = instr.stored_var()
+                if var in candidates:
+                    defined.append(var)
+                for name in defined:
+                    site = ids[(block.label, i, name)]
+                    current[name] = 1 << site
+                    occurrences.append((instr, 'def', name, site))
+
+        webs = {}
+        counts = {}
+        for _, _, name, site in occurrences:
+            root = find(site)
+            if root not in webs:
+                webs[root] = (name, counts.get(name, 0))
+                counts[name] = counts.get(name, 0) + 1
+
+        def web_name(name, site):
+            base, number = webs[find(site)]
+            return base if counts[base] == 1 else f"{base}.{number}"
+
+        for name in params:
+            site = ids[(None, -1, name)]
+            if find(site) in webs:
+                allocation.params[name] = web_name(name, site)
+
+        defs = {}
+        names = set(allocation.params.values())
+        for instr, kind, name, site in occurrences:
+            new = web_name(name, site)
+            names.add(new)
+            if kind == 'use':
+                if instr.op == 'LOAD' and instr.args[0] == name:
+                    instr.args[0] = new
+                else:
+                    instr.replace_uses({name: new})
+            else:
+                if instr.dest == name:
+                    instr.dest = new
+                elif instr.op == 'STORE':
+                    instr.args[1] = new
+                else:
+                    instr.args[0] = new
+                defs.setdefault(new, []).append(instr)
+
+        for name, instrs in defs.items():
+            if len(instrs) == 1 and instrs[0].op == 'CONST' and name not in allocation.params.values():
+                allocation.constants[name] = instrs[0].args[0]
+        return names
+
+    def _reads(self, block):
+        """
+        Returns the names each instruction of a block reads. Arguments are
+        read by the CALL, where the code generator consumes them, rather
+        than by their ARG instructions.
+        """
+        reads = []
+        pending_args = []
+        for instr in block.instructions:
+            names = list(instr.uses())
+            var = instr.loaded_var()
+            if var is not None:
+                names.append(var)
+            if instr.op == 'ARG':
+                pending_args.extend(names)
+                names = []
+            elif instr.op == 'CALL':
+                names.extend(pending_args)
+                pending_args = []
+            reads.append(names)
+        return reads
+
+    def _defined(self, instr):
+        names = [instr.dest] if instr.dest is not None else []
+        var = instr.stored_var()
+        if var is not None:
+            names.append(var)
+        return names
+
+    def _loop_weights(self, func):
+        """Maps block labels to 10 ** (number of enclosing loops)."""
+        depth = {}
+        for loop in find_natural_loops(func):
+            for label in loop.blocks:
+                depth[label] = depth.get(label, 0) + 1
+        return {block.label: 10 ** min(depth.get(block.label, 0), 6) for block in func.blocks}
+
+    def _liveness(self, func, nodes):
+        """
+        Returns (live_in, live_out): block labels to sets of nodes. The
+        bitsets are masked down to the nodes before they become sets.
+        """
+        live_in = {block.label: set() for block in func.blocks}
+        live_out = {block.label: set() for block in func.blocks}
+        for result in (solve(LiveValues(func)), solve(LiveVariables(func))):
+            to_set = result.index.to_set
+            mask = result.index.mask(nodes)
+            for block in func.blocks:
+                live_in[block.label] |= to_set(result.block_in[block.label] & mask)
+                live_out[block.label] |= to_set(result.block_out[block.label] & mask)
+        return live_in, live_out
+
+    def _find_call_saves(self, func, nodes, allocation):
+        _, live_out = self.live
+        for block in func.blocks:
+            live = set(live_out[block.label])
+            for instr, reads in zip(reversed(block.instructions), reversed(self._reads(block))):
+                defined = self._defined(instr)
+                if instr.op in CALL_OPS:
+                    saves = {allocation.register(name) for name in live if name not in defined}
+                    saves &= set(self.caller_saved)
+                    if saves:
+                        allocation.call_saves[id(instr)] = sorted(saves)
+                live.difference_update(defined)
+                live.update(name for name in reads if name in nodes)
+
+    def _choose(self, crosses_call, available, hint=None):
+        """Picks a register, preferring callee-saved ones for values live across calls."""
+        if not available:
+            return None
+        if hint in available and not (crosses_call and hint in self.caller_saved):
+            return hint
+        preferred = self.callee_saved if crosses_call else self.caller_saved
+        for register in self.registers:
+            if register in preferred and register in available:
+                return register
+        return next(register for register in self.registers if register in available)
+
+
+class LinearScanAllocator(RegisterAllocator):
+    """
+    Assigns registers by a linear scan over live intervals.
+    """
+
+    def _assign(self, func, nodes, allocation):
+        positions, intervals = self._build_intervals(func, nodes, allocation)
+        self._mark_calls(positions, intervals)
+        ordered = sorted(intervals.values(), key=lambda i: (i.start, i.end))
+        self._scan(ordered)
+        for interval in ordered:
+            allocation.assignment[interval.name] = interval.register
+
+    def _build_intervals(self, func, nodes, allocation):
+        """
+        Numbers the instructions and computes one interval per web.
+
+        Returns:
+            tuple: (positions, intervals) where positions maps instructions
+            to their read position and intervals maps web names to
+            LiveIntervals
+        """
+        intervals = {}
+
+        def touch(name, position, weight):
+            if name not in nodes:
+                return
+            interval = intervals.get(name)
+            if interval is None:
+                interval = intervals[name] = LiveInterval(name, position, position)
+            else:
+                interval.start = min(interval.start, position)
+                interval.end = max(interval.end, position)
+            interval.weight += weight
+
+        # Incoming parameters are defined before the first instruction
+        for web in allocation.params.values():
+            touch(web, -1, 1)
+
+        loop_weights = self._loop_weights(func)
+        positions = {}
+        position = 0
+        ranges = {}
+        for block in func.blocks:
+            first = position
+            weight = loop_weights[block.label]
+            for instr, reads in zip(block.instructions, self._reads(block)):
+                positions[instr] = position
+                for name in reads:
+                    touch(name, position, weight)
+                for name in self._defined(instr):
+                    touch(name, position + 1, weight)
+                position += 2
+            if position > first:
+                ranges[block.label] = (first, position - 1)
+
+        live_in, live_out = self.live
+        for label, (first, last) in ranges.items():
+            for name in live_in[label]:
+                if name in intervals:
+                    intervals[name].start = min(intervals[name].start, first)
+            for name in live_out[label]:
+                if name in intervals:
+                    intervals[name].end = max(intervals[name].end, last)
+        return positions, intervals
+
+    def _mark_calls(self, positions, intervals):
+        calls = sorted(position for instr, position in positions.items() if instr.op in CALL_OPS)
+        for interval in intervals.values():
+            # A call at p crosses the interval if start < p and p + 1 < end
+            i = bisect_left(calls, interval.start + 1)
+            interval.crosses_call = i < len(calls) and calls[i] + 1 < interval.end
+
+    def _scan(self, intervals):
+        free = list(self.registers)
+        active = []
+        for current in intervals:
+            for interval in list(active):
+                if interval.end < current.start:
+                    active.remove(interval)
+                    free.append(interval.register)
+
+            register = self._choose(current.crosses_call, free)
+            if register is not None:
+                free.remove(register)
+                current.register = register
+                active.append(current)
+                continue
+
+            victim = min(active + [current], key=LiveInterval.spill_cost)
+            if victim is not current:
+                current.register = victim.register
+                victim.register = None
+                active.remove(victim)
+                active.append(current)
+
+
+class GraphColoringAllocator(RegisterAllocator):
+    """
+    Assigns registers by coloring an interference graph (Chaitin-Briggs
+    with conservative coalescing and optimistic spilling).
+    """
+
+    def _assign(self, func, nodes, allocation):
+        graph, moves, weights, crossing = self._build_graph(func, nodes, allocation)
+        k = len(self.registers)
+        self._coalesce(graph, moves, weights, crossing, allocation.aliases, k)
+
+        partners = {name: set() for name in graph}
+        for dest, source in moves:
+            dest, source = allocation.home(dest), allocation.home(source)
+            if dest != source and dest in graph and source in graph:
+                partners[dest].add(source)
+                partners[source].add(dest)
+
+        colors = {}
+        for name in self._simplify(graph, weights, k):
+            taken = {colors[other] for other in graph[name] if other in colors}
+            available = [register for register in self.registers if register not in taken]
+            hints = [colors[partner] for partner in partners[name] if partner in colors]
+            colors[name] = self._choose(crossing.get(name, False), available, hints[0] if hints else None)
+        for name in sorted(graph):
+            allocation.assignment[name] = colors[name]
+
+    def _build_graph(self, func, nodes, allocation):
+        """
+        Builds the interference graph by walking every block backwards from
+        its live-out set. A definition interferes with everything live
+        after it, except the source of a move, which may share its register.
+
+        Returns:
+            tuple: (graph, moves, weights, crossing) where graph maps nodes
+            to sets of neighbors, moves lists (dest, source) pairs, weights
+            maps nodes to their loop-weighted occurrence counts and crossing
+            marks nodes live across a call
+        """
+        graph = {name: set() for name in nodes}
+        moves = []
+        weights = dict.fromkeys(nodes, 0)
+        crossing = {}
+        loop_weights = self._loop_weights(func)
+        live_in, live_out = self.live
+        for block in func.blocks:
+            weight = loop_weights[block.label]
+            live = set(live_out[block.label])
+            for instr, reads in zip(reversed(block.instructions), reversed(self._reads(block))):
+                defined = [name for name in self._defined(instr) if name in nodes]
+                source = None
+                if instr.op in MOVE_OPS:
+                    dest, source = move_operands(instr)
+                    if dest in nodes and source in nodes:
+                        moves.append((dest, source))
+                if instr.op in CALL_OPS:
+                    for name in live:
+                        if name not in defined:
+                            crossing[name] = True
+                for name in defined:
+                    weights[name] += weight
+                    for other in live:
+                        if other != name and other != source:
+                            graph[name].add(other)
+                            graph[other].add(name)
+                live.difference_update(defined)
+                for name in reads:
+                    if name in nodes:
+                        weights[name] += weight
+                        live.add(name)
+
+        # Parameters and other values live on entry are all defined at once
+        entry = sorted(live_in[func.entry.label] | set(allocation.params.values()) & nodes)
+        for i, name in enumerate(entry):
+            weights[name] += 1
+            for other in entry[i + 1:]:
+                graph[name].add(other)
+                graph[other].add(name)
+        return graph, moves, weights, crossing
+
+    def _coalesce(self, graph, moves, weights, crossing, aliases, k):
+        """Merges move-related nodes while the Briggs test allows it."""
+        def home(name):
+            while name in aliases:
+                name = aliases[name]
+            return name
+
+        changed = True
+        while changed:
+            changed = False
+            for dest, source in moves:
+                a, b = home(dest), home(source)
+                if a == b or b in graph[a]:
+                    continue
+                if crossing.get(a, False) != crossing.get(b, False):
+                    # The merged node would need a callee-saved register or
+                    # a save around every call for its shorter half as well
+                    continue
+                neighbors = graph[a] | graph[b]
+                significant = sum(1 for n in neighbors
+                                  if len(graph[n]) - (n in graph[a] and n in graph[b]) >= k)
+                if significant >= k:
+                    continue
+                # Merge b into a
+                for n in graph.pop(b):
+                    graph[n].discard(b)
+                    graph[n].add(a)
+                    graph[a].add(n)
+                weights[a] += weights.pop(b)
+                crossing[a] = crossing.get(a, False) or crossing.pop(b, False)
+                aliases[b] = a
+                changed = True
+        for name in list(aliases):
+            aliases[name] = home(name)
+
+    def _simplify(self, graph, weights, k):
+        """
+        Removes nodes of degree < k, cheapest first, or the cheapest spill
+        candidate when none is left, and returns the nodes in coloring
+        order, so that the most used nodes pick their registers first.
+        """
+        degree = {name: len(neighbors) for name, neighbors in graph.items()}
+        removed = set()
+        stack = []
+        low = [(weights[name], name) for name in graph if degree[name] < k]
+        heapq.heapify(low)
+        remaining = set(graph)
+        while remaining:
+            if low:
+                _, name = heapq.heappop(low)
+                if name in removed:
+                    continue
+            else:
+                name = min(sorted(remaining),
+                           key=lambda n: weights[n] / (degree[n] + 1))
+            removed.add(name)
+            remaining.discard(name)
+            stack.append(name)
+            for other in graph[name]:
+                if other not in removed:
+                    degree[other] -= 1
+                    if degree[other] == k - 1:
+                        heapq.heappush(low, (weights[other], other))
+        stack.reverse()
+        return stack
+
+
+class StackAllocator(RegisterAllocator):
+    """
+    Keeps every web in a stack slot. Webs still matter: constant webs
+    become immediates and independent values of a name get slots of their
+    own.
+    """
+
+    def _assign(self, func, nodes, allocation):
+        for name in sorted(nodes):
+            allocation.assignment[name] = None
+
+
+def allocator_for_level(level, target='x86'):
+    """
+    Returns the register allocator used at an optimization level: linear
+    scan compiles fastest, graph coloring is used at -O2.
+
+    Args:
+        level: Optimization level (0, 1 or 2)
+        target: 'x86' or 'x86-64', whose register conventions to follow
+    """
+    if level >= 2:
+        return GraphColoringAllocator(target=target)
+    return LinearScanAllocator(target=target)
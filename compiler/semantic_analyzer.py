@@ -314,4 +314,37 @@ class SemanticAnalyzer:
         Returns:
             str: Type of the contained expression
         """
-        return self.visit(node['expression'])
\ No newline at end of file
+        return self.visit(node['expression'])
+    
+    def visit_call_expression(self, node):
+        """
+        Analyzes function calls. Checks that the callee is a declared
+        function and that the arguments match its parameters.
+        
+        Args:
+            node: Call expression AST node
+            
+        Returns:
+            str: Return type of the called function
+            
+        Raises:
+            TypeError: If the callee is not a function, the argument count
+                differs from the parameter count or an argument type is
+                incompatible with its parameter
+        """
+        symbol = self.symbol_table.lookup(node['callee'])
+        if symbol['type'] != 'function':
+            raise TypeError(f"'{node['callee']}' is not a function")
+        
+        parameters = symbol['value']['parameters']
+        if len(node['arguments']) != len(parameters):
+            raise TypeError(f"Function '{node['callee']}' expects {len(parameters)} "
+                            f"arguments, got {len(node['arguments'])}")
+        
+        for arg, param in zip(node['arguments'], parameters):
+            arg_type = self.visit(arg)
+            if param['type'] in ['int', 'float'] and arg_type not in ['int', 'float']:
+                raise TypeError(f"Cannot pass {arg_type} as {param['type']} parameter "
+                                f"'{param['name']}' of '{node['callee']}'")
+        
+        return symbol['value']['return_type']
@@ -0,0 +1,456 @@
+"""
+This module converts function CFGs into static single assignment (SSA) form
+and back.
+
+Construction follows Cytron et al.: the LOAD/STORE traffic on local
+variables is rewritten into copies between versioned names (x.1, x.2, ...),
+PHIs are placed on the iterated dominance frontiers of each variable's
+definitions (semi-pruned, so only names live across blocks get PHIs), and
+a walk over the dominator tree renames every definition and use.
+
+Destruction splits critical edges, replaces PHIs with sequentialized
+parallel copies in the predecessors, coalesces copy-related versions of
+the same variable whose live ranges do not interfere, and lowers the
+result back to the plain STORE/LOAD/copy TAC understood by the rest of
+the compiler.
+"""
+
+import re
+
+from .cfg import (BasicBlock, build_program, compute_dominators,
+                  dominance_frontiers, dominator_tree, remove_unreachable_blocks)
+from .ir import Instruction, is_constant
+from .liveness import compute_liveness
+
+SSA_NAME_PATTERN = re.compile(r'(.+)\.(\d+)$')
+
+
+def base_name(name):
+    """Returns the original name of an SSA version (x.3 -> x)."""
+    match = SSA_NAME_PATTERN.match(name)
+    return match.group(1) if match else name
+
+
+def _promotable_names(func, global_names):
+    """
+    Returns the names that SSA construction renames: local variables accessed
+    through LOAD/STORE plus temporaries that are assigned more than once.
+    """
+    variables = set(func.params)
+    def_counts = {}
+    for instr in func.instructions():
+        var = instr.loaded_var() or instr.stored_var()
+        if var is not None:
+            variables.add(var)
+        if instr.dest is not None:
+            def_counts[instr.dest] = def_counts.get(instr.dest, 0) + 1
+    variables -= set(global_names)
+    temps = {name for name, count in def_counts.items() if count > 1}
+    return variables, temps
+
+
+def construct_ssa(func, global_names=()):
+    """
+    Rewrites a function into SSA form in place.
+
+    Local variables become versioned values: STORE v, x turns into
+    x.N = v and t = LOAD x turns into t = x.N. Globals keep their memory
+    semantics because other functions may observe them.
+
+    Args:
+        func: Function CFG to convert
+        global_names: Names of program-level variables, left in memory
+    """
+    remove_unreachable_blocks(func)
+    variables, temps = _promotable_names(func, global_names)
+    names = variables | temps
+
+    # Turn memory accesses on promotable variables into copies
+    for block in func.blocks:
+        for i, instr in enumerate(block.instructions):
+            if instr.op == 'STORE' and instr.args[1] in variables:
+                block.instructions[i] = Instruction('COPY', instr.args[1], [instr.args[0]])
+            elif instr.op == 'LOAD' and instr.args[0] in variables:
+                block.instructions[i] = Instruction('COPY', instr.dest, [instr.args[0]])
+            elif instr.op == 'DECLARE' and instr.args[0] in variables:
+                instr.dest = instr.args[0]
+
+    idom = compute_dominators(func)
+    frontiers = dominance_frontiers(func, idom)
+    _place_phis(func, names, frontiers)
+    _rename(func, names, idom)
+
+    for block in func.blocks:
+        for instr in block.instructions:
+            if instr.op == 'DECLARE' and instr.dest is not None:
+                instr.args[0] = instr.dest
+
+
+def _place_phis(func, names, frontiers):
+    def_blocks = {name: set() for name in names}
+    live_across = set()
+    for block in func.blocks:
+        defined = set()
+        for instr in block.instructions:
+            for use in instr.uses():
+                if use in names and use not in defined:
+                    live_across.add(use)
+            if instr.dest in names:
+                defined.add(instr.dest)
+                def_blocks[instr.dest].add(block.label)
+
+    for name in sorted(live_across):
+        worklist = list(def_blocks[name])
+        has_phi = set()
+        while worklist:
+            label = worklist.pop()
+            for frontier in frontiers.get(label, ()):
+                if frontier in has_phi:
+                    continue
+                has_phi.add(frontier)
+                block = func.block_map[frontier]
+                phi = Instruction('PHI', name, [name] * len(block.preds), block.preds)
+                block.instructions.insert(0, phi)
+                if frontier not in def_blocks[name]:
+                    worklist.append(frontier)
+
+
+def _rename(func, names, idom):
+    counters = {name: 0 for name in names}
+    stacks = {name: [] for name in names}
+    children = dominator_tree(idom)
+
+    def current(name):
+        stack = stacks[name]
+        return stack[-1] if stack else f"{name}.0"
+
+    # Iterative dominator tree walk: ('enter', label) / ('exit', pushed names)
+    work = [('enter', func.entry.label)]
+    while work:
+        action, payload = work.pop()
+        if action == 'exit':
+            for name in payload:
+                stacks[name].pop()
+            continue
+
+        block = func.block_map[payload]
+        pushed = []
+        for instr in block.instructions:
+            if instr.op != 'PHI':
+                mapping = {use: current(use) for use in instr.uses() if use in names}
+                if mapping:
+                    instr.replace_uses(mapping)
+            if instr.dest in names:
+                original = instr.dest
+                counters[original] += 1
+                instr.dest = f"{original}.{counters[original]}"
+                stacks[original].append(instr.dest)
+                pushed.append(original)
+
+        for succ in block.succs:
+            for phi in func.block_map[succ].phis():
+                for i, label in enumerate(phi.labels):
+                    if label == block.label and phi.args[i] in names:
+                        phi.args[i] = current(phi.args[i])
+
+        work.append(('exit', pushed))
+        for child in reversed(children[payload]):
+            work.append(('enter', child))
+
+
+def destruct_ssa(func, global_names=()):
+    """
+    Lowers a function out of SSA form in place.
+
+    PHIs become copies at the end of each predecessor (critical edges are
+    split first). Versions of the same variable connected by copies are
+    coalesced into one name unless their live ranges interfere; coalesced
+    copies vanish, and the remaining variable definitions and uses are
+    lowered back to STORE and LOAD.
+
+    Args:
+        func: Function CFG in SSA form
+        global_names: Names of program-level variables, which must keep
+            their original names
+    """
+    edge_blocks = _split_critical_edges(func)
+    _eliminate_phis(func)
+    names = _coalesce(func, set(global_names))
+    _lower_copies(func, names)
+    _remove_empty_edge_blocks(func, edge_blocks)
+
+
+def _split_critical_edges(func):
+    """Splits edges into PHI blocks from blocks with several successors."""
+    created = []
+    for block in list(func.blocks):
+        if not block.phis() or len(block.preds) < 2:
+            continue
+        for pred_label in list(block.preds):
+            pred = func.block_map[pred_label]
+            if len(pred.succs) < 2:
+                continue
+            edge = BasicBlock(func.new_label())
+            edge.fallthrough = block.label
+            term = pred.terminator
+            if pred.fallthrough == block.label:
+                pred.fallthrough = edge.label
+                func.add_block(edge, func.blocks.index(pred) + 1)
+            else:
+                term.target = edge.label
+                func.add_block(edge)
+            for phi in block.phis():
+                phi.labels = [edge.label if l == pred_label else l for l in phi.labels]
+            created.append((pred_label, edge.label))
+    func.compute_edges()
+    return created
+
+
+def _remove_empty_edge_blocks(func, edge_blocks):
+    """Undoes critical edge splits whose copies were all coalesced away."""
+    for pred_label, edge_label in edge_blocks:
+        edge = func.block_map[edge_label]
+        if edge.instructions:
+            continue
+        pred = func.block_map[pred_label]
+        if pred.fallthrough == edge_label:
+            pred.fallthrough = edge.fallthrough
+        else:
+            pred.terminator.target = edge.fallthrough
+        func.remove_block(edge)
+    func.compute_edges()
+
+
+def _eliminate_phis(func):
+    for block in func.blocks:
+        phis = block.phis()
+        if not phis:
+            continue
+        for pred_label in block.preds:
+            copies = []
+            for phi in phis:
+                value = phi.args[phi.labels.index(pred_label)]
+                if value != phi.dest:
+                    copies.append((phi.dest, value))
+            pred = func.block_map[pred_label]
+            position = len(pred.instructions) - (1 if pred.terminator else 0)
+            pred.instructions[position:position] = _sequentialize(func, copies)
+        del block.instructions[:len(phis)]
+
+
+def _sequentialize(func, copies):
+    """
+    Orders a set of parallel copies (dest <- src) so that no source is
+    overwritten before it is read, breaking cycles with a fresh temporary.
+    """
+    result = []
+    pending = dict(copies)
+    while pending:
+        read = set(pending.values())
+        ready = [dest for dest in pending if dest not in read]
+        if ready:
+            for dest in ready:
+                result.append(Instruction('COPY', dest, [pending.pop(dest)]))
+            continue
+        # Every destination is still needed as a source: break the cycle
+        dest, src = next(iter(pending.items()))
+        temp = func.new_temp()
+        result.append(Instruction('COPY', temp, [dest]))
+        for other, value in pending.items():
+            if value == dest:
+                pending[other] = temp
+    return [instr if not is_constant(instr.args[0]) else
+            Instruction('CONST', instr.dest, instr.args) for instr in result]
+
+
+def _interference(func):
+    """Builds an interference graph over all defined names using liveness."""
+    liveness = compute_liveness(func)
+    graph = {}
+    for block in func.blocks:
+        live = liveness.out_set(block.label)
+        for instr in reversed(block.instructions):
+            if instr.dest is not None:
+                neighbours = graph.setdefault(instr.dest, set())
+                source = instr.args[0] if instr.op == 'COPY' else None
+                for other in live:
+                    if other != instr.dest and other != source:
+                        neighbours.add(other)
+                        graph.setdefault(other, set()).add(instr.dest)
+                live.discard(instr.dest)
+            live.update(instr.uses())
+    return graph
+
+
+def _coalesce(func, global_names):
+    """
+    Groups copy-related versions of each original name into classes and
+    picks a final name per class.
+
+    Returns:
+        dict: Maps every SSA name to its final name
+    """
+    graph = _interference(func)
+    parent = {}
+
+    def find(name):
+        parent.setdefault(name, name)
+        while parent[name] != name:
+            parent[name] = parent[parent[name]]
+            name = parent[name]
+        return name
+
+    members = {}
+    neighbours = {}
+
+    def union(x, y):
+        a, b = find(x), find(y)
+        if a == b:
+            return
+        group_a = members.get(a, {a})
+        group_b = members.get(b, {b})
+        adj_a = neighbours.get(a, graph.get(a, set()))
+        adj_b = neighbours.get(b, graph.get(b, set()))
+        if adj_a & group_b or adj_b & group_a:
+            return
+        parent[b] = a
+        members[a] = group_a | group_b
+        neighbours[a] = adj_a | adj_b
+        members.pop(b, None)
+        neighbours.pop(b, None)
+
+    # Copies between versions of one name first, since each success
+    # removes an instruction
+    for instr in func.instructions():
+        if instr.op == 'COPY' and base_name(instr.dest) == base_name(instr.args[0]):
+            union(instr.dest, instr.args[0])
+
+    ssa_names = set()
+    for instr in func.instructions():
+        for name in [instr.dest] + instr.uses():
+            if name is not None and SSA_NAME_PATTERN.match(name):
+                ssa_names.add(name)
+
+    def version(name):
+        return int(SSA_NAME_PATTERN.match(name).group(2))
+
+    # Then any remaining non-interfering versions, so that they share the
+    # original name instead of each needing a fresh variable
+    by_base = {}
+    for name in sorted(ssa_names, key=lambda n: (base_name(n), version(n))):
+        by_base.setdefault(base_name(name), []).append(name)
+    for versions in by_base.values():
+        for name in versions[1:]:
+            union(versions[0], name)
+
+    taken = set(global_names) | set(func.params)
+    for instr in func.instructions():
+        for name in [instr.dest, instr.loaded_var(), instr.stored_var()] + instr.uses():
+            if name is not None and not SSA_NAME_PATTERN.match(name):
+                taken.add(name)
+
+    final = {}
+    class_names = {}
+    for name in sorted(ssa_names, key=lambda n: (base_name(n), version(n))):
+        root = find(name)
+        if root in class_names:
+            final[name] = class_names[root]
+            continue
+        base = base_name(name)
+        if base not in taken or version(name) == 0:
+            chosen = base
+        elif base.startswith('t') and base[1:].isdigit():
+            chosen = func.new_temp()
+        else:
+            suffix = 1
+            while f"{base}_{suffix}" in taken:
+                suffix += 1
+            chosen = f"{base}_{suffix}"
+        taken.add(chosen)
+        class_names[root] = chosen
+        final[name] = chosen
+    return final
+
+
+def _lower_copies(func, names):
+    """Applies final names and turns variable definitions and uses back into STORE/LOAD."""
+    def is_variable(name):
+        return name in names and not re.match(r't\d+$', names[name])
+
+    for block in func.blocks:
+        lowered = []
+        for instr in block.instructions:
+            if instr.op == 'DECLARE':
+                if instr.dest is not None:
+                    instr.args[0] = names.get(instr.dest, instr.dest)
+                    instr.dest = None
+                lowered.append(instr)
+                continue
+
+            if instr.op == 'COPY':
+                dest, src = instr.dest, instr.args[0]
+                if is_variable(dest):
+                    if is_variable(src):
+                        if names[src] == names[dest]:
+                            continue
+                        temp = func.new_temp()
+                        lowered.append(Instruction('LOAD', temp, [names[src]]))
+                        src = temp
+                    lowered.append(Instruction('STORE', args=[names.get(src, src), names[dest]]))
+                    continue
+                if is_variable(src):
+                    lowered.append(Instruction('LOAD', names.get(dest, dest), [names[src]]))
+                    continue
+
+            # Variable reads in any other position need an explicit LOAD
+            loads = {}
+            for use in instr.uses():
+                if is_variable(use) and use not in loads:
+                    loads[use] = func.new_temp()
+                    lowered.append(Instruction('LOAD', loads[use], [names[use]]))
+            instr.replace_uses({use: loads.get(use, names.get(use, use)) for use in instr.uses()})
+            if is_variable(instr.dest):
+                # A variable defined by an operation rather than a copy, as
+                # left by passes that propagate copies in SSA form: compute
+                # into a temp and store it
+                var = names[instr.dest]
+                instr.dest = func.new_temp()
+                lowered.extend([instr, Instruction('STORE', args=[instr.dest, var])])
+                continue
+            if instr.dest in names:
+                instr.dest = names[instr.dest]
+            if instr.op == 'COPY' and instr.dest == instr.args[0]:
+                continue
+            lowered.append(instr)
+        block.instructions = lowered
+
+
+def to_ssa(code):
+    """
+    Converts a whole TAC program into SSA form.
+
+    Args:
+        code: List of TAC strings
+
+    Returns:
+        Program: The program with every function in SSA form
+    """
+    program = build_program(code)
+    for func in program.functions:
+        construct_ssa(func, program.global_names)
+    return program
+
+
+def from_ssa(program):
+    """
+    Lowers a program in SSA form back to plain TAC.
+
+    Args:
+        program: Program whose functions are in SSA form
+
+    Returns:
+        list: TAC strings using only the generator's opcodes
+    """
+    for func in program.functions:
+        destruct_ssa(func, program.global_names)
+    return program.to_tac()
@@ -0,0 +1,347 @@
+"""
+This module contains the x86-64 backend: X86_64CodeGenerator converts TAC
+to 64-bit NASM assembly for the System V AMD64 ABI (Linux).
+
+The language only has 32-bit ints, so values are computed in the 32-bit
+halves of the registers and spilled to 4-byte slots; addresses and the
+stack use the full 64-bit registers.
+
+With buffered_output, PRINT does not call printf. It calls a small runtime
+that is appended to the program: __print_int and __print_str format into a
+static 4 KiB buffer, which __flush empties with write system calls when it
+fills up and when main returns.
+"""
+
+from .code_generator import TargetCodeGenerator
+from .regalloc import LinearScanAllocator
+
+# Buffer size of the buffered PRINT runtime
+PRINT_BUFFER_SIZE = 4096
+
+# The buffered PRINT runtime. The routines only clobber rax, rcx, rdx, rsi,
+# rdi and r11; r11 is caller-saved and pushed around PRINT when it holds a
+# live value, the others hold nothing across instructions in generated code.
+PRINT_RUNTIME = [
+    "",
+    "__print_int:",
+    "    push rbp",
+    "    mov rbp, rsp",
+    "    sub rsp, 16",
+    "    lea rsi, [rbp-1]",
+    "    mov byte [rsi], 10",
+    "    mov eax, edi",
+    "    test eax, eax",
+    "    jns __print_int_digits",
+    "    neg eax",
+    "    __print_int_digits:",
+    "    mov ecx, 10",
+    "    __print_int_loop:",
+    "    xor edx, edx",
+    "    div ecx",
+    "    add dl, 48",
+    "    sub rsi, 1",
+    "    mov byte [rsi], dl",
+    "    test eax, eax",
+    "    jnz __print_int_loop",
+    "    test edi, edi",
+    "    jns __print_int_append",
+    "    sub rsi, 1",
+    "    mov byte [rsi], 45",
+    "    __print_int_append:",
+    "    mov rdx, rbp",
+    "    sub rdx, rsi",
+    "    call __print_bytes",
+    "    mov rsp, rbp",
+    "    pop rbp",
+    "    ret",
+    "",
+    "__print_str:",
+    "    mov rsi, rdi",
+    "    xor edx, edx",
+    "    __print_str_length:",
+    "    movzx eax, byte [rdi]",
+    "    test eax, eax",
+    "    jz __print_str_append",
+    "    add rdi, 1",
+    "    add edx, 1",
+    "    jmp __print_str_length",
+    "    __print_str_append:",
+    "    call __print_bytes",
+    "    lea rsi, [rel __print_newline]",
+    "    mov edx, 1",
+    "    jmp __print_bytes",
+    "",
+    "__print_bytes:",
+    "    test edx, edx",
+    "    jz __print_bytes_done",
+    "    mov ecx, dword [rel __print_length]",
+    f"    cmp ecx, {PRINT_BUFFER_SIZE}",
+    "    jl __print_bytes_room",
+    "    push rsi",
+    "    push rdx",
+    "    call __flush",
+    "    pop rdx",
+    "    pop rsi",
+    "    xor ecx, ecx",
+    "    __print_bytes_room:",
+    "    lea rdi, [rel __print_buffer]",
+    "    add rdi, rcx",
+    "    movzx eax, byte [rsi]",
+    "    mov byte [rdi], al",
+    "    add ecx, 1",
+    "    mov dword [rel __print_length], ecx",
+    "    add rsi, 1",
+    "    sub edx, 1",
+    "    jmp __print_bytes",
+    "    __print_bytes_done:",
+    "    ret",
+    "",
+    "__flush:",
+    "    mov edx, dword [rel __print_length]",
+    "    lea rsi, [rel __print_buffer]",
+    "    __flush_loop:",
+    "    test edx, edx",
+    "    jle __flush_done",
+    "    mov eax, 1",
+    "    mov edi, 1",
+    "    syscall",
+    "    test eax, eax",
+    "    jle __flush_done",
+    "    add rsi, rax",
+    "    sub edx, eax",
+    "    jmp __flush_loop",
+    "    __flush_done:",
+    "    mov dword [rel __print_length], 0",
+    "    ret",
+    "",
+    "section .data",
+    "    __print_length dd 0",
+    "    __print_newline db 10",
+    "",
+    "section .bss",
+    f"    __print_buffer resb {PRINT_BUFFER_SIZE}"
+]
+
+
+class X86_64CodeGenerator(TargetCodeGenerator):
+    """
+    Converts three-address code (TAC) to x86-64 assembly code.
+
+    Temporaries and local variables are kept in registers chosen by a
+    register allocator following the System V conventions (see
+    compiler.regalloc; linear scan unless another is passed in); the ones
+    it spills get a slot in the function's rbp-based frame, so functions
+    are reentrant and recursion works. Globals and string literals are
+    addressed RIP-relative. Calls follow the System V ABI: the first six
+    arguments go in edi, esi, edx, ecx, r8d and r9d, the rest on the stack
+    in 8-byte slots, and rsp is 16-byte aligned at every call, printf
+    included.
+
+    eax, ecx and edx are scratch registers. The callee-saved registers a
+    function uses are pushed in its prologue, and the caller-saved ones
+    holding values live across a call are pushed around it.
+
+    Attributes:
+        buffered_output: True to print through the buffered runtime
+            instead of printf
+        function_name: Name of the function being generated
+        See also TargetCodeGenerator
+    """
+
+    ARGUMENT_REGISTERS = ['edi', 'esi', 'edx', 'ecx', 'r8d', 'r9d']
+    REGISTERS = {'eax', 'ebx', 'ecx', 'edx', 'edi', 'esi', 'r8d', 'r9d',
+                 'r10d', 'r11d', 'r12d', 'r13d', 'r14d', 'r15d'}
+
+    def __init__(self, intermediate_code, allocator=None, buffered_output=False):
+        super().__init__(intermediate_code, allocator or LinearScanAllocator(target='x86-64'))
+        self.buffered_output = buffered_output
+        self.function_name = None
+
+    def generate(self):
+        """
+        Generates x86-64 assembly code from TAC, followed by the buffered
+        PRINT runtime if it is enabled.
+
+        Returns:
+            list: Generated assembly instructions
+        """
+        super().generate()
+        if self.buffered_output:
+            self.target_code.extend(PRINT_RUNTIME)
+        return self.target_code
+
+    def _generate_function(self, function):
+        """
+        Emits one function: prologue, register allocation and body.
+
+        Args:
+            function: Function CFG (compiler.cfg.Function); its instructions
+                are renamed by the register allocator
+        """
+        params = function.params
+        self.function_name = function.name
+        self.allocation = self.allocator.allocate(function, self.variables)
+
+        # Stack layout: [rbp+16+8i] holds stack arguments, [rbp-4k] spill
+        # slots, and the saved callee-saved registers sit below the slots
+        self.frame = {}
+        registers = len(self.ARGUMENT_REGISTERS)
+        incoming = {}
+        for i, param in enumerate(params[registers:]):
+            incoming[param] = f"dword [rbp+{16 + 8 * i}]"
+            web = self.allocation.params.get(param)
+            if web is not None and self.allocation.register(web) is None:
+                # A spilled stack parameter stays where the caller put it
+                self.frame[self.allocation.home(web)] = incoming[param]
+        slots = 0
+        for name in self.allocation.spilled():
+            if name not in self.frame:
+                slots += 1
+                self.frame[name] = f"dword [rbp-{4 * slots}]"
+        # push rbp realigned rsp to 16 bytes; the frame and the saved
+        # registers together keep it aligned
+        saved = 8 * len(self.allocation.callee_saved)
+        frame_size = (4 * slots + saved + 15) // 16 * 16 - saved
+
+        self.target_code.append(f"\n{function.name}:")
+        self.target_code.append("    push rbp")
+        self.target_code.append("    mov rbp, rsp")
+        if frame_size:
+            self.target_code.append(f"    sub rsp, {frame_size}")
+        for register in self.allocation.callee_saved:
+            self.target_code.append(f"    push {self._qword(register)}")
+        # No allocated home is an argument register, so the order is free
+        for i, param in enumerate(params):
+            web = self.allocation.params.get(param)
+            if web is None:
+                continue
+            source = self.ARGUMENT_REGISTERS[i] if i < registers else incoming[param]
+            for line in self._move(self._operand(web), source):
+                self.target_code.append("    " + line)
+
+        body = function.linearize()[len(function.header):]
+        self.fused = self._find_fused_branches(body)
+        compares = {id(compare) for compare in self.fused.values()}
+        for instr in body:
+            if id(instr) in compares:
+                continue
+            asm_code = self._convert_instruction(instr)
+            if isinstance(asm_code, list):
+                self.target_code.extend(["    " + line for line in asm_code])
+            elif asm_code:
+                self.target_code.append("    " + asm_code)
+
+    def _qword(self, register):
+        """Returns the 64-bit name of a 32-bit register (ebx -> rbx, r12d -> r12)."""
+        if register.startswith('e'):
+            return 'r' + register[1:]
+        return register[:-1]
+
+    def _with_saves(self, instr, code):
+        """
+        Preserves caller-saved registers that hold values live across a
+        call, keeping rsp 16-byte aligned at the call.
+        """
+        saves = [self._qword(register) for register in self.allocation.call_saves.get(id(instr), [])]
+        pad = ["sub rsp, 8"] if len(saves) % 2 else []
+        unpad = ["add rsp, 8"] if len(saves) % 2 else []
+        return ([f"push {register}" for register in saves] + pad + code + unpad +
+                [f"pop {register}" for register in reversed(saves)])
+
+    def _operand(self, name):
+        operand = super()._operand(name)
+        if operand == f"dword [{name}]":
+            return f"dword [rel {name}]"
+        return operand
+
+    def _lea(self, dest, base, displacement):
+        """
+        Emits dest = base + displacement as an lea with a 64-bit base; the
+        low 32 bits of the address do not depend on the upper half of base.
+        """
+        if not -(1 << 31) <= displacement < 1 << 31:
+            return None
+        return [f"lea {dest}, [{self._qword(base)}{displacement:+d}]"]
+
+    def _select_add_lea(self, instr, dest, left, right):
+        if dest != left and dest != right and self._kind(right) == 'imm':
+            code = self._lea(dest, left, int(right))
+            if code:
+                return code
+        # The assembler encodes no index registers, so reg + reg is an add
+        return self._binary("add", dest, left, right, True)
+
+    def _select_sub_lea(self, instr, dest, left, right):
+        if dest != left:
+            code = self._lea(dest, left, -int(right))
+            if code:
+                return code
+        return self._binary("sub", dest, left, right, False)
+
+    def _select_shl_lea(self, instr, dest, left, right):
+        return self._binary("shl", dest, left, right, False)
+
+    def _select_mul_imm(self, instr, dest, left, right):
+        if right in ["2", "4", "8"]:
+            return self._binary("shl", dest, left, str(int(right).bit_length() - 1), False)
+        if self._kind(left) == 'imm':
+            return self._binary("imul", dest, left, right, True)
+        # Three-operand imul takes the source straight from its register or slot
+        target = dest if dest in self.REGISTERS else "eax"
+        return [f"imul {target}, {left}, {right}"] + self._move(dest, target)
+
+    def _divide_by_immediate(self, divisor):
+        # ecx is free between instructions
+        return [f"mov ecx, {divisor}", "idiv ecx"]
+
+    def _select_print(self, instr, dest, value):
+        if self.buffered_output:
+            if self._is_string(instr.args[0]):
+                return self._with_saves(instr, [f"lea rdi, [rel {value}]", "call __print_str"])
+            return self._with_saves(instr, [f"mov edi, {value}", "call __print_int"])
+        if self._is_string(instr.args[0]):
+            code = ["lea rdi, [rel fmt_str]", f"lea rsi, [rel {value}]"]
+        else:
+            code = ["lea rdi, [rel fmt_int]", f"mov esi, {value}"]
+        # printf is variadic: al holds the number of vector registers used
+        return self._with_saves(instr, code + [
+            "xor eax, eax",
+            "call printf wrt ..plt"
+        ])
+
+    def _select_call(self, instr, dest):
+        args = instr.args
+        count = int(args[1])
+        call_args = self.pending_args[len(self.pending_args) - count:]
+        del self.pending_args[len(self.pending_args) - count:]
+        registers = len(self.ARGUMENT_REGISTERS)
+        stack_args = call_args[registers:]
+        code = []
+        if len(stack_args) % 2:
+            # Keep rsp 16-byte aligned at the call
+            code.append("sub rsp, 8")
+        for arg in reversed(stack_args):
+            if self._is_memory(arg):
+                code += [f"mov eax, {arg}", "push rax"]
+            elif arg in self.REGISTERS:
+                code.append(f"push {self._qword(arg)}")
+            else:
+                code.append(f"push {arg}")
+        for register, arg in zip(self.ARGUMENT_REGISTERS, call_args):
+            code.append(f"mov {register}, {arg}")
+        code.append(f"call {args[0]}")
+        if stack_args:
+            code.append(f"add rsp, {8 * (len(stack_args) + len(stack_args) % 2)}")
+        return self._with_saves(instr, code + self._move(dest, "eax"))
+
+    def _select_return(self, instr, dest, value="0"):
+        code = self._move("eax", value)
+        if self.buffered_output and self.function_name == 'main':
+            # Returning from main exits the program; __flush clobbers rax
+            code += ["push rax", "sub rsp, 8", "call __flush", "add rsp, 8", "pop rax"]
+        code += [f"pop {self._qword(register)}" for register in reversed(self.allocation.callee_saved)]
+        return code + [
+            "mov rsp, rbp",
+            "pop rbp",
+            "ret"
+        ]
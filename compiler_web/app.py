@@ -10,6 +10,14 @@ from compiler.lexer import Lexer
 from compiler.parser import Parser
 from compiler.semantic_analyzer import SemanticAnalyzer
 from compiler.code_generator import IntermediateCodeGenerator, TargetCodeGenerator
+from compiler.x86_64 import X86_64CodeGenerator
+from compiler.passes import build_pipeline
+from compiler.regalloc import allocator_for_level
+from compiler.peephole import PeepholeOptimizer
+from compiler.execution import BytecodeCompiler, VirtualMachine
+from compiler.execution.budget import ExecutionBudget
+from compiler.execution.tracing import Tracer, TRACE_OFF, TRACE_BASIC, TRACE_VERBOSE
+from compiler.execution.vm import MAX_STEPS
 
 app = Flask(__name__)
 
@@ -43,6 +51,16 @@ except Exception as e:
         force=True
     )
 
+# Execution traces are written here once a traced run has finished
+TRACE_FILE = 'output.txt'
+
+# Execution limits of /compile requests: (type, default, most a request may ask for)
+EXECUTION_LIMITS = {
+    'max_steps': (int, MAX_STEPS, 10 * MAX_STEPS),
+    'max_time': (float, 5.0, 30.0),
+    'max_output': (int, 1000000, 10000000)
+}
+
 def log_debug(message):
     """Helper function to log debug messages"""
     logging.debug(str(message))  # Convert message to string to handle non-string objects
@@ -152,39 +170,59 @@ def ast_to_tree(ast, indent=0):
     
     return "\n".join(result)
 
-def simulate_execution(ast):
-    """Simulate the execution of the C code and return output"""
+def simulate_execution(ast, tracer=None, budget=None):
+    """
+    Simulate the execution of the C code and return output.
+
+    Trace messages go to the tracer's in-memory ring buffer; with tracing on
+    they are written to output.txt once, at the end, and with tracing off
+    (the default) nothing is formatted or written. Every executed statement
+    and evaluated expression is one step of the ExecutionBudget.
+    """
     output = []
     variables = {}
-    MAX_ITERATIONS = 1000  # Add maximum iteration limit
-    
-    # Open output file
-    with open('output.txt', 'w') as f:
-        f.write("=== Program Execution Output ===\n\n")
-    
-    def write_output(msg):
-        with open('output.txt', 'a') as f:
-            f.write(str(msg) + '\n')
-        log_debug(msg)
+    if budget is None:
+        budget = ExecutionBudget(MAX_STEPS)
+    steps = budget.steps
+    limit = budget.start()
+    if tracer is None:
+        tracer = Tracer(TRACE_OFF)
+    trace = tracer.trace
+    # Checked before every message, so disabled messages are never formatted
+    basic = tracer.enabled(TRACE_BASIC)
+    verbose = tracer.enabled(TRACE_VERBOSE)
     
     def evaluate_expr(node):
-        write_output(f"\nDEBUG - Evaluating expression: {node}")
+        nonlocal steps, limit
+        steps += 1
+        if steps > limit:
+            limit = budget.check(steps)
+        if verbose: trace(f"\nDEBUG - Evaluating expression: {node}")
         if not isinstance(node, dict):
             return node
         
         try:
             if node['type'] == 'number_literal':
                 value = int(node['value'])
-                write_output(f"DEBUG - Number literal value: {value}")
+                if verbose: trace(f"DEBUG - Number literal value: {value}")
                 return value
             elif node['type'] == 'identifier':
                 var_name = node.get('name', '')
                 if var_name not in variables:
                     raise NameError(f"Variable '{var_name}' is not defined")
                 value = variables[var_name]
-                write_output(f"DEBUG - Identifier '{var_name}' value: {value}")
+                if verbose: trace(f"DEBUG - Identifier '{var_name}' value: {value}")
                 return value
             elif node['type'] == 'binary_expression':
+                if node['operator'] in ('&&', '||'):
+                    # Short-circuit: the right operand is only evaluated if needed
+                    left = evaluate_expr(node['left'])
+                    if bool(left) == (node['operator'] == '||'):
+                        result = int(bool(left))
+                    else:
+                        result = int(bool(evaluate_expr(node['right'])))
+                    if verbose: trace(f"DEBUG - Logical operation {node['operator']} = {result}")
+                    return result
                 left = evaluate_expr(node['left'])
                 right = evaluate_expr(node['right'])
                 op = node['operator']
@@ -198,22 +236,27 @@ def simulate_execution(ast):
                 elif op == '>=': result = left >= right
                 elif op == '<=': result = left <= right
                 elif op == '==': result = left == right
-                write_output(f"DEBUG - Binary operation: {left} {op} {right} = {result}")
+                if verbose: trace(f"DEBUG - Binary operation: {left} {op} {right} = {result}")
                 return result
             elif node['type'] == 'string_literal':
                 value = node['value']
                 if value.startswith('"') and value.endswith('"'):
                     value = value[1:-1]
-                write_output(f"DEBUG - String literal value: {value}")
+                if verbose: trace(f"DEBUG - String literal value: {value}")
                 return value
             return 0
         except Exception as e:
-            write_output(f"DEBUG - Error evaluating expression: {node}")
-            write_output(f"DEBUG - Error: {str(e)}")
+            if verbose:
+                trace(f"DEBUG - Error evaluating expression: {node}")
+                trace(f"DEBUG - Error: {str(e)}")
             raise
     
     def execute_node(node):
-        write_output(f"\nDEBUG - Executing node: {node}")
+        nonlocal steps, limit
+        steps += 1
+        if steps > limit:
+            limit = budget.check(steps)
+        if verbose: trace(f"\nDEBUG - Executing node: {node}")
         try:
             if not isinstance(node, dict):
                 if isinstance(node, list):
@@ -222,7 +265,7 @@ def simulate_execution(ast):
                 return
             
             if node['type'] == 'function_declaration':
-                write_output("DEBUG - Executing function declaration")
+                if basic: trace("DEBUG - Executing function declaration")
                 if 'body' in node:
                     for stmt in node['body']:
                         execute_node(stmt)
@@ -233,7 +276,7 @@ def simulate_execution(ast):
                     raise NameError(f"Variable '{var_name}' is already defined")
                 value = evaluate_expr(node['initializer']) if 'initializer' in node else 0
                 variables[var_name] = value
-                write_output(f"DEBUG - Declared variable {var_name} = {value}")
+                if basic: trace(f"DEBUG - Declared variable {var_name} = {value}")
             
             elif node['type'] == 'assignment_expression':
                 var_name = node['left'].get('name', '')
@@ -241,12 +284,12 @@ def simulate_execution(ast):
                     raise NameError(f"Variable '{var_name}' is not defined")
                 value = evaluate_expr(node['right'])
                 variables[var_name] = value  # Update the variable value
-                write_output(f"DEBUG - Assigned {var_name} = {value}")
+                if basic: trace(f"DEBUG - Assigned {var_name} = {value}")
             
             elif node['type'] == 'print_statement':
-                write_output("\nDEBUG - Executing print statement")
+                if basic: trace("\nDEBUG - Executing print statement")
                 expr = node.get('expression', {})
-                write_output(f"DEBUG - Print expression: {expr}")
+                if verbose: trace(f"DEBUG - Print expression: {expr}")
                 
                 try:
                     if isinstance(expr, dict):
@@ -259,25 +302,29 @@ def simulate_execution(ast):
                     else:
                         value = str(expr)
                     
-                    write_output(f"DEBUG - Print statement value: {value}")
+                    if basic: trace(f"DEBUG - Print statement value: {value}")
+                    budget.add_output(value)
                     output.append(value)
-                    write_output(f"DEBUG - Current output buffer: {output}")
+                    if verbose: trace(f"DEBUG - Current output buffer: {output}")
+                except RuntimeError:
+                    # Budget exhausted: stop the program, not just the print
+                    raise
                 except Exception as e:
-                    write_output(f"DEBUG - Error in print statement: {str(e)}")
+                    if basic: trace(f"DEBUG - Error in print statement: {str(e)}")
                     output.append(f"Error: {str(e)}")
             
             elif node['type'] == 'if_statement':
                 condition = evaluate_expr(node['condition'])
-                write_output(f"DEBUG - If condition result: {condition}")
+                if basic: trace(f"DEBUG - If condition result: {condition}")
                 if condition:
-                    write_output("DEBUG - Executing if branch")
+                    if basic: trace("DEBUG - Executing if branch")
                     if isinstance(node['consequent'], list):
                         for stmt in node['consequent']:
                             execute_node(stmt)
                     else:
                         execute_node(node['consequent'])
                 elif node.get('alternate'):
-                    write_output("DEBUG - Executing else branch")
+                    if basic: trace("DEBUG - Executing else branch")
                     if isinstance(node['alternate'], list):
                         for stmt in node['alternate']:
                             execute_node(stmt)
@@ -286,60 +333,88 @@ def simulate_execution(ast):
             
             elif node['type'] == 'while_statement':
                 iterations = 0
-                write_output("DEBUG - Starting while loop")
+                if basic: trace("DEBUG - Starting while loop")
                 while evaluate_expr(node['condition']):
                     iterations += 1
-                    if iterations > MAX_ITERATIONS:
-                        raise RuntimeError(f"Maximum iteration limit ({MAX_ITERATIONS}) exceeded in while loop")
-                    write_output(f"DEBUG - While loop iteration {iterations}")
+                    if basic: trace(f"DEBUG - While loop iteration {iterations}")
                     if isinstance(node['body'], list):
                         for stmt in node['body']:
                             execute_node(stmt)
                     else:
                         execute_node(node['body'])
-                    write_output(f"DEBUG - After iteration {iterations}, variables: {variables}")
+                    if verbose: trace(f"DEBUG - After iteration {iterations}, variables: {variables}")
             
             elif node['type'] == 'block_statement' and 'body' in node:
-                write_output("DEBUG - Executing block statement")
+                if basic: trace("DEBUG - Executing block statement")
                 for stmt in node['body']:
                     execute_node(stmt)
             
             elif node['type'] == 'expression_statement':
-                write_output("DEBUG - Executing expression statement")
+                if verbose: trace("DEBUG - Executing expression statement")
                 execute_node(node['expression'])
             
-            write_output(f"DEBUG - Current variables: {variables}")
+            if verbose: trace(f"DEBUG - Current variables: {variables}")
             
         except Exception as e:
-            write_output(f"DEBUG - Error executing node: {node}")
-            write_output(f"DEBUG - Error: {str(e)}")
+            if verbose:
+                trace(f"DEBUG - Error executing node: {node}")
+                trace(f"DEBUG - Error: {str(e)}")
             raise
     
     try:
-        write_output("\nDEBUG - Starting program simulation")
+        if basic: trace("\nDEBUG - Starting program simulation")
         if isinstance(ast, list):
             for node in ast:
                 execute_node(node)
         else:
             execute_node(ast)
-        write_output(f"\nDEBUG - Final variables: {variables}")
-        write_output(f"DEBUG - Final output: {output}")
+        if basic:
+            trace(f"\nDEBUG - Final variables: {variables}")
+            trace(f"DEBUG - Final output: {output}")
         
         # Ensure output is not empty
         if not output:
-            write_output("DEBUG - No output generated during execution")
+            if basic: trace("DEBUG - No output generated during execution")
             output.append("(No output generated)")
             
-        # Write final program output
-        with open('output.txt', 'a') as f:
-            f.write("\n=== Program Output ===\n")
-            for line in output:
-                f.write(line + '\n')
-            
     except Exception as e:
-        write_output(f"\nDEBUG - Runtime error: {str(e)}")
+        if basic: trace(f"\nDEBUG - Runtime error: {str(e)}")
         output.append(f"Runtime Error: {str(e)}")
+    finally:
+        budget.steps = steps
+        budget.stop()
     
+    # Write the trace and the program output in one go
+    tracer.flush(TRACE_FILE,
+                 header=["=== Program Execution Output ===", ""],
+                 footer=["", "=== Program Output ==="] + output)
+    return output
+
+def execution_budget(params):
+    """Build an ExecutionBudget from the limits of a request, capped at the server's maximums"""
+    limits = {}
+    for name, (kind, default, maximum) in EXECUTION_LIMITS.items():
+        value = kind(params.get(name, default))
+        if value <= 0:
+            raise ValueError(f"{name} must be positive")
+        limits[name] = min(value, maximum)
+    return ExecutionBudget(**limits)
+
+def execute_program(intermediate_code, tracer=None, budget=None):
+    """Run a compiled program in the bytecode VM and return its output"""
+    vm = VirtualMachine(BytecodeCompiler().compile(intermediate_code), tracer=tracer, budget=budget)
+    try:
+        vm.run()
+    except RuntimeError as e:
+        log_debug(f"DEBUG - Runtime error: {str(e)}")
+        vm.output.append(f"Runtime Error: {str(e)}")
+    output = vm.output
+    if not output:
+        output.append("(No output generated)")
+    if tracer is not None:
+        tracer.flush(TRACE_FILE,
+                     header=["=== Program Execution Trace ===", ""],
+                     footer=["", "=== Program Output ==="] + output)
     return output
 
 @app.route('/')
@@ -352,6 +427,12 @@ def compile_code():
     """Compile the code and return all stages"""
     try:
         source_code = request.json['code']
+        optimization_level = int(request.json.get('optimization_level', 0))
+        target = request.json.get('target', 'x86-64')
+        # Trace level of this request: 'off' (default), 'basic' or 'verbose'
+        tracer = Tracer.from_name(request.json.get('trace', 'off'))
+        # Limits of the program run: max_steps, max_time (seconds), max_output (characters)
+        budget = execution_budget(request.json)
         log_debug("\nDEBUG - Received source code:")
         log_debug(source_code)
         
@@ -371,35 +452,38 @@ def compile_code():
         import json
         log_debug(json.dumps(ast, indent=2))
         
-        # Get the main function (first function declaration)
-        if isinstance(ast, list) and len(ast) > 0:
-            main_func = ast[0]
-        else:
-            main_func = ast
-            
-        log_debug("\nDEBUG - Main function:")
-        log_debug(json.dumps(main_func, indent=2))
-        
         # Create simple tree representation
-        ast_tree = ast_to_tree(main_func)
+        ast_tree = ast_to_tree(ast)
         log_debug("\nAST Tree Structure:")
         log_debug(ast_tree)
         
-        # Generate intermediate code
-        ir_generator = IntermediateCodeGenerator(main_func)
+        # Generate intermediate code for the whole program
+        ir_generator = IntermediateCodeGenerator(ast)
         ir_code = ir_generator.generate()
         log_debug("\nDEBUG - Intermediate Code:")
         log_debug(str(ir_code))
         
+        # Optimize intermediate code
+        pipeline = build_pipeline(optimization_level)
+        optimized_ir_code = pipeline.run_on_code(ir_code)
+        log_debug("\nDEBUG - Optimized Intermediate Code:")
+        log_debug(str(optimized_ir_code))
+        
         # Generate target code
-        target_generator = TargetCodeGenerator(ir_code)
+        if target == 'x86':
+            target_generator = TargetCodeGenerator(optimized_ir_code, allocator_for_level(optimization_level))
+        else:
+            target_generator = X86_64CodeGenerator(optimized_ir_code,
+                                                   allocator_for_level(optimization_level, target))
         target_code = target_generator.generate()
+        peephole = PeepholeOptimizer()
+        target_code = peephole.optimize(target_code)
         log_debug("\nDEBUG - Target Code:")
         log_debug(str(target_code))
         
-        # Simulate execution with debug output
+        # Run the program, all of its functions, in the bytecode VM
         log_debug("\nDEBUG - Starting program execution:")
-        output = simulate_execution(main_func)
+        output = execute_program(optimized_ir_code, tracer, budget)
         log_debug("\nDEBUG - Program output:")
         log_debug(str(output))
         
@@ -408,8 +492,13 @@ def compile_code():
             'tokens': token_list,
             'ast': ast_tree,
             'ir_code': ir_code,
+            'optimized_ir_code': optimized_ir_code,
+            'pass_statistics': pipeline.statistics,
+            'peephole_statistics': peephole.hits,
             'target_code': target_code,
-            'output': output
+            'output': output,
+            'trace': tracer.lines(),
+            'budget': budget.usage()
         })
         
     except Exception as e:
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+
+"""
+Builds programs natively through the C backend and checks them against the
+bytecode VM that runs programs for the web interface.
+Usage: python run_native.py [source_file ...] [-O0|-O1|-O2] [--runs=N]
+
+Every source file is translated to C, built with `cc -O2` (or $CC) and run.
+Its output is compared with the unoptimized program run in the VM
+(compiler/execution/vm.py), so both the optimizer and the C backend are
+checked, and the script prints the best time of N runs of each. The
+debugging output of the lexer and parser goes to compiler.log in the
+temporary build directory, next to the C file.
+Without arguments it runs test.c and the programs in examples/.
+"""
+
+import contextlib
+import glob
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from compiler.lexer import Lexer
+from compiler.parser import Parser
+from compiler.semantic_analyzer import SemanticAnalyzer
+from compiler.code_generator import IntermediateCodeGenerator
+from compiler.c_backend import CCodeGenerator
+from compiler.passes import build_pipeline
+from compiler.execution import BytecodeCompiler, VirtualMachine
+
+# The lexer and parser print debugging output; it goes to this file of
+# the build directory
+LOG_FILE = 'compiler.log'
+
+
+def parse(source_code, directory):
+    """Parses a program, sending the parser's debugging output to LOG_FILE in directory."""
+    with open(os.path.join(directory, LOG_FILE), 'a') as log, contextlib.redirect_stdout(log):
+        ast = Parser(Lexer(source_code).tokenize()).parse()
+    SemanticAnalyzer(ast).analyze()
+    return ast
+
+
+def build_native(intermediate_code, optimization_level, directory):
+    """
+    Translates a program to C and builds it with the system C compiler.
+
+    Args:
+        intermediate_code: Unoptimized TAC of the program
+        optimization_level: IR optimization level (0, 1 or 2)
+        directory: Directory for the C file and the executable
+
+    Returns:
+        str: Path of the executable
+    """
+    intermediate_code = build_pipeline(optimization_level).run_on_code(intermediate_code)
+    c_file = os.path.join(directory, 'program.c')
+    with open(c_file, 'w') as f:
+        for line in CCodeGenerator(intermediate_code).generate():
+            f.write(line + '\n')
+    executable = os.path.join(directory, 'program')
+    subprocess.run([os.environ.get('CC', 'cc'), '-O2', c_file, '-o', executable], check=True)
+    return executable
+
+
+def best_time(run, runs):
+    """Calls run() runs times; returns its last result and the fastest time."""
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = run()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def run_vm(intermediate_code):
+    """Runs TAC in the bytecode VM; returns the printed lines, ending with any runtime error."""
+    vm = VirtualMachine(BytecodeCompiler().compile(intermediate_code))
+    try:
+        vm.run()
+    except RuntimeError as e:
+        vm.output.append(f"Runtime Error: {str(e)}")
+    return vm.output
+
+
+def check(source_file, optimization_level, runs):
+    """Runs a file natively and in the VM, and prints the comparison."""
+    with open(source_file, 'r') as f:
+        source_code = f.read()
+    with tempfile.TemporaryDirectory() as directory:
+        intermediate_code = IntermediateCodeGenerator(parse(source_code, directory)).generate()
+        executable = build_native(intermediate_code, optimization_level, directory)
+        native, native_time = best_time(
+            lambda: subprocess.run([executable], capture_output=True, text=True).stdout.splitlines(),
+            runs)
+
+    expected, vm_time = best_time(lambda: run_vm(intermediate_code), runs)
+
+    print(f"\n{source_file} (-O{optimization_level})")
+    print(f"{'Output':<12}{'matches' if native == expected else 'differs'}"
+          f" ({len(native)} lines native, {len(expected)} in the VM)")
+    print(f"{'Native':<12}{native_time * 1000:10.3f} ms")
+    print(f"{'VM':<12}{vm_time * 1000:10.3f} ms"
+          f"  ({vm_time / native_time:.1f}x native)")
+    return native == expected
+
+
+def main():
+    optimization_level = 2
+    runs = 5
+    sources = []
+    for arg in sys.argv[1:]:
+        if arg in ("-O0", "-O1", "-O2"):
+            optimization_level = int(arg[2])
+        elif arg.startswith("--runs="):
+            runs = int(arg[len("--runs="):])
+        else:
+            sources.append(arg)
+    if not sources:
+        sources = [path for path in ['test.c'] if os.path.exists(path)]
+        sources += sorted(glob.glob(os.path.join('examples', '*.c')))
+
+    results = [check(source_file, optimization_level, runs) for source_file in sources]
+    sys.exit(0 if all(results) else 1)
+
+if __name__ == "__main__":
+    main()
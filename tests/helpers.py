@@ -0,0 +1,82 @@
+"""
+Helpers shared by the tests: compiling source code to TAC and running it,
+in the bytecode VM or natively.
+"""
+
+import contextlib
+import io
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from compiler.assembler import Assembler
+from compiler.code_generator import IntermediateCodeGenerator
+from compiler.elf import write_object_file
+from compiler.execution import BytecodeCompiler, VirtualMachine
+from compiler.ir import parse_instruction
+from compiler.lexer import Lexer
+from compiler.parser import Parser
+from compiler.passes import PassManager, build_pipeline
+
+needs_cc = pytest.mark.skipif(shutil.which('cc') is None, reason="a C compiler is required")
+
+
+def parse(source):
+    """Parses source code into its list of top-level declarations."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        # The lexer and parser print debugging output
+        return Parser(Lexer(source).tokenize()).parse()
+
+
+def intermediate_code(source):
+    """Returns the unoptimized TAC of a program."""
+    return IntermediateCodeGenerator(parse(source)).generate()
+
+
+def generate_ir(source, level=0):
+    """Returns the TAC of a program, optimized at the given -O level."""
+    return build_pipeline(level).run_on_code(intermediate_code(source))
+
+
+def run_passes(source, *passes):
+    """Returns the TAC of a program after running the given pass classes on it."""
+    return PassManager([pass_() for pass_ in passes]).run_on_code(intermediate_code(source))
+
+
+def operations(code):
+    """Returns the opcodes of TAC strings."""
+    return [parse_instruction(line).op for line in code]
+
+
+def run_ir(ir):
+    """Runs TAC in the bytecode VM and returns the printed lines."""
+    return VirtualMachine(BytecodeCompiler().compile(ir)).run()
+
+
+def run_source(source, level=0):
+    """Compiles a program at the given -O level and returns its output."""
+    return run_ir(generate_ir(source, level))
+
+
+def run_native(target_code, tmp_path):
+    """Assembles and links generated code and returns the printed lines."""
+    obj = os.path.join(tmp_path, 'program.o')
+    exe = os.path.join(tmp_path, 'program')
+    write_object_file(Assembler().assemble(target_code), obj)
+    subprocess.run(['cc', obj, '-o', exe], check=True, capture_output=True)
+    result = subprocess.run([exe], capture_output=True, text=True, timeout=10)
+    return result.stdout.splitlines()
+
+
+def run_c(c_code, tmp_path, flags=('-O2',)):
+    """Builds C code with the system compiler and returns the printed lines."""
+    source = os.path.join(tmp_path, 'program.c')
+    exe = os.path.join(tmp_path, 'program')
+    with open(source, 'w') as f:
+        f.write('\n'.join(c_code) + '\n')
+    subprocess.run(['cc', *flags, '-Wall', '-Werror', source, '-o', exe],
+                   check=True, capture_output=True)
+    result = subprocess.run([exe], capture_output=True, text=True, timeout=10)
+    return result.stdout.splitlines()
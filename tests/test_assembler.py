@@ -0,0 +1,124 @@
+import re
+import shutil
+import subprocess
+
+import pytest
+
+from compiler.assembler import Assembler
+from compiler.elf import write_object_file
+from compiler.peephole import PeepholeOptimizer
+from compiler.x86_64 import X86_64CodeGenerator
+from tests.helpers import generate_ir
+
+# Instructions of the subset X86_64CodeGenerator and the peephole
+# optimizer emit, in NASM syntax
+INSTRUCTIONS = [
+    'mov eax, 5', 'mov r10d, 7', 'mov eax, -1', 'mov eax, 2147483647',
+    'mov eax, -2147483648', 'mov eax, 2147483648', 'mov eax, 4294967295',
+    'mov dword [rbp-8], 3000000000', 'mov dword [rbp-200], -5', 'mov dword [rsp+4], 1',
+    'mov dword [r12+8], 9', 'mov byte [rbx], 10', 'mov eax, ecx', 'mov r9d, eax',
+    'mov rbp, rsp', 'mov eax, dword [rbp-12]', 'mov dword [rbp-12], r11d',
+    'mov al, byte [rsi]', 'mov byte [rdi+3], al', 'movzx eax, al', 'lea rsi, [rbp-16]',
+    'add eax, 1', 'add eax, 1000', 'add eax, 2147483648', 'sub rsp, 80', 'sub eax, ecx',
+    'and eax, 255', 'or ecx, edx', 'xor eax, eax', 'cmp eax, -1', 'cmp eax, 4294967295',
+    'cmp dword [rbp-4], 100000', 'cmp al, 10', 'add eax, dword [rbp-20]', 'test eax, eax',
+    'test eax, 1', 'imul eax, ecx', 'imul eax, 10', 'imul eax, 100000',
+    'imul eax, dword [rbp-8], 3', 'imul ecx, eax, 2147483648', 'cdq', 'idiv ecx',
+    'idiv dword [rbp-8]', 'div r8d', 'neg eax', 'not edx', 'shl eax, 1', 'shl eax, 5',
+    'sar eax, 31', 'shr edx, 3', 'shl eax, cl', 'sete al', 'setne cl', 'setl al',
+    'setge dl', 'push rbp', 'push r12', 'pop rbx', 'pop r15', 'ret', 'leave', 'syscall',
+    'lea r12d, [r13+5]', 'lea r10d, [rbx-3]', 'lea ebx, [r15+100000]', 'push r10', 'pop r11',
+    'cmp r11d, -1', 'cmp dword [rbp+16], -1', 'xor edx, edx', 'idiv r13d',
+]
+
+needs_binutils = pytest.mark.skipif(not (shutil.which('as') and shutil.which('objdump')),
+                                    reason="GNU as and objdump are required")
+
+
+def disassemble(path):
+    """Returns the instructions objdump decodes from an object file's .text."""
+    result = subprocess.run(['objdump', '-d', '-M', 'intel', '-j', '.text', path],
+                            capture_output=True, text=True, check=True)
+    instructions = []
+    for line in result.stdout.splitlines():
+        # "   4:\t83 c0 01             \tadd    eax,0x1"
+        parts = line.split('\t')
+        if len(parts) == 3 and re.match(r'\s*[0-9a-f]+:$', parts[0]):
+            instructions.append(' '.join(parts[2].split()))
+    return instructions
+
+
+def assemble_with_as(lines, path, tmp_path):
+    """Assembles NASM-syntax lines with GNU as in Intel syntax."""
+    source = tmp_path / 'reference.s'
+    converted = [re.sub(r'\b(byte|dword|qword) \[', r'\1 ptr [', line) for line in lines]
+    source.write_text('.intel_syntax noprefix\n.text\n' + '\n'.join(converted) + '\n')
+    subprocess.run(['as', '--64', '-o', str(path), str(source)], check=True, capture_output=True)
+
+
+def assemble_with_compiler(lines, path):
+    code = Assembler().assemble(['section .text', 'f:'] + ['    ' + line for line in lines])
+    write_object_file(code, str(path))
+    return code
+
+
+@needs_binutils
+def test_encodings_match_gnu_as(tmp_path):
+    ours, reference = tmp_path / 'ours.o', tmp_path / 'reference.o'
+    assemble_with_compiler(INSTRUCTIONS, ours)
+    assemble_with_as(INSTRUCTIONS, reference, tmp_path)
+    decoded = disassemble(ours)
+    assert len(decoded) == len(INSTRUCTIONS)
+    assert decoded == disassemble(reference)
+
+
+@needs_binutils
+def test_jumps_and_calls_reach_their_labels(tmp_path):
+    lines = ['jmp .L1', 'add eax, 1', '.L1:', 'jl .L2', 'call f', '.L2:', 'ret']
+    path = tmp_path / 'jumps.o'
+    code = Assembler().assemble(['section .text', 'f:'] + lines)
+    write_object_file(code, str(path))
+    decoded = disassemble(path)
+    # All branches use rel32: jmp 5 bytes, add 3, jl 6, call 5
+    assert decoded[0].startswith('jmp 8')
+    assert decoded[2].startswith('jl 13')
+    assert decoded[3].startswith('call 0')
+
+
+def test_immediates_wrap_to_32_bits():
+    code = Assembler().assemble(['section .text', 'f:', '    mov eax, 2147483648',
+                                 '    mov dword [rbp-8], 3000000000'])
+    text = bytes(code.sections['.text'])
+    assert text[:5] == b'\xB8\x00\x00\x00\x80'
+    assert text[-4:] == (3000000000).to_bytes(4, 'little')
+
+
+@pytest.mark.parametrize('line', [
+    'mov eax, 4294967296', 'add eax, -2147483649', 'add rax, 2147483648',
+    'mov byte [rbx], 256', 'mov eax, dword [rbp-4294967296]',
+])
+def test_unencodable_values_raise_value_error(line):
+    with pytest.raises(ValueError):
+        Assembler().assemble(['section .text', 'f:', '    ' + line])
+
+
+def test_data_directives():
+    code = Assembler().assemble(['section .data', '    counter dd -1',
+                                 '    big dd 4294967295', '    fmt_int db \'%d\', 10, 0',
+                                 '    buffer resb 16'])
+    assert bytes(code.sections['.data']) == b'\xff\xff\xff\xff' * 2
+    assert bytes(code.sections['.rodata']) == b'%d\n\x00'
+    assert len(code.sections['.bss']) == 16
+
+
+@pytest.mark.parametrize('level', [0, 2])
+def test_generated_code_with_large_literals_assembles(level):
+    ir = generate_ir("""int main() {
+        int x = -2147483648;
+        int y = 3000000000;
+        print(x);
+        print(y);
+        return 0;
+    }""", level)
+    target_code = PeepholeOptimizer().optimize(X86_64CodeGenerator(ir).generate())
+    assert Assembler().assemble(target_code).sections['.text']
@@ -0,0 +1,62 @@
+from compiler.passes import BlockLayout, BranchSimplification, PassManager
+from tests.helpers import operations, run_passes, run_source
+
+PROGRAM = """int main() {
+    int x = 0;
+    if (1) { x = 2; } else { x = 3; }
+    while (x < 10) {
+        if (x == 4) { x = x + 3; }
+        x = x + 1;
+    }
+    print(x);
+    return 0;
+}"""
+
+
+def simplify(code):
+    return PassManager([BranchSimplification()]).run_on_code(code)
+
+
+def test_constant_conditions_are_folded():
+    code = run_passes(PROGRAM, BranchSimplification)
+    # The else branch stored 3 to x; it is unreachable once if (1) folds
+    assert not any(line.startswith('STORE t3,') for line in code)
+    assert code[:6] == ['FUNCTION main:', 't0 = 0', 'STORE t0, x', 't1 = 1', 't2 = 2', 'STORE t2, x']
+
+
+def test_jumps_are_threaded_and_fallthroughs_need_no_goto():
+    code = simplify([
+        'FUNCTION main:',
+        't0 = LOAD x',
+        'IF_FALSE t0 GOTO L1',
+        't1 = 1', 'PRINT t1',
+        'GOTO L2',
+        'LABEL L1',
+        'GOTO L3',
+        'LABEL L2',
+        't2 = 2', 'PRINT t2',
+        'LABEL L3',
+        't3 = 0',
+        'IF_FALSE t3 GOTO L4',
+        'LABEL L4',
+        'RETURN 0',
+    ])
+    # L1 only jumped to L3, GOTO L2 fell through and the last branch
+    # went to its own fallthrough
+    assert code == ['FUNCTION main:', 't0 = LOAD x', 'IF_FALSE t0 GOTO L3',
+                    't1 = 1', 'PRINT t1', 't2 = 2', 'PRINT t2', 'LABEL L3', 't3 = 0', 'RETURN 0']
+
+
+def test_layout_rotates_loops():
+    code = run_passes(PROGRAM, BranchSimplification, BlockLayout)
+    # The loop test sits after the body and jumps back with IF_TRUE
+    back = next(line for line in code if line.startswith('IF_TRUE'))
+    target = back.split()[-1]
+    body = code[code.index(f'LABEL {target}'):code.index(back)]
+    assert 'GOTO' not in operations(body)
+    assert 'IF_TRUE' not in operations(code[code.index(back) + 1:])
+
+
+def test_output_is_unchanged():
+    for level in (0, 1, 2):
+        assert run_source(PROGRAM, level) == ['10']
@@ -0,0 +1,66 @@
+import pytest
+
+from compiler.execution import BytecodeCompiler, ClosureCompiler, VirtualMachine, compile_program
+from compiler.execution.budget import ExecutionBudget
+from tests.helpers import intermediate_code, parse
+
+FOREVER = "int main() { int x = 0; while (1) { x = x + 1; } return 0; }"
+CHATTY = "int main() { int x = 0; while (x < 1000) { print(x); x = x + 1; } return 0; }"
+RECURSIVE = "int f(int n) { return f(n + 1); } int main() { return f(0); }"
+
+
+def run_vm(source, budget):
+    program = BytecodeCompiler().compile(intermediate_code(source))
+    return VirtualMachine(program, max_call_depth=10 ** 9, budget=budget).run()
+
+
+def run_closures(source, budget):
+    return ClosureCompiler().compile(parse(source)).run(budget=budget)
+
+
+def run_python(source, budget):
+    return compile_program(parse(source)).run(budget=budget)
+
+
+ENGINES = [run_vm, run_closures, run_python]
+
+
+@pytest.mark.parametrize('run', ENGINES)
+def test_step_limit(run):
+    with pytest.raises(RuntimeError, match="Execution limit of 50000 steps exceeded"):
+        run(FOREVER, ExecutionBudget(50000))
+
+
+@pytest.mark.parametrize('run', ENGINES)
+def test_time_limit(run):
+    budget = ExecutionBudget(10 ** 12, max_time=0.05)
+    with pytest.raises(RuntimeError, match="Time limit of 0.05 seconds exceeded"):
+        run(FOREVER, budget)
+    assert budget.elapsed >= 0.05
+
+
+@pytest.mark.parametrize('run', ENGINES)
+def test_output_limit(run):
+    budget = ExecutionBudget(10 ** 9, max_output=100)
+    with pytest.raises(RuntimeError, match="Output limit of 100 characters exceeded"):
+        run(CHATTY, budget)
+    assert budget.output_size == 101
+
+
+@pytest.mark.parametrize('run', [run_closures, run_python])
+def test_calls_are_steps(run):
+    # Each call is a step, so unbounded recursion hits the step limit
+    # before Python's recursion limit
+    with pytest.raises(RuntimeError, match="Execution limit of 100 steps exceeded"):
+        run(RECURSIVE, ExecutionBudget(100))
+
+
+# One step per iteration; the Python translation also counts entering main
+@pytest.mark.parametrize('run, steps', [(run_closures, 1000), (run_python, 1001)])
+def test_usage_is_reported(run, steps):
+    budget = ExecutionBudget(10 ** 6, max_time=5.0, max_output=10 ** 6)
+    output = run(CHATTY, budget)
+    usage = budget.usage()
+    assert usage['steps'] == steps
+    assert usage['output_size'] == sum(len(line) + 1 for line in output)
+    assert 0 < usage['time'] < 5.0
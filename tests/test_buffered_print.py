@@ -0,0 +1,74 @@
+import os
+import subprocess
+
+import pytest
+
+from compiler.assembler import Assembler
+from compiler.elf import write_object_file
+from compiler.x86_64 import PRINT_BUFFER_SIZE, PRINT_RUNTIME, X86_64CodeGenerator
+from tests.helpers import generate_ir, needs_cc, run_ir, run_native
+
+PROGRAM = """int show(int x) { print(x); return x; }
+int main() {
+    print("start");
+    print(show(-2147483647 - 1));
+    print(0);
+    print(2147483647);
+    return 3;
+}"""
+
+# Several times the buffer size of output
+LONG = """int main() {
+    int i = 0;
+    while (i < 3000) { print(i * 1000003); print("line"); i = i + 1; }
+    return 0;
+}"""
+
+
+def generate(source, buffered=True, level=0):
+    return X86_64CodeGenerator(generate_ir(source, level), buffered_output=buffered).generate()
+
+
+def test_print_calls_the_runtime_instead_of_printf():
+    code = [line.strip() for line in generate(PROGRAM)]
+    assert not [line for line in code if line.startswith('call printf')]
+    assert code.count('call __print_int') == 4 and code.count('call __print_str') == 1
+    assert code[-len(PRINT_RUNTIME):] == [line.strip() for line in PRINT_RUNTIME]
+    assert f'__print_buffer resb {PRINT_BUFFER_SIZE}' in code
+
+
+def test_main_flushes_before_returning():
+    code = [line.strip() for line in generate(PROGRAM)]
+    main = code[code.index('main:'):code.index('__print_int:')]
+    show = code[code.index('show:'):code.index('main:')]
+    assert 'call __flush' not in show
+    flush = main.index('call __flush')
+    # The return value survives the flush
+    assert main[flush - 2:flush + 3] == ['push rax', 'sub rsp, 8', 'call __flush', 'add rsp, 8', 'pop rax']
+    assert [line for line in main if line][-1] == 'ret'
+
+
+def test_unbuffered_programs_have_no_runtime():
+    code = [line.strip() for line in generate(PROGRAM, buffered=False)]
+    assert '__print_int:' not in code and 'call __flush' not in code
+    assert code.count('call printf wrt ..plt') == 5
+
+
+@needs_cc
+@pytest.mark.parametrize('source', [PROGRAM, LONG])
+@pytest.mark.parametrize('level', [0, 2])
+def test_buffered_output_matches_printf(source, level, tmp_path):
+    expected = run_ir(generate_ir(source, level))
+    assert run_native(generate(source, level=level), tmp_path) == expected
+    assert run_native(generate(source, buffered=False, level=level), tmp_path) == expected
+
+
+@needs_cc
+def test_exit_status_is_the_return_value_of_main(tmp_path):
+    obj = os.path.join(tmp_path, 'program.o')
+    exe = os.path.join(tmp_path, 'program')
+    write_object_file(Assembler().assemble(generate(PROGRAM)), obj)
+    subprocess.run(['cc', obj, '-o', exe], check=True, capture_output=True)
+    result = subprocess.run([exe], capture_output=True, text=True, timeout=10)
+    assert result.returncode == 3
+    assert result.stdout.splitlines()[0] == 'start'
@@ -0,0 +1,73 @@
+import re
+
+import pytest
+
+from compiler.c_backend import CCodeGenerator, c_string_literal
+from tests.helpers import generate_ir, needs_cc, run_c, run_ir
+
+# Overflow, division of negative numbers, strings, globals, recursion and
+# functions whose names are taken by the C library
+PROGRAM = """int g = 5;
+int puts(int x) { return x * 3; }
+int div(int a, int b) { return a / b; }
+int mod(int a, int b) { return a % b; }
+int fib(int n) { if (n < 2) { return n; } return fib(n - 1) + fib(n - 2); }
+int main() {
+    int a = 2147483647;
+    print(a + 1);
+    print(a * 4);
+    print(-a - 2);
+    print(puts(-7) / 4);
+    print(puts(-7) % 4);
+    print(fib(15));
+    print(div(-a - 1, -1));
+    print(mod(-a - 1, -1));
+    print(div(-7, 2) + mod(-7, 2));
+    g = g * 2;
+    print(g);
+    print("done");
+    int i = 0; int s = 1;
+    while (i < 40) { s = s * 2 + i; i = i + 1; }
+    print(s);
+    return 0;
+}"""
+
+def test_names_are_prefixed():
+    code = CCodeGenerator(generate_ir(PROGRAM)).generate()
+    assert 'static int fn_puts(int v_x);' in code
+    assert 'static int v_g;' in code
+    assert 'int main(void)' in code and '    return fn_main();' in code
+
+
+def test_overflowing_operations_are_unsigned():
+    code = CCodeGenerator(generate_ir(PROGRAM)).generate()
+    assert '    t1 = (int)((unsigned)(t1) + (unsigned)(t2));' in code
+    assert not [line for line in code if re.search(r'= t\d+ [-+*] ', line)]
+
+
+def test_division_by_minus_one_is_negation():
+    code = CCodeGenerator(generate_ir(PROGRAM)).generate()
+    # INT_MIN / -1 overflows
+    assert '    t0 = (t1 == -1 ? (int)(0u - (unsigned)(t0)) : t0 / t1);' in code
+    assert '    t0 = (t1 == -1 ? 0 : t0 % t1);' in code
+
+
+def test_string_literals_are_escaped():
+    assert c_string_literal('q"q') == '"q\\"q"'
+    assert c_string_literal('a\\b\n\t1') == '"a\\\\b\\012\\0111"'
+
+
+@needs_cc
+def test_strings_with_quotes_and_control_characters(tmp_path):
+    ir = generate_ir(r'int main() { print("q\"q"); print("tab\there\\"); print(""); return 0; }')
+    expected = run_ir(ir)
+    assert expected == ['q"q', 'tab\there\\', '']
+    assert run_c(CCodeGenerator(ir).generate(), tmp_path) == expected
+
+
+@needs_cc
+@pytest.mark.parametrize('level', [0, 1, 2])
+@pytest.mark.parametrize('flags', [('-O0',), ('-O2',), ('-O2', '-fsanitize=undefined', '-fno-sanitize-recover')])
+def test_native_output_matches_the_vm(level, flags, tmp_path):
+    ir = generate_ir(PROGRAM, level)
+    assert run_c(CCodeGenerator(ir).generate(), tmp_path, flags) == run_ir(ir)
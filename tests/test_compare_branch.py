@@ -0,0 +1,50 @@
+import pytest
+
+from compiler.code_generator import TargetCodeGenerator
+from compiler.x86_64 import X86_64CodeGenerator
+from tests.helpers import generate_ir, needs_cc, run_ir, run_native
+
+GENERATORS = [TargetCodeGenerator, X86_64CodeGenerator]
+
+# Every comparison on both sides of its bound, with the branch on each polarity
+COMPARISONS = "int main() { int a = 0; int b = 2; while (a < 4) {" + "".join(
+    f" if (a {operator} b) {{ print({i}); }} else {{ print(-{i}); }}"
+    for i, operator in enumerate(['==', '!=', '<', '<=', '>', '>='], 1)) + " a = a + 1; } return 0; }"
+
+
+def instructions(generator, ir):
+    code = generator(ir).generate()
+    return [line.split()[0] for line in code if line.startswith('    ') and not line.strip().endswith(':')]
+
+
+@pytest.mark.parametrize('generator', GENERATORS)
+@pytest.mark.parametrize('level', [0, 1])
+def test_branches_on_comparisons_are_fused(generator, level):
+    mnemonics = instructions(generator, generate_ir(COMPARISONS, level))
+    assert not [m for m in mnemonics if m.startswith('set') or m == 'movzx']
+    assert {'je', 'jne', 'jl', 'jle', 'jg', 'jge'} <= set(mnemonics)
+    assert 'test' not in mnemonics
+
+
+@pytest.mark.parametrize('generator', GENERATORS)
+@pytest.mark.parametrize('op, jump', [('IF_FALSE', 'jne'), ('IF_TRUE', 'je')])
+def test_not_is_a_comparison_with_zero(generator, op, jump):
+    ir = ['FUNCTION main:', 't0 = 3', 'STORE t0, x', 't1 = LOAD x', 't2 = NOT t1',
+          f'{op} t2 GOTO L0', 't3 = 1', 'PRINT t3', 'LABEL L0', 't4 = 0', 'RETURN t4']
+    mnemonics = instructions(generator, ir)
+    assert jump in mnemonics and 'sete' not in mnemonics
+
+
+@pytest.mark.parametrize('generator', GENERATORS)
+def test_comparisons_used_elsewhere_are_materialized(generator):
+    source = "int main() { int a = 1; int b = 2; print(a < b); if (a < b) { print(a); } return 0; }"
+    mnemonics = instructions(generator, generate_ir(source))
+    assert mnemonics.count('setl') == 1
+    assert 'jge' in mnemonics
+
+
+@needs_cc
+@pytest.mark.parametrize('level', [0, 1, 2])
+def test_fused_branches_take_the_right_way(level, tmp_path):
+    ir = generate_ir(COMPARISONS, level)
+    assert run_native(X86_64CodeGenerator(ir).generate(), tmp_path) == run_ir(ir)
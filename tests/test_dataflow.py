@@ -0,0 +1,116 @@
+from compiler.cfg import build_program
+from compiler.dataflow import (BACKWARD, DataflowProblem, IndexMap, ReachingDefinitions,
+                               iter_bits, mask_of, solve)
+
+# Entry block, loop header L0, body L1 and exit L2
+LOOP = [
+    'FUNCTION main:',
+    'PARAM n',
+    't0 = 0',
+    'STORE t0, i',
+    'LABEL L0',
+    't1 = LOAD i',
+    't2 = LOAD n',
+    't3 = t1 LT t2',
+    'IF_FALSE t3 GOTO L2',
+    'LABEL L1',
+    't4 = t1 ADD 1',
+    'STORE t4, i',
+    'GOTO L0',
+    'LABEL L2',
+    'PRINT t1',
+    'RETURN 0',
+]
+
+
+class StoredEverywhere(DataflowProblem):
+    """Must problem: variables stored on every path from the entry."""
+
+    meet = 'intersection'
+
+    def __init__(self, func):
+        super().__init__(func)
+        for instr in func.instructions():
+            if instr.stored_var() is not None:
+                self.index.add(instr.stored_var())
+
+    def gen_kill(self, block):
+        return self.index.mask([instr.stored_var() for instr in block.instructions]), 0
+
+
+class LoadedLater(DataflowProblem):
+    """May problem solved backward: variables loaded on some path to the exit."""
+
+    direction = BACKWARD
+
+    def __init__(self, func):
+        super().__init__(func)
+        for instr in func.instructions():
+            if instr.loaded_var() is not None:
+                self.index.add(instr.loaded_var())
+
+    def gen_kill(self, block):
+        return self.index.mask([instr.loaded_var() for instr in block.instructions]), 0
+
+
+def function():
+    return build_program(LOOP).functions[0]
+
+
+def test_bitsets():
+    for ids in ([], [0], [3, 5, 64], list(range(0, 300, 7))):
+        bits = mask_of(ids, 300)
+        assert bits == sum(1 << i for i in ids)
+        assert list(iter_bits(bits)) == ids
+
+
+def test_index_map():
+    index = IndexMap(['a', 'b'])
+    assert index.add('c') == 2 and index.add('a') == 0
+    assert len(index) == 3 and 'b' in index and 'd' not in index
+    bits = index.mask(['c', 'a', 'd'])
+    assert bits == 0b101
+    assert index.to_set(bits) == {'a', 'c'}
+
+
+def test_reaching_definitions():
+    func = function()
+    entry, header, body, exit_ = [block.label for block in func.blocks]
+    problem = ReachingDefinitions(func, entry_defs=['n'])
+    result = solve(problem)
+    # The initial store and the store in the loop body both reach the header
+    assert problem.reaching(result, header, 'i') == [(entry, 1, 'i'), (body, 1, 'i')]
+    assert problem.reaching(result, exit_, 'n') == [(None, -1, 'n')]
+    assert problem.reaching(result, header, 't4') == [(body, 0, 't4')]
+    assert problem.reaching(result, entry, 'i') == []
+
+
+def test_call_definitions():
+    code = ['FUNCTION main:', 't0 = 1', 'STORE t0, g', 't1 = CALL f, 0', 'LABEL L0', 'RETURN 0']
+    func = build_program(code).functions[0]
+    problem = ReachingDefinitions(func, call_defs=['g'])
+    result = solve(problem)
+    label = func.blocks[-1].label
+    # The call may overwrite g, so only its definition reaches L0
+    assert problem.reaching(result, label, 'g') == [(func.entry.label, 2, 'g')]
+
+
+def test_intersection_meet():
+    func = function()
+    entry, header, body, exit_ = [block.label for block in func.blocks]
+    result = solve(StoredEverywhere(func))
+    # The top value of a must problem is every fact, so the back edge does
+    # not remove i from the header
+    assert result.in_set(header) == {'i'}
+    assert result.in_set(entry) == set()
+
+
+def test_backward_problem():
+    func = function()
+    entry, header, body, exit_ = [block.label for block in func.blocks]
+    result = solve(LoadedLater(func))
+    assert result.out_set(entry) == {'i', 'n'}
+    assert result.in_set(exit_) == set()
+    block_in, block_out = result.sets()
+    assert block_in[body] == block_out[body] == {'i', 'n'}
+    assert result.iterations >= len(func.blocks)
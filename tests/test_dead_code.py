@@ -0,0 +1,60 @@
+import pytest
+
+from compiler.passes import DeadCodeElimination
+from tests.helpers import generate_ir, operations, run_passes, run_source
+
+PROGRAM = """int g = 0;
+int f(int x) { g = x; return x; print(1); }
+int main() {
+    int a = 1; int b = 2;
+    a = 3;
+    a + b;
+    int z = 0;
+    5 / z;
+    print(a);
+    f(4);
+    g = 9;
+    return 0;
+}"""
+
+
+def function_code(code, name):
+    """Returns the instructions of one function, without its FUNCTION line."""
+    start = code.index(f'FUNCTION {name}:') + 1
+    end = next((i for i in range(start, len(code)) if code[i].startswith('FUNCTION')), len(code))
+    return code[start:end]
+
+
+def test_unreachable_code_after_return_is_removed():
+    f = function_code(run_passes(PROGRAM, DeadCodeElimination), 'f')
+    assert operations(f)[-1] == 'RETURN'
+    assert 'PRINT' not in operations(f)
+
+
+def test_stores_to_globals_are_kept_outside_main():
+    f = function_code(run_passes(PROGRAM, DeadCodeElimination), 'f')
+    assert 'STORE t1, g' in f
+
+
+def test_dead_values_and_stores_are_removed():
+    main = function_code(run_passes(PROGRAM, DeadCodeElimination), 'main')
+    # b is never read, the first store to a is overwritten and a + b is unused
+    assert not any(line.endswith((', b', ', g')) for line in main)
+    assert [line for line in main if line.endswith(', a')] == ['STORE t6, a']
+    assert 'ADD' not in operations(main)
+
+
+@pytest.mark.parametrize('level', [0, 1, 2])
+def test_division_that_may_trap_is_kept(level):
+    main = function_code(generate_ir(PROGRAM, level), 'main')
+    assert 'DIV' in operations(main)
+    with pytest.raises(RuntimeError, match="Division by zero"):
+        run_source("int main() { int z = 0; 5 / z; print(1); return 0; }", level)
+
+
+def test_output_is_unchanged():
+    source = PROGRAM.replace("5 / z;", "")
+    expected = run_source(source)
+    assert expected == ['3']
+    for level in (1, 2):
+        assert run_source(source, level) == expected
@@ -0,0 +1,172 @@
+import pytest
+
+from compiler.c_backend import CCodeGenerator
+from compiler.execution import BytecodeCompiler, ClosureCompiler, VirtualMachine, compile_program
+from compiler.peephole import PeepholeOptimizer
+from compiler.regalloc import allocator_for_level
+from compiler.x86_64 import X86_64CodeGenerator
+from tests.helpers import (generate_ir, intermediate_code, needs_cc, parse, run_c, run_ir,
+                           run_native, run_source)
+
+# Programs exercising the semantics every engine must share, with their output
+PROGRAMS = {
+    'arithmetic': ("""int main() {
+        int big = 2147483647; int small = -2147483647 - 1;
+        print(big + 1); print(small - 1); print(big * big); print(-small);
+        print(-7 / 2); print(-7 % 2); print(7 / -2); print(7 % -2); print(small / -1);
+        print(1 + 2 * 3 - 8 / 4 % 3); print((1 + 2) * -3);
+        return 0;
+    }""", ['-2147483648', '2147483647', '1', '-2147483648', '-3', '-1', '-3', '1',
+           '-2147483648', '5', '-9']),
+    'logic': ("""int side = 0;
+    int touch(int v) { side = side + 1; return v; }
+    int main() {
+        int a = 3; int b = 0;
+        print(a && b); print(a || b); print(!a); print(!b); print(a > b == 1); print(a != 3);
+        if (b && touch(1)) { print(1); }
+        if (a || touch(1)) { print(2); }
+        if (!(b || touch(0))) { print(3); }
+        print(side);
+        return 0;
+    }""", ['0', '1', '0', '1', '1', '0', '2', '3', '1']),
+    'globals': ("""int g = 10;
+    int counter;
+    int bump(int by) { counter = counter + by; return counter; }
+    int main() {
+        int g = g + 5;
+        bump(2); bump(3);
+        print(g); print(counter); print(bump(g));
+        return 0;
+    }""", ['15', '5', '20']),
+    'initializers': ("""int a = 5;
+    int b = a + 1;
+    int c = 3 || 0;
+    int d = -b * 2 + (a > 3 && b != 6);
+    int e;
+    int main() {
+        print(a); print(b); print(c); print(d); print(e);
+        return 0;
+    }""", ['5', '6', '1', '-12', '0']),
+    'calls': ("""int mix(int a, int b, int c, int d, int e, int f, int h, int i) {
+        return a - b + c * d - e + f * h - i;
+    }
+    int fib(int n) { if (n < 2) { return n; } return fib(n - 1) + fib(n - 2); }
+    int gcd(int a, int b) { while (b != 0) { int t = b; b = a % b; a = t; } return a; }
+    int main() {
+        print(mix(1, 2, 3, 4, 5, 6, 7, 8));
+        print(fib(20));
+        print(gcd(1071, 462));
+        print("done");
+        return 0;
+    }""", ['40', '6765', '21', 'done']),
+    'loops': ("""int main() {
+        int i = 0; int total = 0;
+        while (i < 30) {
+            int j = i;
+            while (j > 0) { if (j % 3 == 0 || j % 5 == 0) { total = total + j; } j = j - 7; }
+            i = i + 1;
+        }
+        print(total);
+        int k = 10; int s = 0;
+        while (k != 0) { s = s * 31 + k; k = k - 1; }
+        print(s);
+        return 0;
+    }""", None),
+}
+
+
+def run_vm(ir, **options):
+    return VirtualMachine(BytecodeCompiler().compile(ir), **options)
+
+
+@pytest.mark.parametrize('name', [name for name, (_, output) in PROGRAMS.items() if output])
+def test_vm_semantics(name):
+    source, expected = PROGRAMS[name]
+    assert run_source(source) == expected
+
+
+@pytest.mark.parametrize('name', PROGRAMS)
+@pytest.mark.parametrize('level', [1, 2])
+def test_vm_output_does_not_depend_on_the_level(name, level):
+    source = PROGRAMS[name][0]
+    assert run_source(source, level) == run_source(source)
+
+
+def test_return_value_of_main():
+    vm = run_vm(generate_ir("int main() { print(1); return 42; }"))
+    assert vm.run() == ['1'] and vm.exit_code == 42
+
+
+def test_deep_recursion_does_not_use_the_python_stack():
+    # Deeper than Python's default recursion limit
+    source = "int depth(int n) { if (n == 0) { return 0; } return depth(n - 1) + 1; } " \
+             "int main() { print(depth(9000)); return 0; }"
+    assert run_source(source) == ['9000']
+    with pytest.raises(RuntimeError, match="Call depth"):
+        run_vm(intermediate_code(source), max_call_depth=1000).run()
+
+
+def test_division_by_zero():
+    source = "int main() { int a = 1; int b = 0; print(a / b); return 0; }"
+    with pytest.raises(RuntimeError, match="Division by zero"):
+        run_source(source)
+
+
+def test_missing_entry():
+    with pytest.raises(RuntimeError, match="no function start"):
+        run_vm(generate_ir("int main() { return 0; }")).run('start')
+
+
+@pytest.mark.parametrize('name', PROGRAMS)
+def test_closures_match_the_vm(name):
+    source = PROGRAMS[name][0]
+    assert ClosureCompiler().compile(parse(source)).run() == run_source(source)
+
+
+def test_closure_programs_can_run_again():
+    program = ClosureCompiler().compile(parse(PROGRAMS['globals'][0]))
+    assert program.run() == program.run() == PROGRAMS['globals'][1]
+
+
+def test_closures_report_runtime_errors():
+    program = ClosureCompiler().compile(parse("int main() { int a = 1; int b = 0; print(a % b); return 0; }"))
+    with pytest.raises(RuntimeError, match="Division by zero"):
+        program.run()
+    with pytest.raises(ValueError, match="undefined function f"):
+        ClosureCompiler().compile(parse("int main() { return f(1); }"))
+
+
+@pytest.mark.parametrize('name', PROGRAMS)
+def test_python_backend_matches_the_vm(name):
+    source = PROGRAMS[name][0]
+    assert compile_program(parse(source)).run() == run_source(source)
+
+
+def test_python_programs_are_cached():
+    source = PROGRAMS['calls'][0]
+    program = compile_program(parse(source))
+    assert compile_program(parse(source)) is program
+    assert 'def f_fib(v_n):' in program.source
+
+
+def test_python_programs_cannot_reach_builtins():
+    program = compile_program(parse("int main() { print(open); return 0; }"))
+    with pytest.raises(NameError):
+        program.run()
+
+
+@needs_cc
+@pytest.mark.parametrize('name', PROGRAMS)
+@pytest.mark.parametrize('level', [0, 1, 2])
+def test_every_engine_prints_the_same(name, level, tmp_path):
+    source = PROGRAMS[name][0]
+    ir = generate_ir(source, level)
+    expected = run_ir(ir)
+    assert ClosureCompiler().compile(parse(source)).run() == expected
+    assert compile_program(parse(source)).run() == expected
+    assert run_c(CCodeGenerator(ir).generate(), tmp_path) == expected
+    for buffered in (False, True):
+        generator = X86_64CodeGenerator(ir, allocator_for_level(level, 'x86-64'),
+                                        buffered_output=buffered)
+        target_code = PeepholeOptimizer().optimize(generator.generate())
+        assert run_native(target_code, tmp_path) == expected
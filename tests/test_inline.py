@@ -0,0 +1,75 @@
+import pytest
+
+from compiler.callgraph import CallGraph
+from compiler.cfg import build_program
+from compiler.passes import FunctionInlining
+from tests.helpers import intermediate_code, run_ir, run_passes, run_source
+
+PROGRAM = """int square(int x) { return x * x; }
+int fact(int n) { if (n < 2) { return 1; } return n * fact(n - 1); }
+int twice(int x) { return square(x) + square(x); }
+int main() {
+    int i = 0; int s = 0;
+    while (i < 5) { s = s + square(i); i = i + 1; }
+    print(s);
+    print(fact(5));
+    print(twice(3));
+    return 0;
+}"""
+
+
+def functions(code):
+    return [line.split()[1].rstrip(':') for line in code if line.startswith('FUNCTION')]
+
+
+def calls(code):
+    return [line.split()[3].rstrip(',') for line in code if ' CALL ' in line]
+
+
+def test_call_graph():
+    graph = CallGraph(build_program(intermediate_code(PROGRAM)))
+    assert graph.callees['main'] == {'square', 'fact', 'twice'}
+    assert graph.callers['square'] == {'main', 'twice'}
+    assert graph.is_leaf('square') and not graph.is_leaf('twice')
+    assert graph.is_recursive('fact') and not graph.is_recursive('twice')
+    order = graph.bottom_up()
+    assert order.index('square') < order.index('twice') < order.index('main')
+    assert graph.reachable() == {'main', 'square', 'fact', 'twice'}
+
+
+def test_leaf_calls_are_inlined():
+    code = run_passes(PROGRAM, FunctionInlining)
+    # Callees are inlined first, so twice makes no calls any more; square
+    # is then unreachable and removed
+    assert functions(code) == ['fact', 'twice', 'main']
+    assert calls(code) == ['fact', 'fact', 'twice']
+    assert 'square_x' in ' '.join(code)
+
+
+def test_recursive_functions_are_not_inlined():
+    code = run_passes(PROGRAM, FunctionInlining)
+    fact = code[code.index('FUNCTION fact:'):code.index('FUNCTION main:')]
+    assert calls(fact) == ['fact']
+
+
+def test_large_callees_are_not_inlined():
+    body = ' '.join(f"s = s * x + {i};" for i in range(10))
+    source = f"""int big(int x) {{ int s = 0; {body} return s; }}
+    int main() {{ print(big(2)); return 0; }}"""
+    assert calls(run_passes(source, FunctionInlining)) == ['big']
+
+
+@pytest.mark.parametrize('level', [0, 1, 2])
+def test_inlining_keeps_the_output(level):
+    assert run_ir(run_passes(PROGRAM, FunctionInlining)) == ['30', '120', '18']
+    assert run_source(PROGRAM, level) == ['30', '120', '18']
+
+
+def test_callees_with_several_returns():
+    source = """int abs(int x) { if (x < 0) { return -x; } return x; }
+    int main() { print(abs(-4)); print(abs(9)); return 0; }"""
+    code = run_passes(source, FunctionInlining)
+    assert functions(code) == ['main']
+    # Both returns store the result, which is loaded after the inlined body
+    assert 'abs_result' in ' '.join(code)
+    assert run_ir(code) == ['4', '9']
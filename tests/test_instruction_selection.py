@@ -0,0 +1,101 @@
+import pytest
+
+from compiler.code_generator import TargetCodeGenerator
+from compiler.x86_64 import X86_64CodeGenerator
+from tests.helpers import generate_ir, needs_cc, run_ir, run_native
+
+
+def select(lines, generator=TargetCodeGenerator):
+    """
+    Generates f(a, b), whose body loads a into t0 and b into t1 and then
+    runs lines, and returns the instructions selected for lines.
+    """
+    ir = (['FUNCTION f:', 'PARAM a', 'PARAM b', 't0 = LOAD a', 't1 = LOAD b'] + lines +
+          ['FUNCTION main:', 't9 = 1', 'ARG t9', 't9 = 2', 'ARG t9', 't8 = CALL f, 2',
+           'PRINT t8', 't7 = 0', 'RETURN t7'])
+    code = [line.strip() for line in generator(ir).generate()]
+    # Skip the prologue and the moves of the incoming arguments, and stop
+    # at the move of the return value into eax
+    body = code[code.index('f:') + 5:code.index('main:')]
+    end = max(i for i, line in enumerate(body) if line.startswith('mov eax, '))
+    return body[:end]
+
+
+def keeping_t0(op, constant):
+    """t3 = t0 op constant, with t0 still live afterwards."""
+    return [f't2 = {constant}', f't3 = t0 {op} t2', 't4 = t3 ADD t0', 'RETURN t4']
+
+
+@pytest.mark.parametrize('lines, expected', [
+    # Constants are folded into immediates, on the right of commutative operations
+    (['t2 = 5', 't3 = t0 ADD t2', 'RETURN t3'], ['add ecx, 5']),
+    (['t2 = 5', 't3 = t2 ADD t0', 'RETURN t3'], ['add ecx, 5']),
+    (['t2 = 7', 't3 = t0 SUB t2', 'RETURN t3'], ['sub ecx, 7']),
+    (['t2 = 100', 't3 = t0 MUL t2', 'RETURN t3'], ['imul ecx, ecx, 100']),
+    (['t2 = 4', 't3 = t0 MUL t2', 'RETURN t3'], ['shl ecx, 2']),
+    (['t2 = 9', 't3 = t0 MUL t2', 'RETURN t3'], ['lea ecx, [ecx+ecx*8]']),
+    # A result in another register than a live source is computed by lea
+    (keeping_t0('ADD', 5), ['lea ebx, [ecx+5]', 'add ecx, ebx']),
+    (keeping_t0('SUB', 7), ['lea ebx, [ecx-7]', 'add ecx, ebx']),
+    (keeping_t0('MUL', 3), ['lea ebx, [ecx+ecx*2]', 'add ecx, ebx']),
+    (keeping_t0('MUL', 2), ['lea ebx, [ecx+ecx]', 'add ecx, ebx']),
+    (keeping_t0('MUL', 8), ['lea ebx, [ecx*8]', 'add ecx, ebx']),
+    (keeping_t0('SHL', 2), ['lea ebx, [ecx*4]', 'add ecx, ebx']),
+    (keeping_t0('SHL', 5), ['mov ebx, ecx', 'shl ebx, 5', 'add ecx, ebx']),
+    # idiv takes no immediate
+    (['t2 = 3', 't3 = t0 DIV t2', 'RETURN t3'],
+     ['mov eax, ecx', 'cdq', 'push 3', 'idiv dword [esp]', 'add esp, 4', 'mov ecx, eax']),
+    # idiv faults on INT_MIN / -1, which wraps around instead
+    (['t3 = t0 MOD t1', 'RETURN t3'],
+     ['mov eax, ecx', 'cmp ebx, -1', 'jne div_0', 'neg eax', 'xor edx, edx', 'jmp div_0_done',
+      'div_0:', 'cdq', 'idiv ebx', 'div_0_done:', 'mov ecx, edx']),
+    (['t2 = -1', 't3 = t0 DIV t2', 'RETURN t3'], ['neg ecx']),
+    (['t2 = -1', 't3 = t0 MOD t2', 'RETURN t3'], ['mov ecx, 0']),
+])
+def test_x86_selection(lines, expected):
+    assert select(lines) == expected
+
+
+@pytest.mark.parametrize('lines, expected', [
+    (keeping_t0('ADD', 5), ['lea r11d, [r10+5]', 'add r10d, r11d']),
+    (keeping_t0('MUL', 3), ['imul r11d, r10d, 3', 'add r10d, r11d']),
+    (['t2 = 3', 't3 = t0 DIV t2', 'RETURN t3'],
+     ['mov eax, r10d', 'cdq', 'mov ecx, 3', 'idiv ecx', 'mov r10d, eax']),
+    (['t3 = t0 DIV t1', 'RETURN t3'],
+     ['mov eax, r10d', 'cmp r11d, -1', 'jne div_0', 'neg eax', 'xor edx, edx', 'jmp div_0_done',
+      'div_0:', 'cdq', 'idiv r11d', 'div_0_done:', 'mov r10d, eax']),
+])
+def test_x86_64_selection(lines, expected):
+    assert select(lines, X86_64CodeGenerator) == expected
+
+
+def test_selection_table():
+    table = TargetCodeGenerator._selection_table()
+    # The first matching rule wins
+    assert table[('ADD', 'reg', ('reg', 'imm'))] == '_select_add_lea'
+    assert table[('ADD', 'mem', ('reg', 'imm'))] == '_select_binary'
+    assert table[('MUL', 'mem', ('mem', 'imm'))] == '_select_mul_imm'
+    assert table[('LT', 'reg', ('imm', 'mem'))] == '_select_compare'
+    assert ('PRINT', 'reg', ('reg',)) not in table
+    # Subclasses get a table of their own
+    assert X86_64CodeGenerator._selection_table() is not table
+
+
+ARITHMETIC = """int main() {
+    int i = -20; int s = 7;
+    while (i < 20) {
+        s = s + i * 3 + i * 5 - i * 9 + i * 4 + i * 100 - (i - 7) + (s / 3) % 11 - i / 4;
+        print((-2147483647 - 1) / (i % 2 * 2 - 1) + s % (i % 2 * 2 - 1));
+        print(s);
+        print(i * 2 + 1);
+        i = i + 3;
+    }
+    return 0;
+}"""
+
+
+@needs_cc
+@pytest.mark.parametrize('level', [0, 1, 2])
+def test_selected_code_computes_what_the_vm_does(level, tmp_path):
+    ir = generate_ir(ARITHMETIC, level)
+    assert run_native(X86_64CodeGenerator(ir).generate(), tmp_path) == run_ir(ir)
@@ -0,0 +1,44 @@
+from compiler.passes import LoopInvariantCodeMotion
+from tests.helpers import operations, run_passes, run_source
+
+INVARIANT_PRODUCT = """int main() {
+    int a = 6; int b = 7; int i = 0; int s = 0;
+    while (i < 3) { s = s + a * b; i = i + 1; }
+    print(s);
+    return 0;
+}"""
+
+# The loop never runs, so hoisting the division would divide by zero
+GUARDED_DIVISION = """int main() {
+    int a = 6; int b = 0; int i = 0; int s = 0;
+    while (i < 0) { s = s + a / b; i = i + 1; }
+    print(s);
+    return 0;
+}"""
+
+
+def loop_body(code):
+    """Returns the instructions from the loop label to the back edge."""
+    start = code.index('LABEL L0')
+    end = code.index('GOTO L0')
+    return code[start:end + 1]
+
+
+def test_invariant_computations_are_hoisted():
+    code = run_passes(INVARIANT_PRODUCT, LoopInvariantCodeMotion)
+    body = loop_body(code)
+    assert 'MUL' not in operations(body)
+    assert 'MUL' in operations(code[:code.index('LABEL L0')])
+    loads = [line for line in body if 'LOAD' in line]
+    assert sorted(line.split()[-1] for line in loads) == ['i', 'i', 's']
+
+
+def test_hoisting_keeps_the_output():
+    for level in (0, 2):
+        assert run_source(INVARIANT_PRODUCT, level) == ['126']
+
+
+def test_division_that_may_trap_stays_in_the_loop():
+    code = run_passes(GUARDED_DIVISION, LoopInvariantCodeMotion)
+    assert 'DIV' in operations(loop_body(code))
+    assert run_source(GUARDED_DIVISION, 2) == ['0']
@@ -0,0 +1,78 @@
+from compiler.cfg import build_program
+from compiler.dataflow import DataflowResult
+from compiler.liveness import LiveScan, compute_liveness, compute_variable_liveness
+from compiler.passes import AnalysisManager
+
+# Block layout: entry B0, loop header L0, body L1, exit L2
+LOOP = [
+    'FUNCTION main:',
+    't0 = 0',
+    'STORE t0, i',
+    'LABEL L0',
+    't1 = LOAD i',
+    't2 = t1 LT 10',
+    'IF_FALSE t2 GOTO L2',
+    'LABEL L1',
+    't3 = t1 ADD 1',
+    'STORE t3, i',
+    'GOTO L0',
+    'LABEL L2',
+    'PRINT t1',
+    'RETURN 0',
+]
+
+
+def function():
+    return build_program(LOOP).functions[0]
+
+
+def labels(func):
+    return [block.label for block in func.blocks]
+
+
+def test_liveness_is_a_bitset_solution():
+    func = function()
+    result = compute_liveness(func)
+    assert isinstance(result, DataflowResult)
+    header, body, exit_ = labels(func)[1:]
+    assert all(isinstance(bits, int) for bits in result.block_out.values())
+    assert result.out_set(header) == {'t1'}
+    assert result.in_set(body) == {'t1'}
+    assert result.in_set(exit_) == {'t1'}
+    assert result.out_set(exit_) == set()
+
+
+def test_variable_liveness():
+    func = function()
+    entry, header, body, exit_ = labels(func)
+    result = compute_variable_liveness(func)
+    assert result.out_set(entry) == {'i'}
+    assert result.out_set(body) == {'i'}
+    assert result.in_set(exit_) == set()
+    # Globals stay live at the exit of functions other than main
+    assert compute_variable_liveness(func, live_at_exit=['i']).out_set(exit_) == {'i'}
+
+
+def test_live_scan_walks_a_block_backwards():
+    func = function()
+    header = func.blocks[1]
+    live = LiveScan(compute_liveness(func), header.label)
+    assert 't1' in live and 't2' not in live and 'unknown' not in live
+    for instr in reversed(header.instructions):
+        if instr.dest is not None:
+            live.discard(instr.dest)
+        live.update(instr.uses())
+    assert 't1' not in live and 't2' not in live
+    # The walk never converts the live-out bitset
+    assert live.bits == compute_liveness(func).block_out[header.label]
+
+
+def test_analysis_manager_caches_the_bitsets():
+    func = function()
+    manager = AnalysisManager()
+    first = manager.get('liveness', func)
+    assert isinstance(first, DataflowResult)
+    assert manager.get('liveness', func) is first
+    assert manager.hits['liveness'] == 1 and manager.misses['liveness'] == 1
+    manager.invalidate(func)
+    assert manager.get('liveness', func) is not first
@@ -0,0 +1,60 @@
+import pytest
+
+from compiler.passes import LoopUnrolling
+from compiler.passes.loop_unroll import trip_count
+from tests.helpers import operations, run_ir, run_passes, run_source
+
+
+def counted_loop(condition, start=0, step=1):
+    return f"""int main() {{
+        int i = {start}; int s = 0;
+        while ({condition}) {{ s = s + i; i = i + {step}; }}
+        print(s);
+        return 0;
+    }}"""
+
+
+@pytest.mark.parametrize('op, start, step, bound, count', [
+    ('LT', 0, 1, 10, 10), ('LE', 0, 1, 10, 11), ('LT', 0, 3, 10, 4), ('LT', 5, 1, 0, 0),
+    ('GT', 10, -2, 0, 5), ('GE', 10, -2, 0, 6), ('NE', 0, 2, 10, 5), ('EQ', 3, 1, 3, 1),
+])
+def test_trip_count(op, start, step, bound, count):
+    assert trip_count(op, start, step, bound) == count
+
+
+@pytest.mark.parametrize('op, start, step, bound', [
+    ('NE', 0, 3, 10),              # steps over the bound
+    ('LT', 0, -1, 10),             # moves away from the bound
+    ('LE', 0, 1, 2147483647),      # i overflows before the test fails
+])
+def test_loops_without_a_trip_count(op, start, step, bound):
+    assert trip_count(op, start, step, bound) is None
+
+
+def test_short_loops_are_fully_unrolled():
+    code = run_passes(counted_loop("i < 3"), LoopUnrolling)
+    assert 'LT' not in operations(code)
+    assert operations(code).count('ADD') == 6
+    assert run_ir(code) == ['3']
+
+
+def test_long_loops_are_unrolled_by_the_factor():
+    code = run_passes(counted_loop("i < 1002"), LoopUnrolling)
+    # Four copies per test of the unrolled loop, one in the remainder loop
+    assert operations(code).count('ADD') == 10
+    assert 'i0 = 1000' not in code and 't14 = 1000' in code
+    assert run_ir(code) == ['501501']
+
+
+def test_loops_with_unknown_bounds_are_kept():
+    source = counted_loop("i < s + 5")
+    assert run_passes(source, LoopUnrolling) == run_passes(source)
+
+
+@pytest.mark.parametrize('condition, step', [("i < 7", 1), ("i <= 100", 3), ("i != 12", 4),
+                                             ("i > -9", -2)])
+def test_output_is_unchanged(condition, step):
+    source = counted_loop(condition, step=step)
+    expected = run_source(source)
+    assert run_ir(run_passes(source, LoopUnrolling)) == expected
+    assert run_source(source, 2) == expected
@@ -0,0 +1,21 @@
+import pytest
+
+from tests.helpers import parse
+
+
+def call_arguments(source):
+    """Returns the argument nodes of the call in `int main() { return <call>; }`."""
+    ast = parse(f"int f(int a, int b) {{ return a; }} int main() {{ return {source}; }}")
+    return ast[1]['body'][0]['expression']['arguments']
+
+
+@pytest.mark.parametrize('source, count', [('f()', 0), ('f(1)', 1), ('f(1, 2)', 2),
+                                           ('f(f(1, 2), 3 + 4)', 2)])
+def test_call_arguments(source, count):
+    assert len(call_arguments(source)) == count
+
+
+@pytest.mark.parametrize('source', ['f(1 2)', 'f(1, 2 3)', 'f(1,)', 'f(,1)', 'f(1;'])
+def test_malformed_argument_lists_are_syntax_errors(source):
+    with pytest.raises(SyntaxError):
+        call_arguments(source)
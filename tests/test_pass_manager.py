@@ -0,0 +1,96 @@
+import pytest
+
+from compiler.passes import (OPTIMIZATION_LEVELS, DeadCodeElimination, FunctionPass,
+                             LoopInvariantCodeMotion, PassManager, build_pipeline)
+from tests.helpers import intermediate_code, operations, run_ir, run_source
+
+PROGRAM = """int main() {
+    int a = 6; int b = 7; int i = 0; int s = 0; int unused = 3;
+    while (i < 10) { s = s + a * b; i = i + 1; }
+    print(s);
+    return 0;
+}"""
+
+
+class CountingPass(FunctionPass):
+    """Records the functions it sees and changes nothing."""
+
+    name = 'count'
+
+    def __init__(self):
+        self.seen = []
+
+    def run_on_function(self, func, program):
+        self.seen.append(func.name)
+        self.analysis('loops', func)
+        return False
+
+
+@pytest.mark.parametrize('level', sorted(OPTIMIZATION_LEVELS))
+def test_levels_keep_the_output(level):
+    assert run_source(PROGRAM, level) == ['420']
+
+
+def test_levels_optimize_more():
+    code = intermediate_code(PROGRAM)
+    O0, O1, O2 = (build_pipeline(level).run_on_code(code) for level in (0, 1, 2))
+    assert len(O0) == len(code)
+    assert len(O1) < len(O0)
+    # -O1 rotates the loop so its test is at the bottom
+    assert operations(O1).count('IF_TRUE') == 1
+    # -O2 hoists the product out of the loop and unrolls it
+    assert operations(O2).count('MUL') == 1
+    assert O2.index('t0 = t1 MUL t2') < O2.index('GOTO L5')
+    assert operations(O2).count('ADD') > operations(O1).count('ADD')
+
+
+def test_unknown_levels_are_rejected():
+    with pytest.raises(ValueError, match="-O3"):
+        build_pipeline(3)
+
+
+def test_pipelines_have_fresh_passes():
+    first, second = build_pipeline(2), build_pipeline(2)
+    assert not set(map(id, first.passes)) & set(map(id, second.passes))
+    assert [pass_.name for pass_ in first.passes][-1] == 'renumber-temps'
+
+
+def test_empty_pipeline_returns_a_copy():
+    code = intermediate_code(PROGRAM)
+    result = PassManager().run_on_code(code)
+    assert result == code and result is not code
+
+
+def test_statistics_track_instruction_counts():
+    manager = PassManager([DeadCodeElimination(), CountingPass()])
+    code = intermediate_code(PROGRAM)
+    optimized = manager.run_on_code(code)
+    dce, count = manager.statistics
+    assert dce['pass'] == 'dce' and dce['changed']
+    assert dce['instructions_before'] == len(code)
+    assert dce['instructions_after'] < dce['instructions_before']
+    assert count['instructions_before'] == count['instructions_after'] == dce['instructions_after']
+    assert not count['changed']
+    assert all(stat['time_ms'] >= 0 for stat in manager.statistics)
+    assert run_ir(optimized) == ['420']
+
+
+def test_report():
+    manager = build_pipeline(2)
+    manager.run_on_code(intermediate_code(PROGRAM))
+    lines = manager.report()
+    assert lines[0] == "===== Pass execution timing report ====="
+    assert len(lines) >= 2 + len(manager.passes) + 1
+    assert lines[2 + len(manager.passes)].endswith('Total')
+    assert any(line.startswith('Analysis loops: computed') for line in lines)
+
+
+def test_analyses_are_shared_until_invalidated():
+    counting = CountingPass()
+    manager = PassManager([CountingPass(), counting, LoopInvariantCodeMotion(), CountingPass()])
+    manager.run_on_code(intermediate_code(PROGRAM))
+    assert counting.seen == ['main']
+    # Computed by the first pass and reused by the second; LICM changed
+    # main, so the last pass computes the loops again
+    assert manager.analyses.misses['loops'] == 3
+    assert manager.analyses.hits['loops'] >= 1
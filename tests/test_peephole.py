@@ -0,0 +1,71 @@
+import pytest
+
+from compiler.peephole import PeepholeOptimizer, mentions, parse_line
+
+
+def optimize(body):
+    """Optimizes the body of a function; returns it and the rule hits."""
+    optimizer = PeepholeOptimizer()
+    code = optimizer.optimize(['section .text', 'main:'] + [f"    {line}" for line in body])
+    hits = {name: count for name, count in optimizer.hits.items() if count}
+    return [line.strip() for line in code[2:]], hits
+
+
+@pytest.mark.parametrize('rule, before, after', [
+    ('self-move', ['mov ebx, ebx', 'ret'], ['ret']),
+    ('overwritten-move', ['mov eax, 1', 'mov eax, ebx', 'ret'], ['mov eax, ebx', 'ret']),
+    ('store-load', ['mov [ebp-4], eax', 'mov ebx, [ebp-4]', 'ret'],
+     ['mov [ebp-4], eax', 'mov ebx, eax', 'ret']),
+    ('load-store', ['mov eax, [ebp-4]', 'mov [ebp-4], eax', 'ret'], ['mov eax, [ebp-4]', 'ret']),
+    ('jump-to-next', ['jmp L1', 'L1:', 'ret'], ['ret']),
+    ('unreachable', ['jmp L1', 'mov eax, 1', 'L1:', 'ret'], ['ret']),
+    ('push-add-esp', ['push eax', 'add esp, 4', 'ret'], ['ret']),
+    ('merge-add-esp', ['call f', 'add esp, 8', 'add esp, 4', 'ret'], ['call f', 'add esp, 12', 'ret']),
+    ('branch-over-jump', ['jl L1', 'jmp L2', 'L1:', 'mov eax, 1', 'L2:', 'ret'],
+     ['jge L2', 'mov eax, 1', 'L2:', 'ret']),
+])
+def test_rules(rule, before, after):
+    code, hits = optimize(before)
+    assert code == after
+    assert rule in hits
+
+
+@pytest.mark.parametrize('body', [
+    # The second move reads the register the first one wrote
+    ['mov eax, 1', 'mov eax, [eax+4]', 'ret'],
+    ['mov eax, 1', 'mov eax, [rax+4]', 'ret'],
+    # Different memory operands
+    ['mov [ebp-4], eax', 'mov ebx, [ebp-8]', 'ret'],
+    # A label between two lines may be reached from elsewhere
+    ['mov eax, 1', 'L1:', 'mov eax, 2', 'jmp L1'],
+    ['push eax', 'add esp, 8', 'ret'],
+])
+def test_code_that_must_stay(body):
+    assert optimize(body)[0] == body
+
+
+def test_rules_apply_until_nothing_changes():
+    # Removing the dead move exposes a jump to the next label, which makes
+    # the label unused
+    code, hits = optimize(['jmp L1', 'mov eax, 1', 'L1:', 'mov ebx, ebx', 'ret'])
+    assert code == ['ret']
+    assert hits == {'unreachable': 1, 'jump-to-next': 1, 'unused-label': 1, 'self-move': 1}
+
+
+def test_data_section_and_function_labels_are_kept():
+    code = ['section .data', 'x: dd 0', 'section .text', 'f:', '    ret', 'main:', '    ret']
+    assert PeepholeOptimizer().optimize(code) == code
+
+
+def test_register_names():
+    assert mentions('[rbp-8]', 'ebp') and mentions('r12', 'r12d') and not mentions('r12', 'r13d')
+    line = parse_line('    mov dword [rbp-4], 5')
+    assert line.mnemonic == 'mov' and line.operands == ['dword [rbp-4]', '5']
+
+
+def test_report():
+    optimizer = PeepholeOptimizer()
+    optimizer.optimize(['section .text', 'main:', '    mov eax, eax', '    ret'])
+    report = optimizer.report()
+    assert report[0] == "===== Peephole rule hits ====="
+    assert '       1  self-move' in report and report[-1] == '       1  Total'
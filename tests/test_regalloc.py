@@ -0,0 +1,131 @@
+import itertools
+
+import pytest
+
+from compiler.cfg import build_program
+from compiler.regalloc import (GraphColoringAllocator, LinearScanAllocator, StackAllocator,
+                               allocator_for_level)
+from tests.helpers import generate_ir
+
+LOOP = """int main() {
+    int a = 1; int b = 2; int i = 0; int s = 0;
+    while (i < 10) { s = s + a * i + b; print(s); i = i + 1; }
+    print(s);
+    return 0;
+}"""
+
+# More values are live at once than there are registers
+PRESSURE = """int main() {
+    int a = 1; int b = 2; int c = 3; int d = 4; int e = 5; int f = 6; int i = 0;
+    while (i < 10) { a = a + b; b = b + c; c = c + d; d = d + e; e = e + f; f = f + a; i = i + 1; }
+    print(a + b + c + d + e + f);
+    return 0;
+}"""
+
+PROGRAMS = [LOOP, PRESSURE]
+
+
+def allocate(source, allocator, level=1):
+    """Allocates main of a program; returns the renamed function and the allocation."""
+    program = build_program(generate_ir(source, level))
+    func = program.functions[-1]
+    return func, allocator.allocate(func, program.global_names)
+
+
+def test_webs_split_names_and_constants_become_immediates():
+    func, allocation = allocate(LOOP, LinearScanAllocator())
+    # TempRenumbering reuses t0 for every statement; each value is a web
+    assert len([name for name in allocation.assignment if name.startswith('t0.')]) > 5
+    assert 't0' not in allocation.assignment
+    assert allocation.constants['t1.4'] == '10'
+    assert not set(allocation.constants) & set(allocation.assignment)
+
+
+@pytest.mark.parametrize('source', PROGRAMS)
+@pytest.mark.parametrize('registers', [None, ['ecx', 'ebx'], ['ecx']])
+def test_overlapping_intervals_get_different_registers(source, registers):
+    allocator = LinearScanAllocator(registers)
+    func, allocation = allocate(source, allocator)
+    _, intervals = allocator._build_intervals(func, set(allocation.assignment), allocation)
+    assigned = [interval for interval in intervals.values() if allocation.register(interval.name)]
+    for first, second in itertools.combinations(assigned, 2):
+        if allocation.register(first.name) == allocation.register(second.name):
+            assert first.end < second.start or second.end < first.start
+
+
+def test_values_live_across_calls_prefer_callee_saved_registers():
+    func, allocation = allocate(LOOP, LinearScanAllocator())
+    # i is live across print(s) in the loop
+    assert allocation.register('i') in ('ebx', 'esi', 'edi')
+    assert allocation.callee_saved == [register for register in ('ebx', 'esi', 'edi')
+                                       if register in allocation.assignment.values()]
+
+
+def test_caller_saved_registers_are_saved_around_calls():
+    source = "int main() { int x = 5; print(1); print(x); return 0; }"
+    func, allocation = allocate(source, LinearScanAllocator(['ecx']))
+    first_print = next(instr for instr in func.instructions() if instr.op == 'PRINT')
+    assert allocation.call_saves[id(first_print)] == ['ecx']
+    assert allocation.callee_saved == []
+
+
+def test_spills_when_registers_run_out():
+    func, allocation = allocate(PRESSURE, LinearScanAllocator())
+    assert allocation.spilled()
+    assert all(register in ('ecx', 'ebx', 'esi', 'edi', None)
+               for register in allocation.assignment.values())
+    _, everything = allocate(PRESSURE, StackAllocator())
+    assert everything.spilled() == sorted(everything.assignment)
+
+
+def test_allocator_for_level():
+    assert isinstance(allocator_for_level(0), LinearScanAllocator)
+    assert isinstance(allocator_for_level(1), LinearScanAllocator)
+    assert isinstance(allocator_for_level(2), GraphColoringAllocator)
+
+
+COPIES = """int main() {
+    int x = 0; int y = 0;
+    while (x < 10) { y = x; x = y + 1; }
+    print(x);
+    return 0;
+}"""
+
+
+@pytest.mark.parametrize('source', PROGRAMS + [COPIES])
+@pytest.mark.parametrize('registers', [None, ['ecx', 'ebx'], ['ecx']])
+def test_interfering_webs_get_different_registers(source, registers):
+    allocator = GraphColoringAllocator(registers)
+    func, allocation = allocate(source, allocator, 2)
+    nodes = set(allocation.assignment) | set(allocation.aliases)
+    graph, _, _, _ = allocator._build_graph(func, nodes, allocation)
+    for name, neighbors in graph.items():
+        for other in neighbors:
+            register = allocation.register(name)
+            assert register is None or register != allocation.register(other)
+
+
+def test_copies_are_coalesced():
+    func, allocation = allocate(COPIES, GraphColoringAllocator(), 2)
+    # x, y and the temps copying between them become one web
+    home = allocation.home('x')
+    assert allocation.home('y') == home
+    assert sum(1 for name in allocation.aliases if allocation.home(name) == home) >= 4
+    assert len(set(allocation.assignment.values())) == 2
+
+
+def test_values_live_across_calls_are_not_coalesced_with_others():
+    func, allocation = allocate(LOOP, GraphColoringAllocator(), 2)
+    crossing = [name for name in allocation.assignment if name.startswith(('i.', 's.'))]
+    assert crossing
+    for name in crossing:
+        assert allocation.home(name) == name
+
+
+def test_colors_follow_the_call_conventions():
+    source = "int main() { int x = 5; print(1); print(x); return 0; }"
+    func, allocation = allocate(source, GraphColoringAllocator(), 2)
+    assert allocation.register('x') in ('ebx', 'esi', 'edi')
+    assert not allocation.call_saves
+    func, allocation = allocate(source, GraphColoringAllocator(['ecx']), 2)
+    assert allocation.call_saves
@@ -0,0 +1,20 @@
+import os
+import shutil
+
+import pytest
+
+import run_native
+
+FACTORIAL = os.path.join(os.path.dirname(__file__), '..', 'examples', 'factorial.c')
+
+
+@pytest.mark.skipif(shutil.which('cc') is None, reason="a C compiler is required")
+@pytest.mark.parametrize('level', [0, 1, 2])
+def test_factorial_matches_the_vm(level, tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    assert run_native.check(os.path.abspath(FACTORIAL), level, 1)
+    # The parser's debugging output stays in the build directory
+    assert os.listdir(tmp_path) == []
+    output = capsys.readouterr().out
+    assert 'matches (4 lines native, 4 in the VM)' in output
+    assert 'DEBUG' not in output
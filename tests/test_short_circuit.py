@@ -0,0 +1,33 @@
+import pytest
+
+from compiler.lexer import Lexer
+from tests.helpers import intermediate_code, operations, run_source
+
+# f prints its argument, so the output shows which operands were evaluated
+PROGRAM = """int f(int x) { print(x); return x; }
+int main() {
+    if (f(0) && f(1)) { print(9); }
+    if (f(2) || f(3)) { print(8); }
+    int v = f(0) || f(5);
+    print(v);
+    int w = f(4) && !f(0);
+    print(w);
+    return 0;
+}"""
+
+
+def test_lexer_reads_logical_operators_as_single_tokens():
+    tokens = [(token.type, token.value) for token in Lexer("a && b || !c").tokenize()]
+    assert ('OPERATOR', '&&') in tokens and ('OPERATOR', '||') in tokens
+    assert ('OPERATOR', '&') not in tokens and ('OPERATOR', '|') not in tokens
+
+
+def test_conditions_lower_to_branches():
+    ops = operations(intermediate_code(PROGRAM))
+    assert 'AND' not in ops and 'OR' not in ops
+    assert 'IF_TRUE' in ops
+
+
+@pytest.mark.parametrize('level', [0, 1, 2])
+def test_right_operand_is_only_evaluated_when_needed(level):
+    assert run_source(PROGRAM, level) == ['0', '2', '8', '0', '5', '1', '4', '0', '1']
@@ -0,0 +1,181 @@
+import re
+
+import pytest
+
+from compiler.cfg import build_program
+from compiler.ssa import _sequentialize, from_ssa, to_ssa
+from tests.helpers import generate_ir, run_ir
+
+PROGRAMS = {
+    'loop': """int main() {
+        int i = 0;
+        int total = 0;
+        while (i < 10) {
+            total = total + i;
+            i = i + 1;
+        }
+        print(total);
+        print(i);
+        return 0;
+    }""",
+    'nested-ifs': """int main() {
+        int i = 0;
+        int a = 0;
+        int b = 100;
+        while (i < 12) {
+            if (i > 3) {
+                if (i / 2 * 2 == i) {
+                    a = a + i;
+                } else {
+                    b = b - i;
+                }
+            } else {
+                a = a - 1;
+            }
+            i = i + 1;
+        }
+        print(a);
+        print(b);
+        return 0;
+    }""",
+    'swap': """int main() {
+        int a = 1;
+        int b = 2;
+        int i = 0;
+        while (i < 5) {
+            int t = a;
+            a = b;
+            b = t;
+            i = i + 1;
+        }
+        print(a);
+        print(b);
+        return 0;
+    }""",
+    'short-circuit': """int main() {
+        int i = 0;
+        int hits = 0;
+        while (i < 20) {
+            if (i > 5 && i < 15 || i == 2) {
+                hits = hits + (i > 10 || i < 3);
+            }
+            i = i + 1;
+        }
+        print(hits);
+        return 0;
+    }""",
+    'calls-and-globals': """int calls = 0;
+
+    int fib(int n) {
+        calls = calls + 1;
+        if (n < 2) {
+            return n;
+        }
+        return fib(n - 1) + fib(n - 2);
+    }
+
+    int main() {
+        int n = 0;
+        while (n < 8) {
+            print(fib(n));
+            n = n + 1;
+        }
+        print(calls);
+        return 0;
+    }""",
+}
+
+# Lowered by hand into SSA: a and b swap through their PHIs, a copy cycle
+SWAP_SSA = """FUNCTION main:
+LABEL L9
+a.1 = 1
+b.1 = 2
+i.1 = 0
+LABEL L0
+a.2 = PHI [a.1, L9], [b.2, L3]
+b.2 = PHI [b.1, L9], [a.2, L3]
+i.2 = PHI [i.1, L9], [i.3, L3]
+t0 = i.2 LT 3
+IF_FALSE t0 GOTO L1
+LABEL L3
+i.3 = i.2 ADD 1
+GOTO L0
+LABEL L1
+PRINT a.2
+PRINT b.2
+t1 = 0
+RETURN t1"""
+
+# The "lost copy" problem: x.2 is used after the loop that redefines it,
+# along a critical edge
+LOST_COPY_SSA = """FUNCTION main:
+LABEL L9
+x.1 = 1
+LABEL L0
+x.2 = PHI [x.1, L9], [x.3, L0]
+x.3 = x.2 ADD 1
+t0 = x.3 LT 5
+IF_TRUE t0 GOTO L0
+LABEL L1
+PRINT x.2
+PRINT x.3
+t1 = 0
+RETURN t1"""
+
+
+def ssa_names(line):
+    return re.findall(r'\b[A-Za-z_]\w*\.\d+\b', line)
+
+
+@pytest.mark.parametrize('level', [0, 1, 2])
+@pytest.mark.parametrize('name', sorted(PROGRAMS))
+def test_round_trip_preserves_output(name, level):
+    code = generate_ir(PROGRAMS[name], level)
+    lowered = from_ssa(to_ssa(code))
+    assert run_ir(lowered) == run_ir(code)
+    assert not any(' PHI ' in line or ssa_names(line) for line in lowered)
+
+
+@pytest.mark.parametrize('name', sorted(PROGRAMS))
+def test_every_name_is_defined_once(name):
+    program = to_ssa(generate_ir(PROGRAMS[name], 0))
+    for func in program.functions:
+        dests = [instr.dest for instr in func.instructions() if instr.dest is not None]
+        assert len(dests) == len(set(dests))
+
+
+def test_loop_header_gets_phis_for_loop_variables():
+    program = to_ssa(generate_ir(PROGRAMS['loop'], 0))
+    phis = [instr for instr in program.functions[0].instructions() if instr.op == 'PHI']
+    assert sorted(phi.dest.split('.')[0] for phi in phis) == ['i', 'total']
+    assert all(len(phi.args) == 2 for phi in phis)
+
+
+def test_nested_ifs_merge_assignments_with_phis():
+    program = to_ssa(generate_ir(PROGRAMS['nested-ifs'], 0))
+    phis = [instr for instr in program.functions[0].instructions() if instr.op == 'PHI']
+    merged = {phi.dest.split('.')[0] for phi in phis}
+    assert {'a', 'b', 'i'} <= merged
+    # a is assigned in the inner then-branch and the outer else-branch, so
+    # it is merged after the inner if, after the outer if and at the loop
+    assert sum(phi.dest.startswith('a.') for phi in phis) >= 3
+
+
+def test_swap_cycle_of_phis_is_sequentialized():
+    lowered = from_ssa(build_program(SWAP_SSA.splitlines()))
+    assert run_ir(lowered) == ['2', '1']
+
+
+def test_lost_copy_splits_the_critical_edge():
+    lowered = from_ssa(build_program(LOST_COPY_SSA.splitlines()))
+    assert run_ir(lowered) == ['4', '5']
+
+
+def test_parallel_copy_cycle_uses_one_temporary():
+    func = build_program(['FUNCTION main:', 'RETURN 0']).functions[0]
+    copies = _sequentialize(func, [('a', 'b'), ('b', 'c'), ('c', 'a')])
+    values = {'a': 1, 'b': 2, 'c': 3}
+    for instr in copies:
+        values[instr.dest] = values[instr.args[0]]
+    assert (values['a'], values['b'], values['c']) == (2, 3, 1)
+    assert len(copies) == 4
@@ -0,0 +1,82 @@
+import pytest
+
+from compiler.passes import AlgebraicSimplification, InductionVariableStrengthReduction
+from tests.helpers import operations, run_ir, run_passes, run_source
+
+# 2 * INT_MAX + 1 wraps around to -1
+OVERFLOW_PROGRAM = """int main() {
+    int x = 2147483647;
+    int y = x + x;
+    int z = y + 1;
+    print(z / 2);
+    print(z % 2);
+    return 0;
+}"""
+
+
+def simplified_ops(source):
+    """Returns the opcodes of a program after AlgebraicSimplification."""
+    return operations(run_passes(source, AlgebraicSimplification))
+
+
+@pytest.mark.parametrize('level', [0, 1, 2])
+def test_division_of_wrapped_sum_truncates_toward_zero(level):
+    assert run_source(OVERFLOW_PROGRAM, level) == ['0', '-1']
+
+
+def test_wrapping_dividend_is_not_shifted():
+    ops = simplified_ops(OVERFLOW_PROGRAM)
+    assert 'DIV' in ops and 'MOD' in ops
+    assert 'SAR' not in ops and 'BITAND' not in ops
+
+
+def test_bounded_dividend_is_shifted():
+    ops = simplified_ops("""int main() {
+        int x = 100;
+        int y = x * 3 + 7;
+        print(y / 4);
+        print(y % 8);
+        return 0;
+    }""")
+    assert 'SAR' in ops and 'BITAND' in ops
+    assert 'DIV' not in ops and 'MOD' not in ops
+
+
+def test_induction_variable_is_not_assumed_non_negative():
+    ops = simplified_ops("""int main() {
+        int i = 0;
+        while (i < 10) {
+            print(i / 2);
+            i = i + 1;
+        }
+        return 0;
+    }""")
+    assert 'SAR' not in ops
+
+
+def test_power_of_two_multiplication_becomes_shift():
+    ops = simplified_ops("int main() { int a = 3; print(a * 8); return 0; }")
+    assert 'SHL' in ops and 'MUL' not in ops
+
+
+def test_induction_variable_multiplication_is_reduced():
+    source = """int main() {
+        int i = 0;
+        int total = 0;
+        while (i < 10) {
+            total = total + i * 7;
+            i = i + 1;
+        }
+        print(total);
+        return 0;
+    }"""
+    ir = run_passes(source, InductionVariableStrengthReduction)
+    # The only multiplication left initializes the running sum before the loop
+    assert operations(ir).count('MUL') == 1
+    assert run_ir(ir) == ['315']
+
+
+def test_negated_dividend_is_not_shifted():
+    source = "int main() { int a = 7; int b = -a; print(b / 2); print(b % 2); return 0; }"
+    assert 'SAR' not in simplified_ops(source)
+    assert run_source(source, 1) == ['-3', '-1']
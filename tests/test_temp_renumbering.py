@@ -0,0 +1,44 @@
+import re
+
+from compiler.passes import OPTIMIZATION_LEVELS, TempRenumbering
+from tests.helpers import intermediate_code, operations, run_ir, run_passes
+
+PROGRAM = """int square(int x) {
+    return x * x;
+}
+
+int main() {
+    int i = 0;
+    int total = 0;
+    while (i < 10) {
+        if (i / 2 * 2 == i && i != 4) {
+            total = total + square(i) + (i || total);
+        } else {
+            print("odd");
+        }
+        i = i + 1;
+    }
+    print(total);
+    return 0;
+}"""
+
+
+def temps(code):
+    return {name for line in code for name in re.findall(r'\bt\d+\b', line)}
+
+
+def test_renumbering_shrinks_the_temp_namespace():
+    before = intermediate_code(PROGRAM)
+    after = run_passes(PROGRAM, TempRenumbering)
+    assert len(temps(after)) < len(temps(before)) // 3
+
+
+def test_renumbering_only_renames():
+    before = intermediate_code(PROGRAM)
+    after = run_passes(PROGRAM, TempRenumbering)
+    assert operations(after) == operations(before)
+    assert run_ir(after) == run_ir(before)
+
+
+def test_o0_runs_only_renumbering():
+    assert OPTIMIZATION_LEVELS[0] == [TempRenumbering]
@@ -0,0 +1,66 @@
+import pytest
+
+from compiler.execution import BytecodeCompiler, VirtualMachine
+from compiler.execution.tracing import TRACE_BASIC, TRACE_OFF, TRACE_VERBOSE, Tracer
+from tests.helpers import generate_ir
+
+PROGRAM = """int twice(int x) { return x * 2; }
+int main() {
+    int i = 0;
+    while (i < 2) { print(twice(i)); i = i + 1; }
+    return 0;
+}"""
+
+
+def traced_run(tracer):
+    program = BytecodeCompiler().compile(generate_ir(PROGRAM))
+    return VirtualMachine(program, tracer=tracer).run()
+
+
+def test_basic_tracing_follows_calls_returns_and_output():
+    tracer = Tracer(TRACE_BASIC)
+    assert traced_run(tracer) == ['0', '2']
+    # The global initializers run first, as a function of their own
+    assert tracer.lines() == [
+        '<globals>: return 0',
+        'main: call twice(0)', 'twice: return 0', 'main: print 0',
+        'main: call twice(1)', 'twice: return 2', 'main: print 2',
+        'main: return 0',
+    ]
+
+
+def test_verbose_tracing_adds_jumps():
+    basic, verbose = Tracer(TRACE_BASIC), Tracer(TRACE_VERBOSE)
+    traced_run(basic)
+    traced_run(verbose)
+    jumps = [line for line in verbose.lines() if ': jump to ' in line]
+    assert jumps
+    assert [line for line in verbose.lines() if line not in jumps] == basic.lines()
+
+
+def test_tracing_off_records_nothing(tmp_path):
+    tracer = Tracer(TRACE_OFF)
+    assert traced_run(tracer) == ['0', '2']
+    assert tracer.count == 0
+    path = tmp_path / 'trace.txt'
+    tracer.flush(str(path), header=['header'])
+    assert not path.exists()
+
+
+def test_ring_buffer_keeps_the_latest_messages(tmp_path):
+    tracer = Tracer(TRACE_BASIC, capacity=3)
+    traced_run(tracer)
+    assert tracer.count == 8 and tracer.dropped == 5
+    assert tracer.lines() == ['... 5 earlier trace messages dropped',
+                              'twice: return 2', 'main: print 2', 'main: return 0']
+    path = tmp_path / 'trace.txt'
+    tracer.flush(str(path), header=['start'], footer=['end'])
+    assert path.read_text().splitlines() == ['start'] + tracer.lines() + ['end']
+
+
+def test_levels_by_name():
+    assert Tracer.from_name('verbose').enabled(TRACE_VERBOSE)
+    assert Tracer.from_name('basic').enabled() and not Tracer.from_name('basic').enabled(TRACE_VERBOSE)
+    assert not Tracer.from_name('off').enabled()
+    with pytest.raises(ValueError, match="Unknown trace level 'loud'"):
+        Tracer.from_name('loud')
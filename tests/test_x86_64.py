@@ -0,0 +1,103 @@
+import pytest
+
+from compiler.peephole import PeepholeOptimizer
+from compiler.regalloc import GraphColoringAllocator, LinearScanAllocator, allocator_for_level
+from compiler.x86_64 import X86_64CodeGenerator
+from tests.helpers import generate_ir, needs_cc, run_ir, run_native
+
+# Many values live across calls, an eight-parameter function (two stack
+# arguments), recursion and a division
+CALLS = """
+int g = 3;
+int f(int a, int b, int c, int d, int e, int h, int i, int j) {
+    int k = a * b + c - d;
+    return k + e * 2 + h - i + j * 3 + g;
+}
+int sum(int n) {
+    if (n <= 0) { return 0; }
+    return n + sum(n - 1);
+}
+int main() {
+    int a = 1; int b = 2; int c = 3; int d = 4; int e = 5; int h = 6; int i = 7; int j = 8;
+    int x = 0;
+    while (x < 5) {
+        int y = f(a + x, b, c, d, e, h, i, j);
+        print(y);
+        print(a + b + c + d + e + h + i + j + x);
+        print(sum(x * 10) / (x + 1));
+        print(y % 7);
+        x = x + 1;
+    }
+    print("done");
+    return 0;
+}
+"""
+
+
+def function_code(target_code, name):
+    """Returns the instructions of one function."""
+    start = target_code.index(f"\n{name}:") + 1
+    end = next((i for i in range(start, len(target_code))
+                if not target_code[i].startswith('    ')), len(target_code))
+    return [line.strip() for line in target_code[start:end]]
+
+
+def test_values_live_in_registers():
+    ir = generate_ir("int main() { int x = 0; while (x < 10) { x = x + 1; } print(x); return 0; }")
+    code = function_code(X86_64CodeGenerator(ir).generate(), 'main')
+    assert not any('[rbp-' in line for line in code)
+
+
+def test_allocator_follows_the_system_v_conventions():
+    for allocator in (allocator_for_level(1, 'x86-64'), allocator_for_level(2, 'x86-64')):
+        assert set(allocator.registers) == {'r10d', 'r11d', 'ebx', 'r12d', 'r13d', 'r14d', 'r15d'}
+    assert 'esi' in allocator_for_level(2).registers
+
+
+@pytest.mark.parametrize('allocator', [LinearScanAllocator, GraphColoringAllocator])
+def test_callee_saved_registers_are_saved_and_the_stack_stays_aligned(allocator):
+    ir = generate_ir(CALLS, 2)
+    code = function_code(X86_64CodeGenerator(ir, allocator(target='x86-64')).generate(), 'main')
+    frame = int(code[2].split(', ')[1]) if code[2].startswith('sub rsp') else 0
+    saved = []
+    for line in code[3 if frame else 2:]:
+        if not line.startswith('push'):
+            break
+        saved.append(line.split()[1])
+    assert saved and set(saved) <= {'rbx', 'r12', 'r13', 'r14', 'r15'}
+    assert (frame + 8 * len(saved)) % 16 == 0
+    pops = [line.split()[1] for line in code if line.startswith('pop') and line != 'pop rbp']
+    assert pops[-len(saved):] == list(reversed(saved))
+
+
+def test_caller_saved_registers_are_pushed_around_calls():
+    ir = generate_ir("int main() { int x = 5; print(1); print(x); return 0; }")
+    allocator = LinearScanAllocator(registers=['r10d'], target='x86-64')
+    code = function_code(X86_64CodeGenerator(ir, allocator).generate(), 'main')
+    call = code.index('call printf wrt ..plt')
+    # An odd number of pushes is padded to keep rsp 16-byte aligned
+    assert code[call - 5:call - 3] == ['push r10', 'sub rsp, 8']
+    assert code[call + 1:call + 3] == ['add rsp, 8', 'pop r10']
+
+
+@needs_cc
+@pytest.mark.parametrize('level', [0, 1, 2])
+@pytest.mark.parametrize('buffered', [False, True])
+def test_native_output_matches_the_vm(level, buffered, tmp_path):
+    ir = generate_ir(CALLS, level)
+    expected = run_ir(ir)
+    generator = X86_64CodeGenerator(ir, allocator_for_level(level, 'x86-64'), buffered_output=buffered)
+    target_code = PeepholeOptimizer().optimize(generator.generate())
+    assert run_native(target_code, tmp_path) == expected
+
+
+@needs_cc
+@pytest.mark.parametrize('buffered', [False, True])
+def test_strings_with_quotes_and_control_characters(buffered, tmp_path):
+    ir = generate_ir(r'int main() { print("q\"q"); print("tab\there\\"); print(""); return 0; }')
+    expected = run_ir(ir)
+    assert expected == ['q"q', 'tab\there\\', '']
+    generator = X86_64CodeGenerator(ir, buffered_output=buffered)
+    target_code = PeepholeOptimizer().optimize(generator.generate())
+    assert 'str_0 db 113, 34, 113, 0' in [line.strip() for line in target_code]
+    assert run_native(target_code, tmp_path) == expected